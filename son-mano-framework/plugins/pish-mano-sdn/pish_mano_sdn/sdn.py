@@ -22,11 +22,11 @@ partner consortium (www.sonata-nfv.eu).a
 """
 
 import logging
-import yaml
 import os
 import json
 from sonmanobase.plugin import ManoBasePlugin
 from sonmanobase import messaging
+from sonmanobase import codec
 
 import zmq
 from time import sleep
@@ -115,7 +115,7 @@ class SDN(ManoBasePlugin):
         LOG.info(payload)
         fg_labels = []
         ip_list = []
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
         for i in  range (len(message['cosd']['forwarding_graphs'][0]['network_forwarding_paths'][0]['connection_points'])):
             fg_labels.append(message['cosd']['forwarding_graphs'][0]['network_forwarding_paths'][0]['connection_points'][i]['connection_point_ref'])
 
@@ -23,7 +23,6 @@ partner consortium (www.sonata-nfv.eu).
 
 import logging
 import uuid
-import requests
 import yaml
 import time
 import os
@@ -32,6 +31,9 @@ import concurrent.futures as pool
 
 from sonmanobase.plugin import ManoBasePlugin
 import sonmanobase.messaging as messaging
+from sonmanobase import codec
+from sonmanobase.corrindex import CorrelationIndex
+from sonmanobase.repository import get_client
 
 try:
     from son_mano_clm import clm_helpers as tools
@@ -70,8 +72,12 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
 
         # Create the ledger that saves state
         self.cloud_services = {}
+        # corr_id -> cservice_id of the outstanding requests in the ledger
+        self.corr_index = CorrelationIndex()
         self.clm_ledger = {}
         self.thrd_pool = pool.ThreadPoolExecutor(max_workers=10)
+        # Pooled client for the record repositories
+        self.repository = get_client()
 
         # call super class (will automatically connect to
         # broker and register the FLM to the plugin manger)
@@ -145,9 +151,36 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
 
     def set_cloud_services(self, cloud_service_dict):
         self.cloud_services = cloud_service_dict
+        self.corr_index.rebuild(cloud_service_dict)
 
         return
 
+    def cserviceid_from_corrid(self, corr_id):
+        """
+        This method returns the cloud service uuid based on a correlation id,
+        using the index if the correlation id was registered in it.
+
+        :param corr_id: The correlation id
+        """
+        cservice_id = self.corr_index.get(corr_id)
+        if cservice_id is not None and cservice_id in self.cloud_services:
+            return cservice_id
+        return tools.cserviceid_from_corrid(self.cloud_services, corr_id)
+
+    def set_act_corr_id(self, cservice_id, corr_id):
+        """
+        This method sets the active correlation id of a cloud service.
+        """
+        self.cloud_services[cservice_id]['act_corr_id'] = corr_id
+        self.corr_index.set(cservice_id, corr_id)
+
+    def remove_from_ledger(self, cservice_id):
+        """
+        This method removes a cloud service from the ledger.
+        """
+        del self.cloud_services[cservice_id]
+        self.corr_index.remove(cservice_id)
+
     def start_next_task(self, cservice_id):
         """
         This method makes sure that the next task in the schedule is started
@@ -160,7 +193,7 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
         # If the kill field is active, the chain is killed
         if self.cloud_services[cservice_id]['kill_chain']:
             LOG.info("Cloud Service " + cservice_id + ": Killing running workflow")
-            del self.cloud_services[cservice_id]
+            self.remove_from_ledger(cservice_id)
             return
 
         # Select the next task, only if task list is not empty
@@ -185,7 +218,7 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
                 self.start_next_task(cservice_id)
 
         else:
-            del self.cloud_services[cservice_id]
+            self.remove_from_ledger(cservice_id)
 
 ####################
 # CLM input - output
@@ -209,7 +242,7 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
         topic = self.cloud_services[cservice_id]['topic']
 
         self.manoconn.notify(topic,
-                             yaml.dump(message),
+                             codec.encode(message),
                              correlation_id=corr_id)
 
         # Kill the current workflow
@@ -226,7 +259,7 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
             return
 
         LOG.info("Cloud Service instance create request received.")
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
 
         # Extract the correlation id
         corr_id = properties.correlation_id
@@ -265,10 +298,10 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
         outg_message['vim_uuid'] = cloud_service['vim_uuid']
         outg_message['service_instance_id'] = cloud_service['serv_id']
 
-        payload = yaml.dump(outg_message)
+        payload = codec.encode(outg_message)
 
         corr_id = str(uuid.uuid4())
-        self.cloud_services[cservice_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(cservice_id, corr_id)
 
         LOG.info("IA contacted for cloud service deployment.")
         LOG.debug("Payload of request: " + payload)
@@ -290,9 +323,9 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
         LOG.info("Response from IA on cs deploy call received.")
         LOG.debug("Payload of request: " + str(payload))
 
-        inc_message = yaml.load(payload)
+        inc_message = codec.decode(payload, getattr(prop, 'content_type', None))
 
-        cservice_id = tools.cserviceid_from_corrid(self.cloud_services, prop.correlation_id)
+        cservice_id = self.cserviceid_from_corrid(prop.correlation_id)
 
         self.cloud_services[cservice_id]['status'] = inc_message['request_status']
 
@@ -324,20 +357,14 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
 
         # Store the record
         url = t.CSR_REPOSITORY_URL + 'cs-instances'
-        header = {'Content-Type': 'application/json'}
-        csr_response = requests.post(url,
-                                      data=json.dumps(csr),
-                                      headers=header,
-                                      timeout=1.0)
         LOG.info("Storing CSR on " + url)
         LOG.debug("CSR: " + str(csr))
+        error = self.repository.write('POST', url, csr)
 
-        if csr_response.status_code == 200:
+        if error is None:
             LOG.info("CSR storage accepted.")
         # If storage fails, add error code and message to reply to gk
         else:
-            error = {'http_code': csr_response.status_code,
-                     'message': csr_response.json()}
             self.cloud_services[cservice_id]['error'] = error
             LOG.info('CSR to repo failed: ' + str(error))
 
@@ -359,7 +386,7 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
 
         corr_id = self.cloud_services[cservice_id]['orig_corr_id']
         self.manoconn.notify(t.CS_DEPLOY,
-                             yaml.dump(message),
+                             codec.encode(message),
                              correlation_id=corr_id)
 
 
@@ -404,7 +431,7 @@ class CloudServiceLifecycleManager(ManoBasePlugin):
         self.cloud_services[cservice_id]['pause_chain'] = False
         self.cloud_services[cservice_id]['kill_chain'] = False
 
-        self.cloud_services[cservice_id]['act_corr_id'] = None
+        self.set_act_corr_id(cservice_id, None)
         self.cloud_services[cservice_id]['message'] = None
 
         # Add error field
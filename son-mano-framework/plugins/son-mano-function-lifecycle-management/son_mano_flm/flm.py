@@ -25,7 +25,6 @@ import logging
 import yaml
 import time
 import os
-import requests
 import copy
 import uuid
 import json
@@ -36,6 +35,9 @@ import concurrent.futures as pool
 
 from sonmanobase.plugin import ManoBasePlugin
 import sonmanobase.messaging as messaging
+from sonmanobase import codec
+from sonmanobase.corrindex import CorrelationIndex
+from sonmanobase.repository import get_client
 
 try:
     from son_mano_flm import flm_helpers as tools
@@ -74,8 +76,12 @@ class FunctionLifecycleManager(ManoBasePlugin):
 
         # Create the ledger that saves state
         self.functions = {}
+        # corr_id -> func_id of the outstanding requests in the ledger
+        self.corr_index = CorrelationIndex()
 
         self.thrd_pool = pool.ThreadPoolExecutor(max_workers=10)
+        # Pooled client for the record repositories
+        self.repository = get_client()
 
         self.flm_ledger = {}
 
@@ -175,9 +181,36 @@ class FunctionLifecycleManager(ManoBasePlugin):
     def set_functions(self, functions_dict):
 
         self.functions = functions_dict
+        self.corr_index.rebuild(functions_dict)
 
         return
 
+    def funcid_from_corrid(self, corr_id):
+        """
+        This method returns the function uuid based on a correlation id,
+        using the index if the correlation id was registered in it.
+
+        :param corr_id: The correlation id
+        """
+        func_id = self.corr_index.get(corr_id)
+        if func_id is not None and func_id in self.functions:
+            return func_id
+        return tools.funcid_from_corrid(self.functions, corr_id)
+
+    def set_act_corr_id(self, func_id, corr_id):
+        """
+        This method sets the active correlation id of a function.
+        """
+        self.functions[func_id]['act_corr_id'] = corr_id
+        self.corr_index.set(func_id, corr_id)
+
+    def remove_from_ledger(self, func_id):
+        """
+        This method removes a function from the ledger.
+        """
+        del self.functions[func_id]
+        self.corr_index.remove(func_id)
+
     def start_next_task(self, func_id):
         """
         This method makes sure that the next task in the schedule is started
@@ -192,7 +225,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             LOG.info("Function " + func_id + ": Killing running workflow")
             # TODO: delete FSMs, records, stop
             # TODO: Or, jump into the kill workflow.
-            del self.functions[func_id]
+            self.remove_from_ledger(func_id)
             return
 
         # Select the next task, only if task list is not empty
@@ -217,7 +250,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
                 self.start_next_task(func_id)
 
         else:
-            del self.functions[func_id]
+            self.remove_from_ledger(func_id)
 
 ####################
 # FLM input - output
@@ -241,7 +274,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
         topic = self.functions[func_id]['topic']
 
         self.manoconn.notify(topic,
-                             yaml.dump(message),
+                             codec.encode(message),
                              correlation_id=corr_id)
 
         # Kill the current workflow
@@ -258,7 +291,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             return
 
         LOG.info("Function instance create request received.")
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
 
         # Extract the correlation id
         corr_id = properties.correlation_id
@@ -302,7 +335,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             return
 
         LOG.info("Function instance start request received.")
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
 
         # Extract the correlation id
         corr_id = properties.correlation_id
@@ -320,7 +353,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             self.functions[func_id]['message'] = msg
             self.respond_to_request(func_id)
 
-            del self.functions[func_id]
+            self.remove_from_ledger(func_id)
             return
 
         # If a start FSM is present, continu with workflow
@@ -352,7 +385,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             return
 
         LOG.info("Function instance config request received.")
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
 
         # Extract the correlation id
         corr_id = properties.correlation_id
@@ -370,7 +403,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             self.functions[func_id]['message'] = msg
             self.respond_to_request(func_id)
 
-            del self.functions[func_id]
+            self.remove_from_ledger(func_id)
             return
 
         # add the payload for the FSM
@@ -401,7 +434,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             return
 
         LOG.info("Function instance stop request received.")
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
 
         # Extract the correlation id
         corr_id = properties.correlation_id
@@ -419,7 +452,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             self.functions[func_id]['message'] = msg
             self.respond_to_request(func_id)
 
-            del self.functions[func_id]
+            self.remove_from_ledger(func_id)
             return
 
         # add the payload for the FSM
@@ -450,7 +483,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             return
 
         LOG.info("Function instance scale request received.")
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
 
         # Extract the correlation id
         corr_id = properties.correlation_id
@@ -468,7 +501,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             self.functions[func_id]['message'] = msg
             self.respond_to_request(func_id)
 
-            del self.functions[func_id]
+            self.remove_from_ledger(func_id)
             return
 
         # add the payload for the FSM
@@ -502,7 +535,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
             return
 
         LOG.info("Function instance kill request received.")
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
 
         # Extract the correlation id
         corr_id = properties.correlation_id
@@ -537,14 +570,14 @@ class FunctionLifecycleManager(ManoBasePlugin):
         corr_id = str(uuid.uuid4())
         # Sending the vnfd to the SRM triggers it to onboard the fsms
         msg = {'VNFD': self.functions[func_id]['vnfd']}
-        pyld = yaml.dump(msg)
+        pyld = codec.encode(msg)
         self.manoconn.call_async(self.resp_onboard,
                                  t.SRM_ONBOARD,
                                  pyld,
                                  correlation_id=corr_id)
 
         # Add correlation id to the ledger for future reference
-        self.functions[func_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(func_id, corr_id)
 
         # Pause the chain of tasks to wait for response
         self.functions[func_id]['pause_chain'] = True
@@ -556,10 +589,10 @@ class FunctionLifecycleManager(ManoBasePlugin):
         This method handles the response from the SMR on the fsm onboard call
         """
 
-        func_id = tools.funcid_from_corrid(self.functions, prop.correlation_id)
+        func_id = self.funcid_from_corrid(prop.correlation_id)
         LOG.info("Function " + func_id + ": Onboard resp received from SMR.")
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         for key in message.keys():
             if message[key]['error'] == 'None':
@@ -594,7 +627,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
 
         msg = ": Keys in message for FSM instant: " + str(msg_for_smr.keys())
         LOG.info("Function " + func_id + msg)
-        pyld = yaml.dump(msg_for_smr)
+        pyld = codec.encode(msg_for_smr)
 
         self.manoconn.call_async(self.resp_instant,
                                  t.SRM_INSTANT,
@@ -602,7 +635,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
                                  correlation_id=corr_id)
 
         # Add correlation id to the ledger for future reference
-        self.functions[func_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(func_id, corr_id)
 
         # Pause the chain of tasks to wait for response
         self.functions[func_id]['pause_chain'] = True
@@ -616,12 +649,12 @@ class FunctionLifecycleManager(ManoBasePlugin):
         """
 
         # Retrieve the function uuid
-        func_id = tools.funcid_from_corrid(self.functions, prop.correlation_id)
+        func_id = self.funcid_from_corrid(prop.correlation_id)
         msg = ": Instantiating response received from SMR."
         LOG.info("Function " + func_id + msg)
         LOG.debug(payload)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
         for fsm_type in self.functions[func_id]['fsm'].keys():
             fsm = self.functions[func_id]['fsm'][fsm_type]
             response = message[fsm['id']]
@@ -661,10 +694,10 @@ class FunctionLifecycleManager(ManoBasePlugin):
         if function['public_key']:
             outg_message['public_key'] = function['public_key']
 
-        payload = yaml.dump(outg_message)
+        payload = codec.encode(outg_message)
 
         corr_id = str(uuid.uuid4())
-        self.functions[func_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(func_id, corr_id)
 
         LOG.info("IA contacted for function deployment.")
         LOG.debug("Payload of request: " + payload)
@@ -686,9 +719,9 @@ class FunctionLifecycleManager(ManoBasePlugin):
         LOG.info("Response from IA on vnf deploy call received.")
         LOG.debug("Payload of request: " + str(payload))
 
-        inc_message = yaml.load(payload)
+        inc_message = codec.decode(payload, getattr(prop, 'content_type', None))
 
-        func_id = tools.funcid_from_corrid(self.functions, prop.correlation_id)
+        func_id = self.funcid_from_corrid(prop.correlation_id)
 
         self.functions[func_id]['status'] = inc_message['request_status']
 
@@ -719,28 +752,17 @@ class FunctionLifecycleManager(ManoBasePlugin):
         LOG.info(yaml.dump(vnfr))
 
         # Store the record
-#            try:
         url = t.VNFR_REPOSITORY_URL + 'vnf-instances'
-        header = {'Content-Type': 'application/json'}
-        vnfr_response = requests.post(url,
-                                      data=json.dumps(vnfr),
-                                      headers=header,
-                                      timeout=1.0)
         LOG.info("Storing VNFR on " + url)
         LOG.debug("VNFR: " + str(vnfr))
+        error = self.repository.write('POST', url, vnfr)
 
-        if (vnfr_response.status_code == 200):
+        if error is None:
             LOG.info("VNFR storage accepted.")
         # If storage fails, add error code and message to rply to gk
         else:
-            error = {'http_code': vnfr_response.status_code,
-                     'message': vnfr_response.json()}
             self.functions[func_id]['error'] = error
             LOG.info('vnfr to repo failed: ' + str(error))
-        # except:
-        #     error = {'http_code': '0',
-        #              'message': 'Timeout contacting VNFR server'}
-        #     LOG.info('time-out on vnfr to repo')
 
         return
 
@@ -754,7 +776,6 @@ class FunctionLifecycleManager(ManoBasePlugin):
         # is added, other fields of the record might need upates
         # as well
 
-        error = None
         vnfr = self.functions[func_id]['vnfr']
         vnfr_id = func_id
 
@@ -771,28 +792,11 @@ class FunctionLifecycleManager(ManoBasePlugin):
 
         # Put it
         url = t.VNFR_REPOSITORY_URL + 'vnf-instances/' + vnfr_id
-        header = {'Content-Type': 'application/json'}
-
-        LOG.info("Service " + serv_id + ": VNFR update: " + url)
+        LOG.info("Function " + func_id + ": VNFR update: " + url)
 
-        try:
-            vnfr_resp = requests.put(url,
-                                     data=json.dumps(vnfr),
-                                     headers=header,
-                                     timeout=1.0)
-            vnfr_resp_json = str(vnfr_resp.json())
-
-            if (vnfr_resp.status_code == 200):
-                msg = ": VNFR update accepted for " + vnfr_id
-                LOG.info("Service " + serv_id + msg)
-            else:
-                msg = ": VNFR update not accepted: " + vnfr_resp_json
-                LOG.info("Service " + serv_id + msg)
-                error = {'http_code': vnfr_resp.status_code,
-                         'message': vnfr_resp_json}
-        except:
-            error = {'http_code': '0',
-                     'message': 'Timeout when contacting VNFR repo'}
+        error = self.repository.write('PUT', url, vnfr)
+        if error is None:
+            LOG.info("Function " + func_id + ": VNFR update accepted")
 
         if error is not None:
             LOG.info("record update failed: " + str(error))
@@ -815,7 +819,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
 
         corr_id = self.functions[func_id]['orig_corr_id']
         self.manoconn.notify(t.VNF_DEPLOY,
-                             yaml.dump(message),
+                             codec.encode(message),
                              correlation_id=corr_id)
 
     def trigger_task_fsm(self, func_id):
@@ -835,14 +839,14 @@ class FunctionLifecycleManager(ManoBasePlugin):
 
         # Generating the corr_id
         corr_id = str(uuid.uuid4())
-        self.functions[func_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(func_id, corr_id)
 
         fsm_conn = self.fsm_connections[func_id]
 
         # Making the call
         fsm_conn.call_async(self.fsm_task_response,
                             topic,
-                            yaml.dump(payload),
+                            codec.encode(payload),
                             correlation_id=corr_id)
 
         # Pause the chain
@@ -852,9 +856,9 @@ class FunctionLifecycleManager(ManoBasePlugin):
         """
         This method handles a response from a task FSM.
         """
-        response = yaml.load(response)
+        response = codec.decode(response)
 
-        func_id = tools.funcid_from_corrid(self.functions, prop.correlation_id)
+        func_id = self.funcid_from_corrid(prop.correlation_id)
 
         LOG.info("Response from task FSM received")
 
@@ -910,7 +914,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
 
         # Generating the corr_id
         corr_id = str(uuid.uuid4())
-        self.functions[func_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(func_id, corr_id)
         self.functions[func_id]['active_fsm'] = fsm_type
 
         fsm_conn = self.fsm_connections[func_id]
@@ -918,7 +922,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
         # Making the call
         fsm_conn.call_async(self.fsm_generic_response,
                             topic,
-                            yaml.dump(payload),
+                            codec.encode(payload),
                             correlation_id=corr_id)
 
         # Pause the chain
@@ -928,9 +932,9 @@ class FunctionLifecycleManager(ManoBasePlugin):
         """
         This method handles a response to a generic FSM trigger call
         """
-        response = yaml.load(payload)
+        response = codec.decode(payload, getattr(prop, 'content_type', None))
 
-        func_id = tools.funcid_from_corrid(self.functions, prop.correlation_id)
+        func_id = self.funcid_from_corrid(prop.correlation_id)
         fsm_type = self.functions[func_id]['active_fsm']
 
         LOG.info("Response from " + fsm_type + " FSM received")
@@ -969,7 +973,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
         corr_id = self.functions[func_id]['orig_corr_id']
         topic = self.functions[func_id]['topic']
         self.manoconn.notify(topic,
-                             yaml.dump(message),
+                             codec.encode(message),
                              correlation_id=corr_id)
 
 ###########
@@ -1025,7 +1029,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
         self.functions[func_id]['stop'] = None
         self.functions[func_id]['configure'] = None
 
-        self.functions[func_id]['act_corr_id'] = None
+        self.set_act_corr_id(func_id, None)
         self.functions[func_id]['message'] = None
 
         # Add error field
@@ -1094,7 +1098,7 @@ class FunctionLifecycleManager(ManoBasePlugin):
         self.functions[func_id]['start'] = None
         self.functions[func_id]['stop'] = None
         self.functions[func_id]['configure'] = None
-        self.functions[func_id]['act_corr_id'] = None
+        self.set_act_corr_id(func_id, None)
         self.functions[func_id]['message'] = None
 
         # Add error field
@@ -29,10 +29,10 @@ partner consortium (www.sonata-nfv.eu).
 This is the main module of the Placement Executive Plugin.
 """
 import logging
-import yaml
 import os
 from sonmanobase.plugin import ManoBasePlugin
 from sonmanobase import messaging
+from sonmanobase import codec
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("son-mano-placement-executive")
@@ -69,7 +69,7 @@ class PlacementExecutive(ManoBasePlugin):
         LOG.info('De-registering Placement Executive with uuid ' + str(self.uuid))
         message = {"uuid": self.uuid}
         self.manoconn.notify("platform.management.plugin.deregister",
-                             yaml.dump(message))
+                             codec.encode(message))
         os._exit(0)
 
     def on_registration_ok(self):
@@ -87,14 +87,14 @@ class PlacementExecutive(ManoBasePlugin):
 
     def on_placement_request(self, ch, method, properties, payload):
         if properties.app_id != self.name:
-            message = yaml.load(payload)
+            message = codec.decode(payload, getattr(properties, 'content_type', None))
             LOG.info('Placement request received')
 
             #topic = 'placement.ssm.{0}'.format(message['uuid'])
             topic = 'placement.ssm.' + message['uuid']
 
             LOG.info(topic)
-            req = yaml.dump(message)
+            req = codec.encode(message)
             url = "{0}/ssm-{1}".format(self.sm_broker_host, message['uuid'])
             connection = messaging.ManoBrokerRequestResponseConnection(app_id=self.name, url=url)
             connection.call_async(self.on_placement_result, topic=topic, msg=req, correlation_id= properties.correlation_id)
@@ -103,8 +103,8 @@ class PlacementExecutive(ManoBasePlugin):
     def on_placement_result(self, ch, method, properties, payload):
         if properties.app_id != self.name:
             LOG.info ('Placement result received')
-            message = yaml.load(payload)
-            resp = yaml.dump(message)
+            message = codec.decode(payload, getattr(properties, 'content_type', None))
+            resp = codec.encode(message)
             inspect = self.inspector(resp)
             if inspect:
                 self.manoconn.notify(topic="placement.executive.request", msg=resp, correlation_id=properties.correlation_id)
@@ -0,0 +1,243 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+
+# Benchmark of the placement strategies on synthetic services.
+#
+# Every scenario generates a topology and a number of services from a
+# fixed seed and places the services one after the other on it, as the
+# placement plugin does for a batch. It reports the placement time, the
+# share of services that could be placed, the fragmentation of the free
+# resources and the number of forwarding graph links that cross VIMs.
+# The generated requests only depend on the parameters, so results of
+# different commits can be compared, e.g. with --baseline:
+#
+#   python -m son_mano_placement.benchmark --json before.json
+#   python -m son_mano_placement.benchmark --baseline before.json
+
+import argparse
+import copy
+import json
+import logging
+import subprocess
+import time
+
+from sonmanobase.benchmark import percentile
+
+from son_mano_placement import engine
+from son_mano_placement import generator
+
+LOG = logging.getLogger("plugin:placement:benchmark")
+LOG.setLevel(logging.INFO)
+
+# The fields that identify a scenario
+KEY = ("strategy", "vims", "vnfs", "services", "graph", "distribution", "seed")
+
+
+def cross_vim_links(request, mapping):
+    """
+    :return: number of links of the forwarding paths of a service whose
+             ends are on different VIMs
+    """
+    by_name = dict((f['vnfd']['name'], mapping[f['id']]['vim'])
+                   for f in request['functions'])
+    vim_of = dict((vnf['vnf_id'], by_name.get(vnf['vnf_name']))
+                  for vnf in request['nsd']['network_functions'])
+
+    links = 0
+    for graph in request['nsd'].get('forwarding_graphs') or []:
+        for path in graph['network_forwarding_paths']:
+            points = sorted(path['connection_points'], key=lambda cp: cp['position'])
+            previous = None
+            for point in points:
+                vnf_id = point['connection_point_ref'].split(':')[0]
+                if vnf_id not in vim_of or vnf_id == previous:
+                    continue
+                if previous is not None and vim_of[previous] != vim_of[vnf_id]:
+                    links += 1
+                previous = vnf_id
+    return links
+
+
+def average_demand(requests):
+    """
+    :return: the average cores and memory of a function of the requests
+    """
+    demand = [0, 0]
+    count = 0
+    for request in requests:
+        for function in request['functions']:
+            count += 1
+            for vdu in function['vnfd']['virtual_deployment_units']:
+                demand[0] += vdu['resource_requirements']['cpu']['vcpus']
+                demand[1] += vdu['resource_requirements']['memory']['size']
+    return [d / float(count) for d in demand] if count else demand
+
+
+def fragmentation(topology, demand):
+    """
+    The share of the free resources that is stranded on VIMs which can't
+    host an average function anymore, averaged over cores and memory.
+
+    :param demand: the average cores and memory of a function
+    """
+    fields = (('core_used', 'core_total'), ('memory_used', 'memory_total'))
+    free = [[vim[total] - vim[used] for used, total in fields]
+            for vim in topology if vim['vim_type'] != engine.KUBERNETES]
+    stranded = [vim for vim in free
+                if any(vim[r] < demand[r] for r in range(len(fields)))]
+
+    shares = []
+    for r in range(len(fields)):
+        total = sum(vim[r] for vim in free)
+        if total > 0:
+            shares.append(sum(vim[r] for vim in stranded) / float(total))
+    return sum(shares) / len(shares) if shares else 0.0
+
+
+def run_scenario(strategy, vims=10, vnfs=5, services=50, graph='chain',
+                 distribution='uniform', seed=0):
+    """
+    Place the generated services of one scenario with one strategy.
+    :return: result dict
+    """
+    topology, requests = generator.generate(seed, vims, services, vnfs, graph,
+                                            distribution=distribution)
+    # All strategies of a scenario start from the same topology
+    topology = copy.deepcopy(topology)
+
+    durations = []
+    placed = 0
+    links = 0
+    for request in requests:
+        start = time.perf_counter()
+        mapping = engine.place(request['nsd'], request['functions'], [],
+                               topology, strategy)
+        durations.append(time.perf_counter() - start)
+        if mapping is not None:
+            placed += 1
+            links += cross_vim_links(request, mapping)
+
+    used = sum(1 for vim in topology if vim['core_used'] > 0)
+    return {"strategy": strategy,
+            "vims": vims,
+            "vnfs": vnfs,
+            "services": services,
+            "graph": graph,
+            "distribution": distribution,
+            "seed": seed,
+            "placed": placed,
+            "success_rate": round(placed / float(services), 4) if services else None,
+            "total_ms": round(sum(durations) * 1000, 3),
+            "p50_ms": round(percentile(durations, 50) * 1000, 3) if durations else None,
+            "p99_ms": round(percentile(durations, 99) * 1000, 3) if durations else None,
+            "fragmentation": round(fragmentation(topology, average_demand(requests)), 4),
+            "cross_vim_links": links,
+            "vims_used": used}
+
+
+def run(strategies=tuple(sorted(engine.STRATEGIES)), vims=(10, 100), vnfs=(5, 20),
+        services=50, graphs=('chain',), distributions=('uniform',), seed=0):
+    """
+    Run the benchmark matrix.
+    :return: list of result dicts
+    """
+    results = []
+    for num_vims in vims:
+        for num_vnfs in vnfs:
+            for graph in graphs:
+                for distribution in distributions:
+                    for strategy in strategies:
+                        result = run_scenario(strategy, num_vims, num_vnfs, services,
+                                              graph, distribution, seed)
+                        LOG.info("%(strategy)-19s vims=%(vims)-4d vnfs=%(vnfs)-3d "
+                                 "%(graph)s/%(distribution)s placed=%(placed)d/%(services)d "
+                                 "p50=%(p50_ms)sms frag=%(fragmentation)s "
+                                 "links=%(cross_vim_links)d" % result)
+                        results.append(result)
+    return results
+
+
+def compare(results, baseline):
+    """
+    Compare results with the results of an earlier run, scenario by
+    scenario.
+    :return: list of dicts with the changes of the scenarios in both runs
+    """
+    before = dict((tuple(r[k] for k in KEY), r) for r in baseline)
+    changes = []
+    for result in results:
+        old = before.get(tuple(result[k] for k in KEY))
+        if old is None:
+            continue
+        change = dict((k, result[k]) for k in KEY)
+        for field in ("success_rate", "fragmentation", "cross_vim_links", "p50_ms", "total_ms"):
+            change[field] = (old[field], result[field])
+        changes.append(change)
+    return changes
+
+
+def _commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="placement strategy benchmark")
+    parser.add_argument("--strategies", nargs="+", default=sorted(engine.STRATEGIES),
+                        choices=sorted(engine.STRATEGIES))
+    parser.add_argument("--vims", nargs="+", type=int, default=[10, 100])
+    parser.add_argument("--vnfs", nargs="+", type=int, default=[5, 20])
+    parser.add_argument("--services", type=int, default=50)
+    parser.add_argument("--graphs", nargs="+", default=["chain"], choices=generator.GRAPHS)
+    parser.add_argument("--distributions", nargs="+", default=["uniform"],
+                        choices=generator.DISTRIBUTIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("plugin:placement:engine").setLevel(logging.WARNING)
+    results = run(strategies=args.strategies, vims=args.vims, vnfs=args.vnfs,
+                  services=args.services, graphs=args.graphs,
+                  distributions=args.distributions, seed=args.seed)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for change in compare(results, baseline["results"]):
+            LOG.info(" ".join("%s=%s" % (k, change[k]) for k in KEY[:3]) + " " +
+                     " ".join("%s:%s->%s" % (field, change[field][0], change[field][1])
+                              for field in ("success_rate", "fragmentation",
+                                            "cross_vim_links", "p50_ms")))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"commit": _commit(), "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+
+"""
+The placement engine. A placement request is turned into arrays of the
+free resources of all VIMs and the demand of all functions and cloud
+services, summed over all their VDUs. The strategies rank the VIMs that
+fit a function on these arrays, and a bounded backtracking search falls
+back to the next ranked VIM when a later function doesn't fit anymore.
+The search first looks for a placement in which the forwarding paths
+never return to a VIM they already left, as the VIMs of such a placement
+can't be configured one after the other along the paths. If it doesn't
+find one quickly, looping VIMs are only tried last.
+"""
+
+import logging
+import os
+
+import numpy as np
+
+LOG = logging.getLogger("plugin:placement:engine")
+
+# The strategy used if a request doesn't select one
+DEFAULT_STRATEGY = os.environ.get("placement_strategy", "best_fit_decreasing")
+# Number of placement steps after which the search gives up
+BACKTRACK_LIMIT = int(os.environ.get("placement_backtrack_limit", 1000))
+# Number of placement steps, on top of placing every item once, spent on
+# finding a placement without loops
+LOOP_FREE_LIMIT = int(os.environ.get("placement_loop_free_limit", 50))
+
+KUBERNETES = 'Kubernetes'
+
+# The resources, with their fields in the topology and in the VDUs
+CORE, MEMORY, STORAGE = 0, 1, 2
+RESOURCES = (('core_used', 'core_total', 'cpu', 'vcpus'),
+             ('memory_used', 'memory_total', 'memory', 'size'),
+             ('storage_used', 'storage_total', 'storage', 'size'))
+
+
+def _requirement(vdu, index):
+    field, key = RESOURCES[index][2:]
+    requirements = vdu.get('resource_requirements') or {}
+    return (requirements.get(field) or {}).get(key, 0)
+
+
+def _descriptor_key(descriptor):
+    return (descriptor.get('vendor'), descriptor.get('name'), descriptor.get('version'))
+
+
+class Problem(object):
+    """
+    The arrays of a placement request.
+
+    The items are the functions followed by the cloud services. A function
+    needs cpu, memory and storage of a non-Kubernetes VIM, a cloud service
+    needs memory of a Kubernetes VIM. VIMs that don't report a resource
+    have no limit on it.
+    """
+
+    def __init__(self, descriptor, functions, cloud_services, topology):
+        self.descriptor = descriptor or {}
+        self.ids = [f['id'] for f in functions] + [c['id'] for c in cloud_services]
+        self.vims = [vim['vim_uuid'] for vim in topology]
+        self.num_functions = len(functions)
+
+        # Free resources per VIM
+        total = np.full((len(topology), len(RESOURCES)), np.inf)
+        used = np.zeros((len(topology), len(RESOURCES)))
+        for v, vim in enumerate(topology):
+            for r, (used_key, total_key, _, _) in enumerate(RESOURCES):
+                if total_key in vim:
+                    total[v, r] = vim[total_key]
+                    used[v, r] = vim.get(used_key, 0)
+        self.free = total - used
+        # Resources are compared relative to the size of a VIM
+        self.limited = np.isfinite(total) & (total > 0)
+        self.scale = np.where(self.limited, 1.0 / np.where(self.limited, total, 1.0), 0.0)
+
+        # Demand per item, summed over all VDUs at once
+        vdus = []
+        owners = []
+        for i, function in enumerate(functions):
+            for vdu in function['vnfd'].get('virtual_deployment_units') or []:
+                vdus.append([_requirement(vdu, r) for r in range(len(RESOURCES))])
+                owners.append(i)
+        for i, cloud_service in enumerate(cloud_services, len(functions)):
+            for vdu in cloud_service['csd'].get('virtual_deployment_units') or []:
+                vdus.append([0, _requirement(vdu, MEMORY), 0])
+                owners.append(i)
+        self.demand = np.zeros((len(self.ids), len(RESOURCES)))
+        if vdus:
+            np.add.at(self.demand, np.array(owners), np.array(vdus, dtype=float))
+
+        # Which items may go on which VIMs
+        kubernetes = np.array([vim.get('vim_type') == KUBERNETES for vim in topology],
+                              dtype=bool)
+        is_function = np.arange(len(self.ids)) < len(functions)
+        self.eligible = is_function[:, None] != kubernetes[None, :]
+
+        self.keys = [_descriptor_key(f['vnfd']) for f in functions] + \
+                    [_descriptor_key(c['csd']) for c in cloud_services]
+        self._neighbours = None
+        self._links = None
+
+    def size(self):
+        """
+        :return: the normalised size of each item, on its largest VIM
+        """
+        scale = self.scale.max(axis=0) if len(self.vims) else np.zeros(len(RESOURCES))
+        return (self.demand * scale).sum(axis=1)
+
+    def fits(self, i, free):
+        """
+        :return: bool array of the VIMs with room for item i
+        """
+        return self.eligible[i] & (self.demand[i] <= free).all(axis=1)
+
+    def slack(self, i, free):
+        """
+        :return: the normalised free resources of each VIM once item i
+                 is placed on it
+        """
+        remaining = np.where(self.limited, free - self.demand[i], 0.0)
+        return (remaining * self.scale).sum(axis=1)
+
+    def neighbours(self):
+        """
+        The items that are adjacent in the forwarding graphs of the
+        descriptor, in the order of their paths.
+
+        :return: list of sets of item indices, and the items in the order
+                 in which they appear on the paths
+        """
+        if self._neighbours is None:
+            self._read_paths()
+        return self._neighbours
+
+    def links(self):
+        """
+        :return: set of (from, to) pairs of the items that follow each
+                 other on the forwarding paths
+        """
+        if self._links is None:
+            self._read_paths()
+        return self._links
+
+    def _read_paths(self):
+        # The descriptor refers to its functions by vnf_id and to its cloud
+        # services by service_id, the items are matched on vendor, name
+        # and version
+        by_key = {}
+        for i, key in enumerate(self.keys):
+            by_key.setdefault((i < self.num_functions,) + key, []).append(i)
+        by_ref = {}
+        for vnf in self.descriptor.get('network_functions') or []:
+            key = (True, vnf.get('vnf_vendor'), vnf.get('vnf_name'), vnf.get('vnf_version'))
+            if by_key.get(key):
+                by_ref[vnf['vnf_id']] = by_key[key].pop(0)
+        for cs in self.descriptor.get('cloud_services') or []:
+            key = (False, cs.get('service_vendor'), cs.get('service_name'), cs.get('service_version'))
+            if by_key.get(key):
+                by_ref[cs['service_id']] = by_key[key].pop(0)
+
+        adjacent = [set() for _ in self.ids]
+        order = []
+        links = set()
+        for graph in self.descriptor.get('forwarding_graphs') or []:
+            for path in graph.get('network_forwarding_paths') or []:
+                points = sorted(path.get('connection_points') or [],
+                                key=lambda cp: cp.get('position', 0))
+                previous = None
+                for point in points:
+                    ref = point['connection_point_ref'].split(':')[0]
+                    item = by_ref.get(ref)
+                    if item is None:
+                        continue
+                    if item not in order:
+                        order.append(item)
+                    if previous is not None and previous != item:
+                        adjacent[previous].add(item)
+                        adjacent[item].add(previous)
+                        links.add((previous, item))
+                    previous = item
+
+        self._neighbours = (adjacent, order)
+        self._links = links
+
+    def loops(self, i, vims, assignment):
+        """
+        :param vims: candidate VIMs for item i
+        :return: set of the VIMs on which item i makes the forwarding
+                 paths between the placed items return to a VIM they
+                 already left
+        """
+        links = self.links()
+        if not links:
+            return set()
+
+        # The VIM graph of the other placed items
+        successors = {}
+        before = set()
+        after = set()
+        for source, target in links:
+            a = assignment[source]
+            b = assignment[target]
+            if target == i and a >= 0:
+                before.add(a)
+            elif source == i and b >= 0:
+                after.add(b)
+            elif source != i and target != i and a >= 0 and b >= 0 and a != b:
+                successors.setdefault(a, set()).add(b)
+        if not before and not after:
+            return set()
+
+        reach = {}
+
+        def reachable(node):
+            # The VIMs reachable from node, node included
+            if node not in reach:
+                found = set([node])
+                stack = [node]
+                while stack:
+                    for following in successors.get(stack.pop(), ()):
+                        if following not in found:
+                            found.add(following)
+                            stack.append(following)
+                reach[node] = found
+            return reach[node]
+
+        looping = set()
+        for vim in vims:
+            # A new loop leaves vim and comes back to it, directly or over
+            # a VIM that precedes item i
+            targets = (before - set([vim])) | set([vim])
+            outgoing = successors.get(vim, set()) | (after - set([vim]))
+            if any(reachable(b) & targets for b in outgoing):
+                looping.add(vim)
+        return looping
+
+
+class Strategy(object):
+    """
+    A placement strategy decides the order in which the items are placed
+    and ranks the VIMs that fit an item.
+    """
+
+    def order(self, problem):
+        """
+        :return: the item indices in the order in which they are placed
+        """
+        return list(range(len(problem.ids)))
+
+    def rank(self, problem, i, free, assignment):
+        """
+        :param free: the free resources of the VIMs at this point
+        :param assignment: the VIM index of every item, -1 if not placed
+        :return: the indices of the VIMs that fit item i, best first
+        """
+        return np.flatnonzero(problem.fits(i, free))
+
+
+class FirstFit(Strategy):
+    """
+    The items in the order of the request, on the first VIM of the
+    topology that fits. This was the only placement before.
+    """
+
+
+class BestFitDecreasing(Strategy):
+    """
+    The largest items first, each on the VIM that has the least room
+    left afterwards. This packs services on few VIMs.
+    """
+
+    def order(self, problem):
+        return list(np.argsort(-problem.size(), kind='stable'))
+
+    def rank(self, problem, i, free, assignment):
+        candidates = np.flatnonzero(problem.fits(i, free))
+        slack = problem.slack(i, free)[candidates]
+        return candidates[np.argsort(slack, kind='stable')]
+
+
+class WorstFit(BestFitDecreasing):
+    """
+    The largest items first, each on the VIM that has the most room left
+    afterwards. This spreads services over the VIMs.
+    """
+
+    def rank(self, problem, i, free, assignment):
+        candidates = np.flatnonzero(problem.fits(i, free))
+        slack = problem.slack(i, free)[candidates]
+        return candidates[np.argsort(-slack, kind='stable')]
+
+
+class ChainAware(BestFitDecreasing):
+    """
+    The functions along the forwarding paths, each on the VIM that holds
+    most of its already placed neighbours, so that adjacent functions
+    share a VIM and the chain crosses as few VIMs as possible. Ties are
+    broken as with best fit.
+    """
+
+    def order(self, problem):
+        adjacent, order = problem.neighbours()
+        rest = [i for i in super(ChainAware, self).order(problem) if i not in order]
+        return order + rest
+
+    def rank(self, problem, i, free, assignment):
+        candidates = np.flatnonzero(problem.fits(i, free))
+        adjacent, _ = problem.neighbours()
+        placed = assignment[list(adjacent[i])]
+        placed = placed[placed >= 0]
+        together = np.bincount(placed, minlength=len(problem.vims))[candidates]
+        slack = problem.slack(i, free)[candidates]
+        return candidates[np.lexsort((slack, -together))]
+
+
+STRATEGIES = {'first_fit': FirstFit,
+              'best_fit_decreasing': BestFitDecreasing,
+              'worst_fit': WorstFit,
+              'chain': ChainAware}
+
+
+def get_strategy(name=None):
+    """
+    :param name: name of a strategy, None for the default one
+    :return: the strategy, the default one if the name is unknown
+    """
+    if name is None:
+        name = DEFAULT_STRATEGY
+    if name not in STRATEGIES:
+        LOG.warning("Unknown placement strategy " + str(name) +
+                    ", using " + DEFAULT_STRATEGY)
+        name = DEFAULT_STRATEGY
+    return STRATEGIES[name]()
+
+
+def search(problem, strategy, limit=BACKTRACK_LIMIT, loop_free_limit=LOOP_FREE_LIMIT):
+    """
+    This method places the items one by one in the order of the strategy,
+    on the best ranked VIM. If an item doesn't fit anywhere, the previous
+    item moves to its next ranked VIM.
+
+    :param limit: maximum number of placement steps
+    :param loop_free_limit: maximum number of steps, on top of placing
+                            every item once, of the search for a
+                            placement without loops
+    :return: the VIM index of every item, None if no placement was found
+    """
+    if problem.links() and loop_free_limit > 0:
+        loop_free_steps = min(limit, len(problem.ids) + loop_free_limit)
+        assignment = _search(problem, strategy, loop_free_steps, True)
+        if assignment is not None:
+            return assignment
+    return _search(problem, strategy, limit, False)
+
+
+def _search(problem, strategy, limit, loop_free):
+    order = strategy.order(problem)
+    assignment = np.full(len(problem.ids), -1, dtype=int)
+    free = problem.free.copy()
+    candidates = [None] * len(order)
+    depth = 0
+    steps = 0
+
+    while depth < len(order):
+        i = order[depth]
+        if candidates[depth] is None:
+            ranked = list(strategy.rank(problem, i, free, assignment))
+            looping = problem.loops(i, ranked, assignment)
+            candidates[depth] = [vim for vim in ranked if vim not in looping]
+            if not loop_free:
+                candidates[depth] += [vim for vim in ranked if vim in looping]
+
+        if not candidates[depth]:
+            # Undo the previous item, it continues with its next VIM
+            candidates[depth] = None
+            if depth == 0:
+                return None
+            depth -= 1
+            previous = order[depth]
+            free[assignment[previous]] += problem.demand[previous]
+            assignment[previous] = -1
+            continue
+
+        if steps >= limit:
+            if not loop_free:
+                LOG.info("Placement gave up after " + str(steps) + " steps")
+            return None
+        steps += 1
+
+        vim = candidates[depth].pop(0)
+        free[vim] -= problem.demand[i]
+        assignment[i] = vim
+        depth += 1
+
+    return assignment
+
+
+def place(descriptor, functions, cloud_services, topology, strategy=None):
+    """
+    This method places the functions and cloud services of a service.
+    The resources of the placement are added to the used resources of
+    the topology.
+
+    :param descriptor: the NSD or COSD of the service
+    :param functions: the functions of the service, with their vnfd
+    :param cloud_services: the cloud services of the service, with their csd
+    :param topology: list of VIMs, as returned by the IA
+    :param strategy: name of the strategy, None for the default one
+    :return: dict of instance id -> {'vim': vim uuid}, None if the
+             service doesn't fit
+    """
+    problem = Problem(descriptor, functions, cloud_services, topology)
+    assignment = search(problem, get_strategy(strategy))
+    if assignment is None:
+        return None
+
+    for v, vim in enumerate(topology):
+        on_vim = assignment == v
+        if not on_vim.any():
+            continue
+        used = problem.demand[on_vim].sum(axis=0)
+        for r, (used_key, total_key, _, _) in enumerate(RESOURCES):
+            if total_key in vim:
+                value = used[r].item()
+                if value.is_integer():
+                    value = int(value)
+                vim[used_key] = vim.get(used_key, 0) + value
+
+    return dict((problem.ids[i], {'vim': problem.vims[v]})
+                for i, v in enumerate(assignment))
@@ -0,0 +1,179 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+
+"""
+Synthetic placement requests, in the shape that the SLM sends them on
+mano.service.place: an NSD with network functions and forwarding graphs,
+the functions of the service with their VNFDs, and the topology of the
+VIMs as reported by the IA. The requests only depend on the seed.
+"""
+
+import random
+import uuid
+
+VENDOR = 'eu.sonata-nfv.synthetic'
+VERSION = '1.0'
+
+# How VDU sizes are drawn
+DISTRIBUTIONS = ('uniform', 'skewed')
+# How the functions of a service are connected
+GRAPHS = ('chain', 'branch', 'none')
+
+
+def _draw(rng, distribution, low, high):
+    if distribution == 'uniform':
+        return rng.randint(low, high)
+    # Mostly small, sometimes large
+    return min(high, low + int(rng.paretovariate(1.5)) - 1)
+
+
+def generate_topology(rng, vims=10, cores=(16, 64), memory=(32, 256),
+                      storage=(500, 2000), kubernetes=0):
+    """
+    :param rng: the random.Random to draw from
+    :param vims: number of OpenStack VIMs
+    :param cores: range of the cores of a VIM
+    :param memory: range of the memory of a VIM
+    :param storage: range of the storage of a VIM
+    :param kubernetes: number of Kubernetes VIMs
+    :return: list of VIMs, as reported by the IA
+    """
+    topology = []
+    for i in range(vims + kubernetes):
+        topology.append({'vim_uuid': str(uuid.UUID(int=rng.getrandbits(128))),
+                         'vim_name': 'vim-' + str(i),
+                         'vim_type': 'Kubernetes' if i >= vims else 'Heat',
+                         'core_total': rng.randint(*cores),
+                         'core_used': 0,
+                         'memory_total': rng.randint(*memory),
+                         'memory_used': 0,
+                         'storage_total': rng.randint(*storage),
+                         'storage_used': 0})
+    return topology
+
+
+def generate_vnfd(rng, name, vdus=(1, 3), cpu=(1, 4), memory=(1, 8),
+                  storage=(0, 40), distribution='uniform'):
+    """
+    :return: a VNFD with a random number of VDUs of random size
+    """
+    units = []
+    for i in range(rng.randint(*vdus)):
+        units.append({'id': 'vdu' + str(i),
+                      'vm_image': 'http://images/' + name + '.qcow2',
+                      'resource_requirements': {
+                          'cpu': {'vcpus': _draw(rng, distribution, *cpu)},
+                          'memory': {'size': _draw(rng, distribution, *memory),
+                                     'size_unit': 'GB'},
+                          'storage': {'size': _draw(rng, distribution, *storage),
+                                      'size_unit': 'GB'}}})
+    return {'descriptor_version': 'vnfd-schema-01',
+            'vendor': VENDOR,
+            'name': name,
+            'version': VERSION,
+            'virtual_deployment_units': units}
+
+
+def _path(names, first, fg_id):
+    points = [{'connection_point_ref': 'input', 'position': 1}]
+    for name in names:
+        position = len(points) + 1
+        points.append({'connection_point_ref': 'vnf_' + name + ':input',
+                       'position': position})
+        points.append({'connection_point_ref': 'vnf_' + name + ':output',
+                       'position': position + 1})
+    points.append({'connection_point_ref': 'output', 'position': len(points) + 1})
+    return {'fp_id': 'ns:' + fg_id + ':' + first, 'policy': 'none',
+            'connection_points': points}
+
+
+def generate_request(rng, topology, vnfs=5, graph='chain', serv_id=None, **vnfd_kwargs):
+    """
+    :param rng: the random.Random to draw from
+    :param topology: the topology of the request
+    :param vnfs: number of functions of the service
+    :param graph: 'chain' links the functions on one path, 'branch' on two
+                  paths that share the first function, 'none' has no
+                  forwarding graph
+    :param vnfd_kwargs: passed on to generate_vnfd
+    :return: the content of a placement request
+    """
+    if serv_id is None:
+        serv_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    names = ['vnf' + str(i) for i in range(vnfs)]
+
+    functions = []
+    network_functions = []
+    for name in names:
+        vnfd = generate_vnfd(rng, name, **vnfd_kwargs)
+        functions.append({'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                          'vnfd': vnfd})
+        network_functions.append({'vnf_id': 'vnf_' + name,
+                                  'vnf_vendor': VENDOR,
+                                  'vnf_name': name,
+                                  'vnf_version': VERSION})
+
+    nsd = {'descriptor_version': '1.0',
+           'vendor': VENDOR,
+           'name': 'synthetic-' + str(vnfs),
+           'version': VERSION,
+           'network_functions': network_functions}
+
+    if graph == 'chain':
+        paths = [_path(names, 'p0', 'fg01')]
+    elif graph == 'branch':
+        half = (len(names) + 1) // 2
+        paths = [_path(names[:half], 'p0', 'fg01'),
+                 _path(names[:1] + names[half:], 'p1', 'fg01')]
+    else:
+        paths = []
+    if paths:
+        nsd['forwarding_graphs'] = [{'fg_id': 'ns:fg01',
+                                     'network_forwarding_paths': paths}]
+
+    return {'nsd': nsd,
+            'functions': functions,
+            'topology': topology,
+            'serv_id': serv_id,
+            'nap': {}}
+
+
+def generate(seed=0, vims=10, services=20, vnfs=5, graph='chain',
+             vim_cores=(16, 64), vim_memory=(32, 256), vim_storage=(500, 2000),
+             kubernetes=0, **vnfd_kwargs):
+    """
+    Generate a topology and the requests of services to place on it.
+
+    :param seed: the seed, the same seed gives the same requests
+    :param vim_cores: range of the cores of a VIM, likewise vim_memory
+                      and vim_storage
+    :param vnfd_kwargs: passed on to generate_vnfd
+    :return: the topology and the list of requests, which all share it
+    """
+    rng = random.Random(seed)
+    topology = generate_topology(rng, vims, vim_cores, vim_memory,
+                                 vim_storage, kubernetes)
+    requests = [generate_request(rng, topology, vnfs, graph, **vnfd_kwargs)
+                for _ in range(services)]
+    return topology, requests
@@ -22,7 +22,6 @@ partner consortium (www.sonata-nfv.eu).a
 """
 
 import logging
-import yaml
 import time
 import os
 import requests
@@ -35,6 +34,9 @@ import concurrent.futures as pool
 # import psutil
 
 from sonmanobase.plugin import ManoBasePlugin
+from sonmanobase import codec
+
+from son_mano_placement import engine
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("plugin:placement")
@@ -137,78 +139,87 @@ class PlacementPlugin(ManoBasePlugin):
         if prop.app_id == self.name:
             return
 
-        content = yaml.load(payload)
+        content = codec.decode(payload, getattr(prop, 'content_type', None))
+
+        if 'services' in content:
+            self.batch_placement_request(content, prop.correlation_id)
+            return
+
         LOG.info("Placement request for service: " + content['serv_id'])
         topology = content['topology']
         descriptor = content['nsd'] if 'nsd' in content else content['cosd']
         functions = content['functions'] if 'functions' in content else []
         cloud_services = content['cloud_services'] if 'cloud_services' in content else []
 
-        placement = self.placement(descriptor, functions, cloud_services, topology)
+        placement = self.placement(descriptor,
+                                   functions,
+                                   cloud_services,
+                                   topology,
+                                   content.get('strategy'))
 
         response = {'mapping': placement}
         topic = 'mano.service.place'
 
         self.manoconn.notify(topic,
-                             yaml.dump(response),
+                             codec.encode(response),
                              correlation_id=prop.correlation_id)
 
         LOG.info("Placement response sent for service: " + content['serv_id'])
         LOG.info(response)
 
-    def placement(self, descriptor, functions, cloud_services, topology):
+    def batch_placement_request(self, content, corr_id):
+        """
+        This method handles a placement request for a batch of services.
+        The services are placed one after the other on the same topology,
+        so each placement takes the resources used by the previous ones
+        into account.
+        """
+        LOG.info("Placement request for batch: " + str(content['batch_id']))
+        topology = content['topology']
+
+        mappings = {}
+        for service in content['services']:
+            descriptor = service['nsd'] if 'nsd' in service else service['cosd']
+            functions = service['functions'] if 'functions' in service else []
+            cloud_services = service['cloud_services'] if 'cloud_services' in service else []
+            strategy = service.get('strategy', content.get('strategy'))
+
+            mappings[service['serv_id']] = self.placement(descriptor,
+                                                          functions,
+                                                          cloud_services,
+                                                          topology,
+                                                          strategy)
+
+        response = {'mappings': mappings}
+        topic = 'mano.service.place'
+
+        self.manoconn.notify(topic,
+                             codec.encode(response),
+                             correlation_id=corr_id)
+
+        LOG.info("Placement response sent for batch: " + str(content['batch_id']))
+
+    def placement(self, descriptor, functions, cloud_services, topology,
+                  strategy=None):
         """
         This is the default placement algorithm that is used if the SLM
-        is responsible to perform the placement
+        is responsible to perform the placement. The resources of the
+        placement are added to the topology.
+
+        :param strategy: name of the placement strategy, one of
+                         engine.STRATEGIES, None for the default one
         """
         LOG.info("Embedding started on following topology: " + str(topology))
 
-        mapping = {}
-
-        for function in functions:
-            vnfd = function['vnfd']
-            vdu = vnfd['virtual_deployment_units']
-            needed_cpu = vdu[0]['resource_requirements']['cpu']['vcpus']
-            needed_mem = vdu[0]['resource_requirements']['memory']['size']
-            needed_sto = vdu[0]['resource_requirements']['storage']['size']
-
-            for vim in topology:
-                if vim['vim_type'] == 'Kubernetes':
-                    continue
-                cpu_req = needed_cpu <= (vim['core_total'] - vim['core_used'])
-                mem_req = needed_mem <= (vim['memory_total'] - vim['memory_used'])
-
-                if cpu_req and mem_req:
-                    mapping[function['id']] = {}
-                    mapping[function['id']]['vim'] = vim['vim_uuid']
-                    vim['core_used'] = vim['core_used'] + needed_cpu
-                    vim['memory_used'] = vim['memory_used'] + needed_mem
-                    break
-
-        for cloud_service in cloud_services:
-            csd = cloud_service['csd']
-            vdu = csd['virtual_deployment_units']
-            needed_mem = 0
-            if 'resource_requirements' in vdu[0] and 'memory' in vdu[0]['resource_requirements']:
-                needed_mem = vdu[0]['resource_requirements']['memory']['size']
-
-            for vim in topology:
-                if vim['vim_type'] != 'Kubernetes':
-                    continue
-                mem_req = needed_mem <= (vim['memory_total'] - vim['memory_used'])
-
-                if mem_req:
-                    mapping[cloud_service['id']] = {}
-                    mapping[cloud_service['id']]['vim'] = vim['vim_uuid']
-                    vim['memory_used'] = vim['memory_used'] + needed_mem
-                    break
-
-        # Check if all VNFs and CSs have been mapped
-        if len(mapping.keys()) == len(functions) + len(cloud_services):
-            return mapping
-        else:
+        mapping = engine.place(descriptor,
+                               functions,
+                               cloud_services,
+                               topology,
+                               strategy)
+
+        if mapping is None:
             LOG.info("Placement was not possible")
-            return None
+        return mapping
 
 
 def main():
@@ -0,0 +1,77 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+
+import unittest
+
+from son_mano_placement import benchmark, engine, generator
+
+
+class testPlacementBenchmark(unittest.TestCase):
+    """
+    Tests the synthetic requests and the placement metrics.
+    """
+
+    def test_same_seed_same_requests(self):
+        self.assertEqual(generator.generate(seed=3, services=4),
+                         generator.generate(seed=3, services=4))
+        self.assertNotEqual(generator.generate(seed=3, services=4),
+                            generator.generate(seed=4, services=4))
+
+    def test_request_shape(self):
+        topology, requests = generator.generate(vims=3, services=2, vnfs=4,
+                                                graph='branch', kubernetes=1)
+        self.assertEqual(len(topology), 4)
+        self.assertEqual(topology[-1]['vim_type'], 'Kubernetes')
+        request = requests[0]
+        self.assertEqual(len(request['functions']), 4)
+        self.assertEqual(len(request['nsd']['network_functions']), 4)
+        paths = request['nsd']['forwarding_graphs'][0]['network_forwarding_paths']
+        self.assertEqual(len(paths), 2)
+        self.assertIsNotNone(engine.place(request['nsd'], request['functions'], [],
+                                          topology))
+
+    def test_cross_vim_links(self):
+        _, requests = generator.generate(services=1, vnfs=3)
+        request = requests[0]
+        ids = [f['id'] for f in request['functions']]
+        mapping = {ids[0]: {'vim': 'a'}, ids[1]: {'vim': 'a'}, ids[2]: {'vim': 'b'}}
+        self.assertEqual(benchmark.cross_vim_links(request, mapping), 1)
+
+    def test_fragmentation(self):
+        topology = [{'vim_type': 'Heat', 'core_total': 10, 'core_used': 9,
+                     'memory_total': 10, 'memory_used': 0},
+                    {'vim_type': 'Heat', 'core_total': 10, 'core_used': 7,
+                     'memory_total': 10, 'memory_used': 0}]
+        # Only the second VIM can host a function of 2 cores
+        self.assertAlmostEqual(benchmark.fragmentation(topology, [2, 2]),
+                               (1 / 4.0 + 10 / 20.0) / 2)
+
+    def test_scenario(self):
+        result = benchmark.run_scenario('chain', vims=5, vnfs=3, services=5)
+        self.assertEqual(result['services'], 5)
+        self.assertGreater(result['success_rate'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+
+import unittest
+
+from son_mano_placement import engine
+
+try:
+    from son_mano_slm.slm_order import vim_stages
+except ImportError:
+    vim_stages = None
+
+
+def vim(name, cores=8, memory=16, vim_type='Heat', **kwargs):
+    vim = {'vim_uuid': name, 'vim_type': vim_type,
+           'core_total': cores, 'core_used': 0,
+           'memory_total': memory, 'memory_used': 0}
+    vim.update(kwargs)
+    return vim
+
+
+def vdu(cpu, memory, storage=0):
+    return {'resource_requirements': {'cpu': {'vcpus': cpu},
+                                      'memory': {'size': memory},
+                                      'storage': {'size': storage}}}
+
+
+def function(name, *vdus):
+    return {'id': 'id-' + name,
+            'vnfd': {'vendor': 'eu.sonata', 'name': name, 'version': '1.0',
+                     'virtual_deployment_units': list(vdus)}}
+
+
+def chain(*names):
+    """
+    An NSD with one forwarding path through the functions.
+    """
+    functions = [{'vnf_id': 'vnf_' + name, 'vnf_vendor': 'eu.sonata',
+                  'vnf_name': name, 'vnf_version': '1.0'} for name in names]
+    points = []
+    for position, name in enumerate(names):
+        points.append({'connection_point_ref': 'vnf_' + name + ':input',
+                       'position': 2 * position + 1})
+        points.append({'connection_point_ref': 'vnf_' + name + ':output',
+                       'position': 2 * position + 2})
+    return {'network_functions': functions,
+            'forwarding_graphs': [{'network_forwarding_paths': [{'connection_points': points}]}]}
+
+
+class testPlacementEngine(unittest.TestCase):
+    """
+    Tests the placement strategies (no broker needed).
+    """
+
+    def test_all_vdus(self):
+        # Only the sum of both VDUs doesn't fit on the first VIM
+        functions = [function('fw', vdu(3, 2), vdu(3, 2))]
+        topology = [vim('a', cores=4), vim('b')]
+        mapping = engine.place({}, functions, [], topology, 'first_fit')
+        self.assertEqual(mapping, {'id-fw': {'vim': 'b'}})
+        self.assertEqual(topology[1]['core_used'], 6)
+        self.assertEqual(topology[1]['memory_used'], 4)
+
+    def test_storage(self):
+        functions = [function('fw', vdu(1, 1, 50))]
+        topology = [vim('a', storage_total=40, storage_used=0),
+                    vim('b', storage_total=100, storage_used=0)]
+        mapping = engine.place({}, functions, [], topology, 'first_fit')
+        self.assertEqual(mapping['id-fw']['vim'], 'b')
+        self.assertEqual(topology[1]['storage_used'], 50)
+
+    def test_backtracking(self):
+        # First fit puts the small function on the large VIM first
+        functions = [function('small', vdu(2, 1)), function('large', vdu(6, 1))]
+        topology = [vim('a', cores=6), vim('b', cores=2)]
+        mapping = engine.place({}, functions, [], topology, 'first_fit')
+        self.assertEqual(mapping, {'id-small': {'vim': 'b'}, 'id-large': {'vim': 'a'}})
+
+    def test_no_placement(self):
+        functions = [function('fw', vdu(9, 1))]
+        topology = [vim('a')]
+        self.assertIsNone(engine.place({}, functions, [], topology))
+        self.assertEqual(topology[0]['core_used'], 0)
+
+    def test_best_fit_and_worst_fit(self):
+        functions = [function('fw', vdu(2, 2))]
+        topology = [vim('a', cores=8), vim('b', cores=4), vim('c', cores=16)]
+        best = engine.place({}, functions, [], [dict(v) for v in topology],
+                            'best_fit_decreasing')
+        worst = engine.place({}, functions, [], [dict(v) for v in topology], 'worst_fit')
+        self.assertEqual(best['id-fw']['vim'], 'b')
+        self.assertEqual(worst['id-fw']['vim'], 'c')
+
+    def test_chain(self):
+        names = ['a', 'b', 'c', 'd']
+        functions = [function(name, vdu(2, 2)) for name in names]
+        topology = [vim('v1', cores=4), vim('v2', cores=4), vim('v3', cores=4)]
+        mapping = engine.place(chain(*names), functions, [], topology, 'chain')
+        vims = [mapping['id-' + name]['vim'] for name in names]
+        # The chain crosses one VIM boundary
+        self.assertEqual(sum(1 for x, y in zip(vims, vims[1:]) if x != y), 1)
+
+    def test_cloud_services(self):
+        cloud_services = [{'id': 'cs', 'csd': {'virtual_deployment_units': [vdu(0, 3), vdu(0, 3)]}}]
+        functions = [function('fw', vdu(1, 1))]
+        topology = [vim('k8s', memory=4, vim_type='Kubernetes'),
+                    vim('k8s-large', vim_type='Kubernetes'),
+                    vim('heat')]
+        mapping = engine.place({}, functions, cloud_services, topology)
+        self.assertEqual(mapping, {'id-fw': {'vim': 'heat'}, 'cs': {'vim': 'k8s-large'}})
+
+    def test_no_loops(self):
+        # Worst fit alternates between equal VIMs, a -> b -> a would loop
+        names = ['a', 'b', 'c']
+        functions = [function(name, vdu(2, 2)) for name in names]
+        topology = [vim('v1'), vim('v2')]
+        mapping = engine.place(chain(*names), functions, [], topology, 'worst_fit')
+        vims = [mapping['id-' + name]['vim'] for name in names]
+        self.assertEqual(sum(1 for x, y in zip(vims, vims[1:]) if x != y), 1)
+
+    @unittest.skipIf(vim_stages is None, "SLM not on the path")
+    def test_strategies_are_ordered_by_slm(self):
+        """
+        The SLM can order the VIMs of every placement.
+        """
+        names = ['a', 'b', 'c', 'd', 'e']
+        descriptor = chain(*names)
+        for strategy in engine.STRATEGIES:
+            functions = [function(name, vdu(3, 2)) for name in names]
+            topology = [vim('v1'), vim('v2'), vim('v3')]
+            mapping = engine.place(descriptor, functions, [], topology, strategy)
+            self.assertIsNotNone(mapping, strategy)
+            for f in functions:
+                f['vim_uuid'] = mapping[f['id']]['vim']
+            stages = vim_stages(descriptor, functions, [])
+            self.assertEqual(sorted(v for stage in stages for v in stage),
+                             sorted(set(m['vim'] for m in mapping.values())), strategy)
+
+    def test_unknown_strategy(self):
+        self.assertIsInstance(engine.get_strategy('foo'),
+                              engine.STRATEGIES[engine.DEFAULT_STRATEGY])
+
+
+if __name__ == '__main__':
+    unittest.main()
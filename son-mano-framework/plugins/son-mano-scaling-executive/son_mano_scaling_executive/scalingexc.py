@@ -29,10 +29,10 @@ partner consortium (www.sonata-nfv.eu).
 This is the main module of the Scaling Executive Plugin.
 """
 import logging
-import yaml
 import os
 from sonmanobase.plugin import ManoBasePlugin
 from sonmanobase import messaging
+from sonmanobase import codec
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("son-mano-scaling-executive")
@@ -75,7 +75,7 @@ class ScalingExecutive(ManoBasePlugin):
         LOG.info('De-registering Scaling Executive with uuid ' + str(self.uuid))
         message = {"uuid": self.uuid}
         self.manoconn.notify("platform.management.plugin.deregister",
-                             yaml.dump(message))
+                             codec.encode(message))
         os._exit(0)
 
     def on_registration_ok(self):
@@ -88,8 +88,8 @@ class ScalingExecutive(ManoBasePlugin):
     def on_scaling_request(self, ch, method, properties, payload):
         if properties.app_id != self.name:
             LOG.info('Scaling request received')
-            message = yaml.load(payload)
-            req = yaml.dump(message)
+            message = codec.decode(payload, getattr(properties, 'content_type', None))
+            req = codec.encode(message)
             topic = 'scaling.fsm.{0}'.format(message['uuid'])
             url = "{0}/fsm-{1}".format(self.sm_broker_host, message['uuid'])
             connection = messaging.ManoBrokerRequestResponseConnection(app_id=self.name, url=url)
@@ -99,8 +99,8 @@ class ScalingExecutive(ManoBasePlugin):
     def on_scaling_result(self, ch, method, properties, payload):
         if properties.app_id != self.name:
             LOG.info('Scaling result received')
-            message = yaml.load(payload)
-            resp = yaml.dump(message)
+            message = codec.decode(payload, getattr(properties, 'content_type', None))
+            resp = codec.encode(message)
             inspect = self.inspector(resp)
             if inspect:
 
@@ -61,7 +61,7 @@ setup(
     license='Apache 2.0',
 
     packages=find_packages(),
-    install_requires=['pycrypto==2.6.1'],
+    install_requires=['pycrypto==2.6.1', 'pymongo'],
     setup_requires=[],
 
     # To provide executable scripts, use entry points in preference to the
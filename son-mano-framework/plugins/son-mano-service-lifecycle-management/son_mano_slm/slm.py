@@ -22,7 +22,6 @@ partner consortium (www.sonata-nfv.eu).a
 """
 
 import logging
-import yaml
 import time
 import os
 import requests
@@ -32,10 +31,16 @@ import json
 import threading
 import sys
 import concurrent.futures as pool
+import bisect
 # import psutil
 
 from sonmanobase.plugin import ManoBasePlugin
 import sonmanobase.messaging as messaging
+from sonmanobase import codec
+from sonmanobase.pluginstatus import PluginStatusView
+from sonmanobase.corrindex import CorrelationIndex
+from sonmanobase.tokenmanager import TokenManager
+from sonmanobase.repository import RecordWrite, get_client, first_error
 
 try:
     from son_mano_slm import slm_helpers as tools
@@ -52,6 +57,46 @@ try:
 except:
     import slm_topics as t
 
+try:
+    from son_mano_slm.slm_workflow import Workflow
+except:
+    from slm_workflow import Workflow
+
+try:
+    from son_mano_slm.slm_batch import Batch
+except:
+    from slm_batch import Batch
+
+try:
+    from son_mano_slm.slm_trace import Tracer, end_span
+except:
+    from slm_trace import Tracer, end_span
+
+try:
+    from son_mano_slm.slm_ledger import ServiceRecord
+except:
+    from slm_ledger import ServiceRecord
+
+try:
+    from son_mano_slm.slm_ring import HashRing, instance_uuid
+except:
+    from slm_ring import HashRing, instance_uuid
+
+try:
+    from son_mano_slm.slm_store import Checkpointer, OwnershipLost, get_store
+except:
+    from slm_store import Checkpointer, OwnershipLost, get_store
+
+try:
+    from son_mano_slm.slm_topology import TopologyCache, service_usage
+except:
+    from slm_topology import TopologyCache, service_usage
+
+try:
+    from son_mano_slm.slm_order import CycleError
+except:
+    from slm_order import CycleError
+
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("plugin:slm")
 LOG.setLevel(logging.DEBUG)
@@ -79,37 +124,59 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         # Create the ledger that saves state
         self.services = {}
+        # corr_id -> serv_id of the outstanding requests in the ledger
+        self.corr_index = CorrelationIndex()
 
-        # The frequency of state sharing events
-        self.state_share_frequency = 1
-
-        # Create a configuration dict that contains config info of SLM
-        # Setting the number of SLMs and the rank of this SLM
-        self.slm_config = {}
-        self.slm_config['slm_rank'] = 0
-        self.slm_config['slm_total'] = 1
-        self.slm_config['old_slm_rank'] = 0
-        self.slm_config['old_slm_total'] = 1
-        self.slm_config['tasks_other_slm'] = {}
 
         self.publickey = None
         self.token = None
         self.password = '1234'
         self.clientId = 'son-slm'
+        # The GK token is cached and refreshed before it expires
+        self.token_manager = TokenManager(self.gk_login)
 
         # Create the list of known other SLMs
         self.known_slms = []
+        # The services are divided among the known SLMs
+        self.ring = HashRing()
+        # The services are checkpointed after every workflow step, so
+        # that other SLMs can resume them
+        self.checkpointer = Checkpointer(get_store())
+        # Plugin status as seen from the versioned status broadcasts
+        self.plugin_status_view = PluginStatusView()
+        self.plugin_status_lock = threading.Lock()
 
         self.thrd_pool = pool.ThreadPoolExecutor(max_workers=10)
 
-        # Create some flags that will be used for SLM management
-        self.bufferAllRequests = False
-        self.bufferOldRequests = False
-        self.deltaTnew = 1
-        self.deltaTold = 1
-
-        self.old_reqs = {}
-        self.new_reqs = {}
+        # Records and descriptors are retrieved in parallel. Descriptors
+        # don't change, they are cached.
+        self.fetch_pool = pool.ThreadPoolExecutor(max_workers=tools.HTTP_POOL_SIZE)
+        self.descriptor_cache = tools.DescriptorCache()
+        # Records are written concurrently over the pooled session
+        self.repository = get_client(tools.get_session())
+
+        # The workflows of the services in the ledger. They are kept out of
+        # the ledger itself, as the ledger is shared with other SLMs.
+        self.workflows = {}
+        self.workflows_lock = threading.Lock()
+
+        # The batches of the services of bulk requests, by service, and
+        # the outstanding requests of the batches, by correlation id
+        self.batches = {}
+        self.batch_requests = {}
+        self.batches_lock = threading.Lock()
+
+        # Spans of the workflow tasks and external calls, and the traces
+        # of finished workflows
+        self.tracer = Tracer()
+
+        # The topology is cached between instantiations, with the
+        # resources of the placements that are not yet deployed reserved.
+        # The topology requests are kept by correlation id with the time
+        # they were sent.
+        self.topology = TopologyCache()
+        self.topology_requests = {}
+        self.placement_retries = int(os.environ.get("slm_placement_retries", 3))
 
         self.flm_ledger = {}
 
@@ -161,8 +228,18 @@ class ServiceLifecycleManager(ManoBasePlugin):
         # The topic on which termination requests are posted.
         self.manoconn.subscribe(self.service_instance_kill, t.GK_KILL)
 
+        # The topic on which bulk instantiation requests are posted.
+        self.manoconn.subscribe(self.service_instances_create_bulk,
+                                t.GK_CREATE_BULK)
+
+        # The topic on which bulk termination requests are posted.
+        self.manoconn.subscribe(self.service_instances_kill_bulk,
+                                t.GK_KILL_BULK)
+
+        # The topic on which the workflow traces can be queried.
+        self.manoconn.register_async_endpoint(self.trace_query, t.SLM_TRACE)
+
         # The topic on which SLMs share state with eachother
-        self.manoconn.subscribe(self.inter_slm, t.MANO_STATE)
 
         # The topic on which update requests are posted.
         self.manoconn.subscribe(self.service_update, t.GK_UPDATE)
@@ -227,6 +304,14 @@ class ServiceLifecycleManager(ManoBasePlugin):
             LOG.info("Registration with GK failed, continuing without token.")
         else:
             LOG.info("Registration with GK succeeded, token obtained.")
+            self.token_manager.set_token(self.token)
+
+    def gk_login(self):
+        """
+        This method logs the SLM in at the GK and returns the new token.
+        """
+        self.token = tools.client_login(t.GK_LOGIN, self.clientId, self.password)
+        return self.token
 
     def deregister(self):
         """
@@ -245,8 +330,10 @@ class ServiceLifecycleManager(ManoBasePlugin):
         super(self.__class__, self).on_registration_ok()
         LOG.debug("Received registration ok event.")
 
-        # This SLM is currently the only known SLM
-        self.known_slms.append(str(self.uuid))
+        # This SLM is known, other SLMs follow with the status updates
+        if str(self.uuid) not in self.known_slms:
+            bisect.insort(self.known_slms, str(self.uuid))
+            self.ring.set_members(self.known_slms)
 
 
 ##########################
@@ -264,14 +351,33 @@ class ServiceLifecycleManager(ManoBasePlugin):
     def set_services(self, service_dict):
 
         self.services = service_dict
+        self.corr_index.rebuild(service_dict)
 
         return
 
+    def encoded(self, descriptor):
+        """
+        This method returns a descriptor of the ledger in the form in which
+        it is put in messages, so that it is serialized only once.
+        """
+        return self.descriptor_cache.encoded(descriptor)
+
+    def encoded_instances(self, instances, key):
+        """
+        This method returns copies of the functions or cloud services of a
+        service, with their descriptor in the form of encoded().
+
+        :param key: the field of the descriptor, 'vnfd' or 'csd'
+        """
+        return [dict(instance, **{key: self.encoded(instance[key])})
+                for instance in instances]
+
     def error_handling(self, serv_id, topic, message):
 
         LOG.info("Service " + serv_id + ": Error occured, killing workflow")
         LOG.info("Service " + serv_id + ": Error: " + str(message))
         self.services[serv_id]['kill_chain'] = True
+        self.tracer.fail(self.services[serv_id], message)
 
         message = {'error': message,
                    'timestamp': time.time(),
@@ -279,66 +385,256 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         corr_id = self.services[serv_id]['original_corr_id']
         self.manoconn.notify(topic,
-                             yaml.dump(message),
+                             codec.encode(message),
                              correlation_id=corr_id)
 
         return
 
-    def start_next_task(self, serv_id):
+    def start_next_task(self, serv_id, task=None):
         """
-        This method makes sure that the next task in the schedule is started
-        when a task is finished, or when the first task should begin.
+        This method advances the workflow of a service. It is called to
+        start a workflow, and by response handlers to resume the task
+        that paused the workflow to wait for the response. All tasks
+        whose dependencies are done are then started.
 
         :param serv_id: the instance uuid of the service that is being handled.
-        :param first: indicates whether this is the first task in a chain.
+        :param task: name of the task to resume, needed when several tasks
+                     can wait for a response at the same time.
+        """
+        workflow = self.get_workflow(serv_id)
+        if workflow is None:
+            return
+
+        with workflow.lock:
+            tid = workflow.resume(task)
+
+        ledger = self.services.get(serv_id)
+        if tid is not None and ledger is not None:
+            self.tracer.task_resumed(ledger, tid)
+
+        self.advance_workflow(serv_id, workflow)
+
+    def get_workflow(self, serv_id):
+        """
+        This method returns the workflow of a service. If the schedule in the
+        ledger was replaced, e.g. by an SSM, a workflow that runs the new
+        schedule task by task is created.
+
+        :param serv_id: the instance uuid of the service.
+        """
+        ledger = self.services.get(serv_id)
+        if ledger is None:
+            return None
+
+        with self.workflows_lock:
+            workflow = self.workflows.get(serv_id)
+            schedule = ledger['schedule']
+            if workflow is None or workflow.schedule is not schedule:
+                if workflow is not None and workflow.schedule == schedule:
+                    # Same tasks, keep the dependencies
+                    workflow.schedule = schedule
+                else:
+                    workflow = Workflow.linear(schedule)
+                self.workflows[serv_id] = workflow
+
+        return workflow
+
+    def set_workflow(self, serv_id, workflow):
+        """
+        This method makes workflow the active workflow of a service.
+        """
+        with self.workflows_lock:
+            self.workflows[serv_id] = workflow
+            self.services[serv_id]['schedule'] = workflow.schedule
+
+    def servid_from_corrid(self, corr_id):
+        """
+        This method returns the service uuid based on a correlation id.
+        Ledger entries that were not indexed, e.g. taken over from other
+        SLMs, are still found by scanning the ledger.
+
+        :param corr_id: The correlation id
+        """
+        serv_id = self.corr_index.get(corr_id)
+        if serv_id is None or serv_id not in self.services:
+            serv_id = tools.servid_from_corrid(self.services, corr_id)
+
+        # The response to a call of the service was received
+        ledger = self.services.get(serv_id)
+        if ledger is not None:
+            self.tracer.call_ended(ledger, corr_id)
+        return serv_id
+
+    def set_act_corr_id(self, serv_id, corr_id):
         """
+        This method sets the active correlation id(s) of a service.
+
+        :param corr_id: a correlation id, a list of them or None
+        """
+        self.services[serv_id]['act_corr_id'] = corr_id
+        self.corr_index.set(serv_id, corr_id)
+
+        corr_ids = corr_id if isinstance(corr_id, list) else [corr_id]
+        for corr_id in corr_ids:
+            if corr_id is not None:
+                self.tracer.call_started(serv_id, self.services[serv_id], corr_id)
+
+    def add_act_corr_id(self, serv_id, corr_id):
+        """
+        This method adds a correlation id to the active list of a service.
+        """
+        self.services[serv_id]['act_corr_id'].append(corr_id)
+        self.corr_index.add(serv_id, corr_id)
+        self.tracer.call_started(serv_id, self.services[serv_id], corr_id)
+
+    def drop_act_corr_id(self, serv_id, corr_id):
+        """
+        This method removes a correlation id that received its response
+        from the active correlation ids of a service.
+        """
+        act_corr_id = self.services[serv_id].get('act_corr_id')
+        if isinstance(act_corr_id, list):
+            if corr_id in act_corr_id:
+                act_corr_id.remove(corr_id)
+        elif act_corr_id == corr_id:
+            self.services[serv_id]['act_corr_id'] = None
+        self.corr_index.discard(corr_id)
+
+    def remove_from_ledger(self, serv_id, delete_checkpoint=True):
+        """
+        This method removes a service and its workflow from the ledger.
+
+        :param delete_checkpoint: False if another SLM handles the service
+                                  from its checkpoint now
+        """
+        with self.workflows_lock:
+            self.workflows.pop(serv_id, None)
+            self.services.pop(serv_id, None)
+        self.corr_index.remove(serv_id)
+        self.leave_batch(serv_id)
+        self.checkpointer.forget(serv_id, str(self.uuid), delete=delete_checkpoint)
+        self.topology.release(serv_id)
+
+    def advance_workflow(self, serv_id, workflow):
+        """
+        This method starts all tasks of a workflow that are ready, or ends
+        the workflow if it was killed or if all tasks are done.
+        """
+        ledger = self.services.get(serv_id)
+        if ledger is None or self.workflows.get(serv_id) is not workflow:
+            # The workflow was replaced or the service removed
+            return
 
         # If the kill field is active, the chain is killed
-        if self.services[serv_id]['kill_chain']:
+        if ledger['kill_chain']:
+            with workflow.lock:
+                if workflow.finished:
+                    return
+                workflow.finished = True
+
             LOG.info("Service " + serv_id + ": Killing running workflow")
 
-            if (self.services[serv_id]["current_workflow"] == 'instantiation'):
+            if (ledger["current_workflow"] == 'instantiation'):
                 # If the current workflow is an instantiation workflow, we need
                 # to delete the stack, the SSMs/FSMs and the generated records, if
                 # they already exist
                 self.roll_back_instantiation(serv_id)
 
-            del self.services[serv_id]
+            self.tracer.finish(serv_id, ledger, 'error')
+            self.remove_from_ledger(serv_id)
             return
 
-        # Select the next task, only if task list is not empty
-        if len(self.services[serv_id]['schedule']) > 0:
-
-            # share state with other SLMs
-            next_task = getattr(self,
-                                self.services[serv_id]['schedule'].pop(0))
-
-            # Push the next task to the threadingpool
-            task = self.thrd_pool.submit(next_task, serv_id)
-
-            # Log the result of the task, for future reference
-#            new_log = [next_task, task.result()]
-#            self.services[serv_id]['task_log'].append(new_log)
-
-            # Log if a task fails
-            if task.exception() is not None:
-                print(task.result())
-
-#            if tasknumber % (1 / self.state_share_frequency) == 0:
-#                self.slm_share('IN PROGRESS', self.services[serv_id])
+        with workflow.lock:
+            ready = workflow.take_ready()
+            done = not ready and workflow.is_done() and not workflow.finished
+            if done:
+                workflow.finished = True
+
+        # Push the ready tasks to the threadingpool
+        for tid in ready:
+            self.thrd_pool.submit(self.run_task, serv_id, workflow, tid)
+
+        if done:
+            current_workflow = ledger.get('current_workflow')
+            if current_workflow == 'instantiation':
+                # The deployed resources stay reserved until the IA
+                # reports them
+                self.topology.confirm(serv_id)
+            elif current_workflow == 'termination':
+                self.topology.invalidate()
+            self.tracer.finish(serv_id, ledger)
+            self.remove_from_ledger(serv_id)
+
+    def run_task(self, serv_id, workflow, tid):
+        """
+        This method executes a single task of a workflow, and advances the
+        workflow once the task is done or waits for a response.
+        """
+        name = workflow.tasks[tid]['name']
+        paused = False
+
+        with workflow.run_lock:
+            ledger = self.services.get(serv_id)
+            if ledger is not None and not ledger['kill_chain']:
+                self.tracer.task_started(serv_id, ledger, tid, name)
+                try:
+                    getattr(self, name)(serv_id)
+                except Exception as e:
+                    # Log if a task fails
+                    LOG.exception("Service " + serv_id + ": Task " + name + " failed")
+                    if serv_id in self.services:
+                        topic = ledger.get('topic', t.GK_CREATE)
+                        self.error_handling(serv_id, topic, str(e))
+                paused = ledger['pause_chain']
+                ledger['pause_chain'] = False
+                self.tracer.task_returned(serv_id, ledger, tid, paused,
+                                          failed=ledger['kill_chain'])
+
+        with workflow.lock:
+            workflow.finish(tid, paused)
+
+        self.checkpoint(serv_id, workflow)
+        self.advance_workflow(serv_id, workflow)
+
+    def checkpoint(self, serv_id, workflow):
+        """
+        This method stores the changes of the ledger entry and the workflow
+        of a service since the previous step, so that another SLM can
+        resume the service from here. If another SLM took the service
+        over meanwhile, the workflow is stopped here.
+        """
+        with workflow.run_lock:
+            ledger = self.services.get(serv_id)
+            if ledger is None or ledger['kill_chain'] or \
+                    self.workflows.get(serv_id) is not workflow:
+                return
 
-            # When the task is done, the next task should be started if no flag
-            # is set to pause the chain.
-            if self.services[serv_id]['pause_chain']:
-                self.services[serv_id]['pause_chain'] = False
-            else:
-                self.start_next_task(serv_id)
+            fields = dict(ledger.items())
+            service = fields.get('service')
+            if service is not None:
+                descriptor = 'nsd' if 'nsd' in service else 'cosd'
+                if descriptor in service:
+                    fields['service'] = dict(service, **{descriptor: self.encoded(service[descriptor])})
+            if fields.get('function'):
+                fields['function'] = self.encoded_instances(fields['function'], 'vnfd')
+            if fields.get('cloud_service'):
+                fields['cloud_service'] = self.encoded_instances(fields['cloud_service'], 'csd')
+            with workflow.lock:
+                fields['workflow'] = workflow.to_dict()
 
-        else:
-            # share state with other SLMs
-            self.slm_share('DONE', self.services[serv_id])
+            try:
+                self.checkpointer.save(serv_id, str(self.uuid), fields)
+                return
+            except OwnershipLost:
+                with workflow.lock:
+                    workflow.finished = True
+            except Exception:
+                # The next step is checkpointed again
+                LOG.exception("Service " + serv_id + ": Checkpoint failed")
+                return
 
-            del self.services[serv_id]
+        LOG.warning("Service " + serv_id + ": Taken over by another SLM, stopping its workflow")
+        self.remove_from_ledger(serv_id, delete_checkpoint=False)
 
 ####################
 # SLM input - output
@@ -351,58 +647,102 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
         # TODO: needs unit testing
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
+
+        with self.plugin_status_lock:
+            delta = self.plugin_status_view.apply(message)
+
+        if delta is None:
+            # A status update was missed, request the full state
+            self.manoconn.call_async(self.plugin_status,
+                                     t.PL_STATUS_SNAPSHOT,
+                                     json.dumps({}))
+            return
 
         # If the plugin configuration has changed, it needs to be checked
         # whether the number of SLMs has changed.
-        self.update_slm_configuration(message['plugin_dict'])
+        added, changed, removed = delta
+        self.update_slm_configuration(added, removed)
 
-    def slm_down(self):
+    def owns(self, key):
         """
-        This method is called when this SLM notices that another SLM
-        has gone missing. This SLM needs to determine whether it should
-        take over unfinished tasks from this SLM.
-        """
-        # TODO: needs unit testing
+        This method checks whether this SLM handles the requests for a
+        service, or for a bulk request.
 
-        for serv_id in self.slm_config['tasks_other_slm'].keys():
-
-            tasks_other_slm = self.slm_config['tasks_other_slm']
-            # TODO: only take over when ID's match
-            LOG.info('SLM down, taking over requests')
-            self.services[serv_id] = tasks_other_slm[serv_id]
-
-            if 'schedule' not in self.services[serv_id].keys():
-                del self.services[serv_id]
-                ch = self.tasks_other_slm[serv_id]['ch']
-                method = tasks_other_slm[serv_id]['method']
-                properties = tasks_other_slm[serv_id]['properties']
-                payload = tasks_other_slm[serv_id]['payload']
-
-                self.service_instance_create(ch, method, properties, payload)
-
-            else:
-                self.start_next_task(serv_id)
+        :param key: the instance uuid of the service, or the correlation
+                    id of the bulk request
+        """
+        owner = self.ring.owner(key)
+        return owner is None or self.uuid is None or owner == str(self.uuid)
 
-        self.slm_config['tasks_other_slm'] = {}
+    def take_over(self, slm_uuids):
+        """
+        This method is called when this SLM notices that other SLMs have
+        gone missing. It resumes the services of these SLMs that it owns
+        now, from their last checkpoint.
 
-    def inter_slm(self, ch, method, properties, payload):
+        :param slm_uuids: the uuids of the missing SLMs
         """
-        This method handles messages that are shared between different SLMs.
+        for slm_uuid in slm_uuids:
+            for serv_id in self.checkpointer.store.owned_by(slm_uuid):
+                if not self.owns(serv_id) or serv_id in self.services:
+                    continue
+                if not self.checkpointer.store.claim(serv_id, slm_uuid, str(self.uuid)):
+                    continue
+                LOG.info("Service " + serv_id + ": Taking over from SLM " + slm_uuid)
+                try:
+                    self.resume_service(serv_id)
+                except Exception:
+                    LOG.exception("Service " + serv_id + ": Take over failed")
+
+    def resume_service(self, serv_id):
         """
-        # TODO: needs unit testing
+        This method resumes the workflow of a service from its checkpoint.
+        The tasks that were waiting for a response are started again, as
+        the responses went to the missing SLM.
 
-        msg = yaml.load(payload)
+        :param serv_id: the instance uuid of the service
+        """
+        document = self.checkpointer.store.load(serv_id)
+        if document is None:
+            return
+        owner, fields = document
+        self.checkpointer.resumed(serv_id, fields)
+
+        fields = dict(fields)
+        state = fields.pop('workflow', None)
+        ledger = ServiceRecord.from_dict(fields)
+
+        # Services of the same descriptors share them in the ledger
+        service = ledger['service']
+        for key in ('nsd', 'cosd'):
+            if key in service:
+                service[key] = self.descriptor_cache.intern(service[key])
+        for function in ledger.get('function') or []:
+            function['vnfd'] = self.descriptor_cache.intern(function['vnfd'])
+        for cloud_service in ledger.get('cloud_service') or []:
+            cloud_service['csd'] = self.descriptor_cache.intern(cloud_service['csd'])
+
+        ledger['pause_chain'] = False
+        self.services[serv_id] = ledger
+        self.set_act_corr_id(serv_id, None)
+
+        if state is None:
+            self.remove_from_ledger(serv_id)
+            return
 
-        if msg['slm_id'] != str(self.uuid):
-            tasks_other_slm = self.slm_config['tasks_other_slm']
+        workflow = Workflow.restore(state)
+        # The batch of a bulk request is gone, the service is placed alone
+        if 'placement' in ledger['service']['ssm']:
+            workflow.replace('join_batch', ['request_topology', 'req_placement_from_ssm'])
+        else:
+            workflow.replace('join_batch', ['request_topology', 'SLM_mapping'])
 
-            if msg['status'] == 'DONE':
-                if (str(msg['corr_id'])) in tasks_other_slm.keys():
-                    del tasks_other_slm[str(msg['corr_id'])]
+        if any(ssm.get('instantiated') for ssm in ledger['service']['ssm'].values()):
+            self.connect_ssms(serv_id)
 
-            if msg['status'] == 'IN PROGRESS':
-                tasks_other_slm[str(msg['corr_id'])] = msg['state']
+        self.set_workflow(serv_id, workflow)
+        self.advance_workflow(serv_id, workflow)
 
     def service_instance_create(self, ch, method, properties, payload):
         """
@@ -410,43 +750,34 @@ class ServiceLifecycleManager(ManoBasePlugin):
         topic.
         """
 
-        # Check if the messages comes from the GK or is forward by another SLM
-        message_from_gk = True
+        # Ignore the responses of the SLMs on this topic
         if properties.app_id == self.name:
-            message_from_gk = False
-            if properties.reply_to is None:
-                return
-
-        # Bypass for backwards compatibility, to be removed after
-        # transition to new version of SLM is completed
-        message = yaml.load(payload)
+            return
 
-        # Extract the correlation id and generate a reduced id
+        # Every SLM receives the request, the owner of the service handles it
         corr_id = properties.correlation_id
-        reduced_id = tools.convert_corr_id(corr_id)
+        if not self.owns(instance_uuid(corr_id)):
+            return
 
-        # If the message comes from another SLM, check if the request has made
-        # a round trip
-        if not message_from_gk:
-            calc_rank = reduced_id % self.slm_config['slm_total']
-            roundtrip = (calc_rank == self.slm_config['slm_rank'])
+        # Start handling the request
+        message = codec.decode(payload, getattr(properties, 'content_type', None))
 
-            if roundtrip:
-                # If the message made a round trip, a new SLM should be started
-                # as this implies that the resources are exhausted
-                deploy_new_slm()
+        serv_id = self.instantiation_workflow(message, corr_id)
 
-            else:
-                # TODO: check if this SLM has the resources for this request
-                has_enough_resources = True
-                if has_enough_resources:
-                    pass
-                else:
-                    # TODO: forward to next SLM
-                    return
+        return self.services[serv_id]['schedule']
 
-        # Start handling the request
-        message = yaml.load(payload)
+    def instantiation_workflow(self, message, corr_id, batch=None):
+        """
+        This method adds a new service to the ledger and creates its
+        instantiation workflow.
+
+        :param message: the instantiation request of the service
+        :param corr_id: the correlation id under which the GK is informed
+        :param batch: the batch of a bulk request. If set, the service
+                      shares the topology and placement of the batch, if
+                      no SSM performs them, and the workflow is not started.
+        :return: the instance uuid of the service
+        """
 
         # Add the service to the ledger
         serv_id = self.add_service_to_ledger(message, corr_id)
@@ -456,45 +787,155 @@ class ServiceLifecycleManager(ManoBasePlugin):
         self.services[serv_id]['current_workflow'] = 'instantiation'
 
         # Schedule the tasks that the SLM should do for this request.
-        add_schedule = []
+        workflow = Workflow()
 
-        add_schedule.append('validate_deploy_request')
-        add_schedule.append('contact_gk')
+        workflow.add('validate_deploy_request')
+        workflow.add('contact_gk')
 
         # Onboard and instantiate the SSMs, if required.
         if self.services[serv_id]['service']['ssm']:
-            add_schedule.append('onboard_ssms')
-            add_schedule.append('instant_ssms')
+            workflow.add('onboard_ssms')
+            workflow.add('instant_ssms')
 
         if 'task' in self.services[serv_id]['service']['ssm'].keys():
-            add_schedule.append('trigger_task_ssm')
-
-        add_schedule.append('request_topology')
-
-        # Perform the placement
-        if 'placement' in self.services[serv_id]['service']['ssm'].keys():
-            add_schedule.append('req_placement_from_ssm')
+            workflow.add('trigger_task_ssm')
+
+        ssm = self.services[serv_id]['service']['ssm']
+        if batch is not None and not ('placement' in ssm or 'task' in ssm):
+            # Topology and placement are shared with the batch
+            with self.batches_lock:
+                batch.add(serv_id)
+                self.batches[serv_id] = batch
+            workflow.add('join_batch')
         else:
-            add_schedule.append('SLM_mapping')
-
-        add_schedule.append('ia_prepare')
-        add_schedule.append('vnf_deploy')
-        add_schedule.append('vnfs_start')
-        add_schedule.append('cs_deploy')
-        #add_schedule.append('vnf_chain')
-        add_schedule.append('store_nsr')
-        add_schedule.append('wan_configure')
-        add_schedule.append('start_monitoring')
-        add_schedule.append('inform_gk_instantiation')
+            workflow.add('request_topology')
 
-        self.services[serv_id]['schedule'].extend(add_schedule)
+            # Perform the placement
+            if 'placement' in ssm.keys():
+                workflow.add('req_placement_from_ssm')
+            else:
+                workflow.add('SLM_mapping')
+
+        prepare = workflow.add('ia_prepare')
+        # VNFs and cloud services are deployed at the same time
+        vnf_deploy = workflow.add('vnf_deploy', after=[prepare])
+        cs_deploy = workflow.add('cs_deploy', after=[prepare])
+        vnfs_start = workflow.add('vnfs_start', after=[vnf_deploy, cs_deploy])
+        #workflow.add('vnf_chain')
+        # The WAN is configured while the records are stored
+        store_nsr = workflow.add('store_nsr', after=[vnfs_start])
+        wan = workflow.add('wan_configure', after=[vnfs_start])
+        monitoring = workflow.add('start_monitoring', after=[store_nsr])
+        workflow.add('inform_gk_instantiation', after=[monitoring, wan])
+
+        self.set_workflow(serv_id, workflow)
 
         msg = ": New instantiation request received. Instantiation started."
         LOG.info("Service " + serv_id + msg)
         # Start the chain of tasks
-        self.start_next_task(serv_id)
+        if batch is None:
+            self.start_next_task(serv_id)
 
-        return self.services[serv_id]['schedule']
+        return serv_id
+
+    def service_instances_create_bulk(self, ch, method, prop, payload):
+        """
+        This function handles a received message on the bulk instantiation
+        topic. The message contains a list of requests, each with the
+        correlation id under which the GK is informed on the progress of
+        that service, as for single requests.
+        """
+
+        # Ignore the acknowledgements of this SLM
+        if prop.app_id == self.name:
+            return
+
+        # The services of a batch share their placement, they stay together
+        if not self.owns(prop.correlation_id):
+            return
+
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
+        batch = Batch(prop.correlation_id)
+
+        services = []
+        for request in message['requests']:
+            corr_id = request.get('correlation_id') or str(uuid.uuid4())
+            serv_id = self.instantiation_workflow(request['request'],
+                                                  corr_id,
+                                                  batch=batch)
+            services.append({'correlation_id': corr_id,
+                             'instance_id': serv_id})
+
+        msg = " services, " + str(len(batch.members)) + " in a batch"
+        LOG.info("Bulk instantiation of " + str(len(services)) + msg)
+
+        # Acknowledge the request, the results follow per service
+        ack = {'status': 'ACCEPTED',
+               'services': services,
+               'timestamp': time.time()}
+        self.manoconn.notify(t.GK_CREATE_BULK,
+                             codec.encode(ack),
+                             correlation_id=prop.correlation_id)
+
+        # All members are known now, start the workflows
+        for service in services:
+            self.start_next_task(service['instance_id'])
+
+        return services
+
+    def service_instances_kill_bulk(self, ch, method, prop, payload):
+        """
+        This function handles a received message on the bulk termination
+        topic. The message contains a list of instance ids, each with the
+        correlation id under which the GK is informed.
+        """
+
+        # Ignore the acknowledgements of this SLM
+        if prop.app_id == self.name:
+            return
+
+        if not self.owns(prop.correlation_id):
+            return
+
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
+        requests = message['requests']
+        LOG.info("Bulk termination of " + str(len(requests)) + " services")
+
+        # Recreate the missing ledger entries in parallel
+        missing = [r for r in requests if r['instance_id'] not in self.services]
+        if missing:
+            workers = min(len(missing), tools.HTTP_POOL_SIZE)
+            with pool.ThreadPoolExecutor(max_workers=workers) as executor:
+                for request in missing:
+                    executor.submit(self.recreate_ledger,
+                                    request.get('correlation_id'),
+                                    request['instance_id'])
+
+        services = []
+        for request in requests:
+            serv_id = request['instance_id']
+            corr_id = request.get('correlation_id') or str(uuid.uuid4())
+            try:
+                self.terminate_workflow(serv_id, corr_id, t.GK_KILL, orig='GK')
+                services.append({'correlation_id': corr_id,
+                                 'instance_id': serv_id})
+            except Exception as e:
+                LOG.exception("Service " + serv_id + ": Termination failed")
+                error = {'error': str(e),
+                         'timestamp': time.time(),
+                         'status': 'ERROR'}
+                self.manoconn.notify(t.GK_KILL,
+                                     codec.encode(error),
+                                     correlation_id=corr_id)
+
+        ack = {'status': 'ACCEPTED',
+               'services': services,
+               'timestamp': time.time()}
+        self.manoconn.notify(t.GK_KILL_BULK,
+                             codec.encode(ack),
+                             correlation_id=prop.correlation_id)
+
+        return services
 
     def sdn_chain_response(self, serv_id):
         
@@ -518,8 +959,10 @@ class ServiceLifecycleManager(ManoBasePlugin):
         if prop.app_id == self.name:
             return
 
-        content = yaml.load(payload)
+        content = codec.decode(payload, getattr(prop, 'content_type', None))
         serv_id = content['instance_id']
+        if not self.owns(serv_id):
+            return
         LOG.info("Termination request received for service " + str(serv_id))
 
         self.terminate_workflow(serv_id,
@@ -536,18 +979,19 @@ class ServiceLifecycleManager(ManoBasePlugin):
         self.services[serv_id]['status'] = 'reconfigurating'
         self.services[serv_id]["current_workflow"] = 'reconfigure'
 
-        add_schedule = []
-        add_schedule.append("configure_ssm")
-        add_schedule.append("vnfs_config")
-        add_schedule.append("inform_config_ssm")
+        workflow = Workflow()
+        workflow.add("configure_ssm")
+        workflow.add("vnfs_config")
+        workflow.add("inform_config_ssm")
 
-        self.services[serv_id]['schedule'].extend(add_schedule)
+        self.set_workflow(serv_id, workflow)
+        schedule = workflow.schedule
 
         LOG.info('Service ' + str(serv_id) + ': reconfigure workflow started')
         # Start the chain of tasks
         self.start_next_task(serv_id)
 
-        return self.services[serv_id]['schedule']
+        return schedule
 
     def terminate_workflow(self, serv_id, corr_id=None, topic=None, orig=None):
         """
@@ -565,35 +1009,40 @@ class ServiceLifecycleManager(ManoBasePlugin):
         self.services[serv_id]['status'] = 'TERMINATING'
         self.services[serv_id]["current_workflow"] = 'termination'
         # Schedule the tasks that the SLM should do for this request.
-        add_schedule = []
+        workflow = Workflow()
 
+        gk = None
         if orig == 'GK':
-            add_schedule.append('contact_gk')
-        add_schedule.append("stop_monitoring")
-        add_schedule.append("wan_deconfigure")
-        add_schedule.append("vnf_unchain")
-        add_schedule.append("vnfs_stop")
-        add_schedule.append("terminate_service")
-
+            gk = workflow.add('contact_gk')
+        # Monitoring is stopped while the network is torn down
+        monitoring = workflow.add("stop_monitoring", after=[gk])
+        workflow.add("wan_deconfigure", after=[gk])
+        workflow.add("vnf_unchain")
+        vnfs_stop = workflow.add("vnfs_stop")
+        service = workflow.add("terminate_service", after=[vnfs_stop, monitoring])
+
+        # The records are updated while the SSMs and FSMs are terminated
+        managers = service
         if self.services[serv_id]['service']['ssm']:
-            add_schedule.append("terminate_ssms")
+            managers = workflow.add("terminate_ssms", after=[managers])
 
         for vnf in self.services[serv_id]['function']:
             if vnf['fsm'] is not None:
-                add_schedule.append("terminate_fsms")
+                managers = workflow.add("terminate_fsms", after=[managers])
                 break
 
-        add_schedule.append("update_records_to_terminated")
+        records = workflow.add("update_records_to_terminated", after=[service])
         if orig == 'GK':
-            add_schedule.append("inform_gk")
+            workflow.add("inform_gk", after=[records, managers])
 
-        self.services[serv_id]['schedule'].extend(add_schedule)
+        self.set_workflow(serv_id, workflow)
+        schedule = workflow.schedule
 
         LOG.info("Termination workflow started for service " + str(serv_id))
         # Start the chain of tasks
         self.start_next_task(serv_id)
 
-        return self.services[serv_id]['schedule']
+        return schedule
 
     def service_instance_custom(self, serv_id, schedule):
         """
@@ -611,13 +1060,40 @@ class ServiceLifecycleManager(ManoBasePlugin):
             self.recreate_ledger(None, serv_id)
 
         self.services[serv_id]["current_workflow"] = 'custom'
-        self.services[serv_id]['schedule'] = schedule
+        # The SSM decides on the order, the tasks run one after the other
+        self.set_workflow(serv_id, Workflow.linear(schedule))
 
         LOG.info("Custom workflow started for service " + str(serv_id))
         # Start the chain of tasks
         self.start_next_task(serv_id)
 
-        return self.services[serv_id]['schedule']
+        return schedule
+
+    def trace_query(self, ch, method, prop, payload):
+        """
+        This method handles queries for the traces of finished workflows.
+        A query with an 'instance_id' returns the trace of that service,
+        other queries return all kept traces with the latency percentiles
+        per task, optionally only for one 'workflow'.
+        """
+        query = codec.decode(payload, getattr(prop, 'content_type', None)) or {}
+
+        if 'instance_id' in query:
+            trace = self.tracer.get(query['instance_id'])
+            if trace is None:
+                response = {'status': 'ERROR',
+                            'error': 'No trace for ' + str(query['instance_id'])}
+            else:
+                response = {'status': 'OK', 'trace': trace}
+        else:
+            workflow = query.get('workflow')
+            traces = [trace for trace in self.tracer.traces()
+                      if workflow in (None, trace['workflow'])]
+            response = {'status': 'OK',
+                        'traces': traces,
+                        'stats': self.tracer.stats(workflow)}
+
+        return codec.encode(response)
 
     def service_update(self, ch, method, prop, payload):
 
@@ -633,7 +1109,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
             content['ssm_type'] = 'monitor'
             uuid = content['serviceID']
-            new_payload = yaml.dump(content)
+            new_payload = codec.encode(content)
 
             # Forward the received monitoring message to the SSM
             topic = 'generic.ssm.' + uuid
@@ -649,7 +1125,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         This method is called every time the SLM receives a message from
         a monitoring SSM.
         """
-        content = yaml.load(payload)
+        content = codec.decode(payload, getattr(prop, 'content_type', None))
         LOG.info("monitoring SSM responded: " + str(content))
 
         serv_id = content['service_instance_id']
@@ -690,16 +1166,18 @@ class ServiceLifecycleManager(ManoBasePlugin):
         This function handles responses to topology requests made to the
         infrastructure adaptor.
         """
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
         LOG.info("Service " + serv_id + ": Topology received from IA.")
-        LOG.debug("Requested info on topology: " + str(message))
+        LOG.debug("Requested info on topology: %s", message)
 
-        # Add topology to ledger
-        self.services[serv_id]['infrastructure']['topology'] = message
+        # Add topology to ledger, with the resources that are reserved
+        # for other services as used
+        topology = self.update_topology(prop.correlation_id, message)
+        self.services[serv_id]['infrastructure']['topology'] = topology
 
         # Continue with the scheduled tasks
         self.start_next_task(serv_id)
@@ -710,10 +1188,10 @@ class ServiceLifecycleManager(ManoBasePlugin):
         of a new service.
         """
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
         LOG.info("Service " + serv_id + ": Onboarding resp received from SMR.")
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         for key in message.keys():
             if message[key]['error'] == 'None':
@@ -735,12 +1213,12 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
 
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
         msg = ": Instantiating response received from SMR."
         LOG.info("Service " + serv_id + msg)
         LOG.debug(payload)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
         for ssm_type in self.services[serv_id]['service']['ssm'].keys():
             ssm = self.services[serv_id]['service']['ssm'][ssm_type]
             response = message[ssm['id']]
@@ -755,16 +1233,21 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
             ssm['uuid'] = response['uuid']
 
-        # Setup broker connection with the SSMs of this service.
+        self.connect_ssms(serv_id)
+
+        # Continue with the scheduled tasks
+        self.start_next_task(serv_id)
+
+    def connect_ssms(self, serv_id):
+        """
+        Setup broker connection with the SSMs of this service.
+        """
         url = self.ssm_url_base + 'ssm-' + serv_id
         ssm_conn = messaging.ManoBrokerRequestResponseConnection(self.name,
                                                                  url=url)
 
         self.ssm_connections[serv_id] = ssm_conn
 
-        # Continue with the scheduled tasks
-        self.start_next_task(serv_id)
-
     def resp_task(self, ch, method, prop, payload):
         """
         This method handles updates of the task schedule by the an SSM.
@@ -772,11 +1255,11 @@ class ServiceLifecycleManager(ManoBasePlugin):
         # TODO: Test this method
 
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
         LOG.info("Service " + serv_id + ": Response from task ssm: " + payload)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         if message['status'] == 'COMPLETED':
             self.services[serv_id]['schedule'] = message['schedule']
@@ -794,13 +1277,13 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
         # TODO: Test this method
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         is_dict = isinstance(message, dict)
         LOG.debug("Type Dict: " + str(is_dict))
 
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
         mapping = message['mapping']
         error = message['error']
@@ -814,24 +1297,14 @@ class ServiceLifecycleManager(ManoBasePlugin):
             msg = ": Calculated SSM mapping: " + str(mapping)
             LOG.info("Service " + serv_id + msg)
             self.services[serv_id]['service']['mapping'] = mapping
+            # The SSM decides the placement, its resources are reserved
+            # even if they seem in use
+            self.reserve_mapping(serv_id, mapping, force=True)
             for function in self.services[serv_id]['function']:
                 vnf_id = function['id']
                 function['vim_uuid'] = mapping[vnf_id]['vim']
 
-        # Check if the placement does not contain any loops
-        vim_list = tools.get_ordered_vim_list(self.services[serv_id])
-
-        if vim_list is None:
-            # the placement contains loops
-            msg = 'Placement contains loop, improve Placement SSM.'
-            self.error_handling(serv_id,
-                                t.GK_CREATE,
-                                msg)
-
-            return
-        else:
-            LOG.info("Service " + serv_id + ": VIM list ordered")
-            self.services[serv_id]['service']['ordered_vim_list'] = vim_list
+        self.order_vims(serv_id, 'improve Placement SSM.')
 
         self.start_next_task(serv_id)
 
@@ -841,12 +1314,12 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
 
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
         msg = ": Response received from configuration SSM."
         LOG.info("Service " + serv_id + msg)
 
-        content = yaml.load(payload)
+        content = codec.decode(payload, getattr(prop, 'content_type', None))
 
         # TODO: check if content is correctly formatted
 
@@ -865,12 +1338,13 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
         This method handles a response from the FLM to a vnf deploy request.
         """
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
         msg = ": Message received from FLM on VNF deploy call."
         LOG.info("Service " + serv_id + msg)
+        self.drop_act_corr_id(serv_id, prop.correlation_id)
 
         # Inform GK if VNF deployment failed
         if message['error'] is not None:
@@ -891,17 +1365,16 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         # Only continue if all vnfs are deployed
         if vnfs_to_depl == 0:
-            self.services[serv_id]['act_corr_id'] = None
-            self.start_next_task(serv_id)
+            self.start_next_task(serv_id, 'vnf_deploy')
 
     def resp_vnfs_csss(self, ch, method, prop, payload):
         """
         This method handles a response from the FLM to a vnf csss request.
         """
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
         msg = ": Response received from FLM on VNF csss call."
         LOG.info("Service " + serv_id + msg)
 
@@ -925,7 +1398,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         # Only continue if all vnfs are done
         if vnfs_to_resp == 0:
-            self.services[serv_id]['act_corr_id'] = None
+            self.set_act_corr_id(serv_id, None)
             self.start_next_task(serv_id)
 
     def resp_prepare(self, ch, method, prop, payload):
@@ -933,13 +1406,15 @@ class ServiceLifecycleManager(ManoBasePlugin):
         This method handles a response to a prepare request.
         """
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
-        response = yaml.load(payload)
+        response = codec.decode(payload, getattr(prop, 'content_type', None))
         LOG.debug("Response from IA on .prepare call: " + str(response))
 
         if response['request_status'] == "COMPLETED":
             LOG.info("Service " + serv_id + ": Msg from IA: Infra prepared")
+            # Followers in a batch wait for the images of this service
+            self.batch_prepared(serv_id)
         else:
             msg = ": Error occured while preparing vims, aborting workflow"
             LOG.info("Service " + serv_id + msg)
@@ -966,7 +1441,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         if 'add_content' in self.services[serv_id].keys():
             message.update(self.services[serv_id]['add_content'])
 
-        payload = yaml.dump(message)
+        payload = codec.encode(message)
         self.manoconn.notify(self.services[serv_id]['topic'],
                              payload,
                              correlation_id=corr_id)
@@ -978,10 +1453,19 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         :param serv_id: The instance uuid of the service
         """
+        topology = self.topology.snapshot()
+        if topology is not None:
+            # Continue with the cached topology, it is refreshed in the
+            # background once it gets old
+            self.services[serv_id]['infrastructure']['topology'] = topology
+            LOG.info("Service " + serv_id + ": Topology taken from cache.")
+            self.refresh_topology()
+            return
 
         # Generate correlation_id for the call, for future reference
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
+        self.topology_requests[corr_id] = time.time()
 
         self.manoconn.call_async(self.resp_topo,
                                  t.IA_TOPO,
@@ -993,6 +1477,49 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         LOG.info("Service " + serv_id + ": Topology requested from IA.")
 
+    def refresh_topology(self):
+        """
+        This method requests the topology from the Infrastructure Adaptor
+        in the background if the cached topology is getting old.
+        """
+        if not self.topology.needs_refresh():
+            return
+
+        corr_id = str(uuid.uuid4())
+        self.topology_requests[corr_id] = time.time()
+
+        self.manoconn.call_async(self.resp_refresh_topo,
+                                 t.IA_TOPO,
+                                 None,
+                                 correlation_id=corr_id)
+
+        LOG.debug("Topology refresh requested from IA.")
+
+    def resp_refresh_topo(self, ch, method, prop, payload):
+        """
+        This method handles responses to background topology requests.
+        """
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
+        self.update_topology(prop.correlation_id, message)
+
+    def update_topology(self, corr_id, topology):
+        """
+        This method merges a topology from the IA into the cache.
+
+        :param corr_id: the correlation id of the topology request
+        :param topology: the topology from the IA
+        :return: the topology with the reserved resources as used
+        """
+        requested = self.topology_requests.pop(corr_id, None)
+        changed = self.topology.update(topology, requested)
+        LOG.debug("Topology updated, " + str(changed) + " VIMs changed")
+
+        snapshot = self.topology.snapshot()
+        if snapshot is None:
+            # Not a usable topology, the placement gets what the IA sent
+            return topology
+        return snapshot
+
     def ia_prepare(self, serv_id):
         """
         This method informs the IA which PoPs will be used and which
@@ -1003,6 +1530,38 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         msg = ": Requesting IA to prepare the infrastructure."
         LOG.info("Service " + serv_id + msg)
+        IA_mapping = self.prepare_message(serv_id)
+
+        # In a batch, the images may be prepared by other services
+        batch = self.batches.get(serv_id)
+        if batch is not None:
+            with batch.lock:
+                strip = batch.strip_images(serv_id)
+            if strip:
+                LOG.info("Service " + serv_id + ": Images prepared by batch")
+                for vim in IA_mapping['vim_list']:
+                    vim['vm_images'] = []
+
+        # Add correlation id to the ledger for future reference
+        corr_id = str(uuid.uuid4())
+        self.set_act_corr_id(serv_id, corr_id)
+
+        # Send this mapping to the IA
+        self.manoconn.call_async(self.resp_prepare,
+                                 t.IA_PREPARE,
+                                 codec.encode(IA_mapping),
+                                 correlation_id=corr_id)
+
+        # Pause the chain of tasks to wait for response
+        self.services[serv_id]['pause_chain'] = True
+
+    def prepare_message(self, serv_id):
+        """
+        This method builds the prepare request for the IA, with the VIMs
+        that the service uses and the images needed on them.
+
+        :param serv_id: The instance uuid of the service
+        """
         # Build mapping message for IA
         IA_mapping = {}
 
@@ -1052,18 +1611,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
                 IA_mapping['vim_list'].append({'uuid': vim_uuid,
                                                'vm_images': []})
 
-        # Add correlation id to the ledger for future reference
-        corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
-
-        # Send this mapping to the IA
-        self.manoconn.call_async(self.resp_prepare,
-                                 t.IA_PREPARE,
-                                 yaml.dump(IA_mapping),
-                                 correlation_id=corr_id)
-
-        # Pause the chain of tasks to wait for response
-        self.services[serv_id]['pause_chain'] = True
+        return IA_mapping
 
     def vnf_deploy(self, serv_id):
         """
@@ -1078,15 +1626,17 @@ class ServiceLifecycleManager(ManoBasePlugin):
         functions = self.services[serv_id]['function']
         self.services[serv_id]['vnfs_to_resp'] = len(functions)
 
-        self.services[serv_id]['act_corr_id'] = []
+        # cs_deploy can be waiting for responses at the same time
+        if not isinstance(self.services[serv_id].get('act_corr_id'), list):
+            self.set_act_corr_id(serv_id, [])
 
         for function in functions:
 
             corr_id = str(uuid.uuid4())
-            self.services[serv_id]['act_corr_id'].append(corr_id)
+            self.add_act_corr_id(serv_id, corr_id)
 
             message = {}
-            message['vnfd'] = function['vnfd']
+            message['vnfd'] = self.encoded(function['vnfd'])
             message['id'] = function['id']
             message['vim_uuid'] = function['vim_uuid']
             message['serv_id'] = serv_id
@@ -1095,10 +1645,10 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
             msg = ": Requesting the deployment of vnf " + function['id']
             LOG.info("Service " + serv_id + msg)
-            LOG.debug("Payload of request: " + str(message))
+            LOG.debug("Payload of request: %s", message)
             self.manoconn.call_async(self.resp_vnf_depl,
                                      t.MANO_DEPLOY,
-                                     yaml.dump(message),
+                                     codec.encode(message),
                                      correlation_id=corr_id)
 
         self.services[serv_id]['pause_chain'] = True
@@ -1118,24 +1668,26 @@ class ServiceLifecycleManager(ManoBasePlugin):
         cloud_services = self.services[serv_id]['cloud_service']
         self.services[serv_id]['css_to_resp'] = len(cloud_services)
 
-        self.services[serv_id]['act_corr_id'] = []
+        # vnf_deploy can be waiting for responses at the same time
+        if not isinstance(self.services[serv_id].get('act_corr_id'), list):
+            self.set_act_corr_id(serv_id, [])
 
         for cloud_service in cloud_services:
             corr_id = str(uuid.uuid4())
-            self.services[serv_id]['act_corr_id'].append(corr_id)
+            self.add_act_corr_id(serv_id, corr_id)
 
             message = {}
-            message['csd'] = cloud_service['csd']
+            message['csd'] = self.encoded(cloud_service['csd'])
             message['id'] = cloud_service['id']
             message['vim_uuid'] = cloud_service['vim_uuid']
             message['serv_id'] = serv_id
 
             msg = ": Requesting the deployment of cs " + cloud_service['id']
             LOG.info("Service " + serv_id + msg)
-            LOG.debug("Payload of request: " + str(message))
+            LOG.debug("Payload of request: %s", message)
             self.manoconn.call_async(self.resp_cs_depl,
                                      t.MANO_CS_DEPLOY,
-                                     yaml.dump(message),
+                                     codec.encode(message),
                                      correlation_id=corr_id)
 
         self.services[serv_id]['pause_chain'] = True
@@ -1144,12 +1696,13 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
         This method handles a response from the FLM to a cs deploy request.
         """
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         # Retrieve the service uuid
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
         msg = ": Message received from CLM on CS deploy call."
         LOG.info("Service " + serv_id + msg)
+        self.drop_act_corr_id(serv_id, prop.correlation_id)
 
         # Inform GK if CS deployment failed
         if message['error'] is not None:
@@ -1171,8 +1724,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         # Only continue if all css are deployed
         if css_to_depl == 0:
             LOG.info("Deployment of CSs completed.")
-            self.services[serv_id]['act_corr_id'] = None
-            self.start_next_task(serv_id)
+            self.start_next_task(serv_id, 'cs_deploy')
 
 
     def vnfs_start(self, serv_id):
@@ -1229,7 +1781,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         triggers.
         """
         functions = self.services[serv_id]['function']
-        self.services[serv_id]['act_corr_id'] = []
+        self.set_act_corr_id(serv_id, [])
 
         # Counting the number of vnfs that you need a response from
         vnfs_to_resp = 0
@@ -1244,7 +1796,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
                 # Check if payload was provided
                 payload = {}
                 payload['vnf_id'] = vnf['id']
-                payload['vnfd'] = vnf['vnfd']
+                payload['vnfd'] = self.encoded(vnf['vnfd'])
                 payload['serv_id'] = serv_id
                 if bool(vnf[csss_type]['payload']):
                     payload['data'] = vnf[csss_type]['payload']
@@ -1257,19 +1809,19 @@ class ServiceLifecycleManager(ManoBasePlugin):
                             vnfrs.append(vnf_new['vnfr'])
                         data = {'nsr': nsr, 'vnfrs': vnfrs}
                     else:
-                        data = {'vnfr': vnf['vnfr'], 'vnfd': vnf['vnfd']}
+                        data = {'vnfr': vnf['vnfr'], 'vnfd': payload['vnfd']}
 
                     payload['data'] = data
 
                 corr_id = str(uuid.uuid4())
-                self.services[serv_id]['act_corr_id'].append(corr_id)
+                self.add_act_corr_id(serv_id, corr_id)
 
                 msg = " " + csss_type + " event requested for vnf " + vnf['id']
                 LOG.info("Service " + serv_id + msg)
 
                 self.manoconn.call_async(self.resp_vnfs_csss,
                                          topic,
-                                         yaml.dump(payload),
+                                         codec.encode(payload),
                                          correlation_id=corr_id)
 
                 self.services[serv_id]['pause_chain'] = True
@@ -1286,21 +1838,21 @@ class ServiceLifecycleManager(ManoBasePlugin):
         # Sending the NSD to the SRM triggers it to onboard the ssms
         msg = {}
         if 'nsd' in self.services[serv_id]['service']:
-            msg['NSD'] = self.services[serv_id]['service']['nsd']
+            msg['NSD'] = self.encoded(self.services[serv_id]['service']['nsd'])
         else:
-            msg['NSD'] = self.services[serv_id]['service']['cosd']
+            msg['NSD'] = self.encoded(self.services[serv_id]['service']['cosd'])
         msg['VNFD'] = []
         for function in self.services[serv_id]['function']:
-            msg['VNFD'].append(function['vnfd'])
+            msg['VNFD'].append(self.encoded(function['vnfd']))
 
-        pyld = yaml.dump(msg)
+        pyld = codec.encode(msg)
         self.manoconn.call_async(self.resp_onboard,
                                  t.SRM_ONBOARD,
                                  pyld,
                                  correlation_id=corr_id)
 
         # Add correlation id to the ledger for future reference
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         # Pause the chain of tasks to wait for response
         self.services[serv_id]['pause_chain'] = True
@@ -1321,14 +1873,14 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         msg_for_smr = {}
         if 'nsd' in self.services[serv_id]['service']:
-            msg_for_smr['NSD'] = self.services[serv_id]['service']['nsd']
+            msg_for_smr['NSD'] = self.encoded(self.services[serv_id]['service']['nsd'])
         else:
-            msg_for_smr['NSD'] = self.services[serv_id]['service']['cosd']
+            msg_for_smr['NSD'] = self.encoded(self.services[serv_id]['service']['cosd'])
         msg_for_smr['UUID'] = serv_id
 
         msg = ": Keys in message for SSM instant: " + str(msg_for_smr.keys())
         LOG.info("Service " + serv_id + msg)
-        pyld = yaml.dump(msg_for_smr)
+        pyld = codec.encode(msg_for_smr)
 
         self.manoconn.call_async(self.resp_instant,
                                  t.SRM_INSTANT,
@@ -1336,7 +1888,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
                                  correlation_id=corr_id)
 
         # Add correlation id to the ledger for future reference
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         # Pause the chain of tasks to wait for response
         self.services[serv_id]['pause_chain'] = True
@@ -1352,7 +1904,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
 
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         # Select the master SSM and create topic to reach it on
         ssm_id = self.services[serv_id]['service']['ssm']['task']['uuid']
@@ -1363,7 +1915,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
                    'ssm_type': 'task'}
 
         # Contact SSM
-        payload = yaml.dump(message)
+        payload = codec.encode(message)
 
         ssm_conn = self.ssm_connections[serv_id]
 
@@ -1385,7 +1937,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
 
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         # Check if placement SSM is available
         ssm_place = self.services[serv_id]['service']['ssm']['placement']
@@ -1394,16 +1946,15 @@ class ServiceLifecycleManager(ManoBasePlugin):
             return self.SLM_mapping(serv_id)
         # build message for placement SSM
         if 'nsd' in self.services[serv_id]['service']:
-            nsd = self.services[serv_id]['service']['nsd']
+            nsd = self.encoded(self.services[serv_id]['service']['nsd'])
         else:
-            nsd = self.services[serv_id]['service']['cosd']
+            nsd = self.encoded(self.services[serv_id]['service']['cosd'])
         top = self.services[serv_id]['infrastructure']['topology']
 
         vnfds = []
         for function in self.services[serv_id]['function']:
-            vnfd_to_add = function['vnfd']
-            vnfd_to_add['instance_uuid'] = function['id']
-            vnfds.append(function['vnfd'])
+            vnfd = self.encoded(function['vnfd'])
+            vnfds.append(vnfd.updated(instance_uuid=function['id']))
 
         message = {'nsd': nsd,
                    'topology': top,
@@ -1418,7 +1969,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
             message['nap']['egresses'] = self.services[serv_id]['egress']
 
         # Contact SSM
-        payload = yaml.dump(message)
+        payload = codec.encode(message)
 
         msg = ": Placement requested from SSM: " + str(message.keys())
         LOG.info("Service " + serv_id + msg)
@@ -1440,7 +1991,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
 
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         if 'configure' not in self.services[serv_id]['service']['ssm'].keys():
             LOG.info("Configuration SSM requested but not available")
@@ -1452,8 +2003,10 @@ class ServiceLifecycleManager(ManoBasePlugin):
         #     return
 
         # Building the content message for the configuration ssm
-        content = {'service': self.services[serv_id]['service'],
-                   'functions': self.services[serv_id]['function']}
+        service = self.services[serv_id]['service']
+        descriptor = 'nsd' if 'nsd' in service else 'cosd'
+        content = {'service': dict(service, **{descriptor: self.encoded(service[descriptor])}),
+                   'functions': self.encoded_instances(self.services[serv_id]['function'], 'vnfd')}
         
         if self.services[serv_id]["current_workflow"] == 'instantiation':
             content['ingress'] = self.services[serv_id]['ingress']
@@ -1468,7 +2021,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         ssm_conn.call_async(self.resp_ssm_configure,
                             topic,
-                            yaml.dump(content),
+                            codec.encode(content),
                             correlation_id=corr_id)
 
         # Pause the chain of tasks to wait for response
@@ -1494,26 +2047,16 @@ class ServiceLifecycleManager(ManoBasePlugin):
         ssm_conn = self.ssm_connections[serv_id]
 
         ssm_conn.notify(topic,
-                        yaml.dump(content),
+                        codec.encode(content),
                         correlation_id=corr_id)
 
-    def slm_share(self, status, content):
-
-        message = {'status': status,
-                   'state': content,
-                   'corr_id': content['original_corr_id'],
-                   'slm_id': self.uuid}
-
-        payload = yaml.dump(message)
-        self.manoconn.notify('mano.inter.slm', payload)
-
     def flm_deploy(self, ch, method, prop, payload):
         """
         This methods fakes the FLM by handling requests from the SLM to dpeloy
         a specific function
         """
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         if 'vnfd' in message.keys():
 
@@ -1523,7 +2066,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
             outg_message['vim_uuid'] = message['vim_uuid']
             outg_message['service_instance_id'] = message['serv_id']
 
-            payload = yaml.dump(outg_message)
+            payload = codec.encode(outg_message)
 
             corr_id = str(uuid.uuid4())
             # adding the vnfd to the flm ledger
@@ -1549,7 +2092,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         LOG.info("IA reply to fake FLM on VNF deploy call")
         LOG.debug("Payload of request: " + str(payload))
 
-        inc_message = yaml.load(payload)
+        inc_message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         # Build the message for the SLM
         outg_message = {}
@@ -1569,35 +2112,25 @@ class ServiceLifecycleManager(ManoBasePlugin):
             outg_message['vnfr'] = vnfr
 
             # Store the record
-#            try:
             url = t.VNFR_REPOSITORY_URL + 'vnf-instances'
-            header = {'Content-Type': 'application/json'}
-            vnfr_response = requests.post(url,
-                                          data=json.dumps(vnfr),
-                                          headers=header,
-                                          timeout=1.0)
             LOG.info("Storing VNFR on " + url)
             LOG.debug("VNFR: " + str(vnfr))
+            repo_error = self.repository.write('POST', url, vnfr)
 
-            if (vnfr_response.status_code == 200):
+            if repo_error is None:
                 LOG.info("VNFR storage accepted.")
                 outg_message['vnfr'] = vnfr
             # If storage fails, add error code and message to rply to gk
             else:
-                error = {'http_code': vnfr_response.status_code,
-                         'message': vnfr_response.json()}
+                error = repo_error
                 LOG.info('vnfr to repo failed: ' + str(error))
-            # except:
-            #     error = {'http_code': '0',
-            #              'message': 'Timeout contacting VNFR server'}
-            #     LOG.info('time-out on vnfr to repo')
 
         outg_message['error'] = error
         outg_message['inst_id'] = vnfd['instance_uuid']
 
         corr_id = self.flm_ledger[prop.correlation_id]['orig_corr_id']
         self.manoconn.notify(t.MANO_DEPLOY,
-                             yaml.dump(outg_message),
+                             codec.encode(outg_message),
                              correlation_id=corr_id)
 
     def store_nsr(self, serv_id):
@@ -1607,69 +2140,39 @@ class ServiceLifecycleManager(ManoBasePlugin):
         request_status = 'normal operation'
 
         if request_status == 'normal operation':
-            LOG.info("Service " + serv_id + ": Update status of the VNFR")
+            LOG.info("Service " + serv_id + ": Update status of the VNFRs and CSRs")
+            writes = []
             for function in self.services[serv_id]['function']:
                 function['vnfr']['status'] = "normal operation"
                 function['vnfr']['version'] = '2'
 
                 url = t.VNFR_REPOSITORY_URL + 'vnf-instances/' + function['id']
-                LOG.info("Service " + serv_id + ": URL VNFR update: " + url)
-
-                error = None
-                try:
-                    header = {'Content-Type': 'application/json'}
-                    vnfr_resp = requests.put(url,
-                                             data=json.dumps(function['vnfr']),
-                                             headers=header,
-                                             timeout=1.0)
-                    vnfr_resp_json = str(vnfr_resp.json())
-                    if (vnfr_resp.status_code == 200):
-                        msg = ": VNFR update accepted for " + function['id']
-                        LOG.info("Service " + serv_id + msg)
-                    else:
-                        msg = ": VNFR update not accepted: " + vnfr_resp_json
-                        LOG.info("Service " + serv_id + msg)
-                        error = {'http_code': vnfr_resp.status_code,
-                                 'message': vnfr_resp_json}
-                except:
-                    error = {'http_code': '0',
-                             'message': 'Timeout when contacting VNFR repo'}
-
-                if error is not None:
-                    self.error_handling(serv_id, t.GK_CREATE, error)
-                    return
+                bulk_url = t.VNFR_REPOSITORY_URL + 'vnf-instances'
+                writes.append(RecordWrite(function['id'], 'PUT', url,
+                                          function['vnfr'], bulk_url))
 
-            LOG.info("Service " + serv_id + ": Update status of the CSR")
             for cloud_service in self.services[serv_id]['cloud_service']:
                 cloud_service['csr']['status'] = "normal operation"
                 cloud_service['csr']['version'] = '1'
 
                 url = t.CSR_REPOSITORY_URL + 'cs-instances/' + cloud_service['id']
-                LOG.info("Service " + serv_id + ": URL CSR update: " + url)
+                bulk_url = t.CSR_REPOSITORY_URL + 'cs-instances'
+                writes.append(RecordWrite(cloud_service['id'], 'PUT', url,
+                                          cloud_service['csr'], bulk_url))
+
+            span = self.tracer.call_started(serv_id, self.services[serv_id],
+                                            target='repository')
+            results = self.repository.write_all(writes)
+            for write in writes:
+                if results[write.key] is None:
+                    msg = ": Record update accepted for " + write.key
+                    LOG.info("Service " + serv_id + msg)
 
-                error = None
-                try:
-                    header = {'Content-Type': 'application/json'}
-                    csr_resp = requests.put(url,
-                                             data=json.dumps(cloud_service['csr']),
-                                             headers=header,
-                                             timeout=1.0)
-                    csr_resp_json = str(csr_resp.json())
-                    if (csr_resp.status_code == 200):
-                        msg = ": CSR update accepted for " + cloud_service['id']
-                        LOG.info("Service " + serv_id + msg)
-                    else:
-                        msg = ": CSR update not accepted: " + csr_resp_json
-                        LOG.info("Service " + serv_id + msg)
-                        error = {'http_code': csr_resp.status_code,
-                                 'message': csr_resp_json}
-                except:
-                    error = {'http_code': '0',
-                             'message': 'Timeout when contacting CSR repo'}
-
-                if error is not None:
-                    self.error_handling(serv_id, t.GK_CREATE, error)
-                    return
+            error = first_error(results, writes)
+            end_span(span, 'ok' if error is None else 'error')
+            if error is not None:
+                self.error_handling(serv_id, t.GK_CREATE, error)
+                return
 
         descriptor = self.services[serv_id]['service']['nsd'] if is_nsd else self.services[serv_id]['service']['cosd']
 
@@ -1686,29 +2189,16 @@ class ServiceLifecycleManager(ManoBasePlugin):
         else:
             record = tools.build_cosr(request_status, descriptor, vnfr_ids, csr_ids, serv_id)
 
-        LOG.debug("Record to be stored: " + yaml.dump(record))
+        LOG.debug("Record to be stored: %s", record)
 
-        error = None
-
-        try:
-            header = {'Content-Type': 'application/json'}
-            url = t.NSR_REPOSITORY_URL + 'ns-instances' if is_nsd else t.COSR_REPOSITORY_URL + 'cos-instances'
-            record_resp = requests.post(url,
-                                     data=json.dumps(record),
-                                     headers=header,
-                                     timeout=1.0)
-            record_resp_json = record_resp.json()
-            if (record_resp.status_code == 200):
-                msg = ": Record accepted and stored for instance " + serv_id
-                LOG.info("Service " + serv_id + msg)
-            else:
-                msg = ": Record not accepted: " + str(record_resp_json)
-                LOG.info("Service " + serv_id + msg)
-                error = {'http_code': record_resp.status_code,
-                         'message': record_resp_json}
-        except:
-            error = {'http_code': '0',
-                     'message': 'Timeout when contacting record repo'}
+        url = t.NSR_REPOSITORY_URL + 'ns-instances' if is_nsd else t.COSR_REPOSITORY_URL + 'cos-instances'
+        span = self.tracer.call_started(serv_id, self.services[serv_id],
+                                        target='repository')
+        error = self.repository.write('POST', url, record)
+        end_span(span, 'ok' if error is None else 'error')
+        if error is None:
+            msg = ": Record accepted and stored for instance " + serv_id
+            LOG.info("Service " + serv_id + msg)
 
         self.services[serv_id]['service']['nsr' if is_nsd else 'cosr'] = record
 
@@ -1731,22 +2221,22 @@ class ServiceLifecycleManager(ManoBasePlugin):
         # COSD chaining requires IPs to be sent to the SDN-Plugin
         """if 'cosd' in self.services[serv_id]['service']:
             corr_id = str(uuid.uuid4())
-            self.services[serv_id]['act_corr_id'] = corr_id
+            self.set_act_corr_id(serv_id, corr_id)
 
             chaining_ips = self.services[serv_id]['connection_points']
 
             self.manoconn.call_async(self.sdn_chain_response,
                                  t.MANO_CHAIN_DPLOY,
-                                 yaml.dump(chaining_ips),
+                                 codec.encode(chaining_ips),
                                  correlation_id=corr_id)"""
             
 
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         chain = {}
         chain["service_instance_id"] = serv_id
-        chain["nsd"] = self.services[serv_id]['service']['nsd']
+        chain["nsd"] = self.encoded(self.services[serv_id]['service']['nsd'])
 
         vnfrs = []
         vnfds = []
@@ -1754,9 +2244,8 @@ class ServiceLifecycleManager(ManoBasePlugin):
         for function in self.services[serv_id]['function']:
             vnfrs.append(function['vnfr'])
 
-            vnfd = function['vnfd']
-            vnfd['instance_uuid'] = function['id']
-            vnfds.append(vnfd)
+            vnfd = self.encoded(function['vnfd'])
+            vnfds.append(vnfd.updated(instance_uuid=function['id']))
 
         chain['vnfrs'] = vnfrs
         chain['vnfds'] = vnfds
@@ -1776,10 +2265,10 @@ class ServiceLifecycleManager(ManoBasePlugin):
             if nap_empty:
                 chain.pop('nap')
 
-        LOG.info(str(yaml.dump(chain)))
+        LOG.debug("Chain request: %s", chain)
         self.manoconn.call_async(self.IA_chain_response,
                                  t.IA_CONF_CHAIN,
-                                 yaml.dump(chain),
+                                 codec.encode(chain),
                                  correlation_id=corr_id)
 
         LOG.info("Service " + serv_id + ": Requested to chain the VNFs.")
@@ -1791,10 +2280,9 @@ class ServiceLifecycleManager(ManoBasePlugin):
         This method handles the IA response to the chain request
         """
         # Get the serv_id of this service
-        serv_id = tools.servid_from_corrid(self.services,
-                                           prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         LOG.info("Service " + serv_id + ": Chaining request completed.")
 
@@ -1813,7 +2301,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         LOG.info("Service " + serv_id + msg)
 
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         payload = json.dumps({'service_instance_id': serv_id})
         self.manoconn.call_async(self.IA_unchain_response,
@@ -1830,10 +2318,9 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
 
         # Get the serv_id of this service
-        serv_id = tools.servid_from_corrid(self.services,
-                                           prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         if message['request_status'] == 'COMPLETED':
             msg = ": Response from IA: Service unchaining succeeded."
@@ -1854,7 +2341,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         LOG.info("Service " + serv_id + ": Requesting IA to terminate service")
 
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         payload = json.dumps({'instance_uuid': serv_id})
         self.manoconn.call_async(self.IA_termination_response,
@@ -1871,10 +2358,9 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
 
         # Get the serv_id of this service
-        serv_id = tools.servid_from_corrid(self.services,
-                                           prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         if message['request_status'] == 'COMPLETED':
             msg = ": Response from IA: Service termination succeeded."
@@ -1895,21 +2381,17 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         if self.services[serv_id]['service']['ssm']:
             corr_id = str(uuid.uuid4())
-            self.services[serv_id]['act_corr_id'] = corr_id
+            self.set_act_corr_id(serv_id, corr_id)
 
             LOG.info("Service " + serv_id + ": Setting kill flag for ssms.")
 
-            nsd = self.services[serv_id]['service']['nsd']
-
-            for ssm in nsd['service_specific_managers']:
-                if 'options' not in ssm.keys():
-                    ssm['options'] = []
-                ssm['options'].append({'key': 'termination', 'value': 'true'})
+            nsd = tools.with_termination_flag(self.services[serv_id]['service']['nsd'],
+                                              'service_specific_managers')
 
             msg = ": SSM part of NSD: " + str(nsd['service_specific_managers'])
             LOG.info("Service " + serv_id + msg)
 
-            payload = yaml.dump({'NSD': nsd, 'UUID': serv_id})
+            payload = codec.encode({'NSD': nsd, 'UUID': serv_id})
 
             if require_resp:
                 self.manoconn.call_async(self.ssm_termination_response,
@@ -1931,10 +2413,9 @@ class ServiceLifecycleManager(ManoBasePlugin):
         call.
         """
         # Get the serv_id of this service
-        serv_id = tools.servid_from_corrid(self.services,
-                                           prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
         LOG.info("Response from SMR: " + str(message))
 
         self.start_next_task(serv_id)
@@ -1949,24 +2430,18 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
                 # If the vnf has fsms, continue with this process.
                 corr_id = str(uuid.uuid4())
-                self.services[serv_id]['act_corr_id'] = corr_id
+                self.set_act_corr_id(serv_id, corr_id)
 
                 LOG.info("Service " + serv_id +
                          ": Setting termination flag for fsms.")
 
-                LOG.info(str(vnf['vnfd']))
-                for fsm in vnf['vnfd']['function_specific_managers']:
-                    if 'options' not in fsm.keys():
-                        fsm['options'] = []
-                    fsm['options'].append({'key': 'termination',
-                                          'value': 'true'})
-
-                vnfd = vnf['vnfd']
+                vnfd = tools.with_termination_flag(vnf['vnfd'],
+                                                   'function_specific_managers')
                 fsm_segment = str(vnfd['function_specific_managers'])
                 msg = ": FSM in VNFD: " + fsm_segment
                 LOG.info("Service " + serv_id + msg)
 
-                payload = yaml.dump({'VNFD': vnf['vnfd'], 'UUID': vnf['id']})
+                payload = codec.encode({'VNFD': vnfd, 'UUID': vnf['id']})
 
                 self.manoconn.call_async(self.no_resp_needed,
                                          t.FSM_TERM,
@@ -1977,10 +2452,9 @@ class ServiceLifecycleManager(ManoBasePlugin):
         This method handles a response from the SMR on the ssm termination
         call.
         """
-        serv_id = tools.servid_from_corrid(self.services,
-                                           prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
         LOG.info("Response from SMR: " + str(message))
 
         self.start_next_task(serv_id)
@@ -1996,135 +2470,57 @@ class ServiceLifecycleManager(ManoBasePlugin):
     def update_records_to_terminated(self, serv_id):
         """
         This method updates the records of the service and function instances
-        to reflect that they have been terminated.
+        to reflect that they have been terminated. The records are
+        independent, so they are written concurrently.
         """
 
-        error = None
+        def terminated(record, record_id):
+            # Updating the version number
+            record['version'] = str(int(record['version']) + 1)
+
+            # Updating the record
+            record['status'] = "terminated"
+            record['id'] = record_id
+            del record["uuid"]
+            del record["updated_at"]
+            del record["created_at"]
+            return record
 
         is_nsd = 'nsr' in self.services[serv_id]['service']
 
         record = self.services[serv_id]['service']['nsr' if is_nsd else 'cosr']
-
-        # Updating the version number
-        old_version = int(record['version'])
-        cur_version = old_version + 1
-        record['version'] = str(cur_version)
-
-        # Updating the record
-        record_id = serv_id
-        record['status'] = "terminated"
-        record['id'] = record_id
-        del record["uuid"]
-        del record["updated_at"]
-        del record["created_at"]
-
-        # Put it
-        url = t.NSR_REPOSITORY_URL + 'ns-instances/' + record_id if is_nsd else t.COSR_REPOSITORY_URL + 'cos-instances/' + record_id
-        header = {'Content-Type': 'application/json'}
-
-        LOG.info("Service " + serv_id + ": Record update: " + url)
-
-        try:
-            record_resp = requests.put(url,
-                                    data=json.dumps(record),
-                                    headers=header,
-                                    timeout=1.0)
-            record_resp_json = str(record_resp.json())
-
-            if (record_resp.status_code == 200):
-                msg = ": Record update accepted for " + record_id
-                LOG.info("Service " + serv_id + msg)
-            else:
-                msg = ": Record update not accepted: " + record_resp_json
-                LOG.info("Service " + serv_id + msg)
-                error = {'http_code': record_resp.status_code,
-                         'message': record_resp_json}
-        except:
-            error = {'http_code': '0',
-                     'message': 'Timeout when contacting NSR repo'}
+        if is_nsd:
+            url = t.NSR_REPOSITORY_URL + 'ns-instances/' + serv_id
+        else:
+            url = t.COSR_REPOSITORY_URL + 'cos-instances/' + serv_id
+        writes = [RecordWrite(serv_id, 'PUT', url, terminated(record, serv_id))]
 
         for vnf in self.services[serv_id]['function']:
-            vnfr = vnf["vnfr"]
             vnfr_id = vnf["id"]
-
-            # Updating version number
-            old_version = int(vnfr['version'])
-            cur_version = old_version + 1
-            vnfr['version'] = str(cur_version)
-
-            # Updating the record
-            vnfr['status'] = "terminated"
-            vnfr["id"] = vnfr_id
-            del vnfr["uuid"]
-            del vnfr["updated_at"]
-            del vnfr["created_at"]
-
-            # Put it
             url = t.VNFR_REPOSITORY_URL + 'vnf-instances/' + vnfr_id
-            header = {'Content-Type': 'application/json'}
-
-            LOG.info("Service " + serv_id + ": VNFR update: " + url)
-
-            try:
-                vnfr_resp = requests.put(url,
-                                         data=json.dumps(vnfr),
-                                         headers=header,
-                                         timeout=1.0)
-                vnfr_resp_json = str(vnfr_resp.json())
-
-                if (vnfr_resp.status_code == 200):
-                    msg = ": VNFR update accepted for " + vnfr_id
-                    LOG.info("Service " + serv_id + msg)
-                else:
-                    msg = ": VNFR update not accepted: " + vnfr_resp_json
-                    LOG.info("Service " + serv_id + msg)
-                    error = {'http_code': vnfr_resp.status_code,
-                             'message': vnfr_resp_json}
-            except:
-                error = {'http_code': '0',
-                         'message': 'Timeout when contacting VNFR repo'}
+            bulk_url = t.VNFR_REPOSITORY_URL + 'vnf-instances'
+            writes.append(RecordWrite(vnfr_id, 'PUT', url,
+                                      terminated(vnf["vnfr"], vnfr_id), bulk_url))
 
         for cloud_service in self.services[serv_id]['cloud_service']:
             csr = cloud_service["csr"]
             csr_id = csr["uuid"]
-
-            # Updating version number
-            old_version = int(csr['version'])
-            cur_version = old_version + 1
-            csr['version'] = str(cur_version)
-
-            # Updating the record
-            csr['status'] = "terminated"
-            csr['id'] = csr_id
-            del csr["uuid"]
-            del csr["updated_at"]
-            del csr["created_at"]
-
-            # Put it
             url = t.CSR_REPOSITORY_URL + 'cs-instances/' + csr_id
-            header = {'Content-Type': 'application/json'}
-
-            LOG.info("Service " + serv_id + ": CSR update: " + url)
-
-            try:
-                csr_resp = requests.put(url,
-                                         data=json.dumps(csr),
-                                         headers=header,
-                                         timeout=1.0)
-                csr_resp_json = str(csr_resp.json())
-
-                if (csr_resp.status_code == 200):
-                    msg = ": CSR update accepted for " + csr_id
-                    LOG.info("Service " + serv_id + msg)
-                else:
-                    msg = ": CSR update not accepted: " + csr_resp_json
-                    LOG.info("Service " + serv_id + msg)
-                    error = {'http_code': csr_resp.status_code,
-                             'message': csr_resp_json}
-            except:
-                error = {'http_code': '0',
-                         'message': 'Timeout when contacting VNFR repo'}
+            bulk_url = t.CSR_REPOSITORY_URL + 'cs-instances'
+            writes.append(RecordWrite(csr_id, 'PUT', url,
+                                      terminated(csr, csr_id), bulk_url))
+
+        LOG.info("Service " + serv_id + ": Updating " + str(len(writes)) + " records")
+        span = self.tracer.call_started(serv_id, self.services[serv_id],
+                                        target='repository')
+        results = self.repository.write_all(writes)
+        for write in writes:
+            if results[write.key] is None:
+                msg = ": Record update accepted for " + write.key
+                LOG.info("Service " + serv_id + msg)
 
+        error = first_error(results, writes)
+        end_span(span, 'ok' if error is None else 'error')
         if error is not None:
             self.error_handling(serv_id, t.GK_KILL, error)
 
@@ -2135,14 +2531,14 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         LOG.info("Service " + serv_id + ": WAN Configuration")
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         chain = {}
         chain["service_instance_id"] = serv_id
         try:
-            chain["cosd"] = self.services[serv_id]['service']['cosd']
+            chain["cosd"] = self.encoded(self.services[serv_id]['service']['cosd'])
         except:
-            chain["nsd"] = self.services[serv_id]['service']['nsd']
+            chain["nsd"] = self.encoded(self.services[serv_id]['service']['nsd'])
 
         vnfrs = []
         vnfds = []
@@ -2151,21 +2547,25 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         for function in self.services[serv_id]['function']:
             vnfrs.append(function['vnfr'])
-            vnfd = function['vnfd']
-            vnfd['instance_uuid'] = function['id']
-            vnfds.append(vnfd)
+            vnfd = self.encoded(function['vnfd'])
+            vnfds.append(vnfd.updated(instance_uuid=function['id']))
 
         for cloud_service in self.services[serv_id]['cloud_service']:
             csrs.append(cloud_service['csr'])
-            csd = cloud_service['csd']
-            csd['instance_uuid'] = cloud_service['id']
-            csds.append(csd)
+            csd = self.encoded(cloud_service['csd'])
+            csds.append(csd.updated(instance_uuid=cloud_service['id']))
 
         chain['vnfrs'] = vnfrs
         chain['vnfds'] = vnfds
         chain['csds'] = csds
         chain['csrs'] = csrs
 
+        # VIMs with the same order can be configured concurrently
+        stages = self.services[serv_id]['service'].get('vim_stages') or []
+        chain['vim_list'] = [{'uuid': vim, 'order': order}
+                             for order, stage in enumerate(stages)
+                             for vim in stage]
+
         #message = {}
         #message['service_instance_id'] = serv_id
 
@@ -2187,7 +2587,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         #    chain['nap']= message['nap']
 
         if chain:
-            self.manoconn.call_async(self.wan_configure_response, t.MANO_CHAIN_DPLOY, yaml.dump(chain),correlation_id=corr_id)
+            self.manoconn.call_async(self.wan_configure_response, t.MANO_CHAIN_DPLOY, codec.encode(chain),correlation_id=corr_id)
 
 
         # Create ordered vim_list
@@ -2200,7 +2600,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         self.manoconn.call_async(self.wan_configure_response,
                                  t.IA_CONF_WAN,
-                                 yaml.dump(message),
+                                 codec.encode(message),
                                  correlation_id=corr_id)"""
 
         # # Pause the chain of tasks to wait for response
@@ -2211,9 +2611,9 @@ class ServiceLifecycleManager(ManoBasePlugin):
         This method handles the IA response to the WAN request
         """
         # Get the serv_id of this service
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         LOG.info("Service " + serv_id + ": WAN configure request completed.")
 
@@ -2222,7 +2622,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
             LOG.info('Error occured during WAN: ' + str(error))
             self.error_handling(serv_id, t.GK_CREATE, error)
 
-        self.start_next_task(serv_id)
+        self.start_next_task(serv_id, 'wan_configure')
 
     def wan_deconfigure(self, serv_id):
         """
@@ -2231,14 +2631,14 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         LOG.info("Service " + serv_id + ": WAN Deonfiguration")
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
         message = {}
         message['service_instance_id'] = serv_id
 
         self.manoconn.call_async(self.wan_deconfigure_response,
                                  t.IA_DECONF_WAN,
-                                 yaml.dump(message),
+                                 codec.encode(message),
                                  correlation_id=corr_id)
 
         self.services[serv_id]['pause_chain'] = True
@@ -2249,9 +2649,9 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
 
         # Get the serv_id of this service
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
 
-        message = yaml.load(payload)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
 
         LOG.info("Service " + serv_id + ": WAN deconfigure request completed.")
 
@@ -2273,10 +2673,13 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         error = None
         # try:
+        span = self.tracer.call_started(serv_id, self.services[serv_id],
+                                        target='monitoring')
         header = {'Content-Type': 'application/json'}
         mon_resp = requests.delete(url,
                                    headers=header,
                                    timeout=10.0)
+        end_span(span, 'ok' if mon_resp.status_code == 204 else 'error')
         msg = ": response from monitoring manager: " + str(mon_resp)
         LOG.info("Service " + serv_id + msg)
 
@@ -2313,16 +2716,16 @@ class ServiceLifecycleManager(ManoBasePlugin):
         if 'monitor' in self.services[serv_id]['service']['ssm'].keys():
             LOG.info("Service " + serv_id + ": Sending descriptors to Mon SSM")
             message = {}
-            message['nsd' if is_nsd else 'cosd'] = self.services[serv_id]['service']['nsd' if is_nsd else 'cosd']
+            message['nsd' if is_nsd else 'cosd'] = self.encoded(self.services[serv_id]['service']['nsd' if is_nsd else 'cosd'])
             message['nsr' if is_nsd else 'cosr'] = self.services[serv_id]['service']['nsr' if is_nsd else 'cosr']
             vnfs = []
             for vnf in self.services[serv_id]['function']:
-                vnfs.append({'vnfd': vnf['vnfd'],
+                vnfs.append({'vnfd': self.encoded(vnf['vnfd']),
                              'id': vnf['id'],
                              'vnfr': vnf['vnfr']})
             css = []
             for cs in self.services[serv_id]['cloud_service']:
-                css.append({'csd': cs['csd'],
+                css.append({'csd': self.encoded(cs['csd']),
                              'id': cs['id'],
                              'csr': cs['csr']})
             message['css'] = css
@@ -2332,7 +2735,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
             ssm_conn = self.ssm_connections[serv_id]
 
-            ssm_conn.notify(topic, yaml.dump(message))
+            ssm_conn.notify(topic, codec.encode(message))
 
             # subscribe to messages from the monitoring SSM
             topic = t.FROM_MON_SSM + serv_id
@@ -2346,9 +2749,11 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         mon_mess = tools.build_monitoring_message(service, functions, cloud_services, userdata)
 
-        LOG.debug("Monitoring message created: " + yaml.dump(mon_mess))
+        LOG.debug("Monitoring message created: %s", mon_mess)
 
         error = None
+        span = self.tracer.call_started(serv_id, self.services[serv_id],
+                                        target='monitoring')
         try:
             header = {'Content-Type': 'application/json'}
             mon_resp = requests.post(t.MONITORING_URL + 'service/new',
@@ -2371,6 +2776,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
             LOG.info("Service " + serv_id + ": timeout on monitoring server.")
             error = {'http_code': '0',
                      'message': 'Timeout when contacting server'}
+        end_span(span, 'ok' if error is None else 'error')
 
         # If an error occured, the workflow is aborted and the GK is informed
         if error is not None:
@@ -2408,7 +2814,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         orig_corr_id = self.services[serv_id]['original_corr_id']
         self.manoconn.notify(t.GK_CREATE,
-                             yaml.dump(message),
+                             codec.encode(message),
                              correlation_id=orig_corr_id)
 
     def inform_gk(self, serv_id):
@@ -2429,7 +2835,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         orig_corr_id = self.services[serv_id]['original_corr_id']
         self.manoconn.notify(topic,
-                             yaml.dump(message),
+                             codec.encode(message),
                              correlation_id=orig_corr_id)
 
 
@@ -2446,18 +2852,19 @@ class ServiceLifecycleManager(ManoBasePlugin):
         :param corr_id: the correlation id of the received message
         """
 
-        # Generate an istance uuid for the service
-        serv_id = str(uuid.uuid4())
+        # Generate an istance uuid for the service, the same on every SLM
+        serv_id = instance_uuid(corr_id)
 
-        descriptor = payload['NSD'] if 'NSD' in payload else payload['COSD']
+        # Services of the same descriptors share them in the ledger
+        descriptor = self.descriptor_cache.intern(payload['NSD'] if 'NSD' in payload else payload['COSD'])
 
         # Add the service to the ledger and add instance ids
-        self.services[serv_id] = {}
+        self.services[serv_id] = ServiceRecord()
         self.services[serv_id]['service'] = {}
         if 'NSD' in payload:
-            self.services[serv_id]['service']['nsd'] = payload['NSD']
+            self.services[serv_id]['service']['nsd'] = descriptor
         else:
-            self.services[serv_id]['service']['cosd'] = payload['COSD']
+            self.services[serv_id]['service']['cosd'] = descriptor
         self.services[serv_id]['service']['id'] = serv_id
 
         msg = ": NSD uuid is " + str(descriptor['uuid'])
@@ -2470,7 +2877,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
                 vnf_id = str(uuid.uuid4())
                 msg = "VNFD instance id generated: " + vnf_id
                 LOG.info("Service " + serv_id + msg)
-                vnfd = payload[key]
+                vnfd = self.descriptor_cache.intern(payload[key])
                 vnf_base_dict = {'start': {'trigger': True, 'payload': {}},
                                  'stop': {'trigger': True, 'payload': {}},
                                  'configure': {'trigger': True, 'payload': {}},
@@ -2482,7 +2889,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
                 cs_id = str(uuid.uuid4())
                 msg = "CSD instance id generated: " + cs_id
                 LOG.info("Service " + serv_id + msg)
-                csd = payload[key]
+                csd = self.descriptor_cache.intern(payload[key])
                 cs_base_dict = {'start': {'trigger': True, 'payload': {}},
                                  'stop': {'trigger': True, 'payload': {}},
                                  'configure': {'trigger': True, 'payload': {}},
@@ -2494,7 +2901,7 @@ class ServiceLifecycleManager(ManoBasePlugin):
         # Add to correlation id to the ledger
         self.services[serv_id]['original_corr_id'] = corr_id
 
-        # Add payload to the ledger
+        # Add payload to the ledger, until it is validated
         self.services[serv_id]['payload'] = payload
 
         self.services[serv_id]['infrastructure'] = {}
@@ -2565,16 +2972,12 @@ class ServiceLifecycleManager(ManoBasePlugin):
             LOG.info("Retrieving of record failed: " + code + " " + mess)
             # TODO: get out of this
 
-        # Update the token of the SLM
-        if self.token is None:
+        # Make sure the SLM has a token, it is normally already cached
+        if self.token_manager.get_token() is None:
             self.register_slm_with_gk()
 
-        token = tools.client_login(t.GK_LOGIN, self.clientId, self.password)
-        self.token = token
-        LOG.info("Service " + serv_id + ": new token: " + str(self.token))
-
         # base of the ledger
-        self.services[serv_id] = {}
+        self.services[serv_id] = ServiceRecord()
         self.services[serv_id]['original_corr_id'] = corr_id
         self.services[serv_id]['service'] = {}
 
@@ -2597,88 +3000,108 @@ class ServiceLifecycleManager(ManoBasePlugin):
         self.services[serv_id]['service']['nsr' if is_ns else 'cosr'] = request['content']
         LOG.info("Service " + serv_id + ": Recreating ledger: Record retrieved.")
 
-        # Retrieve the NSD
+        # Retrieve the descriptor and all function and cloud service records
+        # and descriptors at the same time
         record = self.services[serv_id]['service']['nsr' if is_ns else 'cosr']
         descriptor_uuid = record['descriptor_reference']
 
+        def fetch_descriptor(base, descriptor_uuid, key):
+            # The token is refreshed once if the GK rejects it
+            def fetch(token):
+                return tools.getDescriptor(self.descriptor_cache,
+                                           base,
+                                           descriptor_uuid,
+                                           key,
+                                           token=token)
+            return self.token_manager.call(fetch)
+
         url = t.GK_SERVICES if is_ns else t.GK_COMPLEX_SERVICES
-        request = tools.getRestData(url, descriptor_uuid, token=self.token)
+        descr_req = self.fetch_pool.submit(fetch_descriptor,
+                                           url,
+                                           descriptor_uuid,
+                                           'nsd' if is_ns else 'cosd')
 
+        def fetch_instance(record_base, record_id, descr_base, key):
+            request = tools.getRestData(record_base, record_id)
+            if request['error'] is not None:
+                return request, None
+            descriptor_uuid = request['content']['descriptor_reference']
+            req = fetch_descriptor(descr_base, descriptor_uuid, key)
+            return request, req
+
+        vnf_reqs = []
+        for vnf in record['network_functions']:
+            vnf_reqs.append(self.fetch_pool.submit(fetch_instance,
+                                                   t.VNFR_REPOSITORY_URL + "vnf-instances/",
+                                                   vnf['vnfr_id'],
+                                                   t.GK_FUNCTIONS,
+                                                   'vnfd'))
+
+        cs_reqs = []
+        for cloud_service in record.get('cloud_services') or []:
+            cs_reqs.append(self.fetch_pool.submit(fetch_instance,
+                                                  t.CSR_REPOSITORY_URL + "cs-instances/",
+                                                  cloud_service['csr_id'],
+                                                  t.GK_CLOUD_SERVICES,
+                                                  'csd'))
+
+        request = descr_req.result()
         if request['error'] is not None:
             request_returned_with_error(request)
             return
 
-        self.services[serv_id]['service']['nsd' if is_ns else 'cosd'] = request['content']['nsd' if is_ns else 'cosd']
+        self.services[serv_id]['service']['nsd' if is_ns else 'cosd'] = request['content']
         LOG.info("Service " + serv_id + ": Recreating ledger: Descriptor retrieved.")
 
-        # Retrieve the function records based on the service record
+        # Add the functions based on the service record
         self.services[serv_id]['function'] = []
         self.services[serv_id]['cloud_service'] = []
-        record = self.services[serv_id]['service']['nsr' if is_ns else 'cosr']
-        for vnf in record['network_functions']:
-            base = t.VNFR_REPOSITORY_URL + "vnf-instances/"
-            request = tools.getRestData(base, vnf['vnfr_id'])
+        for vnf, vnf_req in zip(record['network_functions'], vnf_reqs):
+            request, req = vnf_req.result()
 
             if request['error'] is not None:
                 request_returned_with_error(request)
                 return
 
+            if req['error'] is not None:
+                request_returned_with_error(req)
+                return
+
             new_function = {'id': vnf['vnfr_id'],
                             'start': {'trigger': True, 'payload': {}},
                             'stop': {'trigger': True, 'payload': {}},
                             'configure': {'trigger': True, 'payload': {}},
                             'scale': {'trigger': True, 'payload': {}},
-                            'vnfr': request['content']}
+                            'vnfr': request['content'],
+                            'vnfd': req['content']}
 
             self.services[serv_id]['function'].append(new_function)
-            msg = ": Recreating ledger: VNFR retrieved."
+            msg = ": Recreating ledger: VNFR and VNFD retrieved."
             LOG.info("Service " + serv_id + msg)
 
-        # Retrieve the VNFDS based on the function records
-        for vnf in self.services[serv_id]['function']:
-            vnfd_id = vnf['vnfr']['descriptor_reference']
-
-            req = tools.getRestData(t.GK_FUNCTIONS, vnfd_id, token=self.token)
+        # Add the cloud services based on the service record
+        for cloud_service, cs_req in zip(record.get('cloud_services') or [], cs_reqs):
+            request, req = cs_req.result()
 
-            if req['error'] is not None:
-                request_returned_with_error(req)
+            if request['error'] is not None:
+                request_returned_with_error(request)
                 return
 
-            vnf['vnfd'] = req['content']['vnfd']
-            LOG.info("Service " + serv_id + ": Recreate: VNFD retrieved.")
-
-        if 'cloud_services' in record:
-            for cloud_service in record['cloud_services']:
-                base = t.CSR_REPOSITORY_URL + "cs-instances/"
-                request = tools.getRestData(base, cloud_service['csr_id'])
-
-                if request['error'] is not None:
-                    request_returned_with_error(request)
-                    return
-
-                new_cloud_service = {'id': cloud_service['csr_id'],
-                                'start': {'trigger': True, 'payload': {}},
-                                'stop': {'trigger': True, 'payload': {}},
-                                'configure': {'trigger': True, 'payload': {}},
-                                'scale': {'trigger': True, 'payload': {}},
-                                'csr': request['content']}
-
-                self.services[serv_id]['cloud_service'].append(new_cloud_service)
-                msg = ": Recreating ledger: CSR retrieved."
-                LOG.info("Service " + serv_id + msg)
-
-        # Retrieve the CSDs based on the cloud service records
-        for cloud_service in self.services[serv_id]['cloud_service']:
-            csd_id = cloud_service['csr']['descriptor_reference']
-
-            req = tools.getRestData(t.GK_CLOUD_SERVICES, csd_id, token=self.token)
-
             if req['error'] is not None:
                 request_returned_with_error(req)
                 return
 
-            cloud_service['csd'] = req['content']['csd']
-            LOG.info("Service " + serv_id + ": Recreate: CSD retrieved.")
+            new_cloud_service = {'id': cloud_service['csr_id'],
+                            'start': {'trigger': True, 'payload': {}},
+                            'stop': {'trigger': True, 'payload': {}},
+                            'configure': {'trigger': True, 'payload': {}},
+                            'scale': {'trigger': True, 'payload': {}},
+                            'csr': request['content'],
+                            'csd': req['content']}
+
+            self.services[serv_id]['cloud_service'].append(new_cloud_service)
+            msg = ": Recreating ledger: CSR and CSD retrieved."
+            LOG.info("Service " + serv_id + msg)
 
         LOG.info("Service " +
                  serv_id + ": Recreating ledger: VNFDs and CSDs retrieved.")
@@ -2721,7 +3144,9 @@ class ServiceLifecycleManager(ManoBasePlugin):
 
         :param serv_id: the instance id of the service
         """
-        payload = self.services[serv_id]['payload']
+        # The descriptors are in the ledger, the raw request isn't needed
+        # once it is validated
+        payload = self.services[serv_id].pop('payload', None)
         corr_id = self.services[serv_id]['original_corr_id']
 
         # TODO: check whether correlation_id is already being used.
@@ -2816,30 +3241,56 @@ class ServiceLifecycleManager(ManoBasePlugin):
         """
         This method is used if the SLM is responsible for the placement.
 
+        :param serv_id: The instance uuid of the service
+        """
+        LOG.info("Service " + serv_id + ": Calculating the placement")
+        self.services[serv_id]['placement_attempts'] = 0
+        self.send_mapping_request(serv_id)
+
+        self.services[serv_id]['pause_chain'] = True
+
+    def send_mapping_request(self, serv_id):
+        """
+        This method requests the placement of a service from the placement
+        plugin, on the topology in the ledger.
+
         :param serv_id: The instance uuid of the service
         """
         corr_id = str(uuid.uuid4())
-        self.services[serv_id]['act_corr_id'] = corr_id
+        self.set_act_corr_id(serv_id, corr_id)
 
-        LOG.info("Service " + serv_id + ": Calculating the placement")
-        topology = self.services[serv_id]['infrastructure']['topology']
+        content = self.placement_content(serv_id)
+        content['topology'] = self.services[serv_id]['infrastructure']['topology']
+
+        self.manoconn.call_async(self.resp_mapping,
+                                 t.MANO_PLACE,
+                                 codec.encode(content),
+                                 correlation_id=corr_id)
+
+        LOG.info("Service " + serv_id + ": Placement request sent")
+
+    def placement_content(self, serv_id):
+        """
+        This method builds the part of a placement request that describes
+        the service, without the topology.
+
+        :param serv_id: The instance uuid of the service
+        """
         if 'nsd' in self.services[serv_id]['service']:
-            NSD = self.services[serv_id]['service']['nsd']
-            functions = self.services[serv_id]['function']
+            NSD = self.encoded(self.services[serv_id]['service']['nsd'])
+            functions = self.encoded_instances(self.services[serv_id]['function'], 'vnfd')
 
             content = {'nsd': NSD,
                        'functions': functions,
-                       'topology': topology,
                        'serv_id': serv_id}
         else:
-            COSD = self.services[serv_id]['service']['cosd']
-            functions = self.services[serv_id]['function']
-            cloud_services = self.services[serv_id]['cloud_service']
+            COSD = self.encoded(self.services[serv_id]['service']['cosd'])
+            functions = self.encoded_instances(self.services[serv_id]['function'], 'vnfd')
+            cloud_services = self.encoded_instances(self.services[serv_id]['cloud_service'], 'csd')
 
             content = {'cosd': COSD,
                        'functions': functions,
                        'cloud_services': cloud_services,
-                       'topology': topology,
                        'serv_id': serv_id}
 
         content['nap'] = {}
@@ -2849,24 +3300,83 @@ class ServiceLifecycleManager(ManoBasePlugin):
         if self.services[serv_id]['egress'] is not None:
             content['nap']['egresses'] = self.services[serv_id]['egress']
 
-        self.manoconn.call_async(self.resp_mapping,
-                                 t.MANO_PLACE,
-                                 yaml.dump(content),
-                                 correlation_id=corr_id)
-
-        self.services[serv_id]['pause_chain'] = True
-        LOG.info("Service " + serv_id + ": Placement request sent")
+        return content
 
     def resp_mapping(self, ch, method, prop, payload):
         """
         This method handles the response on a mapping request
         """
-        content = yaml.load(payload)
+        content = codec.decode(payload, getattr(prop, 'content_type', None))
         mapping = content["mapping"]
 
-        serv_id = tools.servid_from_corrid(self.services, prop.correlation_id)
+        serv_id = self.servid_from_corrid(prop.correlation_id)
         LOG.info("Service " + serv_id + ": Placement response received")
 
+        if mapping is not None and not self.reserve_mapping(serv_id, mapping):
+            # The placement was calculated on a topology that is outdated
+            # by the placements of other services
+            ledger = self.services[serv_id]
+            ledger['placement_attempts'] = ledger.get('placement_attempts', 0) + 1
+            if ledger['placement_attempts'] <= self.placement_retries:
+                LOG.info("Service " + serv_id + ": Placement conflicts, retrying")
+                self.retry_mapping(serv_id)
+                return
+            mapping = None
+
+        if self.apply_mapping(serv_id, mapping):
+            self.start_next_task(serv_id)
+
+    def retry_mapping(self, serv_id):
+        """
+        This method requests the placement of a service again, on a fresh
+        topology.
+
+        :param serv_id: The instance uuid of the service
+        """
+        corr_id = str(uuid.uuid4())
+        self.set_act_corr_id(serv_id, corr_id)
+        self.topology_requests[corr_id] = time.time()
+
+        self.manoconn.call_async(self.resp_retry_topo,
+                                 t.IA_TOPO,
+                                 None,
+                                 correlation_id=corr_id)
+
+    def resp_retry_topo(self, ch, method, prop, payload):
+        """
+        This method handles the fresh topology of a placement retry.
+        """
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
+        serv_id = self.servid_from_corrid(prop.correlation_id)
+
+        topology = self.update_topology(prop.correlation_id, message)
+        self.services[serv_id]['infrastructure']['topology'] = topology
+        self.send_mapping_request(serv_id)
+
+    def reserve_mapping(self, serv_id, mapping, force=False):
+        """
+        This method reserves the resources of a placement in the topology
+        cache.
+
+        :param serv_id: The instance uuid of the service
+        :param mapping: the placement
+        :param force: reserve even if the resources are not available
+        :return: False if the resources are taken by another placement
+        """
+        ledger = self.services[serv_id]
+        usage = service_usage(ledger['function'],
+                              ledger.get('cloud_service') or [],
+                              mapping)
+        return self.topology.reserve(serv_id, usage, force)
+
+    def apply_mapping(self, serv_id, mapping):
+        """
+        This method adds a placement to the ledger.
+
+        :param serv_id: The instance uuid of the service
+        :param mapping: the placement, None if placement was not possible
+        :return: True if the placement is usable
+        """
         if mapping is None:
             # The GK should be informed that the placement failed and the
             # deployment was aborted.
@@ -2875,95 +3385,249 @@ class ServiceLifecycleManager(ManoBasePlugin):
                                 t.GK_CREATE,
                                 'Unable to perform placement.')
 
+            return False
+
+        # Add mapping to ledger
+        LOG.info("Service " + serv_id + ": Placement completed")
+        LOG.debug("Calculated SLM placement: " + str(mapping))
+        self.services[serv_id]['service']['mapping'] = mapping
+        for function in self.services[serv_id]['function']:
+            vnf_id = function['id']
+            function['vim_uuid'] = mapping[vnf_id]['vim']
+        for cloud_service in self.services[serv_id]['cloud_service']:
+            cs_id = cloud_service['id']
+            cloud_service['vim_uuid'] = mapping[cs_id]['vim']
+
+        self.order_vims(serv_id, 'improve Placement Plugin')
+        return True
+
+    def order_vims(self, serv_id, hint):
+        """
+        This method orders the VIMs of a placed service along its
+        forwarding paths. If the paths loop between VIMs, the VIMs on the
+        loop are ordered as well, but not along all paths.
+
+        :param serv_id: The instance uuid of the service
+        :param hint: added to the warning if the placement contains a loop
+        """
+        try:
+            stages = tools.get_vim_stages(self.services[serv_id])
+        except CycleError as e:
+            LOG.warning("Service " + serv_id + ": " + str(e) + ', ' + hint)
+            stages = tools.get_vim_stages(self.services[serv_id], break_loops=True)
+
+        LOG.info("Service " + serv_id + ": VIM list ordered in " +
+                 str(len(stages)) + " stages")
+        self.services[serv_id]['service']['vim_stages'] = stages
+        self.services[serv_id]['service']['ordered_vim_list'] = [vim for stage in stages
+                                                                 for vim in stage]
+
+    def join_batch(self, serv_id):
+        """
+        This method makes a service of a bulk request wait for the topology
+        and the placement of its batch. The last service to join starts them.
+
+        :param serv_id: The instance uuid of the service
+        """
+        batch = self.batches[serv_id]
+
+        # Pause the chain of tasks until the batch is placed
+        self.services[serv_id]['pause_chain'] = True
+        LOG.info("Service " + serv_id + ": Joined batch " + str(batch.id))
+
+        with batch.lock:
+            start = batch.join(serv_id)
+        if start:
+            self.batch_request_topology(batch)
+
+    def leave_batch(self, serv_id):
+        """
+        This method removes a service that is no longer handled from its
+        batch, so that the other services don't wait for it.
+        """
+        with self.batches_lock:
+            batch = self.batches.pop(serv_id, None)
+        if batch is None:
             return
 
-        else:
-            # Add mapping to ledger
-            LOG.info("Service " + serv_id + ": Placement completed")
-            LOG.debug("Calculated SLM placement: " + str(mapping))
-            self.services[serv_id]['service']['mapping'] = mapping
-            for function in self.services[serv_id]['function']:
-                vnf_id = function['id']
-                function['vim_uuid'] = mapping[vnf_id]['vim']
-            for cloud_service in self.services[serv_id]['cloud_service']:
-                cs_id = cloud_service['id']
-                cloud_service['vim_uuid'] = mapping[cs_id]['vim']
+        with batch.lock:
+            start, release = batch.leave(serv_id)
+        if start:
+            self.batch_request_topology(batch)
+        self.release_batch_members(release)
 
-        # Check if the placement does not contain any loops
-        vim_list = tools.get_ordered_vim_list(self.services[serv_id])
+    def release_batch_members(self, serv_ids):
+        """
+        This method resumes the workflows of services that wait for their
+        batch.
+        """
+        for serv_id in serv_ids:
+            self.start_next_task(serv_id, 'join_batch')
 
-        if vim_list is None:
-            msg = 'Placement contains loop, improve Placement Plugin'
-            # the placement contains loops
-            self.error_handling(serv_id,
-                                t.GK_CREATE,
-                                msg)
+    def batch_request_topology(self, batch):
+        """
+        This method requests one topology snapshot for all services of a
+        batch from the Infrastructure Adaptor.
+        """
+        topology = self.topology.snapshot()
+        if topology is not None:
+            LOG.info("Batch " + str(batch.id) + ": Topology taken from cache.")
+            self.refresh_topology()
+            self.batch_request_placement(batch, topology)
+            return
+
+        corr_id = str(uuid.uuid4())
+        with self.batches_lock:
+            self.batch_requests[corr_id] = batch
+        self.topology_requests[corr_id] = time.time()
+
+        self.manoconn.call_async(self.batch_resp_topo,
+                                 t.IA_TOPO,
+                                 None,
+                                 correlation_id=corr_id)
+
+        LOG.info("Batch " + str(batch.id) + ": Topology requested from IA.")
 
+    def batch_resp_topo(self, ch, method, prop, payload):
+        """
+        This method handles the topology of a batch and requests the
+        placement of all its services in one request.
+        """
+        with self.batches_lock:
+            batch = self.batch_requests.pop(prop.correlation_id, None)
+        if batch is None:
             return
-        else:
-            LOG.info("Service " + serv_id + ": VIM list ordered")
-            self.services[serv_id]['service']['ordered_vim_list'] = vim_list
 
-        self.start_next_task(serv_id)
+        message = codec.decode(payload, getattr(prop, 'content_type', None))
+        LOG.info("Batch " + str(batch.id) + ": Topology received from IA.")
+
+        topology = self.update_topology(prop.correlation_id, message)
+        self.batch_request_placement(batch, topology)
+
+    def batch_request_placement(self, batch, topology):
+        """
+        This method requests the placement of all services of a batch in
+        one request.
+        """
+        with batch.lock:
+            members = batch.active()
+
+        content = {'services': [],
+                   'topology': topology,
+                   'batch_id': batch.id}
+
+        for serv_id in members:
+            if serv_id not in self.services:
+                continue
+            # All services share the same snapshot
+            self.services[serv_id]['infrastructure']['topology'] = topology
+            content['services'].append(self.placement_content(serv_id))
+
+        corr_id = str(uuid.uuid4())
+        with self.batches_lock:
+            self.batch_requests[corr_id] = batch
+
+        self.manoconn.call_async(self.batch_resp_mapping,
+                                 t.MANO_PLACE,
+                                 codec.encode(content),
+                                 correlation_id=corr_id)
 
-    def update_slm_configuration(self, plugin_dict):
+        msg = ": Placement request sent for " + str(len(content['services']))
+        LOG.info("Batch " + str(batch.id) + msg + " services")
+
+    def batch_resp_mapping(self, ch, method, prop, payload):
+        """
+        This method handles the placement of a batch. The services that
+        bring images to a VIM prepare the infrastructure first, the other
+        services follow once these images are prepared.
+        """
+        with self.batches_lock:
+            batch = self.batch_requests.pop(prop.correlation_id, None)
+        if batch is None:
+            return
+
+        content = codec.decode(payload, getattr(prop, 'content_type', None))
+        mappings = content.get('mappings') or {}
+        LOG.info("Batch " + str(batch.id) + ": Placement response received")
+
+        with batch.lock:
+            members = batch.active()
+
+        images = {}
+        failed = []
+        for serv_id in members:
+            if serv_id not in self.services:
+                continue
+            mapping = mappings.get(serv_id)
+            if mapping is not None and not self.reserve_mapping(serv_id, mapping):
+                # The batch is placed together, a member that conflicts
+                # with another placement fails on its own
+                mapping = None
+            if self.apply_mapping(serv_id, mapping):
+                vim_list = self.prepare_message(serv_id)['vim_list']
+                images[serv_id] = set((vim['uuid'], image['image_uuid'])
+                                      for vim in vim_list
+                                      for image in vim['vm_images'])
+            else:
+                failed.append(serv_id)
+
+        with batch.lock:
+            release = batch.assign(images)
+
+        # The failed services are resumed to end their workflow
+        self.release_batch_members(failed + release)
+
+    def batch_prepared(self, serv_id):
+        """
+        This method releases the followers of a batch once the services
+        that prepare their images are prepared.
+        """
+        batch = self.batches.get(serv_id)
+        if batch is None:
+            return
+
+        with batch.lock:
+            release = batch.prepared(serv_id)
+        self.release_batch_members(release)
+
+    def update_slm_configuration(self, added, removed):
         """
         This method checks if an SLM was added or removed from the
         pool of SLMs. If it was, this method updates the configuration
         of the SLM.
 
-        :param plugin_dict: Dictionary of plugins registered in plugin manager
+        :param added: Dictionary of plugins that registered since the last update
+        :param removed: List of plugin uuids that were removed since the last
+                        update, because they deregistered or because the
+                        plugin manager stopped receiving their heartbeats
         """
 
-        active_slms = []
-
-        # Substract information on the different SLMs from the dict
-        for plugin_uuid in plugin_dict.keys():
-            if plugin_dict[plugin_uuid]['name'] == self.name:
-                active_slms.append(plugin_uuid)
+        # Substract information on the different SLMs from the delta
+        new_slms = [plugin_uuid for plugin_uuid in added.keys()
+                    if added[plugin_uuid]['name'] == self.name and
+                    plugin_uuid not in self.known_slms]
+        gone_slms = [plugin_uuid for plugin_uuid in removed
+                     if plugin_uuid in self.known_slms]
 
-        # Check if the list of active SLMs is identical to the known list
-        active_slms.sort()
-#        print('########')
-#        print(active_slms)
-#        print(self.known_slms)
-        if active_slms == self.known_slms:
+        if not new_slms and not gone_slms:
             # No action te be taken
             return
         else:
-            if self.uuid is None:
-                for slm_uuid in active_slms:
-                    if slm_uuid not in self.known_slms:
-                        self.uuid = slm_uuid
-            self.slm_config['old_slm_rank'] = self.slm_config['slm_rank']
-            self.slm_config['old_slm_total'] = self.slm_config['slm_total']
-            self.slm_config['slm_rank'] = active_slms.index(str(self.uuid))
-            self.slm_config['slm_total'] = len(active_slms)
-            down = False
-            if len(active_slms) < len(self.known_slms):
-                down = True
-
-            self.known_slms = active_slms
-            # Buffer incoming requests
-#            self.bufferAllRequests = True
-            # Wait some time to allow different SLMs to get on the same pages
-#            time.sleep(self.deltaTnew)
-            # Start handling the buffered requests in the new regime
-#            self.bufferOldRequests = True
-#            self.bufferAllRequests = False
-
-#            for req in self.new_reqs:
-#                task = self.thrd_pool.submit(req['mthd'], req['arguments'])
-
-#            time.sleep(self.deltaTold)
-            # Start handling the buffered requests from the old regime
-#            self.bufferOldRequests = False
-
-#            for req in self.old_reqs:
-#                task = self.thrd_pool.submit(req['mthd'], req['arguments'])
-
-            if down:
-                self.slm_down()
+            if self.uuid is None and new_slms:
+                self.uuid = new_slms[-1]
+
+            # Keep the list of known SLMs sorted
+            for slm_uuid in new_slms:
+                bisect.insort(self.known_slms, slm_uuid)
+            for slm_uuid in gone_slms:
+                self.known_slms.remove(slm_uuid)
+
+            # New requests are divided among the known SLMs, services
+            # that are being handled stay with their SLM
+            self.ring.set_members(self.known_slms)
+            # Resume the services of the SLMs that are gone
+            if gone_slms:
+                self.thrd_pool.submit(self.take_over, gone_slms)
 
     def roll_back_instantiation(self, serv_id):
         """
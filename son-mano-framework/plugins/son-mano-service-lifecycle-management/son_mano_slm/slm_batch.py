@@ -0,0 +1,148 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Bulk instantiation requests of the SLM are run as one batch. Every service
+of the batch runs its own workflow, but instead of requesting a topology
+and a placement of its own, it joins the batch. Once all services have
+joined, the batch requests one topology snapshot and one placement for
+all of them.
+
+The IA prepare calls are batched per VIM: an image that several services
+of the batch need on the same VIM is only included in the prepare call of
+the first of them (a leader). The prepare calls of the other services (the
+followers) are sent without these images, after those of the leaders
+completed.
+"""
+
+import threading
+
+JOINING = 'joining'
+PLACING = 'placing'
+PREPARING = 'preparing'
+DONE = 'done'
+
+
+class Batch(object):
+    """
+    The services of one bulk instantiation request.
+    """
+
+    def __init__(self, batch_id):
+        self.id = batch_id
+        self.members = []
+        self.joined = set()
+        self.left = set()
+        self.leaders = []
+        self.followers = []
+        self.state = JOINING
+        # leaders whose prepare call is outstanding
+        self._pending = set()
+        self._failed = False
+        self.lock = threading.Lock()
+
+    def add(self, serv_id):
+        self.members.append(serv_id)
+
+    def active(self):
+        """
+        :return: the members that are still handled, in order
+        """
+        return [serv_id for serv_id in self.members if serv_id not in self.left]
+
+    def join(self, serv_id):
+        """
+        A member is ready for the placement.
+
+        :return: True if the placement of the batch can start
+        """
+        self.joined.add(serv_id)
+        return self._start_placement()
+
+    def leave(self, serv_id):
+        """
+        A member is no longer handled, e.g. because its workflow failed.
+
+        :return: (True if the placement of the batch can start,
+                  followers that can prepare now)
+        """
+        self.left.add(serv_id)
+        return self._start_placement(), self.prepared(serv_id, ok=False)
+
+    def _start_placement(self):
+        active = self.active()
+        if self.state == JOINING and active and self.joined.issuperset(active):
+            self.state = PLACING
+            return True
+        return False
+
+    def assign(self, images):
+        """
+        Split the placed members in leaders and followers.
+
+        :param images: dict with the set of (vim uuid, image uuid) pairs
+                       that each placed member needs
+        :return: the members that can prepare now
+        """
+        covered = set()
+        self.leaders = []
+        self.followers = []
+        for serv_id in self.active():
+            if serv_id not in images:
+                continue
+            if images[serv_id] - covered:
+                self.leaders.append(serv_id)
+                covered |= images[serv_id]
+            else:
+                self.followers.append(serv_id)
+
+        self.state = PREPARING
+        self._pending = set(self.leaders)
+        if not self._pending:
+            self.state = DONE
+            return list(self.followers)
+        return list(self.leaders)
+
+    def strip_images(self, serv_id):
+        """
+        :return: True if the images of a member are prepared by the leaders
+        """
+        return serv_id in self.followers and not self._failed
+
+    def prepared(self, serv_id, ok=True):
+        """
+        The prepare call of a member completed.
+
+        :param ok: False if it failed
+        :return: followers that can prepare now
+        """
+        if serv_id not in self._pending:
+            return []
+        self._pending.discard(serv_id)
+        if not ok:
+            # The followers can't rely on the images of the leaders
+            self._failed = True
+        if self._pending or self.state != PREPARING:
+            return []
+        self.state = DONE
+        return [serv_id for serv_id in self.followers if serv_id not in self.left]
@@ -26,8 +26,140 @@ import uuid
 import yaml
 import json
 import base64
+import os
+import threading
+from collections import OrderedDict
 from Crypto.PublicKey import RSA
 
+from sonmanobase import codec
+
+try:
+    from son_mano_slm.slm_order import vim_stages
+except:
+    from slm_order import vim_stages
+
+# Number of descriptors kept by a DescriptorCache
+DESCRIPTOR_CACHE_SIZE = int(os.environ.get("slm_descriptor_cache_size", 512))
+# Number of pooled connections per host of the shared HTTP session
+HTTP_POOL_SIZE = int(os.environ.get("slm_http_pool_size", 20))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    This method returns the HTTP session shared by the REST calls of the
+    SLM, so that connections to the repositories and the GK are reused.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE,
+                                                    pool_maxsize=HTTP_POOL_SIZE)
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+class DescriptorCache(object):
+    """
+    LRU cache of descriptors by uuid. Descriptors can't change once they
+    are onboarded, so they never have to be fetched twice. The ledger
+    shares the cached descriptors, so they must not be changed: use
+    encoded(descriptor).updated() to add instance specific fields to a
+    message. The serialized form of a descriptor is kept with it.
+    """
+
+    def __init__(self, max_size=DESCRIPTOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, descriptor_uuid):
+        """
+        :return: the shared descriptor or None
+        """
+        with self._lock:
+            entry = self._entries.get(descriptor_uuid)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(descriptor_uuid)
+            self.hits += 1
+        return entry.value
+
+    def put(self, descriptor_uuid, descriptor):
+        with self._lock:
+            self._put(descriptor_uuid, descriptor)
+
+    def _put(self, descriptor_uuid, descriptor):
+        self._entries[descriptor_uuid] = codec.Encoded(descriptor)
+        self._entries.move_to_end(descriptor_uuid)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def intern(self, descriptor):
+        """
+        This method returns the cached descriptor with the same uuid, so
+        that services of the same descriptor share a single copy of it.
+
+        :param descriptor: a descriptor of a request
+        :return: the shared descriptor
+        """
+        if not isinstance(descriptor, dict) or descriptor.get('uuid') is None:
+            return descriptor
+        descriptor_uuid = descriptor['uuid']
+        with self._lock:
+            entry = self._entries.get(descriptor_uuid)
+            if entry is None:
+                self.misses += 1
+                self._put(descriptor_uuid, descriptor)
+                return descriptor
+            self._entries.move_to_end(descriptor_uuid)
+            self.hits += 1
+            return entry.value
+
+    def encoded(self, descriptor):
+        """
+        :return: the descriptor as a codec.Encoded, which is serialized
+                 only once if the descriptor is cached
+        """
+        if isinstance(descriptor, dict):
+            with self._lock:
+                entry = self._entries.get(descriptor.get('uuid'))
+            if entry is not None and entry.value is descriptor:
+                return entry
+        return codec.Encoded(descriptor)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries),
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses}
+
+
+def with_termination_flag(descriptor, managers):
+    """
+    This method returns a copy of a descriptor in which the specific
+    managers are flagged for termination. The descriptor itself is shared
+    by the ledger, so it is not changed.
+
+    :param descriptor: the NSD or VNFD
+    :param managers: 'service_specific_managers' or 'function_specific_managers'
+    """
+    flagged = []
+    for manager in descriptor[managers]:
+        options = list(manager.get('options') or [])
+        options.append({'key': 'termination', 'value': 'true'})
+        flagged.append(dict(manager, options=options))
+
+    return dict(descriptor, **{managers: flagged})
+
 
 def convert_corr_id(corr_id):
     """
@@ -332,91 +464,20 @@ def get_sm_from_descriptor(descr):
     return sm_dict
 
 
-def get_ordered_vim_list(payload, which_graph=0):
-    """
-    This method returns a list of vims. The list is ordered in such
-    a way that any VIM is never addressed after the next one in the list
+def get_vim_stages(payload, break_loops=False):
     """
+    This method returns the VIMs of a placed service in stages. A VIM is
+    never addressed before the VIMs that precede it on a forwarding path,
+    the VIMs of one stage can be addressed concurrently.
 
-    # TODO: Add support for cloud services
-
-    def find_vim_based_on_vnf_id(vnf_id, descriptor):
-        for vnf in descriptor['network_functions']:
-            if vnf['vnf_id'] == vnf_id:
-                for func in payload['function']:
-                    if vnf['vnf_version'] == func['vnfd']['version']:
-                        if vnf['vnf_vendor'] == func['vnfd']['vendor']:
-                            if vnf['vnf_name'] == func['vnfd']['name']:
-                                return func['vim_uuid']
-
-        return None
-
-    nodes = {}
-
+    :param break_loops: order the VIMs on a loop instead of raising
+    :raises CycleError: if the placement makes the paths loop between VIMs
+    """
     descriptor = payload['service']['nsd'] if 'nsd' in payload['service'] else payload['service']['cosd']
-    vim_list = []
-
-    if 'forwarding_graphs' not in descriptor:
-        for func in payload['function']:
-            vim_list.append(func['vim_uuid'])
-        for cloud_service in payload['cloud_service']:
-            vim_list.append(cloud_service['vim_uuid'])
-        return vim_list
-
-    forw_graph = descriptor['forwarding_graphs'][which_graph]
-    paths = forw_graph['network_forwarding_paths']
-
-    for path in paths:
-        cps = path["connection_points"]
-        incoming = None
-        for cp in cps:
-            cp_ref = cp['connection_point_ref']
-            if ':' not in cp_ref:
-                pass
-            else:
-                vnf_id = cp_ref.split(':')[0]
-                vim_uuid = find_vim_based_on_vnf_id(vnf_id, descriptor)
-                if vim_uuid not in nodes.keys():
-                    nodes[vim_uuid] = {"incoming": [],
-                                       "outgoing": []}
-
-                if incoming is not None:
-                    if vim_uuid != incoming:
-                        nodes[vim_uuid]["incoming"].append(incoming)
-                        nodes[incoming]["outgoing"].append(vim_uuid)
-                    incoming = vim_uuid
-
-        number_of_vnfs = len(payload['function'])
-        while_counter = 0
-
-        while (len(nodes.keys()) > 0):
-            # Exit if loop is infinite
-            if while_counter > number_of_vnfs:
-                vim_list = None
-                break
-            for vim_uuid in nodes.keys():
-                if len(nodes[vim_uuid]['incoming']) == 0:
-                    vim_list.append(vim_uuid)
-                    outgoing_list = nodes[vim_uuid]['outgoing']
-                    for outg_vim in outgoing_list:
-                        nodes[outg_vim]["incoming"].remove(vim_uuid)
-            # remove vims with no incoming links
-            for vim in vim_list:
-                if vim in nodes.keys():
-                    del nodes[vim]
-
-            while_counter = while_counter + 1
+    return vim_stages(descriptor, payload['function'], payload['cloud_service'], break_loops)
 
-    else:
-        # If no forwarding grapgh is present, the order is irrelevant
-        for func in payload['function']:
-            if func['vim_uuid'] not in vim_list:
-                vim_list.append(func['vim_uuid'])
 
-    return vim_list
-
-
-def getRestData(base, path, expected_code=200, token=None):
+def getRestData(base, path, expected_code=200, token=None, session=None):
     """
     This method can be used to retrieve data through a rest api.
     """
@@ -426,10 +487,13 @@ def getRestData(base, path, expected_code=200, token=None):
     if token is not None:
         header = {"Authorization": "Bearer %s" % token}
 
+    if session is None:
+        session = get_session()
+
     try:
-        get_response = requests.get(url,
-                                    headers=header,
-                                    timeout=5.0)
+        get_response = session.get(url,
+                                   headers=header,
+                                   timeout=5.0)
 
         content = get_response.json()
         code = get_response.status_code
@@ -443,6 +507,28 @@ def getRestData(base, path, expected_code=200, token=None):
         return{'error': '400', 'content': 'request timed out'}
 
 
+def getDescriptor(cache, base, descriptor_uuid, key, token=None):
+    """
+    This method retrieves a descriptor from the catalogue through the GK,
+    or from the cache if it was retrieved before.
+
+    :param cache: DescriptorCache
+    :param key: the field of the response that holds the descriptor, e.g. 'vnfd'
+    :return: dict in the format of getRestData with the descriptor as content
+    """
+    descriptor = cache.get(descriptor_uuid)
+    if descriptor is not None:
+        return {'error': None, 'content': descriptor}
+
+    request = getRestData(base, descriptor_uuid, token=token)
+    if request['error'] is not None:
+        return request
+
+    descriptor = request['content'][key]
+    cache.put(descriptor_uuid, descriptor)
+    return {'error': None, 'content': descriptor}
+
+
 def build_vnfr(ia_vnfr, vnfd):
     """
     This method builds the VNFR. VNFRS are built from the stripped VNFRs
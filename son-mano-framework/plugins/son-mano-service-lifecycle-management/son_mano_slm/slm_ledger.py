@@ -0,0 +1,159 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+The entries of the SLM ledger. A ServiceRecord keeps the fields of a
+service in slots instead of a per-service dict, and still behaves like
+the dict it replaces, so tasks keep using ledger[serv_id]['field'].
+"""
+
+# The fields that every entry of the ledger can have. Other fields are
+# kept in a dict of their own.
+FIELDS = ('service', 'function', 'cloud_service', 'original_corr_id',
+          'payload', 'infrastructure', 'schedule', 'task_log',
+          'vnfs_to_resp', 'css_to_resp', 'pause_chain', 'kill_chain',
+          'ingress', 'egress', 'user_data', 'public_key', 'private_key',
+          'status', 'error', 'act_corr_id', 'current_workflow', 'topic',
+          'config_status', 'traceback', 'connection_points', 'add_content')
+
+_UNSET = object()
+
+
+class ServiceRecord(object):
+    """
+    A service in the ledger.
+    """
+    __slots__ = FIELDS + ('_extra',)
+
+    def __init__(self, fields=None, **kwargs):
+        self._extra = None
+        if fields:
+            self.update(fields)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_dict(cls, fields):
+        """
+        A record for a ledger entry that was shared as a dict, e.g. by
+        another SLM.
+        """
+        if isinstance(fields, cls):
+            return fields
+        return cls(fields)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            value = getattr(self, key, _UNSET)
+        elif self._extra is not None:
+            value = self._extra.get(key, _UNSET)
+        else:
+            value = _UNSET
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, ServiceRecord):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'ServiceRecord(%r)' % self.to_dict()
+
+    def keys(self):
+        keys = [key for key in FIELDS if hasattr(self, key)]
+        if self._extra:
+            keys.extend(self._extra.keys())
+        return keys
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def pop(self, key, default=_UNSET):
+        try:
+            value = self[key]
+        except KeyError:
+            if default is _UNSET:
+                raise
+            return default
+        del self[key]
+        return value
+
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
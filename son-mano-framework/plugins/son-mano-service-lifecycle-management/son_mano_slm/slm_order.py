@@ -0,0 +1,182 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+The order in which the VIMs of a service are configured. The forwarding
+paths of the descriptor link the VIMs of consecutive functions and cloud
+services; a VIM is configured after the VIMs that precede it on any path.
+The VIMs are returned in stages, the VIMs of a stage don't depend on each
+other and can be configured concurrently.
+"""
+
+import logging
+
+LOG = logging.getLogger("son-mano-service-lifecycle-management:slm_order")
+
+
+class CycleError(ValueError):
+    """
+    The forwarding paths loop between VIMs.
+
+    :param path: the VIMs of the loop, the first VIM is repeated at the end
+    """
+
+    def __init__(self, path):
+        self.path = path
+        super(CycleError, self).__init__('Placement contains loop: ' +
+                                         ' -> '.join(str(vim) for vim in path))
+
+
+def order_stages(nodes, edges, break_loops=False):
+    """
+    This method orders the nodes of a graph with Kahn's algorithm.
+
+    :param nodes: the nodes, in the order in which ties are resolved
+    :param edges: iterable of (from, to) pairs
+    :param break_loops: if a cycle is left, continue with the node of the
+                        cycles with the fewest unordered predecessors in
+                        its own stage, instead of raising a CycleError
+    :return: list of stages, each a list of nodes whose predecessors are
+             all in earlier stages
+    :raises CycleError: if the graph contains a cycle
+    """
+    successors = dict((node, []) for node in nodes)
+    in_degree = dict((node, 0) for node in nodes)
+    for source, target in set(edges):
+        if source == target:
+            continue
+        successors[source].append(target)
+        in_degree[target] += 1
+
+    # Keep the order of the nodes within a stage stable
+    position = dict((node, i) for i, node in enumerate(successors))
+
+    stages = []
+    stage = [node for node in successors if in_degree[node] == 0]
+    done = 0
+    while True:
+        while stage:
+            stages.append(stage)
+            done += len(stage)
+            following = []
+            for node in stage:
+                for target in successors[node]:
+                    in_degree[target] -= 1
+                    if in_degree[target] == 0:
+                        following.append(target)
+            stage = sorted(following, key=position.get)
+
+        if done == len(successors):
+            return stages
+        if not break_loops:
+            raise CycleError(find_cycle(successors, in_degree))
+        # The nodes that are left all have unordered predecessors
+        node = min((node for node in successors if in_degree[node] > 0),
+                   key=lambda node: (in_degree[node], position[node]))
+        in_degree[node] = 0
+        stage = [node]
+
+
+def find_cycle(successors, in_degree):
+    """
+    :return: a cycle among the nodes that Kahn's algorithm couldn't order
+    """
+    remaining = set(node for node in successors if in_degree[node] > 0)
+    # Every remaining node has a remaining predecessor, so walking back
+    # from any of them ends in a cycle
+    predecessors = {}
+    for source in remaining:
+        for target in successors[source]:
+            if target in remaining:
+                predecessors.setdefault(target, source)
+
+    node = next(node for node in successors if node in remaining)
+    seen = {}
+    walk = []
+    while node not in seen:
+        seen[node] = len(walk)
+        walk.append(node)
+        node = predecessors[node]
+    cycle = walk[seen[node]:]
+    cycle.reverse()
+    return cycle + [cycle[0]]
+
+
+def vim_stages(descriptor, functions, cloud_services, break_loops=False):
+    """
+    This method orders the VIMs of a placed service along all forwarding
+    paths of all forwarding graphs of its descriptor.
+
+    :param descriptor: the NSD or COSD
+    :param functions: the functions of the service, with vnfd and vim_uuid
+    :param cloud_services: the cloud services, with csd and vim_uuid,
+                           instances without vim_uuid are left out
+    :param break_loops: order the VIMs on a loop instead of raising a
+                        CycleError, see order_stages
+    :return: list of stages of VIM uuids
+    :raises CycleError: if the paths loop between VIMs
+    """
+    # The descriptor refers to functions and cloud services by id, the
+    # instances are matched on vendor, name and version
+    instances = {}
+    for function in functions:
+        vnfd = function['vnfd']
+        key = (vnfd['vendor'], vnfd['name'], vnfd['version'])
+        instances.setdefault(key, function.get('vim_uuid'))
+    for cloud_service in cloud_services:
+        csd = cloud_service['csd']
+        key = (csd['vendor'], csd['name'], csd['version'])
+        instances.setdefault(key, cloud_service.get('vim_uuid'))
+
+    vims = {}
+    for vnf in descriptor.get('network_functions') or []:
+        key = (vnf['vnf_vendor'], vnf['vnf_name'], vnf['vnf_version'])
+        vims[vnf['vnf_id']] = instances.get(key)
+    for cs in descriptor.get('cloud_services') or []:
+        key = (cs['service_vendor'], cs['service_name'], cs['service_version'])
+        vims[cs['service_id']] = instances.get(key)
+
+    nodes = []
+    for instance in list(functions) + list(cloud_services):
+        vim = instance.get('vim_uuid')
+        if vim is not None and vim not in nodes:
+            nodes.append(vim)
+
+    edges = []
+    for graph in descriptor.get('forwarding_graphs') or []:
+        for path in graph.get('network_forwarding_paths') or []:
+            points = sorted(path.get('connection_points') or [],
+                            key=lambda cp: cp.get('position', 0))
+            previous = None
+            for point in points:
+                ref = point['connection_point_ref']
+                if ':' not in ref:
+                    continue
+                vim = vims.get(ref.split(':')[0])
+                if vim is None:
+                    continue
+                if previous is not None and previous != vim:
+                    edges.append((previous, vim))
+                previous = vim
+
+    return order_stages(nodes, edges, break_loops)
@@ -0,0 +1,97 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Ownership of services among the SLMs. Every SLM receives the requests of
+the GK, and only handles those of the services that it owns. The owner
+of a service follows from consistent hashing of its instance uuid over
+the active SLMs, so each SLM computes the same owner without asking the
+others, and only the services of the joining or leaving SLM move when the
+set of SLMs changes.
+"""
+
+import bisect
+import hashlib
+import os
+import threading
+import uuid
+
+# Points of each SLM on the ring, more points spread the services more evenly
+RING_VNODES = int(os.environ.get("slm_ring_vnodes", 64))
+
+# Namespace of the instance uuids that are derived from correlation ids
+INSTANCE_NAMESPACE = uuid.UUID('4a4f3c58-5a2e-4c1e-9d3b-5f1c0b6e2d71')
+
+
+def instance_uuid(corr_id):
+    """
+    This method returns the instance uuid of the service that is created
+    by a request. All SLMs derive the same uuid, and therefore the same
+    owner, from the correlation id of the request.
+
+    :param corr_id: the correlation id of the instantiation request
+    """
+    return str(uuid.uuid5(INSTANCE_NAMESPACE, str(corr_id)))
+
+
+def _position(key):
+    digest = hashlib.md5(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class HashRing(object):
+    """
+    A consistent hash ring of SLM uuids.
+    """
+
+    def __init__(self, members=(), vnodes=RING_VNODES):
+        self.vnodes = vnodes
+        self._lock = threading.Lock()
+        self._positions = []
+        self._owners = []
+        self.members = []
+        self.set_members(members)
+
+    def set_members(self, members):
+        """
+        Replace the SLMs on the ring.
+
+        :param members: uuids of the active SLMs
+        """
+        points = sorted((_position('%s#%d' % (member, i)), member)
+                        for member in set(members)
+                        for i in range(self.vnodes))
+        with self._lock:
+            self.members = sorted(set(members))
+            self._positions = [point[0] for point in points]
+            self._owners = [point[1] for point in points]
+
+    def owner(self, key):
+        """
+        :return: the uuid of the SLM that owns the key, None if the ring is empty
+        """
+        with self._lock:
+            if not self._positions:
+                return None
+            index = bisect.bisect(self._positions, _position(str(key)))
+            return self._owners[index % len(self._owners)]
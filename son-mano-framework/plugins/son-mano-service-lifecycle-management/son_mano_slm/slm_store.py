@@ -0,0 +1,309 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Durable state of the services in the SLM ledger. After every step of a
+workflow, the SLM that owns a service checkpoints its ledger entry and
+workflow, so that another SLM can resume the service if the owner goes
+missing. A store keeps one document per service: the uuid of its owner
+and the fields of its ledger entry, each as JSON text, so a checkpoint
+only writes the fields that changed since the previous one.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from sonmanobase import codec
+
+LOG = logging.getLogger("son-mano-service-lifecycle-management:slm_store")
+
+# memory://<name> keeps the state in this process, for tests and single
+# SLM setups. mongodb://... keeps it in MongoDB.
+STORE_URL = os.environ.get("slm_ledger_store", "memory://slm")
+MEMORY_URL_SCHEME = "memory://"
+MONGO_DATABASE = os.environ.get("slm_ledger_database", "son-mano-slm")
+MONGO_COLLECTION = "ledger"
+
+
+class OwnershipLost(Exception):
+    """
+    A service was taken over by another SLM, this SLM must stop handling
+    it.
+    """
+
+    def __init__(self, serv_id, owner):
+        super(OwnershipLost, self).__init__("Service %s is no longer owned by SLM %s" % (serv_id, owner))
+        self.serv_id = serv_id
+        self.owner = owner
+
+
+class LedgerStore(object):
+    """
+    Interface of the stores of the ledger.
+    """
+
+    def update(self, serv_id, owner, fields, removed=(), create=False):
+        """
+        Write fields of the document of a service, if it still has the
+        given owner.
+
+        :param owner: uuid of the SLM that owns the service
+        :param fields: dict of field name -> JSON text
+        :param removed: names of fields that are no longer in the ledger
+        :param create: create the document if the service is new
+        :return: False if the service has another owner (or was removed)
+        """
+        raise NotImplementedError
+
+    def load(self, serv_id):
+        """
+        :return: (owner, dict of field name -> value) or None
+        """
+        raise NotImplementedError
+
+    def delete(self, serv_id, owner=None):
+        """
+        Remove the document of a service.
+
+        :param owner: only remove it if the service still has this owner
+        """
+        raise NotImplementedError
+
+    def owned_by(self, owner):
+        """
+        :return: list of the uuids of the services of an SLM
+        """
+        raise NotImplementedError
+
+    def claim(self, serv_id, owner, new_owner):
+        """
+        Move a service to a new owner, if it still has the given owner.
+        Only one SLM can take over a service from a missing SLM.
+
+        :return: True if the service was moved
+        """
+        raise NotImplementedError
+
+
+class MemoryStore(LedgerStore):
+    """
+    A store in the memory of this process.
+    """
+
+    def __init__(self):
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def update(self, serv_id, owner, fields, removed=(), create=False):
+        with self._lock:
+            document = self._documents.get(serv_id)
+            if document is None and create:
+                document = self._documents[serv_id] = {'owner': owner, 'fields': {}}
+            if document is None or document['owner'] != owner:
+                return False
+            document['fields'].update(fields)
+            for name in removed:
+                document['fields'].pop(name, None)
+            return True
+
+    def load(self, serv_id):
+        with self._lock:
+            document = self._documents.get(serv_id)
+            if document is None:
+                return None
+            owner = document['owner']
+            fields = dict(document['fields'])
+        return owner, dict((name, json.loads(text)) for name, text in fields.items())
+
+    def delete(self, serv_id, owner=None):
+        with self._lock:
+            document = self._documents.get(serv_id)
+            if document is not None and owner in (None, document['owner']):
+                del self._documents[serv_id]
+
+    def owned_by(self, owner):
+        with self._lock:
+            return [serv_id for serv_id, document in self._documents.items()
+                    if document['owner'] == owner]
+
+    def claim(self, serv_id, owner, new_owner):
+        with self._lock:
+            document = self._documents.get(serv_id)
+            if document is None or document['owner'] != owner:
+                return False
+            document['owner'] = new_owner
+            return True
+
+
+class MongoStore(LedgerStore):
+    """
+    A store in a MongoDB collection, shared by all SLMs. The fields are
+    kept as JSON text, descriptors can have keys that MongoDB doesn't
+    accept.
+    """
+
+    def __init__(self, url, database=MONGO_DATABASE, collection=MONGO_COLLECTION):
+        import pymongo
+        import pymongo.errors
+        self._duplicate_key_error = pymongo.errors.DuplicateKeyError
+        self._collection = pymongo.MongoClient(url)[database][collection]
+        self._collection.create_index('owner')
+        LOG.info("Ledger store connected to MongoDB %r" % database)
+
+    def update(self, serv_id, owner, fields, removed=(), create=False):
+        change = {'$set': {'owner': owner}}
+        for name, text in fields.items():
+            change['$set']['fields.' + name] = text
+        if removed:
+            change['$unset'] = dict(('fields.' + name, '') for name in removed)
+        try:
+            result = self._collection.update_one({'_id': serv_id, 'owner': owner},
+                                                 change, upsert=create)
+        except self._duplicate_key_error:
+            # A new service that another SLM owns already
+            return False
+        return result.matched_count == 1 or result.upserted_id is not None
+
+    def load(self, serv_id):
+        document = self._collection.find_one({'_id': serv_id})
+        if document is None:
+            return None
+        fields = document.get('fields', {})
+        return document['owner'], dict((name, json.loads(text)) for name, text in fields.items())
+
+    def delete(self, serv_id, owner=None):
+        query = {'_id': serv_id}
+        if owner is not None:
+            query['owner'] = owner
+        self._collection.delete_one(query)
+
+    def owned_by(self, owner):
+        return [document['_id'] for document in
+                self._collection.find({'owner': owner}, {'_id': True})]
+
+    def claim(self, serv_id, owner, new_owner):
+        result = self._collection.update_one({'_id': serv_id, 'owner': owner},
+                                             {'$set': {'owner': new_owner}})
+        return result.modified_count == 1
+
+
+_memory_stores = {}
+_memory_stores_lock = threading.Lock()
+
+
+def get_store(url=STORE_URL):
+    """
+    This method returns the store for a URL. SLMs in the same process get
+    the same memory store for the same URL, as they would get the same
+    database.
+    """
+    if url.startswith(MEMORY_URL_SCHEME):
+        with _memory_stores_lock:
+            if url not in _memory_stores:
+                _memory_stores[url] = MemoryStore()
+            return _memory_stores[url]
+    return MongoStore(url)
+
+
+class Checkpointer(object):
+    """
+    Writes the changes of the services of this SLM to a store.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        # serv_id -> field name -> JSON text of the last checkpoint
+        self._written = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.checkpoints = 0
+        self.fields_written = 0
+
+    def _service_lock(self, serv_id):
+        with self._lock:
+            if serv_id not in self._locks:
+                self._locks[serv_id] = threading.Lock()
+            return self._locks[serv_id]
+
+    def save(self, serv_id, owner, fields):
+        """
+        Checkpoint a service.
+
+        :param owner: uuid of this SLM
+        :param fields: dict of field name -> value, values can contain
+                       codec.Encoded parts
+        :return: number of fields that were written
+        :raises OwnershipLost: if another SLM took the service over
+        """
+        with self._service_lock(serv_id):
+            texts = dict((name, codec.encode(value, codec.CONTENT_TYPE_JSON))
+                         for name, value in fields.items())
+            written = self._written.get(serv_id)
+            if written is None:
+                changed = texts
+                removed = []
+            else:
+                changed = dict((name, text) for name, text in texts.items()
+                               if written.get(name) != text)
+                removed = [name for name in written if name not in texts]
+            if changed or removed:
+                if not self.store.update(serv_id, owner, changed, removed, create=written is None):
+                    self._written.pop(serv_id, None)
+                    raise OwnershipLost(serv_id, owner)
+            self._written[serv_id] = texts
+
+        with self._lock:
+            self.checkpoints += 1
+            self.fields_written += len(changed)
+        return len(changed)
+
+    def resumed(self, serv_id, fields):
+        """
+        A service was taken over, the store holds the given fields.
+        """
+        with self._service_lock(serv_id):
+            self._written[serv_id] = dict((name, codec.encode(value, codec.CONTENT_TYPE_JSON))
+                                          for name, value in fields.items())
+
+    def forget(self, serv_id, owner=None, delete=True):
+        """
+        The service is no longer handled, its checkpoint is removed.
+
+        :param owner: uuid of this SLM, the checkpoint is kept if another
+                      SLM took the service over
+        :param delete: False to keep the checkpoint in any case
+        """
+        with self._service_lock(serv_id):
+            self._written.pop(serv_id, None)
+            if delete:
+                self.store.delete(serv_id, owner)
+        with self._lock:
+            self._locks.pop(serv_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'services': len(self._written),
+                    'checkpoints': self.checkpoints,
+                    'fields_written': self.fields_written}
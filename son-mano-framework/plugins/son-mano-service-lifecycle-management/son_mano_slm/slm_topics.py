@@ -35,6 +35,8 @@ GK_PAUSE = "service.instance.pause"
 GK_RESUME = "service.instance.restart"
 GK_KILL = "service.instance.terminate"
 GK_UPDATE = "service.instances.update"
+GK_CREATE_BULK = "service.instances.create.bulk"
+GK_KILL_BULK = "service.instances.terminate.bulk"
 
 # With other SLM
 MANO_STATE = "mano.share.state"
@@ -50,6 +52,7 @@ MANO_START = "mano.function.start"
 MANO_CONFIG = "mano.function.configure"
 MANO_STOP = "mano.function.stop"
 MANO_SCALE = "mano.function.scale"
+SLM_TRACE = "mano.service.trace"
 
 # With gatekeeper or other SLM
 WC_CREATE = "*.instances.create"
@@ -83,6 +86,7 @@ EXEC_PLACE = 'placement.executive.request'
 
 # With plugin mananger
 PL_STATUS = "platform.management.plugin.status"
+PL_STATUS_SNAPSHOT = "platform.management.plugin.status.snapshot"
 
 # With monitoring
 MON_RECEIVE = "son.monitoring"
@@ -0,0 +1,270 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+The topology of the infrastructure as seen by the SLM. Instead of asking
+the IA for the full topology for every instantiation, the SLM keeps the
+last topology and refreshes it in the background once it is older than
+a few seconds. Placements take the resources of the placements of other
+services into account, as these are reserved in the cache until the IA
+reports them as used.
+"""
+
+import logging
+import os
+import threading
+import time
+
+LOG = logging.getLogger("son-mano-service-lifecycle-management:slm_topology")
+
+# Age in seconds after which the topology is refreshed in the background
+TOPOLOGY_TTL = float(os.environ.get("slm_topology_ttl", 2.0))
+# Age in seconds after which the topology is no longer used
+TOPOLOGY_MAX_AGE = float(os.environ.get("slm_topology_max_age", 30.0))
+
+TENTATIVE = 'tentative'
+CONFIRMED = 'confirmed'
+
+# The resources of a VIM, with the fields of the IA topology
+RESOURCES = (('core', 'core_used', 'core_total'),
+             ('memory', 'memory_used', 'memory_total'))
+
+
+def service_usage(functions, cloud_services, mapping):
+    """
+    This method returns the resources that a placement takes per VIM.
+
+    :param functions: the functions of the service, with their vnfd
+    :param cloud_services: the cloud services of the service, with their csd
+    :param mapping: the placement, instance id -> {'vim': vim uuid}
+    :return: dict of vim uuid -> {'core': vcpus, 'memory': size}
+    """
+    usage = {}
+
+    def add(vim, core, memory):
+        vim_usage = usage.setdefault(vim, {'core': 0, 'memory': 0})
+        vim_usage['core'] += core
+        vim_usage['memory'] += memory
+
+    for function in functions:
+        if function['id'] not in mapping:
+            continue
+        for vdu in function['vnfd'].get('virtual_deployment_units') or []:
+            requirements = vdu.get('resource_requirements') or {}
+            core = (requirements.get('cpu') or {}).get('vcpus', 0)
+            memory = (requirements.get('memory') or {}).get('size', 0)
+            add(mapping[function['id']]['vim'], core, memory)
+
+    for cloud_service in cloud_services:
+        if cloud_service['id'] not in mapping:
+            continue
+        for vdu in cloud_service['csd'].get('virtual_deployment_units') or []:
+            requirements = vdu.get('resource_requirements') or {}
+            memory = (requirements.get('memory') or {}).get('size', 0)
+            add(mapping[cloud_service['id']]['vim'], 0, memory)
+
+    return usage
+
+
+class TopologyCache(object):
+    """
+    The last topology received from the IA, with the reservations of the
+    placements of this SLM.
+
+    A reservation is tentative from the placement until the deployment
+    succeeded or failed. A failed deployment releases it, a successful one
+    confirms it. A confirmed reservation is kept until a topology that was
+    requested after the confirmation shows the resources as used.
+    """
+
+    def __init__(self, ttl=TOPOLOGY_TTL, max_age=TOPOLOGY_MAX_AGE):
+        self.ttl = ttl
+        self.max_age = max_age
+        self._vims = []
+        self._received = None
+        # When the running refresh was started, a refresh that is not
+        # answered within max_age is given up
+        self._refreshing = None
+        # serv_id -> {'usage': ..., 'state': ..., 'confirmed': timestamp}
+        self._reservations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.conflicts = 0
+
+    def update(self, topology, requested=None):
+        """
+        Merge a topology from the IA into the cache. VIMs that did not
+        change keep their entry.
+
+        :param topology: list of VIMs, as returned by the IA
+        :param requested: when the topology was requested, default now
+        :return: number of VIMs that were added or changed
+        """
+        if not isinstance(topology, list):
+            return 0
+        if requested is None:
+            requested = time.time()
+
+        with self._lock:
+            known = dict((vim['vim_uuid'], vim) for vim in self._vims)
+            changed = 0
+            vims = []
+            for vim in topology:
+                old = known.get(vim['vim_uuid'])
+                if old is not None and old == vim:
+                    vims.append(old)
+                else:
+                    vims.append(dict(vim))
+                    changed += 1
+            self._vims = vims
+            self._received = time.time()
+            self._refreshing = None
+            self.refreshes += 1
+
+            # The IA reports the resources of deployments that were
+            # confirmed before the request
+            for serv_id, reservation in list(self._reservations.items()):
+                if reservation['state'] == CONFIRMED and \
+                        reservation['confirmed'] <= requested:
+                    del self._reservations[serv_id]
+
+        return changed
+
+    def snapshot(self):
+        """
+        :return: the topology with the reserved resources as used, None if
+                 there is no usable topology
+        """
+        with self._lock:
+            if self._received is None or \
+                    time.time() - self._received > self.max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._available()
+
+    def _available(self):
+        reserved = {}
+        for reservation in self._reservations.values():
+            for vim, usage in reservation['usage'].items():
+                vim_reserved = reserved.setdefault(vim, {'core': 0, 'memory': 0})
+                vim_reserved['core'] += usage['core']
+                vim_reserved['memory'] += usage['memory']
+
+        vims = []
+        for vim in self._vims:
+            vim_reserved = reserved.get(vim['vim_uuid'])
+            if vim_reserved is None:
+                vims.append(dict(vim))
+                continue
+            vim = dict(vim)
+            for resource, used, total in RESOURCES:
+                vim[used] = vim.get(used, 0) + vim_reserved[resource]
+            vims.append(vim)
+        return vims
+
+    def needs_refresh(self):
+        """
+        :return: True if the topology should be refreshed and no refresh
+                 is running, the caller starts the refresh
+        """
+        now = time.time()
+        with self._lock:
+            if self._refreshing is not None and \
+                    now - self._refreshing <= self.max_age:
+                return False
+            if self._received is not None and now - self._received <= self.ttl:
+                return False
+            self._refreshing = now
+            return True
+
+    def invalidate(self):
+        """
+        The infrastructure changed, e.g. a service was terminated, the
+        next snapshot triggers a refresh.
+        """
+        with self._lock:
+            if self._received is not None:
+                self._received = min(self._received, time.time() - self.ttl - 1)
+
+    def reserve(self, serv_id, usage, force=False):
+        """
+        Reserve the resources of a placement. A placement that was made on
+        an older snapshot can need resources that were reserved since.
+
+        :param usage: the result of service_usage
+        :param force: reserve even if the resources are not available
+        :return: False if the resources are not available anymore
+        """
+        with self._lock:
+            self._reservations.pop(serv_id, None)
+            if not force:
+                available = dict((vim['vim_uuid'], vim) for vim in self._available())
+                for vim_uuid, vim_usage in usage.items():
+                    vim = available.get(vim_uuid)
+                    if vim is None:
+                        continue
+                    for resource, used, total in RESOURCES:
+                        if total not in vim:
+                            continue
+                        if vim[used] + vim_usage[resource] > vim[total]:
+                            self.conflicts += 1
+                            return False
+            self._reservations[serv_id] = {'usage': usage,
+                                           'state': TENTATIVE,
+                                           'confirmed': None}
+        return True
+
+    def confirm(self, serv_id):
+        """
+        The resources of a service are deployed.
+        """
+        with self._lock:
+            reservation = self._reservations.get(serv_id)
+            if reservation is not None and reservation['state'] == TENTATIVE:
+                reservation['state'] = CONFIRMED
+                reservation['confirmed'] = time.time()
+
+    def release(self, serv_id):
+        """
+        The deployment of a service failed or was stopped, its tentative
+        reservation is removed.
+        """
+        with self._lock:
+            reservation = self._reservations.get(serv_id)
+            if reservation is not None and reservation['state'] == TENTATIVE:
+                del self._reservations[serv_id]
+
+    def stats(self):
+        with self._lock:
+            states = [r['state'] for r in self._reservations.values()]
+            return {'vims': len(self._vims),
+                    'age': None if self._received is None else time.time() - self._received,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'refreshes': self.refreshes,
+                    'conflicts': self.conflicts,
+                    'tentative': states.count(TENTATIVE),
+                    'confirmed': states.count(CONFIRMED)}
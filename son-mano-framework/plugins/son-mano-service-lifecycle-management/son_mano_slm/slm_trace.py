@@ -0,0 +1,243 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Tracing of the workflows of the SLM. The task_log of a ledger entry holds
+one span per workflow task and one per external call of the service. A
+span records the start and end timestamps and the outcome:
+
+- task spans end when the task is done. A task that waits for a response
+  ends when it is resumed, so its span includes the waiting time.
+- call spans start when a request is sent (the correlation id becomes
+  active) and end when the response is received.
+
+Traces of finished workflows are kept for queries, with per-task latency
+percentiles across services.
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sonmanobase.benchmark import percentile
+
+# number of finished traces that are kept
+TRACE_HISTORY = int(os.environ.get("slm_trace_history", 1000))
+
+PERCENTILES = (50, 90, 99)
+
+OK = 'ok'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+
+# components that are contacted by the tasks that wait for responses
+CALL_TARGETS = {'request_topology': 'IA',
+                'ia_prepare': 'IA',
+                'vnf_chain': 'IA',
+                'vnf_unchain': 'IA',
+                'terminate_service': 'IA',
+                'wan_configure': 'IA',
+                'wan_deconfigure': 'IA',
+                'vnf_deploy': 'FLM',
+                'vnfs_start': 'FLM',
+                'vnfs_stop': 'FLM',
+                'vnfs_config': 'FLM',
+                'vnfs_scale': 'FLM',
+                'cs_deploy': 'CLM',
+                'onboard_ssms': 'SMR',
+                'instant_ssms': 'SMR',
+                'terminate_ssms': 'SMR',
+                'terminate_fsms': 'SMR',
+                'trigger_task_ssm': 'SSM',
+                'req_placement_from_ssm': 'SSM',
+                'configure_ssm': 'SSM',
+                'SLM_mapping': 'placement'}
+
+
+def new_span(kind, name, **fields):
+    span = {'kind': kind,
+            'name': name,
+            'start': time.time(),
+            'end': None,
+            'outcome': None}
+    span.update(fields)
+    return span
+
+
+def end_span(span, outcome=OK):
+    """
+    End a span, if it is still open.
+
+    :return: True if the span was open
+    """
+    if span['end'] is not None:
+        return False
+    span['end'] = time.time()
+    span['outcome'] = outcome
+    return True
+
+
+def duration(span):
+    if span['end'] is None:
+        return None
+    return span['end'] - span['start']
+
+
+def _task_log(ledger):
+    return ledger.setdefault('task_log', [])
+
+
+class Tracer(object):
+
+    def __init__(self, history=TRACE_HISTORY):
+        """
+        :param history: number of finished traces that are kept
+        """
+        self.history = history
+        self._lock = threading.Lock()
+        self._traces = OrderedDict()
+        # task whose body runs, by service
+        self._running = {}
+
+    def task_started(self, serv_id, ledger, tid, name):
+        _task_log(ledger).append(new_span('task', name, tid=tid))
+        self._running[serv_id] = name
+
+    def task_returned(self, serv_id, ledger, tid, paused, failed=False):
+        """
+        The body of a task returned. The span of a task that waits for a
+        response stays open until the task is resumed.
+        """
+        self._running.pop(serv_id, None)
+        span = self._open_task(ledger, tid)
+        if span is None:
+            return
+        if failed:
+            end_span(span, ERROR)
+        elif not paused or span.get('resumed'):
+            end_span(span)
+        else:
+            span['waiting_since'] = time.time()
+
+    def task_resumed(self, ledger, tid):
+        span = self._open_task(ledger, tid)
+        if span is None:
+            return
+        if 'waiting_since' in span:
+            end_span(span)
+        else:
+            # The response arrived while the task body still runs
+            span['resumed'] = True
+
+    def _open_task(self, ledger, tid):
+        for span in reversed(_task_log(ledger)):
+            if span['kind'] == 'task' and span['tid'] == tid:
+                return span if span['end'] is None else None
+        return None
+
+    def call_started(self, serv_id, ledger, corr_id=None, target=None):
+        """
+        An external call of a service started.
+
+        :param corr_id: the correlation id of the request, if any
+        :param target: the contacted component, derived from the running
+                       task if None
+        :return: the span
+        """
+        task = self._running.get(serv_id)
+        if target is None:
+            target = CALL_TARGETS.get(task, task)
+        span = new_span('call', target, task=task, corr_id=corr_id)
+        _task_log(ledger).append(span)
+        return span
+
+    def call_ended(self, ledger, corr_id, outcome=OK):
+        for span in reversed(_task_log(ledger)):
+            if span['kind'] == 'call' and span['corr_id'] == corr_id:
+                end_span(span, outcome)
+                return
+
+    def fail(self, ledger, error):
+        """
+        An error occured, the open spans of the service end with it.
+        """
+        for span in _task_log(ledger):
+            if end_span(span, ERROR):
+                span['error'] = str(error)
+
+    def finish(self, serv_id, ledger, outcome=OK):
+        """
+        The workflow of a service ended. Spans that are still open are
+        cancelled and the trace is kept for queries.
+        """
+        self._running.pop(serv_id, None)
+        spans = _task_log(ledger)
+        for span in spans:
+            end_span(span, CANCELLED)
+
+        trace = {'instance_id': serv_id,
+                 'workflow': ledger.get('current_workflow'),
+                 'outcome': outcome,
+                 'spans': copy.deepcopy(spans)}
+        with self._lock:
+            self._traces.pop(serv_id, None)
+            self._traces[serv_id] = trace
+            while len(self._traces) > self.history:
+                self._traces.popitem(last=False)
+        return trace
+
+    def get(self, serv_id):
+        with self._lock:
+            return self._traces.get(serv_id)
+
+    def traces(self):
+        with self._lock:
+            return list(self._traces.values())
+
+    def stats(self, workflow=None):
+        """
+        Latency percentiles per task and per call target, across the
+        finished traces.
+
+        :param workflow: only use traces of this workflow, e.g. 'instantiation'
+        """
+        durations = {'task': {}, 'call': {}}
+        for trace in self.traces():
+            if workflow is not None and trace['workflow'] != workflow:
+                continue
+            for span in trace['spans']:
+                if span['outcome'] != OK:
+                    continue
+                durations[span['kind']].setdefault(span['name'], []).append(duration(span))
+
+        stats = {}
+        for kind, by_name in durations.items():
+            stats[kind] = {}
+            for name, values in by_name.items():
+                entry = {'count': len(values), 'max': max(values)}
+                for p in PERCENTILES:
+                    entry['p' + str(p)] = percentile(values, p)
+                stats[kind][name] = entry
+        return stats
@@ -0,0 +1,207 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Workflows of the SLM are dependency graphs of tasks. A task is the name of
+an SLM method that takes the service instance id as argument. A task can
+start as soon as all the tasks it depends on are done, so independent
+tasks run concurrently. A task that sends a request and needs the response
+before the workflow can continue pauses: it sets the pause_chain flag of
+the ledger and is waiting until its response handler resumes it.
+"""
+
+import threading
+
+PENDING = 'pending'
+RUNNING = 'running'
+WAITING = 'waiting'
+DONE = 'done'
+
+
+class Workflow(object):
+    """
+    The task graph of one workflow of one service.
+
+    'schedule' is the list of the names of the tasks that have not been
+    started yet, in the order in which they were added. It is stored in
+    the ledger, which is how SSMs see (and replace) the remaining tasks.
+    """
+
+    def __init__(self, schedule=None):
+        self.tasks = []
+        self.schedule = schedule if schedule is not None else []
+        # protects the task states
+        self.lock = threading.Lock()
+        # task bodies of one service share the ledger, they run one at a time
+        self.run_lock = threading.Lock()
+        self.finished = False
+        self._wait_count = 0
+
+    @classmethod
+    def linear(cls, schedule):
+        """
+        Create a workflow that runs the given tasks one after the other.
+
+        :param schedule: list of task names, used as the schedule of the workflow
+        """
+        workflow = cls(schedule)
+        for name in schedule:
+            workflow._add_task(name, None)
+        return workflow
+
+    def add(self, name, after=None):
+        """
+        Add a task to the workflow.
+
+        :param name: name of the task
+        :param after: ids of the tasks it depends on, None for the previously added task
+        :return: the id of the task
+        """
+        self.schedule.append(name)
+        return self._add_task(name, after)
+
+    def _add_task(self, name, after):
+        if after is None:
+            after = [len(self.tasks) - 1] if self.tasks else []
+        self.tasks.append({'name': name,
+                           'after': [tid for tid in after if tid is not None],
+                           'state': PENDING,
+                           'resumed': False,
+                           'waiting_since': None})
+        return len(self.tasks) - 1
+
+    def take_ready(self):
+        """
+        Mark all the tasks that can start as running.
+
+        :return: list of task ids
+        """
+        ready = []
+        for tid, task in enumerate(self.tasks):
+            if task['state'] != PENDING:
+                continue
+            if all(self.tasks[dep]['state'] == DONE for dep in task['after']):
+                task['state'] = RUNNING
+                self.schedule.remove(task['name'])
+                ready.append(tid)
+        return ready
+
+    def finish(self, tid, paused):
+        """
+        Called when the body of a task returned.
+
+        :param tid: id of the task
+        :param paused: whether the task waits for a response
+        """
+        task = self.tasks[tid]
+        if paused and not task['resumed']:
+            task['state'] = WAITING
+            self._wait_count += 1
+            task['waiting_since'] = self._wait_count
+        else:
+            task['state'] = DONE
+
+    def resume(self, name=None):
+        """
+        Mark a waiting task as done. A response can arrive before the body
+        of its task returned, in that case the task is done as soon as it
+        returns.
+
+        :param name: name of the task, None for the task that waits longest
+        :return: id of the resumed task or None
+        """
+        waiting = [tid for tid, task in enumerate(self.tasks)
+                   if task['state'] == WAITING and name in (None, task['name'])]
+        if waiting:
+            tid = min(waiting, key=lambda i: self.tasks[i]['waiting_since'])
+            self.tasks[tid]['state'] = DONE
+            return tid
+
+        running = [tid for tid, task in enumerate(self.tasks)
+                   if task['state'] == RUNNING and name in (None, task['name'])]
+        if running:
+            self.tasks[running[0]]['resumed'] = True
+            return running[0]
+
+        return None
+
+    def replace(self, name, names):
+        """
+        Replace a task that did not start yet by a chain of tasks. The
+        tasks that depended on it depend on the last task of the chain.
+
+        :param name: name of the task
+        :param names: names of the tasks of the chain
+        """
+        for tid, task in enumerate(self.tasks):
+            if task['name'] == name and task['state'] == PENDING:
+                break
+        else:
+            return
+        dependents = [other for other in self.tasks if tid in other['after']]
+        index = self.schedule.index(name)
+        self.schedule[index:index + 1] = names
+        task['name'] = names[0]
+        last = tid
+        for next_name in names[1:]:
+            last = self._add_task(next_name, [last])
+        for other in dependents:
+            other['after'] = [last if dep == tid else dep for dep in other['after']]
+
+    def to_dict(self):
+        """
+        :return: the state of the workflow, to checkpoint it
+        """
+        return {'tasks': [{'name': task['name'],
+                           'after': task['after'],
+                           'state': task['state']} for task in self.tasks]}
+
+    @classmethod
+    def restore(cls, state):
+        """
+        Create a workflow from a checkpoint. The tasks that were running or
+        waiting for a response are started again, the responses were sent
+        to the SLM that made the checkpoint.
+
+        :param state: the result of to_dict()
+        """
+        workflow = cls()
+        for task in state['tasks']:
+            done = task['state'] == DONE
+            workflow.tasks.append({'name': task['name'],
+                                   'after': list(task['after']),
+                                   'state': DONE if done else PENDING,
+                                   'resumed': False,
+                                   'waiting_since': None})
+            if not done:
+                workflow.schedule.append(task['name'])
+        return workflow
+
+    def is_done(self):
+        return all(task['state'] == DONE for task in self.tasks)
+
+    def states(self):
+        """
+        :return: list of (task name, state) tuples
+        """
+        return [(task['name'], task['state']) for task in self.tasks]
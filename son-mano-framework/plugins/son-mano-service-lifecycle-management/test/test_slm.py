@@ -34,6 +34,7 @@ from unittest import mock
 from multiprocessing import Process
 from son_mano_slm.slm import ServiceLifecycleManager
 from sonmanobase.messaging import ManoBrokerRequestResponseConnection
+from sonmanobase import codec
 from collections import namedtuple
 
 logging.basicConfig(level=logging.INFO)
@@ -937,6 +938,33 @@ class testSlmFunctionality(unittest.TestCase):
         #Wait for the test to finish
         self.waitForFirstEvent(timeout=5)
 
+###############################################################
+#TEST: test checkpoint after a take over
+###############################################################
+    def test_checkpoint_after_take_over(self):
+        """
+        This method tests that an SLM stops a service, instead of taking
+        it back, once another SLM took it over.
+        """
+        service_id = str(uuid.uuid4())
+        self.slm_proc.set_services({service_id: {'schedule': ['a', 'b'],
+                                                 'pause_chain': False,
+                                                 'kill_chain': False,
+                                                 'status': 'FOO'}})
+        workflow = self.slm_proc.get_workflow(service_id)
+        self.slm_proc.checkpoint(service_id, workflow)
+
+        store = self.slm_proc.checkpointer.store
+        self.assertTrue(store.claim(service_id, str(self.slm_proc.uuid), 'other'))
+        self.slm_proc.services[service_id]['status'] = 'BAR'
+        self.slm_proc.checkpoint(service_id, workflow)
+
+        self.assertNotIn(service_id, self.slm_proc.services)
+        self.assertTrue(workflow.finished)
+        owner, fields = store.load(service_id)
+        self.assertEqual((owner, fields['status']), ('other', 'FOO'))
+        store.delete(service_id)
+
 ###############################################################
 #TEST9: test ia_prepare
 ###############################################################
@@ -1208,5 +1236,42 @@ class testSlmFunctionality(unittest.TestCase):
 #         self.assertEqual(message, expected_vnfr_iperf, "Built VNFRs are not equals to the expected ones")
 
 
+
+class testDescriptorCache(unittest.TestCase):
+    """
+    Tests the descriptor cache used when recreating the ledger.
+    """
+
+    def test_lru_eviction(self):
+        cache = tools.DescriptorCache(max_size=2)
+        cache.put('a', {'name': 'a'})
+        cache.put('b', {'name': 'b'})
+        # use a, so that b is the least recently used one
+        self.assertEqual(cache.get('a'), {'name': 'a'})
+        cache.put('c', {'name': 'c'})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), {'name': 'c'})
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_intern(self):
+        cache = tools.DescriptorCache()
+        vnfd = {'uuid': 'a', 'name': 'a'}
+        self.assertIs(cache.intern(vnfd), vnfd)
+        # a later request for the same descriptor shares the first copy
+        self.assertIs(cache.intern({'uuid': 'a', 'name': 'a'}), vnfd)
+        self.assertIs(cache.get('a'), vnfd)
+        no_uuid = {'name': 'b'}
+        self.assertIs(cache.intern(no_uuid), no_uuid)
+
+    def test_encoded(self):
+        cache = tools.DescriptorCache()
+        vnfd = cache.intern({'uuid': 'a', 'name': 'a'})
+        self.assertIs(cache.encoded(vnfd), cache.encoded(vnfd))
+        message = {'vnfd': cache.encoded(vnfd).updated(instance_uuid='1')}
+        self.assertEqual(codec.decode(codec.encode(message)),
+                         {'vnfd': {'uuid': 'a', 'name': 'a', 'instance_uuid': '1'}})
+        self.assertEqual(vnfd, {'uuid': 'a', 'name': 'a'})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from son_mano_slm.slm_batch import Batch, JOINING, PLACING, PREPARING, DONE
+
+
+class testSlmBatch(unittest.TestCase):
+    """
+    Tests the coordination of the services of a bulk request (no broker
+    needed).
+    """
+
+    def setUp(self):
+        self.batch = Batch('b')
+        for serv_id in ['s1', 's2', 's3']:
+            self.batch.add(serv_id)
+
+    def test_join(self):
+        self.assertFalse(self.batch.join('s1'))
+        self.assertFalse(self.batch.join('s2'))
+        self.assertTrue(self.batch.join('s3'))
+        self.assertEqual(self.batch.state, PLACING)
+
+    def test_leave_while_joining(self):
+        self.batch.join('s1')
+        self.batch.join('s3')
+        self.assertEqual(self.batch.leave('s2'), (True, []))
+        self.assertEqual(self.batch.active(), ['s1', 's3'])
+
+    def test_all_left(self):
+        for serv_id in ['s1', 's2', 's3']:
+            self.assertEqual(self.batch.leave(serv_id), (False, []))
+        self.assertEqual(self.batch.state, JOINING)
+
+    def test_leaders(self):
+        for serv_id in ['s1', 's2', 's3']:
+            self.batch.join(serv_id)
+        images = {'s1': {('A', 'img')},
+                  's2': {('A', 'img')},
+                  's3': {('B', 'img')}}
+        self.assertEqual(self.batch.assign(images), ['s1', 's3'])
+        self.assertEqual(self.batch.state, PREPARING)
+        self.assertTrue(self.batch.strip_images('s2'))
+        self.assertFalse(self.batch.strip_images('s1'))
+
+        self.assertEqual(self.batch.prepared('s1'), [])
+        self.assertEqual(self.batch.prepared('s3'), ['s2'])
+        self.assertEqual(self.batch.state, DONE)
+        # Only the first completion of a leader counts
+        self.assertEqual(self.batch.prepared('s3'), [])
+
+    def test_no_images(self):
+        for serv_id in ['s1', 's2', 's3']:
+            self.batch.join(serv_id)
+        images = dict((serv_id, set()) for serv_id in ['s1', 's2', 's3'])
+        self.assertEqual(self.batch.assign(images), ['s1', 's2', 's3'])
+        self.assertEqual(self.batch.state, DONE)
+
+    def test_failed_leader(self):
+        for serv_id in ['s1', 's2', 's3']:
+            self.batch.join(serv_id)
+        images = dict((serv_id, {('A', 'img')}) for serv_id in ['s1', 's2', 's3'])
+        self.assertEqual(self.batch.assign(images), ['s1'])
+        self.assertEqual(self.batch.leave('s1'), (False, ['s2', 's3']))
+        # The followers prepare their own images
+        self.assertFalse(self.batch.strip_images('s2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+
+from sonmanobase import codec
+from son_mano_slm.slm_ledger import ServiceRecord
+
+
+class testSlmLedger(unittest.TestCase):
+    """
+    Tests the records of the SLM ledger (no broker needed).
+    """
+
+    def test_mapping(self):
+        record = ServiceRecord({'status': 'INSTANTIATING', 'custom': 1})
+        record['pause_chain'] = False
+        self.assertEqual(record['status'], 'INSTANTIATING')
+        self.assertEqual(record['custom'], 1)
+        self.assertIn('pause_chain', record)
+        self.assertNotIn('error', record)
+        self.assertIsNone(record.get('error'))
+        self.assertRaises(KeyError, lambda: record['error'])
+        self.assertEqual(record.setdefault('task_log', []), [])
+        self.assertEqual(set(record.keys()),
+                         {'status', 'custom', 'pause_chain', 'task_log'})
+
+    def test_pop(self):
+        record = ServiceRecord(payload={'NSD': {}})
+        self.assertEqual(record.pop('payload'), {'NSD': {}})
+        self.assertNotIn('payload', record)
+        self.assertIsNone(record.pop('payload', None))
+        self.assertRaises(KeyError, record.pop, 'payload')
+
+    def test_shared_as_dict(self):
+        record = ServiceRecord(status='ERROR', error='no VIM', custom=[1])
+        shared = codec.decode(codec.encode({'state': record.to_dict()}))
+        taken_over = ServiceRecord.from_dict(shared['state'])
+        self.assertEqual(taken_over, record)
+        self.assertEqual(dict(taken_over), {'status': 'ERROR', 'error': 'no VIM', 'custom': [1]})
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(ServiceRecord(), '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
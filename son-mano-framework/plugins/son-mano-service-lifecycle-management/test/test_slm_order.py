@@ -0,0 +1,109 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import unittest
+
+from son_mano_slm.slm_order import CycleError, order_stages, vim_stages
+
+
+def instance(kind, name, vim):
+    return {'id': name, 'vim_uuid': vim,
+            kind: {'vendor': 'eu.sonata', 'name': name, 'version': '1.0'}}
+
+
+def path(*names):
+    points = [{'connection_point_ref': 'input', 'position': 1}]
+    for name in names:
+        points.append({'connection_point_ref': name + ':input', 'position': len(points) + 1})
+        points.append({'connection_point_ref': name + ':output', 'position': len(points) + 1})
+    # The positions decide the order, not the list
+    points.reverse()
+    return {'connection_points': points}
+
+
+class testSlmOrder(unittest.TestCase):
+    """
+    Tests the ordering of the VIMs of a service (no broker needed).
+    """
+
+    def setUp(self):
+        self.functions = [instance('vnfd', 'fw', 'v1'),
+                          instance('vnfd', 'ids', 'v2'),
+                          instance('vnfd', 'proxy', 'v2')]
+        self.cloud_services = [instance('csd', 'web', 'k8s')]
+        self.descriptor = {
+            'network_functions': [{'vnf_id': f['id'], 'vnf_vendor': 'eu.sonata',
+                                   'vnf_name': f['id'], 'vnf_version': '1.0'}
+                                  for f in self.functions],
+            'cloud_services': [{'service_id': 'web', 'service_vendor': 'eu.sonata',
+                                'service_name': 'web', 'service_version': '1.0'}]}
+
+    def test_stages(self):
+        stages = order_stages(['a', 'b', 'c', 'd'],
+                              [('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')])
+        self.assertEqual(stages, [['a'], ['b', 'c'], ['d']])
+
+    def test_cycle(self):
+        with self.assertRaises(CycleError) as cm:
+            order_stages(['a', 'b', 'c', 'd'],
+                         [('a', 'b'), ('b', 'c'), ('c', 'd'), ('d', 'b')])
+        path = cm.exception.path
+        self.assertEqual(path[0], path[-1])
+        self.assertEqual(sorted(path[:-1]), ['b', 'c', 'd'])
+        # The path follows the edges of the loop
+        for edge in zip(path, path[1:]):
+            self.assertIn(edge, [('b', 'c'), ('c', 'd'), ('d', 'b')])
+        self.assertIn(' -> '.join(path), str(cm.exception))
+
+    def test_no_forwarding_graph(self):
+        stages = vim_stages(self.descriptor, self.functions, self.cloud_services)
+        self.assertEqual(stages, [['v1', 'v2', 'k8s']])
+
+    def test_all_graphs_and_cloud_services(self):
+        self.descriptor['forwarding_graphs'] = [
+            {'network_forwarding_paths': [path('fw', 'ids')]},
+            {'network_forwarding_paths': [path('proxy', 'web')]}]
+        stages = vim_stages(self.descriptor, self.functions, self.cloud_services)
+        self.assertEqual(stages, [['v1'], ['v2'], ['k8s']])
+
+    def test_loop_between_vims(self):
+        self.descriptor['forwarding_graphs'] = [
+            {'network_forwarding_paths': [path('fw', 'ids'), path('proxy', 'fw')]}]
+        with self.assertRaises(CycleError) as cm:
+            vim_stages(self.descriptor, self.functions, self.cloud_services)
+        self.assertEqual(len(cm.exception.path), 3)
+        self.assertEqual(set(cm.exception.path), set(['v1', 'v2']))
+
+
+    def test_break_loops(self):
+        stages = order_stages(['a', 'b', 'c', 'd'],
+                              [('a', 'b'), ('b', 'c'), ('c', 'd'), ('d', 'b')],
+                              break_loops=True)
+        self.assertEqual(stages, [['a'], ['b'], ['c'], ['d']])
+        self.descriptor['forwarding_graphs'] = [
+            {'network_forwarding_paths': [path('fw', 'ids'), path('proxy', 'fw')]}]
+        stages = vim_stages(self.descriptor, self.functions, self.cloud_services,
+                            break_loops=True)
+        self.assertEqual(stages, [['k8s'], ['v1'], ['v2']])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+import uuid
+
+from son_mano_slm.slm_ring import HashRing, instance_uuid
+
+
+class testSlmRing(unittest.TestCase):
+    """
+    Tests the ownership of services among SLMs (no broker needed).
+    """
+
+    def setUp(self):
+        self.keys = [str(uuid.uuid4()) for _ in range(3000)]
+
+    def test_empty(self):
+        self.assertIsNone(HashRing().owner('a'))
+
+    def test_same_owner_on_every_slm(self):
+        ring = HashRing(['slm1', 'slm2', 'slm3'])
+        other = HashRing(['slm3', 'slm1', 'slm2'])
+        for key in self.keys:
+            self.assertEqual(ring.owner(key), other.owner(key))
+
+    def test_spread(self):
+        ring = HashRing(['slm1', 'slm2', 'slm3'])
+        owners = [ring.owner(key) for key in self.keys]
+        for slm in ring.members:
+            self.assertGreater(owners.count(slm), len(self.keys) / 6)
+
+    def test_only_services_of_new_slm_move(self):
+        ring = HashRing(['slm1', 'slm2', 'slm3'])
+        before = dict((key, ring.owner(key)) for key in self.keys)
+        ring.set_members(['slm1', 'slm2', 'slm3', 'slm4'])
+        moved = [key for key in self.keys if ring.owner(key) != before[key]]
+        self.assertTrue(all(ring.owner(key) == 'slm4' for key in moved))
+        self.assertLess(len(moved), len(self.keys) / 2)
+
+    def test_instance_uuid(self):
+        self.assertEqual(instance_uuid('corr'), instance_uuid('corr'))
+        self.assertNotEqual(instance_uuid('corr'), instance_uuid('other'))
+        uuid.UUID(instance_uuid('corr'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+
+from sonmanobase import codec
+from son_mano_slm.slm_store import Checkpointer, MemoryStore, OwnershipLost, get_store
+
+
+class testSlmStore(unittest.TestCase):
+    """
+    Tests the checkpoints of the SLM ledger (no broker or database needed).
+    """
+
+    def setUp(self):
+        self.store = MemoryStore()
+        self.checkpointer = Checkpointer(self.store)
+
+    def test_incremental(self):
+        vnfd = codec.Encoded({'uuid': 'a', 'name': 'firewall'})
+        fields = {'status': 'INSTANTIATING', 'function': [{'vnfd': vnfd, 'id': '1'}]}
+        self.assertEqual(self.checkpointer.save('s', 'slm1', fields), 2)
+        self.assertEqual(self.checkpointer.save('s', 'slm1', dict(fields)), 0)
+        fields['status'] = 'READY'
+        self.assertEqual(self.checkpointer.save('s', 'slm1', fields), 1)
+
+        owner, loaded = self.store.load('s')
+        self.assertEqual(owner, 'slm1')
+        self.assertEqual(loaded, {'status': 'READY',
+                                  'function': [{'vnfd': {'uuid': 'a', 'name': 'firewall'}, 'id': '1'}]})
+
+        del fields['function']
+        self.checkpointer.save('s', 'slm1', fields)
+        self.assertEqual(self.store.load('s')[1], {'status': 'READY'})
+
+    def test_forget(self):
+        self.checkpointer.save('s', 'slm1', {'status': 'READY'})
+        self.checkpointer.forget('s')
+        self.assertIsNone(self.store.load('s'))
+        self.assertEqual(self.checkpointer.stats()['services'], 0)
+
+    def test_claim(self):
+        self.checkpointer.save('s', 'slm1', {'status': 'READY'})
+        self.checkpointer.save('t', 'slm2', {'status': 'READY'})
+        self.assertEqual(self.store.owned_by('slm1'), ['s'])
+        self.assertTrue(self.store.claim('s', 'slm1', 'slm2'))
+        # only one SLM takes over a service
+        self.assertFalse(self.store.claim('s', 'slm1', 'slm3'))
+        self.assertEqual(sorted(self.store.owned_by('slm2')), ['s', 't'])
+
+    def test_resumed(self):
+        self.checkpointer.save('s', 'slm1', {'status': 'READY', 'error': None})
+        other = Checkpointer(self.store)
+        self.assertTrue(self.store.claim('s', 'slm1', 'slm2'))
+        other.resumed('s', self.store.load('s')[1])
+        self.assertEqual(other.save('s', 'slm2', {'status': 'READY', 'error': 'failed'}), 1)
+        self.assertEqual(self.store.load('s')[0], 'slm2')
+
+    def test_ownership_lost(self):
+        self.checkpointer.save('s', 'slm1', {'status': 'READY', 'error': None})
+        self.assertTrue(self.store.claim('s', 'slm1', 'slm2'))
+        # the old owner doesn't take the service back
+        with self.assertRaises(OwnershipLost):
+            self.checkpointer.save('s', 'slm1', {'status': 'ERROR', 'error': None})
+        self.assertEqual(self.store.load('s'), ('slm2', {'status': 'READY', 'error': None}))
+        self.checkpointer.forget('s', 'slm1')
+        self.assertIsNotNone(self.store.load('s'))
+        # nor recreates it once the new owner removed it
+        self.checkpointer.save('t', 'slm1', {'status': 'READY'})
+        self.assertTrue(self.store.claim('t', 'slm1', 'slm2'))
+        self.store.delete('t', 'slm2')
+        with self.assertRaises(OwnershipLost):
+            self.checkpointer.save('t', 'slm1', {'status': 'ERROR'})
+        self.assertIsNone(self.store.load('t'))
+
+    def test_shared_memory_store(self):
+        self.assertIs(get_store('memory://test'), get_store('memory://test'))
+        self.assertIsNot(get_store('memory://test'), get_store('memory://other'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import time
+import unittest
+
+from son_mano_slm.slm_topology import TopologyCache, service_usage
+
+
+def vim(name, core_used=0, memory_used=0):
+    return {'vim_uuid': name, 'vim_type': 'Heat',
+            'core_total': 8, 'core_used': core_used,
+            'memory_total': 16, 'memory_used': memory_used}
+
+
+def vdu(cpu, memory):
+    return {'resource_requirements': {'cpu': {'vcpus': cpu},
+                                      'memory': {'size': memory}}}
+
+
+class testSlmTopology(unittest.TestCase):
+    """
+    Tests the topology cache with reservations (no broker needed).
+    """
+
+    def setUp(self):
+        self.cache = TopologyCache(ttl=60, max_age=120)
+        self.cache.update([vim('a'), vim('b', core_used=6)])
+
+    def test_cold(self):
+        cache = TopologyCache()
+        self.assertIsNone(cache.snapshot())
+        self.assertTrue(cache.needs_refresh())
+        # Only one refresh at a time
+        self.assertFalse(cache.needs_refresh())
+
+    def test_snapshot_equals_topology(self):
+        self.assertEqual(self.cache.snapshot(), [vim('a'), vim('b', core_used=6)])
+        self.assertFalse(self.cache.needs_refresh())
+
+    def test_service_usage(self):
+        functions = [{'id': 'f1', 'vnfd': {'virtual_deployment_units': [vdu(2, 4), vdu(1, 2)]}},
+                     {'id': 'f2', 'vnfd': {'virtual_deployment_units': [vdu(1, 1)]}}]
+        cloud_services = [{'id': 'c1', 'csd': {'virtual_deployment_units': [vdu(4, 3)]}}]
+        mapping = {'f1': {'vim': 'a'}, 'f2': {'vim': 'b'}, 'c1': {'vim': 'k'}}
+
+        usage = service_usage(functions, cloud_services, mapping)
+        self.assertEqual(usage, {'a': {'core': 3, 'memory': 6},
+                                 'b': {'core': 1, 'memory': 1},
+                                 'k': {'core': 0, 'memory': 3}})
+
+    def test_reservations_are_used(self):
+        self.assertTrue(self.cache.reserve('s1', {'a': {'core': 5, 'memory': 4}}))
+        snapshot = dict((v['vim_uuid'], v) for v in self.cache.snapshot())
+        self.assertEqual(snapshot['a']['core_used'], 5)
+        self.assertEqual(snapshot['a']['memory_used'], 4)
+
+        # The next placement conflicts with the first one
+        self.assertFalse(self.cache.reserve('s2', {'a': {'core': 4, 'memory': 1}}))
+        self.assertTrue(self.cache.reserve('s2', {'a': {'core': 4, 'memory': 1}}, force=True))
+        self.assertEqual(self.cache.stats()['conflicts'], 1)
+
+    def test_release(self):
+        self.cache.reserve('s1', {'a': {'core': 5, 'memory': 4}})
+        self.cache.release('s1')
+        self.assertEqual(self.cache.snapshot()[0], vim('a'))
+
+    def test_confirmed_until_reported(self):
+        requested = time.time()
+        self.cache.reserve('s1', {'a': {'core': 5, 'memory': 4}})
+        self.cache.confirm('s1')
+        # A deployed service is not released
+        self.cache.release('s1')
+
+        # A topology that was requested before the confirmation does not
+        # contain the service yet
+        self.cache.update([vim('a'), vim('b')], requested)
+        self.assertEqual(self.cache.snapshot()[0]['core_used'], 5)
+
+        self.cache.update([vim('a', 5, 4), vim('b')])
+        self.assertEqual(self.cache.snapshot()[0], vim('a', 5, 4))
+        self.assertEqual(self.cache.stats()['confirmed'], 0)
+
+    def test_update_merges(self):
+        first = self.cache.snapshot()
+        self.assertEqual(self.cache.update([vim('a'), vim('c')]), 1)
+        self.assertEqual([v['vim_uuid'] for v in self.cache.snapshot()], ['a', 'c'])
+        self.assertEqual(len(first), 2)
+
+    def test_invalidate(self):
+        self.cache.invalidate()
+        self.assertTrue(self.cache.needs_refresh())
+        self.assertIsNotNone(self.cache.snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+import json
+
+from son_mano_slm.slm_trace import Tracer, end_span, CANCELLED, ERROR, OK
+
+
+class testSlmTrace(unittest.TestCase):
+    """
+    Tests the spans of the SLM workflow traces (no broker needed).
+    """
+
+    def setUp(self):
+        self.tracer = Tracer(history=2)
+        self.ledger = {'current_workflow': 'instantiation', 'task_log': []}
+
+    def test_task_spans(self):
+        self.tracer.task_started('s', self.ledger, 0, 'validate_deploy_request')
+        self.tracer.task_returned('s', self.ledger, 0, paused=False)
+        self.tracer.task_started('s', self.ledger, 1, 'ia_prepare')
+        self.tracer.task_returned('s', self.ledger, 1, paused=True)
+
+        spans = self.ledger['task_log']
+        self.assertEqual(spans[0]['outcome'], OK)
+        # A waiting task ends when it is resumed
+        self.assertIsNone(spans[1]['end'])
+        self.tracer.task_resumed(self.ledger, 1)
+        self.assertEqual(spans[1]['outcome'], OK)
+
+    def test_early_resume(self):
+        self.tracer.task_started('s', self.ledger, 0, 'vnf_deploy')
+        self.tracer.task_resumed(self.ledger, 0)
+        self.tracer.task_returned('s', self.ledger, 0, paused=True)
+        self.assertEqual(self.ledger['task_log'][0]['outcome'], OK)
+
+    def test_call_spans(self):
+        self.tracer.task_started('s', self.ledger, 0, 'ia_prepare')
+        self.tracer.call_started('s', self.ledger, 'c1')
+        span = self.tracer.call_started('s', self.ledger, target='monitoring')
+        self.tracer.task_returned('s', self.ledger, 0, paused=True)
+
+        spans = self.ledger['task_log']
+        self.assertEqual(spans[1]['name'], 'IA')
+        self.assertEqual(spans[1]['task'], 'ia_prepare')
+        self.assertEqual(span['name'], 'monitoring')
+
+        self.tracer.call_ended(self.ledger, 'c1')
+        self.assertEqual(spans[1]['outcome'], OK)
+        end_span(span, ERROR)
+        self.assertEqual(span['outcome'], ERROR)
+
+    def test_fail(self):
+        self.tracer.task_started('s', self.ledger, 0, 'ia_prepare')
+        self.tracer.call_started('s', self.ledger, 'c1')
+        self.tracer.fail(self.ledger, 'prepare failed')
+        for span in self.ledger['task_log']:
+            self.assertEqual(span['outcome'], ERROR)
+            self.assertEqual(span['error'], 'prepare failed')
+
+    def test_finish(self):
+        self.tracer.task_started('s', self.ledger, 0, 'ia_prepare')
+        trace = self.tracer.finish('s', self.ledger)
+        self.assertEqual(trace['spans'][0]['outcome'], CANCELLED)
+        self.assertEqual(self.tracer.get('s'), trace)
+        # Traces are exported as JSON
+        self.assertEqual(json.loads(json.dumps(trace)), trace)
+
+    def test_history(self):
+        for serv_id in ['s1', 's2', 's3']:
+            self.tracer.finish(serv_id, {'task_log': []})
+        self.assertIsNone(self.tracer.get('s1'))
+        self.assertEqual(len(self.tracer.traces()), 2)
+
+    def test_stats(self):
+        for i, serv_id in enumerate(['s1', 's2']):
+            ledger = {'current_workflow': 'instantiation', 'task_log': []}
+            self.tracer.task_started(serv_id, ledger, 0, 'ia_prepare')
+            self.tracer.task_returned(serv_id, ledger, 0, paused=False)
+            span = ledger['task_log'][0]
+            span['end'] = span['start'] + i + 1
+            self.tracer.finish(serv_id, ledger)
+
+        stats = self.tracer.stats('instantiation')
+        self.assertEqual(stats['task']['ia_prepare']['count'], 2)
+        self.assertAlmostEqual(stats['task']['ia_prepare']['p50'], 1)
+        self.assertAlmostEqual(stats['task']['ia_prepare']['p99'], 2)
+        self.assertEqual(self.tracer.stats('termination'), {'task': {}, 'call': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
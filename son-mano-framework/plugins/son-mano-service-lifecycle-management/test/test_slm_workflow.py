@@ -0,0 +1,114 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+
+from son_mano_slm.slm_workflow import Workflow, DONE, PENDING, WAITING, RUNNING
+
+
+class testSlmWorkflow(unittest.TestCase):
+    """
+    Tests the task graph of the SLM workflows (no broker needed).
+    """
+
+    def test_linear(self):
+        schedule = ['a', 'b', 'a']
+        workflow = Workflow.linear(schedule)
+        self.assertIs(workflow.schedule, schedule)
+        self.assertEqual(workflow.take_ready(), [0])
+        self.assertEqual(schedule, ['b', 'a'])
+        self.assertEqual(workflow.take_ready(), [])
+        workflow.finish(0, False)
+        self.assertEqual(workflow.take_ready(), [1])
+        workflow.finish(1, False)
+        self.assertEqual(workflow.take_ready(), [2])
+        workflow.finish(2, False)
+        self.assertTrue(workflow.is_done())
+
+    def test_independent_tasks_start_together(self):
+        workflow = Workflow()
+        prepare = workflow.add('ia_prepare')
+        vnf = workflow.add('vnf_deploy', after=[prepare])
+        cs = workflow.add('cs_deploy', after=[prepare])
+        workflow.add('vnfs_start', after=[vnf, cs])
+
+        self.assertEqual(workflow.take_ready(), [prepare])
+        workflow.finish(prepare, False)
+        self.assertEqual(workflow.take_ready(), [vnf, cs])
+        self.assertEqual(workflow.schedule, ['vnfs_start'])
+
+        # both wait for responses, cs_deploy is answered first
+        workflow.finish(vnf, True)
+        workflow.finish(cs, True)
+        self.assertEqual(workflow.resume('cs_deploy'), cs)
+        self.assertEqual(workflow.take_ready(), [])
+        self.assertEqual(workflow.resume(), vnf)
+        self.assertEqual(workflow.take_ready(), [3])
+
+    def test_response_before_task_returned(self):
+        workflow = Workflow.linear(['vnf_deploy', 'vnfs_start'])
+        workflow.take_ready()
+        self.assertEqual(workflow.states()[0], ('vnf_deploy', RUNNING))
+        self.assertEqual(workflow.resume('vnf_deploy'), 0)
+        workflow.finish(0, True)
+        self.assertEqual(workflow.states()[0], ('vnf_deploy', DONE))
+        self.assertEqual(workflow.take_ready(), [1])
+
+    def test_resume_oldest_waiting(self):
+        workflow = Workflow()
+        workflow.add('a', after=[])
+        workflow.add('b', after=[])
+        workflow.take_ready()
+        workflow.finish(1, True)
+        workflow.finish(0, True)
+        self.assertEqual(workflow.states()[0], ('a', WAITING))
+        self.assertEqual(workflow.resume(), 1)
+        self.assertIsNone(workflow.resume('b'))
+
+    def test_restore(self):
+        workflow = Workflow.linear(['validate', 'vnf_deploy', 'vnfs_start'])
+        workflow.finish(workflow.take_ready()[0], False)
+        workflow.finish(workflow.take_ready()[0], True)
+
+        restored = Workflow.restore(workflow.to_dict())
+        # the task that waited for a response starts again
+        self.assertEqual(restored.states(), [('validate', DONE),
+                                             ('vnf_deploy', PENDING),
+                                             ('vnfs_start', PENDING)])
+        self.assertEqual(restored.schedule, ['vnf_deploy', 'vnfs_start'])
+        self.assertEqual(restored.take_ready(), [1])
+
+    def test_replace(self):
+        workflow = Workflow()
+        workflow.add('join_batch')
+        workflow.add('ia_prepare')
+        workflow.replace('join_batch', ['request_topology', 'SLM_mapping'])
+        self.assertEqual(workflow.schedule, ['request_topology', 'SLM_mapping', 'ia_prepare'])
+        ready = workflow.take_ready()
+        self.assertEqual([workflow.tasks[tid]['name'] for tid in ready], ['request_topology'])
+        workflow.finish(ready[0], False)
+        self.assertEqual([workflow.tasks[tid]['name'] for tid in workflow.take_ready()], ['SLM_mapping'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -65,6 +65,7 @@ setup(
     packages=find_packages(),
     install_requires=['amqpstorm', 'pytest', 'PyYAML', 'requests', 'psycopg2'],
     setup_requires=['pytest-runner'],
+    extras_require={'msgpack': ['msgpack']},
 
     # To provide executable scripts, use entry points in preference to the
     # "scripts" keyword. Entry points provide cross-platform support and allow
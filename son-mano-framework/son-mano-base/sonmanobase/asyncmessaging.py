@@ -0,0 +1,227 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import asyncio
+import logging
+import uuid
+
+from sonmanobase import messaging
+
+logging.basicConfig(level=logging.INFO)
+LOG = logging.getLogger("son-mano-base:asyncmessaging")
+LOG.setLevel(logging.DEBUG)
+
+
+class AsyncManoBrokerRequestResponseConnection(object):
+    """
+    asyncio flavour of ManoBrokerRequestResponseConnection.
+
+    The broker transport (channel pool, consumers) is the one of
+    ManoBrokerRequestResponseConnection. Deliveries are handed over to the
+    event loop, so callbacks run on the loop and may be coroutine functions.
+    Pending requests are plain futures, which allows thousands of in-flight
+    calls without blocking any thread.
+    """
+
+    def __init__(self, app_id, loop=None, **kwargs):
+        """
+        Initialize broker connection.
+        :param app_id: string that identifies application
+        :param loop: event loop callbacks are executed on (default: current loop)
+        :param kwargs: passed to ManoBrokerRequestResponseConnection
+        """
+        self.app_id = app_id
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._conn = messaging.ManoBrokerRequestResponseConnection(app_id, **kwargs)
+
+    def _run_blocking(self, func, *args):
+        return self._loop.run_in_executor(None, func, *args)
+
+    def _call_cbf(self, cbf, *args):
+        """
+        Execute a callback on the loop. Coroutine functions are scheduled as tasks.
+        """
+        try:
+            result = cbf(*args)
+        except BaseException:
+            LOG.exception("Error in callback %r:" % cbf)
+            return
+        if asyncio.iscoroutine(result):
+            asyncio.ensure_future(result, loop=self._loop)
+
+    def _to_loop(self, cbf):
+        """
+        Generates a transport callback that forwards deliveries to the loop.
+        """
+
+        def _on_delivery(*args):
+            self._loop.call_soon_threadsafe(self._call_cbf, cbf, *args)
+
+        return _on_delivery
+
+    async def publish(self, topic, message, properties=None):
+        """
+        Topic-based message publishing.
+        :param topic: topic the message is published to
+        :param message: the message (JSON/YAML/STRING)
+        :param properties: custom properties for the message (as dict)
+        """
+        await self._run_blocking(self._conn.publish, topic, message, properties)
+
+    async def subscribe(self, cbf, topic, subscription_queue=None):
+        """
+        Subscribe to a topic.
+        :param cbf: (coroutine) function cbf(channel, method, properties, body)
+        :param topic: topic to subscribe to
+        :param subscription_queue: optional queue name
+        :return: name of the subscription queue
+        """
+        return await self._run_blocking(self._conn.subscribe, self._to_loop(cbf), topic, subscription_queue)
+
+    async def call_async(self, cbf, topic, msg=None, key="default",
+                         content_type=None,
+                         correlation_id=None,
+                         headers=None,
+                         timeout=None,
+                         on_timeout=None):
+        """
+        Sends a request message to a topic. cbf is called on the loop when a
+        reply is received.
+        :param cbf: (coroutine) function that is called when the reply is received
+        :param topic: topic for this call
+        :param msg: the message (STRING)
+        :param key: additional header field
+        :param content_type: default: application/msgpack for bytes, application/json otherwise
+        :param correlation_id: used to match requests to replies (generated if not given)
+        :param headers: dictionary with additional header fields
+        :param timeout: time in s after which the call is dropped if no reply arrived
+        :param on_timeout: (coroutine) function(topic, correlation_id) called if the call is dropped
+        :return: correlation id of the request
+        """
+        if cbf is None:
+            raise BaseException(
+                "No callback function (cbf) given to call_async. Use notify if you want one-way communication.")
+        correlation_id = str(uuid.uuid4()) if correlation_id is None else correlation_id
+        await self._run_blocking(
+            lambda: self._conn.call_async(self._to_loop(cbf), topic, msg=msg, key=key,
+                                          content_type=content_type,
+                                          correlation_id=correlation_id,
+                                          headers=headers,
+                                          timeout=timeout,
+                                          on_timeout=None if on_timeout is None else self._to_loop(on_timeout)))
+        return correlation_id
+
+    async def call_sync(self, topic, msg=None, key="default",
+                        content_type=None,
+                        correlation_id=None,
+                        headers=None,
+                        timeout=20):
+        """
+        Request an endpoint and wait for its response without blocking the loop.
+        :param topic: topic for communication (callee has to be described to it)
+        :param msg: actual message
+        :param key: optional identifier for endpoints
+        :param content_type: type of message
+        :param correlation_id: allow to set individual correlation ids
+        :param headers: header dict
+        :param timeout: time in s to wait for a response
+        :return: message tuple: (ch, method, props, body) or None on timeout
+        """
+        response = self._loop.create_future()
+
+        def result_cbf(ch, method, props, body):
+            if not response.done():
+                response.set_result((ch, method, props, body))
+
+        await self.call_async(result_cbf, topic, msg=msg, key=key,
+                              content_type=content_type,
+                              correlation_id=correlation_id,
+                              headers=headers,
+                              timeout=timeout)
+        try:
+            return await asyncio.wait_for(response, timeout)
+        except asyncio.TimeoutError:
+            LOG.debug("call_sync on %r timed out after %rs" % (topic, timeout))
+            return None
+
+    async def notify(self, topic, msg=None, key="default",
+                     content_type=None,
+                     correlation_id=None,
+                     headers=None,
+                     reply_to=None):
+        """
+        Sends a simple one-way notification that does not expect a reply.
+        """
+        await self._run_blocking(
+            lambda: self._conn.notify(topic, msg=msg, key=key,
+                                      content_type=content_type,
+                                      correlation_id=correlation_id,
+                                      headers=headers,
+                                      reply_to=reply_to))
+
+    async def register_async_endpoint(self, cbf, topic):
+        """
+        Expose cbf as request endpoint. cbf may be a coroutine function, its
+        (awaited) return value is sent back as response.
+        :param cbf: function to be called when requests with the given topic are received
+        :param topic: topic for requests and responses
+        :return: name of the subscription queue
+        """
+
+        async def _on_request(ch, method, props, body):
+            # verify that the message is a request (reply_to != None)
+            if props.reply_to is None:
+                return
+            result = cbf(ch, method, props, body)
+            if asyncio.iscoroutine(result):
+                result = await result
+            await self._run_blocking(self._conn._on_execute_async_finished, ch, method, props, result)
+
+        queue = await self.subscribe(_on_request, topic)
+        LOG.debug("Registered async endpoint: topic: %r cbf: %r" % (topic, cbf))
+        return queue
+
+    async def register_notification_endpoint(self, cbf, topic, key="default"):
+        """
+        Register a (coroutine) function for notifications on the given topic.
+        :return: name of the subscription queue
+        """
+
+        def _on_notification(ch, method, props, body):
+            # verify that the message is a notification (reply_to == None)
+            if props.reply_to is not None:
+                return
+            return cbf(ch, method, props, body)
+
+        return await self.subscribe(_on_notification, topic)
+
+    def stop_connection(self):
+        self._conn.stop_connection()
+
+    def stop_threads(self):
+        self._conn.stop_threads()
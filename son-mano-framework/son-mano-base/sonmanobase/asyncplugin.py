@@ -0,0 +1,218 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import asyncio
+import logging
+import json
+import os
+
+from sonmanobase.asyncmessaging import AsyncManoBrokerRequestResponseConnection
+
+logging.basicConfig(level=logging.INFO)
+LOG = logging.getLogger("son-mano-base:asyncplugin")
+LOG.setLevel(logging.DEBUG)
+
+
+class AsyncManoBasePlugin(object):
+    """
+    asyncio counterpart of ManoBasePlugin.
+    Subscriptions, registration, heartbeats and lifecycle handling all run on
+    one event loop. Subclasses implement their handlers as coroutines and
+    talk to the broker through the awaitable API of self.manoconn.
+
+    Usage:
+        plugin = MyPlugin(start_running=False)
+        plugin.run_forever()
+    """
+
+    def __init__(self,
+                 name="son-plugin",
+                 version=None,
+                 description=None,
+                 auto_register=True,
+                 wait_for_registration=True,
+                 start_running=True,
+                 auto_heartbeat_rate=0.5,
+                 loop=None):
+        """
+        Prepares the plugin. The broker connection is set up by start().
+        :param name: Plugin name prefix
+        :param version: Plugin version
+        :param description: A description string
+        :param auto_register: Automatically register on start
+        :param wait_for_registration: Wait for registration before start() returns
+        :param start_running: Run the event loop forever at the end of init
+        :param auto_heartbeat_rate: rate of automatic heartbeat notifications 1/n seconds. 0=deactivated
+        :param loop: event loop to use (default: current loop)
+        """
+        self.name = "%s.%s" % (name, self.__class__.__name__)
+        self.version = version
+        self.description = description
+        self.uuid = None  # uuid given by plugin manager on registration
+        self.state = None  # the state of this plugin READY/RUNNING/PAUSED/FAILED
+        self.manoconn = None
+        self.auto_register = auto_register
+        self.wait_for_registration = wait_for_registration
+        self.auto_heartbeat_rate = auto_heartbeat_rate
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        self._registered = None
+        if start_running:
+            self.run_forever()
+
+    def run_forever(self):
+        """
+        Start the plugin and keep the event loop running.
+        """
+        self.loop.run_until_complete(self.start())
+        self.loop.run_until_complete(self.run())
+
+    async def start(self):
+        """
+        Connect to the broker, declare subscriptions, register at the
+        plugin manager and kick-off the heartbeat.
+        """
+        LOG.info("Starting async MANO Plugin: %r ..." % self.name)
+        self._registered = asyncio.Event()
+        while True:
+            try:
+                self.manoconn = AsyncManoBrokerRequestResponseConnection(self.name, loop=self.loop)
+                break
+            except BaseException:
+                await asyncio.sleep(5)
+        LOG.info("Plugin connected to broker.")
+
+        await self.declare_subscriptions()
+        if self.auto_register:
+            await self.register()
+            if self.wait_for_registration:
+                await self._registered.wait()
+        if self.auto_heartbeat_rate > 0:
+            asyncio.ensure_future(self._auto_heartbeat(self.auto_heartbeat_rate), loop=self.loop)
+
+    async def stop(self):
+        await self.deregister()
+        self.manoconn.stop_connection()
+        self.manoconn.stop_threads()
+
+    async def _auto_heartbeat(self, rate):
+        while True:
+            if self.uuid is not None:
+                await self._send_heartbeat()
+            await asyncio.sleep(1 / rate)
+
+    async def _send_heartbeat(self):
+        await self.manoconn.notify(
+            "platform.management.plugin.%s.heartbeat" % str(self.uuid),
+            json.dumps({"uuid": self.uuid,
+                        "state": str(self.state)}))
+
+    async def declare_subscriptions(self):
+        """
+        Can be overwritten by subclass.
+        But: The this superclass method should be called in any case.
+        """
+        await self.manoconn.register_notification_endpoint(
+            self.on_plugin_status_update,
+            "platform.management.plugin.status")
+
+    async def run(self):
+        """
+        To be overwritten by subclass
+        """
+        # keep the loop alive, all work is done in callbacks
+        await asyncio.Event().wait()
+
+    async def on_lifecycle_start(self, ch, method, properties, message):
+        LOG.debug("Received lifecycle.start event.")
+        self.state = "RUNNING"
+
+    async def on_lifecycle_pause(self, ch, method, properties, message):
+        LOG.debug("Received lifecycle.pause event.")
+        self.state = "PAUSED"
+
+    async def on_lifecycle_stop(self, ch, method, properties, message):
+        LOG.debug("Received lifecycle.stop event.")
+        await self.deregister()
+        os._exit(0)
+
+    async def on_registration_ok(self):
+        """
+        To be overwritten by subclass
+        """
+        LOG.debug("Received registration ok event.")
+
+    async def on_plugin_status_update(self, ch, method, properties, message):
+        """
+        To be overwritten by subclass.
+        """
+        LOG.debug("Received plugin status update %r." % str(message))
+
+    async def register(self, timeout=5):
+        """
+        Register this plugin at the plugin manager, retrying until it answers.
+        """
+        message = {"name": self.name,
+                   "version": self.version,
+                   "description": self.description}
+        while self.uuid is None:
+            result = await self.manoconn.call_sync("platform.management.plugin.register",
+                                                   json.dumps(message),
+                                                   timeout=timeout)
+            if result is not None:
+                await self._on_register_response(*result)
+
+    async def _on_register_response(self, ch, method, props, response):
+        response = json.loads(str(response))
+        if response.get("status") != "OK":
+            LOG.debug("Response %r" % response)
+            LOG.error("Plugin registration failed. Exit.")
+            exit(1)
+        self.uuid = response.get("uuid")
+        self.state = "READY"
+        LOG.info("Plugin registered with UUID: %r" % response.get("uuid"))
+        await self.on_registration_ok()
+        await self._register_lifecycle_endpoints()
+        await self._send_heartbeat()
+        self._registered.set()
+
+    async def deregister(self):
+        LOG.info("De-registering plugin...")
+        result = await self.manoconn.call_sync("platform.management.plugin.deregister",
+                                               json.dumps({"uuid": self.uuid}))
+        if result is None or json.loads(str(result[3])).get("status") != "OK":
+            LOG.error("Plugin de-registration failed.")
+            return
+        LOG.info("Plugin de-registered.")
+
+    async def _register_lifecycle_endpoints(self):
+        if self.uuid is not None:
+            for event, cbf in [("start", self.on_lifecycle_start),
+                               ("pause", self.on_lifecycle_pause),
+                               ("stop", self.on_lifecycle_stop)]:
+                await self.manoconn.register_notification_endpoint(
+                    cbf, "platform.management.plugin.%s.lifecycle.%s" % (str(self.uuid), event))
@@ -0,0 +1,245 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+# Payload codec used for all messages exchanged between MANO plugins.
+#
+# encode() serializes a message in the configured wire format (YAML by
+# default, see the "message_content_type" env variable). decode() picks
+# the parser based on the content_type of the message and on the payload
+# itself: many peers label YAML bodies as application/json, so JSON
+# parsing falls back to YAML transparently. YAML is handled by the libyaml
+# C loader/dumper when PyYAML was built with it. msgpack is used only if
+# the msgpack package is installed. msgpack payloads are bytes and are
+# recognised as such even if they are labelled with another content_type.
+#
+# Parts of messages that are sent many times, e.g. descriptors, can be
+# wrapped in Encoded. They are serialized once, as JSON, and encode()
+# splices that text into every JSON payload. YAML payloads don't reuse
+# it: YAML doesn't read all JSON alike (e.g. 1e+20 is a string and
+# surrogate escapes are rejected), so Encoded parts are dumped as YAML.
+
+import binascii
+import itertools
+import json
+import logging
+import os
+import threading
+import yaml
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+LOG = logging.getLogger("son-mano-base:codec")
+LOG.setLevel(logging.DEBUG)
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_YAML = "application/x-yaml"
+CONTENT_TYPE_MSGPACK = "application/msgpack"
+
+# wire format of outgoing messages
+DEFAULT_CONTENT_TYPE = os.environ.get("message_content_type", CONTENT_TYPE_YAML)
+
+# prefer the libyaml bindings
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+# marks the places of Encoded parts while a payload is serialized
+_SPLICE_PREFIX = "encoded_" + binascii.hexlify(os.urandom(6)).decode("ascii") + "_"
+_splice = threading.local()
+_splice_ids = itertools.count()
+
+
+class Encoded(object):
+    """
+    A part of a message that keeps its serialized form. It must not be
+    changed once it was serialized.
+    """
+    __slots__ = ("value", "_json")
+
+    def __init__(self, value):
+        self.value = value
+        self._json = None
+
+    @property
+    def json(self):
+        if self._json is None:
+            self._json = json.dumps(self.value, default=str)
+        return self._json
+
+    def updated(self, **fields):
+        """
+        A copy with additional top-level fields that reuses the serialized
+        form, e.g. to add instance ids to a descriptor.
+        """
+        if not isinstance(self.value, dict) or any(k in self.value for k in fields):
+            value = dict(self.value)
+            value.update(fields)
+            return Encoded(value)
+        value = dict(self.value, **fields)
+        extended = Encoded(value)
+        extra = json.dumps(fields, default=str)[1:-1]
+        if self.json == "{}":
+            extended._json = "{" + extra + "}"
+        else:
+            extended._json = self.json[:-1] + ", " + extra + "}"
+        return extended
+
+    def __repr__(self):
+        return "Encoded(%r)" % (self.value,)
+
+
+def _placeholder(encoded):
+    token = _SPLICE_PREFIX + str(next(_splice_ids))
+    _splice.parts[token] = encoded.json
+    return token
+
+
+def _json_default(obj):
+    if isinstance(obj, Encoded):
+        return _placeholder(obj)
+    return str(obj)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, Encoded):
+        return obj.value
+    raise TypeError("Object of type %s is not msgpack serializable" % type(obj).__name__)
+
+
+def _represent_encoded(dumper, data):
+    return dumper.represent_data(data.value)
+
+
+class _Dumper(YAML_DUMPER):
+
+    def ignore_aliases(self, data):
+        # shared parts are repeated, as in JSON, not turned into aliases
+        return True
+
+
+_Dumper.add_representer(Encoded, _represent_encoded)
+
+
+def _splice_parts(payload):
+    for token, text in _splice.parts.items():
+        payload = payload.replace('"' + token + '"', text, 1)
+    return payload
+
+
+def _is_msgpack(content_type):
+    return content_type is not None and "msgpack" in content_type
+
+
+def _is_json(content_type):
+    return content_type is not None and "json" in content_type
+
+
+def _looks_like_msgpack(payload):
+    # msgpack maps and arrays start with bytes that can't start a JSON or
+    # YAML document
+    return len(payload) > 0 and (0x80 <= payload[0] <= 0x9f or 0xdc <= payload[0] <= 0xdf)
+
+
+def content_type_for(payload, content_type=None):
+    """
+    Content type to label an encoded payload with.
+    :param payload: result of encode()
+    :param content_type: explicitly given content_type (if any)
+    :return: content_type, msgpack for bytes and application/json for text,
+             which peers expect for YAML bodies as well
+    """
+    if content_type is not None:
+        return content_type
+    if isinstance(payload, bytes):
+        return CONTENT_TYPE_MSGPACK
+    return CONTENT_TYPE_JSON
+
+
+def yaml_load(payload):
+    """
+    Parse a YAML (or JSON) document with the fastest available safe loader.
+    """
+    return yaml.load(payload, Loader=YAML_LOADER)
+
+
+def yaml_dump(content):
+    """
+    Serialize content as YAML with the fastest available dumper.
+    """
+    return yaml.dump(content, Dumper=YAML_DUMPER, default_flow_style=False)
+
+
+def encode(content, content_type=None):
+    """
+    Serialize a message.
+    :param content: message content (dict, list, ...)
+    :param content_type: wire format, defaults to DEFAULT_CONTENT_TYPE
+    :return: str (bytes for msgpack)
+    """
+    if content_type is None:
+        content_type = DEFAULT_CONTENT_TYPE
+    if _is_msgpack(content_type):
+        if msgpack is not None:
+            return msgpack.packb(content, use_bin_type=True, default=_msgpack_default)
+        LOG.warning("msgpack not installed, encoding message as YAML")
+    _splice.parts = {}
+    try:
+        if _is_json(content_type):
+            return _splice_parts(json.dumps(content, default=_json_default))
+        return yaml.dump(content, Dumper=_Dumper, default_flow_style=False)
+    finally:
+        _splice.parts = {}
+
+
+def decode(payload, content_type=None):
+    """
+    Parse a message.
+    :param payload: message body
+    :param content_type: content_type property of the message (if known)
+    :return: message content
+    """
+    if isinstance(payload, bytes):
+        if msgpack is not None:
+            if _is_msgpack(content_type):
+                return msgpack.unpackb(payload, raw=False)
+            if _looks_like_msgpack(payload):
+                try:
+                    return msgpack.unpackb(payload, raw=False)
+                except ValueError:
+                    pass
+        payload = payload.decode("utf-8")
+    if payload[:1] in ("{", "["):
+        # JSON fast path, YAML flow style documents end up in the fallback
+        try:
+            return json.loads(payload)
+        except ValueError:
+            pass
+    return yaml_load(payload)
@@ -0,0 +1,113 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Correlation id index for the ledgers of the lifecycle managers.
+
+Responses from other components only carry the correlation id of the
+request. The ledgers store the correlation ids of the outstanding
+requests of an entry in its 'act_corr_id' field (a single id or a list).
+CorrelationIndex maps them back to the ledger key without scanning the
+ledger. It has to be updated wherever 'act_corr_id' is set or cleared.
+"""
+import threading
+
+
+class CorrelationIndex(object):
+
+    def __init__(self):
+        self._keys = {}
+        self._corr_ids = {}
+        self._lock = threading.Lock()
+
+    def set(self, key, corr_ids):
+        """
+        Replace the correlation ids of a ledger entry.
+        :param key: ledger key, e.g. the service instance id
+        :param corr_ids: correlation id, list of correlation ids or None
+        """
+        if corr_ids is None:
+            corr_ids = []
+        elif not isinstance(corr_ids, (list, tuple, set)):
+            corr_ids = [corr_ids]
+        with self._lock:
+            self._remove_key(key)
+            if corr_ids:
+                self._corr_ids[key] = set(str(c) for c in corr_ids)
+                for corr_id in self._corr_ids[key]:
+                    self._keys[corr_id] = key
+
+    def add(self, key, corr_id):
+        with self._lock:
+            self._corr_ids.setdefault(key, set()).add(str(corr_id))
+            self._keys[str(corr_id)] = key
+
+    def discard(self, corr_id):
+        with self._lock:
+            key = self._keys.pop(str(corr_id), None)
+            if key is not None:
+                corr_ids = self._corr_ids.get(key)
+                if corr_ids is not None:
+                    corr_ids.discard(str(corr_id))
+                    if not corr_ids:
+                        del self._corr_ids[key]
+
+    def remove(self, key):
+        """
+        Forget all correlation ids of a ledger entry.
+        """
+        with self._lock:
+            self._remove_key(key)
+
+    def _remove_key(self, key):
+        for corr_id in self._corr_ids.pop(key, ()):
+            if self._keys.get(corr_id) == key:
+                del self._keys[corr_id]
+
+    def rebuild(self, ledger):
+        """
+        Index all entries of a ledger.
+        :param ledger: dict key -> entry with an optional 'act_corr_id' field
+        """
+        with self._lock:
+            self._keys = {}
+            self._corr_ids = {}
+        for key, entry in ledger.items():
+            self.set(key, entry.get('act_corr_id'))
+
+    def get(self, corr_id, default=None):
+        """
+        :return: ledger key of the correlation id or default
+        """
+        return self._keys.get(str(corr_id), default)
+
+    def __contains__(self, corr_id):
+        return str(corr_id) in self._keys
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,212 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+LOG = logging.getLogger("son-mano-base:instrumentation")
+LOG.setLevel(logging.DEBUG)
+
+# header stamped on each published message if instrumentation is enabled
+PUBLISH_TIMESTAMP_HEADER = "published_at_us"
+
+# upper bounds (in s) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def now_us():
+    """
+    Current wall clock time in microseconds (fits into an AMQP long long header).
+    """
+    return int(time.time() * 1000000)
+
+
+class Histogram(object):
+    """
+    Cumulative histogram with fixed buckets (Prometheus semantics).
+    Not thread-safe, callers hold the lock of MessagingMetrics.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+class MessagingMetrics(object):
+    """
+    Per-topic message bus metrics of a broker connection:
+    - published messages and bytes
+    - delivery latency (publish timestamp header -> callback start)
+    - handler execution time
+    - request -> reply round-trip time of call_async/call_sync
+    """
+
+    HISTOGRAMS = ("delivery_latency", "handler_duration", "call_round_trip")
+
+    def __init__(self, app_id):
+        self.app_id = app_id
+        self._lock = threading.Lock()
+        self._published = {}
+        self._published_bytes = {}
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+
+    def _observe(self, name, topic, seconds):
+        with self._lock:
+            hist = self._histograms[name].get(topic)
+            if hist is None:
+                hist = self._histograms[name][topic] = Histogram()
+            hist.observe(seconds)
+
+    def observe_publish(self, topic, message):
+        size = len(message) if message is not None else 0
+        with self._lock:
+            self._published[topic] = self._published.get(topic, 0) + 1
+            self._published_bytes[topic] = self._published_bytes.get(topic, 0) + size
+
+    def observe_delivery(self, topic, headers):
+        """
+        Record the queue-to-callback latency of a delivery that carries a
+        publish timestamp header.
+        """
+        if not headers:
+            return
+        stamp = headers.get(PUBLISH_TIMESTAMP_HEADER)
+        if stamp is None:
+            return
+        try:
+            latency = (now_us() - int(stamp)) / 1000000.0
+        except (TypeError, ValueError):
+            return
+        self._observe("delivery_latency", topic, max(latency, 0.0))
+
+    def observe_handler(self, topic, seconds):
+        self._observe("handler_duration", topic, seconds)
+
+    def observe_round_trip(self, topic, seconds):
+        self._observe("call_round_trip", topic, seconds)
+
+    def snapshot(self):
+        """
+        Programmatic view of all metrics.
+        :return: dict
+        """
+        with self._lock:
+            result = {"published": dict(self._published),
+                      "published_bytes": dict(self._published_bytes)}
+            for name, per_topic in self._histograms.items():
+                result[name] = {t: h.snapshot() for t, h in per_topic.items()}
+            return result
+
+
+def _labels(**labels):
+    return ",".join('%s="%s"' % (k, str(v).replace('"', '\\"')) for k, v in sorted(labels.items()))
+
+
+def to_prometheus(app_id, snapshot, gauges=None):
+    """
+    Render a MessagingMetrics snapshot (and optional flat gauges) in the
+    Prometheus text exposition format.
+    :param app_id: value of the app_id label
+    :param snapshot: MessagingMetrics.snapshot()
+    :param gauges: dict metric name -> value
+    :return: str
+    """
+    lines = []
+    for name, help_text in [("published", "Messages published per topic."),
+                            ("published_bytes", "Payload bytes published per topic.")]:
+        metric = "son_mano_broker_%s_total" % name
+        lines.append("# HELP %s %s" % (metric, help_text))
+        lines.append("# TYPE %s counter" % metric)
+        for topic, value in sorted(snapshot.get(name, {}).items()):
+            lines.append("%s{%s} %d" % (metric, _labels(app_id=app_id, topic=topic), value))
+    for name in MessagingMetrics.HISTOGRAMS:
+        metric = "son_mano_broker_%s_seconds" % name
+        lines.append("# TYPE %s histogram" % metric)
+        for topic, hist in sorted(snapshot.get(name, {}).items()):
+            for bound, count in hist["buckets"]:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append("%s_bucket{%s} %d" % (metric, _labels(app_id=app_id, topic=topic, le=le), count))
+            lines.append("%s_sum{%s} %f" % (metric, _labels(app_id=app_id, topic=topic), hist["sum"]))
+            lines.append("%s_count{%s} %d" % (metric, _labels(app_id=app_id, topic=topic), hist["count"]))
+    for metric, value in sorted((gauges or {}).items()):
+        lines.append("# TYPE son_mano_%s gauge" % metric)
+        lines.append("son_mano_%s{%s} %s" % (metric, _labels(app_id=app_id), value))
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port, render, host="0.0.0.0"):
+    """
+    Serve the output of render() as Prometheus text on http://host:port/metrics
+    in a daemon thread.
+    :param port: TCP port
+    :param render: function returning the metrics text
+    :return: HTTPServer
+    """
+
+    class _Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer((host, port), _Handler)
+    t = threading.Thread(target=server.serve_forever, name="metrics-server")
+    t.daemon = True
+    t.start()
+    LOG.info("Metrics endpoint listening on port %d" % port)
+    return server
@@ -0,0 +1,447 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+# In-process stand-in for RabbitMQ.
+#
+# Implements the subset of the amqpstorm connection/channel API that is used
+# by sonmanobase.messaging on top of an in-memory topic exchange: wildcard
+# routing (* and #), reply_to/correlation_id passing, basic.qos prefetch and
+# ack/reject semantics. Connections are created by ManoBrokerConnection for
+# URLs like "memory://" or "memory://<name>", all connections with the same
+# URL share one broker instance.
+
+import collections
+import copy
+import functools
+import itertools
+import logging
+import threading
+
+LOG = logging.getLogger("son-mano-base:memorybroker")
+LOG.setLevel(logging.INFO)
+
+MEMORY_URL_SCHEME = "memory://"
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+class MemoryBrokerError(Exception):
+    pass
+
+
+def is_memory_url(url):
+    return url is not None and url.startswith(MEMORY_URL_SCHEME)
+
+
+def get_broker(url=MEMORY_URL_SCHEME):
+    """
+    Broker instance for the given memory:// URL (created on first use).
+    """
+    with _brokers_lock:
+        broker = _brokers.get(url)
+        if broker is None:
+            broker = _brokers[url] = MemoryBroker()
+        return broker
+
+
+def reset_broker(url=MEMORY_URL_SCHEME):
+    """
+    Drop the broker instance of the given URL (queues and messages are lost).
+    """
+    with _brokers_lock:
+        _brokers.pop(url, None)
+
+
+def connect(url=MEMORY_URL_SCHEME):
+    """
+    Open a connection to the in-memory broker behind url.
+    """
+    return MemoryConnection(get_broker(url))
+
+
+@functools.lru_cache(maxsize=4096)
+def topic_matches(pattern, routing_key):
+    """
+    AMQP topic matching: words are separated by '.', '*' matches exactly
+    one word, '#' matches zero or more words.
+    """
+    return _match(tuple(pattern.split(".")), tuple(routing_key.split(".")))
+
+
+def _match(pattern, key):
+    if len(pattern) == 0:
+        return len(key) == 0
+    if pattern[0] == "#":
+        if _match(pattern[1:], key):
+            return True
+        return len(key) > 0 and _match(pattern, key[1:])
+    if len(key) == 0:
+        return False
+    if pattern[0] == "*" or pattern[0] == key[0]:
+        return _match(pattern[1:], key[1:])
+    return False
+
+
+class _Queue(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.messages = collections.deque()
+        # consumer_tag -> channel
+        self.consumers = collections.OrderedDict()
+
+
+class MemoryBroker(object):
+    """
+    Topic exchanges and queues of one in-memory broker.
+    A single lock protects all state; each channel waits on its own
+    condition so a publish only wakes the channels consuming the target queues.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.exchanges = set()
+        self.queues = {}
+        # exchange -> routing key -> set of queue names (bindings without wildcards)
+        self._exact = collections.defaultdict(lambda: collections.defaultdict(set))
+        # exchange -> list of (pattern, queue name)
+        self._wildcard = collections.defaultdict(list)
+        self._delivery_tags = itertools.count(1)
+        # counters
+        self.published = 0
+        self.routed = 0
+        self.unroutable = 0
+
+    def declare_queue(self, name):
+        with self.lock:
+            if name not in self.queues:
+                self.queues[name] = _Queue(name)
+            return self.queues[name]
+
+    def bind(self, queue, routing_key, exchange):
+        with self.lock:
+            self.declare_queue(queue)
+            if "*" in routing_key or "#" in routing_key:
+                if (routing_key, queue) not in self._wildcard[exchange]:
+                    self._wildcard[exchange].append((routing_key, queue))
+            else:
+                self._exact[exchange][routing_key].add(queue)
+
+    def delete_queue(self, name):
+        with self.lock:
+            q = self.queues.pop(name, None)
+            for bindings in self._exact.values():
+                for queues in bindings.values():
+                    queues.discard(name)
+            for exchange, bindings in self._wildcard.items():
+                self._wildcard[exchange] = [b for b in bindings if b[1] != name]
+            if q is None:
+                return
+            # cancel consumers of the deleted queue
+            for tag, channel in list(q.consumers.items()):
+                channel._cancel(tag)
+
+    def route(self, exchange, routing_key):
+        queues = set(self._exact[exchange].get(routing_key, ()))
+        for pattern, queue in self._wildcard[exchange]:
+            if topic_matches(pattern, routing_key):
+                queues.add(queue)
+        return queues
+
+    def publish(self, exchange, routing_key, body, properties):
+        with self.lock:
+            self.published += 1
+            targets = self.route(exchange, routing_key)
+            if len(targets) == 0:
+                self.unroutable += 1
+                return
+            wake = set()
+            for name in targets:
+                q = self.queues.get(name)
+                if q is None:
+                    continue
+                self.routed += 1
+                q.messages.append((exchange, routing_key, body, properties, False))
+                wake.update(q.consumers.values())
+            for channel in wake:
+                channel._wakeup.notify()
+
+    def requeue(self, queue_name, entry):
+        with self.lock:
+            q = self.queues.get(queue_name)
+            if q is None:
+                return
+            exchange, routing_key, body, properties, _ = entry
+            q.messages.appendleft((exchange, routing_key, body, properties, True))
+            for channel in set(q.consumers.values()):
+                channel._wakeup.notify()
+
+    def next_delivery_tag(self):
+        return next(self._delivery_tags)
+
+
+class MemoryMessage(object):
+    """
+    Delivered message, mimics amqpstorm.Message.
+    """
+
+    def __init__(self, channel, queue_name, entry, consumer_tag, delivery_tag):
+        exchange, routing_key, body, properties, redelivered = entry
+        self.channel = channel
+        self.body = body
+        self.method = {"consumer_tag": consumer_tag,
+                       "delivery_tag": delivery_tag,
+                       "redelivered": redelivered,
+                       "exchange": exchange,
+                       "routing_key": routing_key}
+        # every delivery gets its own copy (callbacks mutate properties)
+        self.properties = copy.deepcopy(properties)
+        self._queue_name = queue_name
+        self._entry = entry
+
+    def ack(self):
+        self.channel._settle(self.method["delivery_tag"])
+
+    def reject(self, requeue=True):
+        self.channel._settle(self.method["delivery_tag"], requeue=requeue)
+
+    def nack(self, requeue=True):
+        self.reject(requeue=requeue)
+
+
+class _Exchange(object):
+
+    def __init__(self, channel):
+        self._channel = channel
+
+    def declare(self, exchange="", exchange_type="direct", **kwargs):
+        with self._channel._broker.lock:
+            self._channel._broker.exchanges.add(exchange)
+
+
+class _QueueApi(object):
+
+    def __init__(self, channel):
+        self._channel = channel
+
+    def declare(self, queue="", **kwargs):
+        self._channel._check_open()
+        self._channel._broker.declare_queue(queue)
+
+    def bind(self, queue="", exchange="", routing_key="", **kwargs):
+        self._channel._check_open()
+        self._channel._broker.bind(queue, routing_key, exchange)
+
+    def delete(self, queue="", **kwargs):
+        self._channel._check_open()
+        self._channel._broker.delete_queue(queue)
+
+
+class _Basic(object):
+
+    def __init__(self, channel):
+        self._channel = channel
+
+    def qos(self, prefetch_count=0, **kwargs):
+        self._channel.prefetch = prefetch_count
+
+    def publish(self, body, routing_key, exchange="", properties=None, **kwargs):
+        self._channel._check_open()
+        self._channel._broker.publish(exchange, routing_key, body, copy.deepcopy(properties or {}))
+
+    def consume(self, callback=None, queue="", consumer_tag="", no_ack=False, **kwargs):
+        channel = self._channel
+        channel._check_open()
+        broker = channel._broker
+        with broker.lock:
+            q = broker.queues.get(queue)
+            if q is None:
+                raise MemoryBrokerError("NOT_FOUND - no queue %r" % queue)
+            channel._consumers[consumer_tag] = (queue, callback, no_ack)
+            q.consumers[consumer_tag] = channel
+            channel._wakeup.notify()
+        return consumer_tag
+
+    def cancel(self, consumer_tag=""):
+        self._channel._cancel(consumer_tag)
+
+
+class MemoryChannel(object):
+    """
+    Channel of a MemoryConnection, mimics amqpstorm.Channel.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._broker = connection.broker
+        self._wakeup = threading.Condition(self._broker.lock)
+        # consumer_tag -> (queue, callback, no_ack)
+        self._consumers = collections.OrderedDict()
+        # delivery_tag -> (queue, entry)
+        self._unacked = {}
+        self._open = True
+        self._consuming = False
+        self.prefetch = 0
+        self.exchange = _Exchange(self)
+        self.queue = _QueueApi(self)
+        self.basic = _Basic(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def is_open(self):
+        return self._open and self._connection.is_open
+
+    @property
+    def is_closed(self):
+        return not self.is_open
+
+    @property
+    def consumer_tags(self):
+        return list(self._consumers.keys())
+
+    def _check_open(self):
+        if not self.is_open:
+            raise MemoryBrokerError("channel is closed")
+
+    def _cancel(self, consumer_tag):
+        with self._broker.lock:
+            entry = self._consumers.pop(consumer_tag, None)
+            if entry is not None:
+                q = self._broker.queues.get(entry[0])
+                if q is not None:
+                    q.consumers.pop(consumer_tag, None)
+            self._wakeup.notify_all()
+
+    def _settle(self, delivery_tag, requeue=False):
+        with self._broker.lock:
+            pending = self._unacked.pop(delivery_tag, None)
+            if pending is not None and requeue:
+                self._broker.requeue(*pending)
+            self._wakeup.notify_all()
+
+    def _next_delivery(self):
+        """
+        Pick the next message for one of this channel's consumers.
+        Caller holds the broker lock.
+        """
+        if 0 < self.prefetch <= len(self._unacked):
+            return None
+        for tag, (queue_name, callback, no_ack) in self._consumers.items():
+            q = self._broker.queues.get(queue_name)
+            if q is None or len(q.messages) == 0:
+                continue
+            entry = q.messages.popleft()
+            delivery_tag = self._broker.next_delivery_tag()
+            if not no_ack:
+                self._unacked[delivery_tag] = (queue_name, entry)
+            # rotate consumers for fairness
+            self._consumers.move_to_end(tag)
+            return callback, MemoryMessage(self, queue_name, entry, tag, delivery_tag)
+        return None
+
+    def process_data_events(self, to_tuple=False, auto_decode=True, timeout=0.1):
+        """
+        Deliver all messages that are ready, wait up to timeout if there are none.
+        :return: number of delivered messages
+        """
+        delivered = 0
+        while self.is_open:
+            with self._broker.lock:
+                delivery = self._next_delivery()
+                if delivery is None:
+                    if delivered > 0 or len(self._consumers) == 0:
+                        return delivered
+                    self._wakeup.wait(timeout)
+                    delivery = self._next_delivery()
+                    if delivery is None:
+                        return delivered
+            callback, msg = delivery
+            callback(msg)
+            delivered += 1
+        return delivered
+
+    def start_consuming(self, to_tuple=False, auto_decode=True):
+        """
+        Consume until the channel is closed or has no consumers left.
+        """
+        self._consuming = True
+        try:
+            while self.is_open and len(self._consumers) > 0:
+                self.process_data_events(to_tuple=to_tuple, auto_decode=auto_decode)
+        finally:
+            self._consuming = False
+
+    def stop_consuming(self):
+        for tag in list(self._consumers.keys()):
+            self._cancel(tag)
+
+    def close(self):
+        with self._broker.lock:
+            if not self._open:
+                return
+            self.stop_consuming()
+            self._open = False
+            # unacked messages go back to their queues
+            for delivery_tag in list(self._unacked.keys()):
+                self._broker.requeue(*self._unacked.pop(delivery_tag))
+            self._wakeup.notify_all()
+            self._connection._channels.discard(self)
+
+
+class MemoryConnection(object):
+    """
+    Connection to a MemoryBroker, mimics amqpstorm.UriConnection.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self._channels = set()
+        self._open = True
+
+    @property
+    def is_open(self):
+        return self._open
+
+    def channel(self):
+        if not self._open:
+            raise MemoryBrokerError("connection is closed")
+        channel = MemoryChannel(self)
+        with self.broker.lock:
+            self._channels.add(channel)
+        return channel
+
+    def close(self):
+        for channel in list(self._channels):
+            channel.close()
+        self._open = False
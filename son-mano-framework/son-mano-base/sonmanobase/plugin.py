@@ -33,6 +33,7 @@ import os
 import threading
 
 from sonmanobase import messaging
+from sonmanobase import instrumentation
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("son-mano-base:plugin")
@@ -59,7 +60,8 @@ class ManoBasePlugin(object):
                  auto_register=True,
                  wait_for_registration=True,
                  start_running=True,
-                 auto_heartbeat_rate=0.5):
+                 auto_heartbeat_rate=0.5,
+                 metrics_port=None):
         """
         Performs plugin initialization steps, e.g., connection setup
         :param name: Plugin name prefix
@@ -68,6 +70,7 @@ class ManoBasePlugin(object):
         :param auto_register: Automatically register on init
         :param wait_for_registration: Wait for registration before returning from init
         :param auto_heartbeat_rate: rate of automatic heartbeat notifications 1/n seconds. 0=deactivated
+        :param metrics_port: serve Prometheus metrics on this port (default: env metrics_port, None=off)
         :return:
         """
         self.name = "%s.%s" % (name, self.__class__.__name__)
@@ -87,6 +90,13 @@ class ManoBasePlugin(object):
                 time.sleep(5)
         # register subscriptions
         LOG.info("Plugin connected to broker.")
+        # expose message bus metrics
+        if metrics_port is None:
+            metrics_port = os.environ.get("metrics_port")
+        self._metrics_server = None
+        if metrics_port is not None:
+            self._metrics_server = instrumentation.start_metrics_server(
+                int(metrics_port), self.get_metrics_text)
 
         self.declare_subscriptions()
         # register to plugin manager
@@ -112,6 +122,24 @@ class ManoBasePlugin(object):
         self.manoconn.stop_threads()
         del self.manoconn
 
+    def get_metrics(self):
+        """
+        Programmatic snapshot of the message bus metrics of this plugin.
+        Per-topic metrics are only collected if the broker connection was
+        created with instrumentation enabled (env broker_instrumentation=true).
+        :return: dict
+        """
+        return self.manoconn.get_metrics()
+
+    def get_metrics_text(self):
+        """
+        Message bus metrics in the Prometheus text format.
+        :return: str
+        """
+        return instrumentation.to_prometheus(self.name,
+                                             self.manoconn.get_metrics(),
+                                             self.manoconn.get_metrics_gauges())
+
     def _auto_heartbeat(self, rate):
         """
         A simple periodic heartbeat mechanism.
@@ -0,0 +1,143 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Versioned plugin status updates.
+
+The plugin manager broadcasts plugin status changes on
+'platform.management.plugin.status' as deltas:
+
+    {"timestamp": ..., "type": "delta", "seq": 42,
+     "added": {uuid: plugin}, "changed": {uuid: plugin}, "removed": [uuid]}
+
+'seq' increases by one with every broadcast. A subscriber that misses a
+message requests a full snapshot on STATUS_SNAPSHOT_TOPIC:
+
+    {"timestamp": ..., "type": "snapshot", "seq": 42, "plugin_dict": {uuid: plugin}}
+
+PluginStatusView keeps the state on the subscriber side. Heartbeat
+timestamps alone don't make a plugin 'changed'.
+"""
+import datetime
+import logging
+
+LOG = logging.getLogger("son-mano-base:pluginstatus")
+LOG.setLevel(logging.INFO)
+
+STATUS_TOPIC = "platform.management.plugin.status"
+STATUS_SNAPSHOT_TOPIC = "platform.management.plugin.status.snapshot"
+
+TYPE_DELTA = "delta"
+TYPE_SNAPSHOT = "snapshot"
+
+# plugin fields that change without a change of the plugin
+VOLATILE_FIELDS = ("last_heartbeat_at",)
+
+
+def _stable(plugin):
+    if not isinstance(plugin, dict):
+        return plugin
+    return dict((k, v) for k, v in plugin.items() if k not in VOLATILE_FIELDS)
+
+
+def diff(old, new):
+    """
+    Compare two plugin dicts.
+    :param old: dict uuid -> plugin dict
+    :param new: dict uuid -> plugin dict
+    :return: (added, changed, removed) with added/changed dicts and removed a sorted list of uuids
+    """
+    added = {}
+    changed = {}
+    for uuid, plugin in new.items():
+        if uuid not in old:
+            added[uuid] = plugin
+        elif _stable(old[uuid]) != _stable(plugin):
+            changed[uuid] = plugin
+    removed = sorted(uuid for uuid in old if uuid not in new)
+    return added, changed, removed
+
+
+def delta_message(seq, added, changed, removed):
+    return {"timestamp": str(datetime.datetime.now()),
+            "type": TYPE_DELTA,
+            "seq": seq,
+            "added": added,
+            "changed": changed,
+            "removed": removed}
+
+
+def snapshot_message(seq, plugin_dict):
+    return {"timestamp": str(datetime.datetime.now()),
+            "type": TYPE_SNAPSHOT,
+            "seq": seq,
+            "plugin_dict": plugin_dict}
+
+
+class PluginStatusView(object):
+    """
+    Subscriber side state of the plugin status stream.
+    """
+
+    def __init__(self):
+        self.seq = None
+        self.plugins = {}
+
+    def apply(self, message):
+        """
+        Apply a status message.
+        :param message: decoded delta or snapshot message
+        :return: (added, changed, removed) or None if a message was missed and a snapshot is needed
+        """
+        seq = message.get("seq")
+        if message.get("type", TYPE_SNAPSHOT) == TYPE_SNAPSHOT:
+            if seq is not None and self.seq is not None and seq < self.seq:
+                # outdated snapshot, we already know more
+                return {}, {}, []
+            plugin_dict = message.get("plugin_dict") or {}
+            result = diff(self.plugins, plugin_dict)
+            self.plugins = dict(plugin_dict)
+            self.seq = seq
+            return result
+
+        if self.seq is not None and seq <= self.seq:
+            # duplicate or reordered delta
+            return {}, {}, []
+        if self.seq is None or seq != self.seq + 1:
+            LOG.info("Missed plugin status update (have %r, got %r)" % (self.seq, seq))
+            return None
+
+        added = message.get("added") or {}
+        changed = message.get("changed") or {}
+        removed = [uuid for uuid in message.get("removed") or [] if uuid in self.plugins]
+        self.plugins.update(added)
+        self.plugins.update(changed)
+        for uuid in removed:
+            del self.plugins[uuid]
+        self.seq = seq
+        return added, changed, removed
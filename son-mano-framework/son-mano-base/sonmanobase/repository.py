@@ -0,0 +1,246 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Client for the record repositories (NSR, COSR, VNFR and CSR) of the
+catalogue, shared by the lifecycle management plugins.
+
+All writes go through one HTTP session with a persistent connection pool.
+Independent writes of a service are sent concurrently, bounded by
+WRITE_CONCURRENCY, and the outcome is reported per record. Repositories
+that accept a list of records in one request can be written with a single
+bulk request; this is switched on with the env repo_bulk_writes=true and
+falls back to single writes if a repository rejects the bulk endpoint.
+"""
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+LOG = logging.getLogger("son-mano-base:repository")
+LOG.setLevel(logging.INFO)
+
+# max number of records written at the same time
+WRITE_CONCURRENCY = int(os.environ.get("repo_write_concurrency", 8))
+# max number of pooled connections per repository host
+POOL_SIZE = int(os.environ.get("repo_pool_size", 20))
+# seconds before a write is given up
+WRITE_TIMEOUT = float(os.environ.get("repo_write_timeout", 1.0))
+# whether the repositories accept a list of records in one request
+BULK_WRITES = os.environ.get("repo_bulk_writes", "false").lower() == "true"
+
+# status codes with which a repository signals it has no bulk endpoint
+BULK_UNSUPPORTED = (404, 405, 501)
+
+HEADER = {'Content-Type': 'application/json'}
+
+RecordWrite = namedtuple('RecordWrite', ['key', 'method', 'url', 'record', 'bulk_url'])
+RecordWrite.__new__.__defaults__ = (None,)
+
+
+def _new_session(pool_size):
+    import requests
+
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                            pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _response_error(response):
+    """
+    :return: None if the repository accepted the write,
+             {'http_code': code, 'message': body} otherwise
+    """
+    if response.status_code == 200:
+        return None
+    try:
+        message = response.json()
+    except ValueError:
+        message = response.text
+    return {'http_code': response.status_code, 'message': message}
+
+
+class RepositoryClient(object):
+
+    def __init__(self, concurrency=WRITE_CONCURRENCY, pool_size=POOL_SIZE,
+                 timeout=WRITE_TIMEOUT, bulk=BULK_WRITES, session=None):
+        """
+        :param concurrency: max number of records written at the same time
+        :param pool_size: max number of pooled connections per host
+        :param timeout: seconds before a write is given up
+        :param bulk: write records that share a bulk_url in one request
+        :param session: HTTP session to use, a pooled one is created if None
+        """
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.bulk = bulk
+        self._pool_size = pool_size
+        self._session = session
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._lock = threading.Lock()
+        self._no_bulk = set()
+        self._stats = {'writes': 0, 'bulk_writes': 0, 'failures': 0}
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = _new_session(self._pool_size)
+            return self._session
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def write(self, method, url, record):
+        """
+        Write a single record.
+        :param method: 'POST' to create, 'PUT' to update a record
+        :param url: url of the record (collection for POST)
+        :param record: dict
+        :return: None on success, {'http_code': code, 'message': msg} otherwise
+        """
+        self._count('writes')
+        try:
+            response = self.session.request(method, url,
+                                            data=json.dumps(record),
+                                            headers=HEADER,
+                                            timeout=self.timeout)
+            error = _response_error(response)
+        except Exception as e:
+            LOG.debug("Write to " + url + " failed: " + str(e))
+            error = {'http_code': '0',
+                     'message': 'Timeout when contacting ' + url}
+        if error is not None:
+            self._count('failures')
+            LOG.info(method + " " + url + " not accepted: " + str(error))
+        return error
+
+    def _write_bulk(self, method, bulk_url, writes):
+        """
+        Write records to a repository in one request.
+        :return: {key: error} or None if the repository has no bulk endpoint
+        """
+        self._count('bulk_writes')
+        try:
+            response = self.session.request(method, bulk_url,
+                                            data=json.dumps([w.record for w in writes]),
+                                            headers=HEADER,
+                                            timeout=self.timeout * len(writes))
+        except Exception as e:
+            LOG.debug("Bulk write to " + bulk_url + " failed: " + str(e))
+            error = {'http_code': '0',
+                     'message': 'Timeout when contacting ' + bulk_url}
+        else:
+            if response.status_code in BULK_UNSUPPORTED:
+                LOG.info("No bulk " + method + " on " + bulk_url +
+                         ", falling back to single writes")
+                with self._lock:
+                    self._no_bulk.add((method, bulk_url))
+                return None
+            error = _response_error(response)
+        if error is not None:
+            self._count('failures', len(writes))
+        return dict((w.key, error) for w in writes)
+
+    def write_all(self, writes):
+        """
+        Write independent records concurrently.
+        :param writes: list of RecordWrite
+        :return: dict with the error (or None) of each record, by key
+        """
+        results = {}
+        single = []
+        groups = {}
+        for w in writes:
+            if self.bulk and w.bulk_url is not None and \
+                    (w.method, w.bulk_url) not in self._no_bulk:
+                groups.setdefault((w.method, w.bulk_url), []).append(w)
+            else:
+                single.append(w)
+
+        bulk_futures = []
+        for (method, bulk_url), group in groups.items():
+            if len(group) == 1:
+                single.extend(group)
+                continue
+            future = self._executor.submit(self._write_bulk, method, bulk_url, group)
+            bulk_futures.append((group, future))
+
+        futures = [(w, self._executor.submit(self.write, w.method, w.url, w.record))
+                   for w in single]
+
+        for group, future in bulk_futures:
+            result = future.result()
+            if result is None:
+                futures.extend((w, self._executor.submit(self.write, w.method, w.url, w.record))
+                               for w in group)
+            else:
+                results.update(result)
+
+        for w, future in futures:
+            results[w.key] = future.result()
+        return results
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def stop(self):
+        self._executor.shutdown(wait=False)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(session=None):
+    """
+    :param session: HTTP session to use if the client is not created yet
+    :return: the repository client shared within this process
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = RepositoryClient(session=session)
+        return _client
+
+
+def first_error(results, writes):
+    """
+    :return: the error of the first failed write, in the order of writes
+    """
+    for w in writes:
+        if results.get(w.key) is not None:
+            return results[w.key]
+    return None
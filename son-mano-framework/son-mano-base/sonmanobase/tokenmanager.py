@@ -0,0 +1,194 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+Cache for the gatekeeper access token of a plugin.
+
+The token is requested once and refreshed in the background shortly
+before it expires, so callers get a valid token without waiting for a
+login. The expiry is read from the 'exp' claim of JWT tokens, other tokens
+are assumed to be valid for DEFAULT_TOKEN_TTL seconds.
+"""
+import base64
+import json
+import logging
+import threading
+import time
+
+LOG = logging.getLogger("son-mano-base:tokenmanager")
+LOG.setLevel(logging.INFO)
+
+# seconds a token without expiry information is assumed to be valid
+DEFAULT_TOKEN_TTL = 300
+# seconds before the expiry at which the token is refreshed
+REFRESH_MARGIN = 30
+# seconds between login attempts after a failed refresh
+RETRY_INTERVAL = 5
+
+
+def token_expiry(token, default_ttl=DEFAULT_TOKEN_TTL):
+    """
+    :param token: access token
+    :return: expiry as unix timestamp
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload.encode('utf-8')).decode('utf-8'))
+        return float(claims['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return time.time() + default_ttl
+
+
+def is_unauthorized(result):
+    """
+    Default check for a rejected token: a requests response or a
+    {'error': code, 'content': ...} dict with code 401.
+    """
+    if isinstance(result, dict):
+        return str(result.get('error')) == '401'
+    return getattr(result, 'status_code', None) == 401
+
+
+class TokenManager(object):
+
+    def __init__(self, login, refresh_margin=REFRESH_MARGIN,
+                 default_ttl=DEFAULT_TOKEN_TTL, retry_interval=RETRY_INTERVAL):
+        """
+        :param login: function without arguments that returns a new token or None
+        :param refresh_margin: seconds before expiry at which the token is refreshed
+        :param default_ttl: validity of tokens without 'exp' claim
+        :param retry_interval: seconds between retries of a failed refresh
+        """
+        self._login = login
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.retry_interval = retry_interval
+        self._token = None
+        self._expiry = 0
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._refresher = None
+        self.logins = 0
+
+    def set_token(self, token):
+        """
+        Use a token that was obtained elsewhere, e.g. while registering.
+        """
+        if token is None:
+            return
+        with self._lock:
+            self._token = token
+            self._expiry = token_expiry(token, self.default_ttl)
+        self._start_refresher()
+
+    def get_token(self, block=True):
+        """
+        :param block: log in if there is no valid token
+        :return: token or None
+        """
+        with self._lock:
+            if self._token is not None and time.time() < self._expiry:
+                return self._token
+        if not block:
+            return None
+        return self.refresh()
+
+    def refresh(self, rejected=None):
+        """
+        Log in and cache the new token. Concurrent callers share one login.
+        :param rejected: token that was rejected, no new login is done if it was already replaced
+        :return: token or None
+        """
+        with self._login_lock:
+            with self._lock:
+                if rejected is not None and self._token != rejected:
+                    return self._token
+                if rejected is None and self._token is not None and \
+                        time.time() < self._expiry - self.refresh_margin:
+                    return self._token
+            try:
+                token = self._login()
+            except Exception:
+                LOG.exception("Login failed")
+                token = None
+            self.logins += 1
+            if token is None:
+                if rejected is not None:
+                    self.invalidate(rejected)
+                return self.get_token(block=False)
+            self.set_token(token)
+            return token
+
+    def invalidate(self, token):
+        with self._lock:
+            if self._token == token:
+                self._token = None
+                self._expiry = 0
+
+    def call(self, fn, unauthorized=is_unauthorized):
+        """
+        Call fn(token) and retry once with a new token if it was rejected.
+        """
+        token = self.get_token()
+        result = fn(token)
+        if unauthorized(result):
+            LOG.info("Token rejected, logging in again")
+            result = fn(self.refresh(rejected=token))
+        return result
+
+    def _start_refresher(self):
+        with self._lock:
+            if self._refresher is not None or self._stopped:
+                self._wakeup.set()
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="token-refresh")
+            self._refresher.daemon = True
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stopped:
+            with self._lock:
+                delay = self._expiry - self.refresh_margin - time.time()
+            if delay > 0:
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                continue
+            token = self.refresh()
+            with self._lock:
+                delay = self._expiry - self.refresh_margin - time.time()
+            if token is None or delay <= 0:
+                # login failed or token lifetime shorter than the margin
+                self._wakeup.wait(self.retry_interval)
+                self._wakeup.clear()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
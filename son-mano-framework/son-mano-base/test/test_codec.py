@@ -0,0 +1,118 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+import yaml
+
+from sonmanobase import codec
+
+
+class TestCodec(unittest.TestCase):
+    """
+    Test encoding/decoding of plugin messages (no broker needed).
+    """
+
+    def setUp(self):
+        self.message = {"serv_id": "1234",
+                        "vnfs": [{"id": 1, "vim": None}, {"id": 2, "vim": "abc"}],
+                        "status": "INSTANTIATING: step 1"}
+
+    def test_roundtrip(self):
+        for content_type in [None, codec.CONTENT_TYPE_JSON, codec.CONTENT_TYPE_YAML]:
+            payload = codec.encode(self.message, content_type)
+            self.assertEqual(codec.decode(payload, content_type), self.message)
+
+    def test_yaml_labelled_as_json(self):
+        """
+        Peers that send YAML with the default application/json content_type.
+        """
+        payload = yaml.dump(self.message)
+        self.assertEqual(codec.decode(payload, codec.CONTENT_TYPE_JSON), self.message)
+
+    def test_yaml_flow_style(self):
+        self.assertEqual(codec.decode("{serv_id: 1234}", codec.CONTENT_TYPE_JSON), {"serv_id": 1234})
+
+    def test_bytes_payload(self):
+        self.assertEqual(codec.decode(b'{"a": [1, 2]}'), {"a": [1, 2]})
+
+    @unittest.skipIf(codec.msgpack is None, "msgpack not installed")
+    def test_msgpack(self):
+        payload = codec.encode(self.message, codec.CONTENT_TYPE_MSGPACK)
+        self.assertEqual(codec.decode(payload, codec.CONTENT_TYPE_MSGPACK), self.message)
+
+    def test_encoded_parts(self):
+        """
+        Encoded parts are spliced into the payload and serialized only once.
+        """
+        vnfd = {"uuid": "abc", "name": "firewall", "descr": "a: \"b\"\n#c"}
+        part = codec.Encoded(vnfd)
+        message = {"vnfd": part, "vnfds": [part, part.updated(instance_uuid="1")]}
+        expected = {"vnfd": vnfd, "vnfds": [vnfd, dict(vnfd, instance_uuid="1")]}
+        for content_type in [codec.CONTENT_TYPE_JSON, codec.CONTENT_TYPE_YAML]:
+            payload = codec.encode(message, content_type)
+            self.assertEqual(codec.decode(payload, content_type), expected)
+        vnfd["name"] = "changed"
+        self.assertIn("firewall", codec.encode({"vnfd": part}, codec.CONTENT_TYPE_JSON))
+        self.assertNotIn("instance_uuid", vnfd)
+
+    def test_encoded_yaml_scalars(self):
+        """
+        Encoded parts survive YAML, which reads some JSON differently.
+        """
+        vnfd = {"n": 1e20, "m": -2.5e-7, "name": "fw \U0001F600", "i": 10}
+        for content_type in [None, codec.CONTENT_TYPE_JSON, codec.CONTENT_TYPE_YAML]:
+            payload = codec.encode({"vnfd": codec.Encoded(vnfd)}, content_type)
+            self.assertEqual(codec.decode(payload, content_type), {"vnfd": vnfd})
+            self.assertIsInstance(codec.decode(payload)["vnfd"]["n"], float)
+
+    def test_encoded_parts_are_not_shared(self):
+        part = codec.Encoded({"a": 1})
+        content = codec.decode(codec.encode({"x": part, "y": part}, codec.CONTENT_TYPE_YAML))
+        self.assertEqual(content, {"x": {"a": 1}, "y": {"a": 1}})
+        self.assertIsNot(content["x"], content["y"])
+
+    @unittest.skipIf(codec.msgpack is None, "msgpack not installed")
+    def test_encoded_msgpack(self):
+        payload = codec.encode({"vnfd": codec.Encoded({"a": 1})}, codec.CONTENT_TYPE_MSGPACK)
+        self.assertEqual(codec.decode(payload, codec.CONTENT_TYPE_MSGPACK), {"vnfd": {"a": 1}})
+
+    @unittest.skipIf(codec.msgpack is None, "msgpack not installed")
+    def test_msgpack_labelled_as_json(self):
+        """
+        msgpack payloads are recognised without (or with a wrong) content_type.
+        """
+        payload = codec.encode(self.message, codec.CONTENT_TYPE_MSGPACK)
+        self.assertEqual(codec.decode(payload), self.message)
+        self.assertEqual(codec.decode(payload, codec.CONTENT_TYPE_JSON), self.message)
+        self.assertEqual(codec.content_type_for(payload), codec.CONTENT_TYPE_MSGPACK)
+        self.assertEqual(codec.content_type_for("{}"), codec.CONTENT_TYPE_JSON)
+
+    @unittest.skipIf(codec.msgpack is None, "msgpack not installed")
+    def test_msgpack_unserializable(self):
+        with self.assertRaises(TypeError):
+            codec.encode({"a": object()}, codec.CONTENT_TYPE_MSGPACK)
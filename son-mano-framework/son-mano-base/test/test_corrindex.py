@@ -0,0 +1,77 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+
+from sonmanobase.corrindex import CorrelationIndex
+
+
+class TestCorrelationIndex(unittest.TestCase):
+    """
+    Test the correlation id -> ledger key index.
+    """
+
+    def setUp(self):
+        self.index = CorrelationIndex()
+
+    def test_set_and_replace(self):
+        self.index.set("s1", "c1")
+        self.index.set("s2", ["c2", "c3"])
+        self.assertEqual(self.index.get("c1"), "s1")
+        self.assertEqual(self.index.get("c3"), "s2")
+        # a new request replaces the old correlation ids
+        self.index.set("s2", "c4")
+        self.assertIsNone(self.index.get("c2"))
+        self.assertEqual(self.index.get("c4"), "s2")
+        self.index.set("s1", None)
+        self.assertNotIn("c1", self.index)
+        self.assertEqual(len(self.index), 1)
+
+    def test_add_discard_remove(self):
+        self.index.set("s1", [])
+        self.index.add("s1", "c1")
+        self.index.add("s1", "c2")
+        self.index.discard("c1")
+        self.assertIsNone(self.index.get("c1"))
+        self.assertEqual(self.index.get("c2"), "s1")
+        self.index.remove("s1")
+        self.assertEqual(len(self.index), 0)
+
+    def test_rebuild(self):
+        ledger = {"s1": {"act_corr_id": "c1"},
+                  "s2": {"act_corr_id": ["c2"]},
+                  "s3": {}}
+        self.index.add("old", "c0")
+        self.index.rebuild(ledger)
+        self.assertIsNone(self.index.get("c0"))
+        self.assertEqual(self.index.get("c2"), "s2")
+        self.assertEqual(len(self.index), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
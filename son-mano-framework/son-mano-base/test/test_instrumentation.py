@@ -0,0 +1,85 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+import urllib.request
+
+from sonmanobase import instrumentation
+
+
+class TestMessagingMetrics(unittest.TestCase):
+    """
+    Test the message bus metrics (no broker needed).
+    """
+
+    def setUp(self):
+        self.m = instrumentation.MessagingMetrics("test-app")
+
+    def test_publish_counters(self):
+        self.m.observe_publish("test.topic", "abc")
+        self.m.observe_publish("test.topic", "defg")
+        snapshot = self.m.snapshot()
+        self.assertEqual(snapshot["published"]["test.topic"], 2)
+        self.assertEqual(snapshot["published_bytes"]["test.topic"], 7)
+
+    def test_delivery_latency(self):
+        stamp = instrumentation.now_us() - 20000
+        self.m.observe_delivery("test.topic", {instrumentation.PUBLISH_TIMESTAMP_HEADER: stamp})
+        # messages from peers without instrumentation are ignored
+        self.m.observe_delivery("test.topic", {"key": "default"})
+        self.m.observe_delivery("test.topic", None)
+        hist = self.m.snapshot()["delivery_latency"]["test.topic"]
+        self.assertEqual(hist["count"], 1)
+        self.assertGreaterEqual(hist["sum"], 0.02)
+
+    def test_histogram_buckets(self):
+        for value in [0.0001, 0.003, 0.003, 100.0]:
+            self.m.observe_handler("test.topic", value)
+        buckets = dict(self.m.snapshot()["handler_duration"]["test.topic"]["buckets"])
+        self.assertEqual(buckets[0.0005], 1)
+        self.assertEqual(buckets[0.005], 3)
+        self.assertEqual(buckets[60.0], 3)
+        self.assertEqual(buckets[float("inf")], 4)
+
+    def test_prometheus_text(self):
+        self.m.observe_publish("test.topic", "abc")
+        self.m.observe_round_trip("test.topic", 0.2)
+        text = instrumentation.to_prometheus("test-app", self.m.snapshot(), {"broker_pending_calls_outstanding": 3})
+        self.assertIn('son_mano_broker_published_total{app_id="test-app",topic="test.topic"} 1', text)
+        self.assertIn('son_mano_broker_call_round_trip_seconds_bucket{app_id="test-app",le="0.25",topic="test.topic"} 1',
+                      text)
+        self.assertIn('son_mano_broker_call_round_trip_seconds_count{app_id="test-app",topic="test.topic"} 1', text)
+        self.assertIn('son_mano_broker_pending_calls_outstanding{app_id="test-app"} 3', text)
+
+    def test_metrics_server(self):
+        server = instrumentation.start_metrics_server(0, lambda: "metric 1\n", host="127.0.0.1")
+        try:
+            url = "http://127.0.0.1:%d/metrics" % server.server_address[1]
+            self.assertEqual(urllib.request.urlopen(url).read().decode("utf-8"), "metric 1\n")
+        finally:
+            server.shutdown()
@@ -0,0 +1,148 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+import time
+
+from sonmanobase import memorybroker
+from sonmanobase import benchmark
+from sonmanobase.messaging import ManoBrokerRequestResponseConnection
+
+
+class TestTopicMatching(unittest.TestCase):
+
+    def test_wildcards(self):
+        self.assertTrue(memorybroker.topic_matches("a.b.c", "a.b.c"))
+        self.assertTrue(memorybroker.topic_matches("a.*.c", "a.b.c"))
+        self.assertFalse(memorybroker.topic_matches("a.*.c", "a.b.b.c"))
+        self.assertTrue(memorybroker.topic_matches("a.#", "a"))
+        self.assertTrue(memorybroker.topic_matches("a.#", "a.b.c"))
+        self.assertTrue(memorybroker.topic_matches("#.c", "a.b.c"))
+        self.assertTrue(memorybroker.topic_matches("a.#.c", "a.c"))
+        self.assertFalse(memorybroker.topic_matches("a.#.d", "a.b.c"))
+        self.assertTrue(memorybroker.topic_matches("#", "anything.at.all"))
+
+
+class TestMemoryBroker(unittest.TestCase):
+    """
+    Test the in-process broker on the amqpstorm-like channel API.
+    """
+
+    def setUp(self):
+        self.url = "memory://test-memorybroker"
+        memorybroker.reset_broker(self.url)
+        self.conn = memorybroker.connect(self.url)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_prefetch_and_ack(self):
+        channel = self.conn.channel()
+        channel.queue.declare("q1")
+        channel.queue.bind(queue="q1", routing_key="test.*", exchange="ex")
+        channel.basic.qos(2)
+        received = []
+        channel.basic.consume(received.append, "q1", consumer_tag="q1")
+        for i in range(0, 5):
+            channel.basic.publish(body="%d" % i, routing_key="test.topic", exchange="ex",
+                                  properties={"correlation_id": "c%d" % i, "reply_to": "r"})
+        channel.process_data_events()
+        # prefetch window is full until messages are acked
+        self.assertEqual([m.body for m in received], ["0", "1"])
+        self.assertEqual(received[0].properties["correlation_id"], "c0")
+        self.assertEqual(received[0].method["routing_key"], "test.topic")
+        received[0].ack()
+        received[1].reject(requeue=True)
+        channel.process_data_events()
+        self.assertEqual([m.body for m in received], ["0", "1", "1", "2"])
+        self.assertTrue(received[2].method["redelivered"])
+
+    def test_close_requeues_unacked(self):
+        channel = self.conn.channel()
+        channel.queue.declare("q2")
+        channel.queue.bind(queue="q2", routing_key="test.close", exchange="ex")
+        received = []
+        channel.basic.consume(received.append, "q2", consumer_tag="c1")
+        channel.basic.publish(body="m", routing_key="test.close", exchange="ex")
+        channel.process_data_events()
+        channel.close()
+        other = self.conn.channel()
+        again = []
+        other.basic.consume(again.append, "q2", consumer_tag="c2")
+        other.process_data_events()
+        self.assertEqual([m.body for m in again], ["m"])
+
+
+class TestRequestResponseOverMemoryBroker(unittest.TestCase):
+    """
+    Run the request/response connection against memory:// (no RabbitMQ needed).
+    """
+
+    def setUp(self):
+        memorybroker.reset_broker("memory://test-rr")
+        self.m = ManoBrokerRequestResponseConnection("test-memory", url="memory://test-rr")
+
+    def tearDown(self):
+        self.m.stop_connection()
+        self.m.stop_threads()
+
+    def test_call_sync(self):
+        self.m.register_async_endpoint(lambda ch, method, props, body: body.upper(), "test.memory.echo")
+        time.sleep(0.2)
+        result = self.m.call_sync("test.memory.echo", "ping", timeout=5)
+        self.assertEqual(result[3], "PING")
+        self.assertEqual(self.m.get_pending_call_stats()["outstanding"], 0)
+
+    def test_notification_wildcard(self):
+        received = []
+        self.m.register_notification_endpoint(
+            lambda ch, method, props, body: received.append(method.routing_key), "test.memory.#")
+        time.sleep(0.2)
+        self.m.notify("test.memory.a.b", "n")
+        for i in range(0, 100):
+            if received:
+                break
+            time.sleep(0.01)
+        self.assertEqual(received, ["test.memory.a.b"])
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertIsNone(benchmark.percentile([], 50))
+
+    def test_smoke(self):
+        results = benchmark.run(url="memory://test-benchmark", sizes=(64,), subscribers=(2,),
+                                messages=20, sync_messages=2)
+        self.assertEqual([r["scenario"] for r in results], list(benchmark.SCENARIOS))
+        for r in results:
+            self.assertGreater(r["received"], 0)
+            self.assertIsNotNone(r["p99_ms"])
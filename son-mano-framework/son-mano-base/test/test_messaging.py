@@ -27,9 +27,15 @@ partner consortium (www.sonata-nfv.eu).
 """
 
 import unittest
+import asyncio
+import sys
 import time
+import threading
 
+from sonmanobase import codec
 from sonmanobase.messaging import ManoBrokerConnection, ManoBrokerRequestResponseConnection
+from sonmanobase.messaging import CallbackDispatcher, PendingCallRegistry, payload_key
+from sonmanobase.asyncmessaging import AsyncManoBrokerRequestResponseConnection
 
 # TODO the active waiting for messages should be replaced by threading.Event() functionality
 
@@ -155,6 +161,94 @@ class TestManoBrokerConnection(BaseTestCase):
         self.assertEqual(self.wait_for_messages(buffer=0, n_messages=100)[99], "99")
         self.assertEqual(self.wait_for_messages(buffer=1, n_messages=100)[99], "99")
 
+    #@unittest.skip("disabled")
+    def test_publisher_channel_reuse(self):
+        """
+        Ensure that sequential publishes reuse a single pooled channel.
+        """
+        for i in range(0, 10):
+            self.m.publish("test.topic", "%d" % i)
+        stats = self.m.get_publisher_pool_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 9)
+        self.assertEqual(stats["idle"], 1)
+
+
+class TestMultiplexedConsumer(BaseTestCase):
+    """
+    Test subscriptions that share a bounded set of consumer channels.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.m = ManoBrokerConnection("test-multiplexed-broker-connection", consumer_channels=2)
+
+    #@unittest.skip("disabled")
+    def test_many_subscriptions_flat_thread_count(self):
+        """
+        Ensure that many subscriptions are consumed by a fixed number of threads
+        and that deliveries reach the callback of their subscription.
+        """
+        for i in range(0, 10):
+            self.m.subscribe(self._simple_subscribe_cbf1, "test.mux.%d" % i)
+        self.m.subscribe(self._simple_subscribe_cbf2, "test.mux.other")
+        time.sleep(0.5)
+        self.assertEqual(self.m._consumer.thread_count(), 2)
+        for i in range(0, 10):
+            self.m.publish("test.mux.%d" % i, "%d" % i)
+        self.m.publish("test.mux.other", "other")
+        self.assertEqual(len(self.wait_for_messages(buffer=0, n_messages=10)), 10)
+        self.assertTrue(self.wait_for_particular_messages("other", buffer=1))
+        self.assertNotIn("other", self._message_buffer[0])
+
+
+class TestMultiplexedRequestResponse(BaseTestCase):
+    """
+    Test request/response over multiplexed consumer channels.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.m = ManoBrokerRequestResponseConnection("test-multiplexed-request-response", consumer_channels=2)
+
+    #@unittest.skip("disabled")
+    def test_response_queues_are_removed(self):
+        """
+        Ensure that the subscriptions of deleted response queues are removed
+        from the shared consumer.
+        """
+        self.m.register_async_endpoint(self._simple_request_echo_cbf, "test.mux.request")
+        time.sleep(0.5)
+        endpoints = self.m._consumer.subscription_count()
+        for i in range(0, 5):
+            self.m.call_async(self._simple_subscribe_cbf1, "test.mux.request", "ping-%d" % i)
+            self.wait_for_messages(n_messages=i + 1)
+        time.sleep(0.5)
+        self.assertEqual(self.m._consumer.subscription_count(), endpoints)
+        self.assertEqual(sum(self.m._consumer._load), endpoints)
+
+    #@unittest.skip("disabled")
+    def test_concurrent_calls_on_one_topic(self):
+        """
+        Ensure that no reply is lost while replies to earlier calls release
+        the response queue of the topic.
+        """
+        self.m.register_async_endpoint(self._simple_request_echo_cbf, "test.mux.concurrent")
+        time.sleep(0.5)
+
+        def caller(n):
+            for i in range(0, 10):
+                self.m.call_async(self._simple_subscribe_cbf1, "test.mux.concurrent", "ping-%d-%d" % (n, i))
+                time.sleep(0.005)
+
+        threads = [threading.Thread(target=caller, args=(n,)) for n in range(0, 8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wait_for_messages(n_messages=80, timeout=10)
+        self.assertEqual(self.m.get_pending_call_stats()["outstanding"], 0)
+
 
 class TestManoBrokerRequestResponseConnection(BaseTestCase):
     """
@@ -182,6 +276,26 @@ class TestManoBrokerRequestResponseConnection(BaseTestCase):
         self.m.call_async(self._simple_subscribe_cbf1, "test.request", "ping-pong")
         self.assertEqual(self.wait_for_messages()[0], "ping-pong")
 
+    #@unittest.skip("disabled")
+    @unittest.skipIf(codec.msgpack is None, "msgpack not installed")
+    def test_msgpack_request_response(self):
+        """
+        Test request/response with msgpack payloads and the default content_type.
+        """
+        def endpoint(ch, method, props, body):
+            self.assertEqual(props.content_type, codec.CONTENT_TYPE_MSGPACK)
+            request = codec.decode(body, props.content_type)
+            return codec.encode({"reply": request["ping"]}, codec.CONTENT_TYPE_MSGPACK)
+
+        def reply(ch, method, props, body):
+            self._message_buffer[0].append(codec.decode(body, props.content_type))
+
+        self.m.register_async_endpoint(endpoint, "test.request.msgpack")
+        time.sleep(0.5)  # give broker some time to register subscriptions
+        self.m.call_async(reply, "test.request.msgpack",
+                          codec.encode({"ping": "pong"}, codec.CONTENT_TYPE_MSGPACK))
+        self.assertEqual(self.wait_for_messages()[0], {"reply": "pong"})
+
     #@unittest.skip("disabled")
     def test_request_response_sync(self):
         """
@@ -236,6 +350,42 @@ class TestManoBrokerRequestResponseConnection(BaseTestCase):
         self.assertTrue(self.wait_for_particular_messages("my-notification1", buffer=0))
         self.assertTrue(self.wait_for_particular_messages("my-notification1", buffer=1))
 
+    #@unittest.skip("disabled")
+    def test_dispatched_request_response(self):
+        """
+        Test request/response with callbacks executed by the dispatcher.
+        """
+        self.m.stop_connection()
+        self.m.stop_threads()
+        self.m = ManoBrokerRequestResponseConnection("test-request-response-broker-connection",
+                                                     dispatch_workers=4,
+                                                     dispatch_key="correlation_id")
+        self.m.register_async_endpoint(self._simple_request_echo_cbf, "test.request.dispatched")
+        time.sleep(0.5)  # give broker some time to register subscriptions
+        for i in range(0, 10):
+            self.m.call_async(self._simple_subscribe_cbf1, "test.request.dispatched", "%d" % i)
+        self.assertEqual(len(self.wait_for_messages(n_messages=10)), 10)
+        self.assertIn("test.request.dispatched", self.m.get_dispatch_stats())
+
+    #@unittest.skip("disabled")
+    def test_instrumented_request_response(self):
+        """
+        Test that publish counts, latencies and round-trip times are recorded.
+        """
+        self.m.stop_connection()
+        self.m.stop_threads()
+        self.m = ManoBrokerRequestResponseConnection("test-request-response-broker-connection",
+                                                     instrumentation=True)
+        self.m.register_async_endpoint(self._simple_request_echo_cbf, "test.request.instrumented")
+        time.sleep(0.5)  # give broker some time to register subscriptions
+        self.m.call_sync("test.request.instrumented", "ping-pong")
+        metrics = self.m.get_metrics()
+        # request and reply are published on the same topic
+        self.assertEqual(metrics["published"]["test.request.instrumented"], 2)
+        self.assertEqual(metrics["call_round_trip"]["test.request.instrumented"]["count"], 1)
+        self.assertGreaterEqual(metrics["delivery_latency"]["test.request.instrumented"]["count"], 2)
+        self.assertGreaterEqual(metrics["handler_duration"]["test.request.instrumented"]["count"], 2)
+
     #@unittest.skip("disabled")
     def test_interleaved_subscriptions(self):
         """
@@ -256,6 +406,229 @@ class TestManoBrokerRequestResponseConnection(BaseTestCase):
         self.assertTrue(self.wait_for_particular_messages("ping-pong"))
         self.assertTrue(self.wait_for_particular_messages("my-notification1", buffer=1))
 
+
+class TestAsyncManoBrokerRequestResponseConnection(BaseTestCase):
+    """
+    Test the awaitable request/response API.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.m = AsyncManoBrokerRequestResponseConnection("test-async-broker-connection",
+                                                          loop=self.loop)
+
+    def tearDown(self):
+        super().tearDown()
+        self.loop.close()
+
+    #@unittest.skip("disabled")
+    def test_call_sync_coroutine_endpoint(self):
+        """
+        A coroutine endpoint answers many concurrent awaited calls.
+        """
+        async def echo(ch, method, props, body):
+            await asyncio.sleep(0.01)
+            return body
+
+        async def scenario():
+            await self.m.register_async_endpoint(echo, "test.async.request")
+            await asyncio.sleep(0.5)  # give broker some time to register subscriptions
+            return await asyncio.gather(*[
+                self.m.call_sync("test.async.request", "%d" % i, timeout=5) for i in range(0, 50)])
+
+        results = self.loop.run_until_complete(scenario())
+        self.assertEqual([str(r[3]) for r in results], ["%d" % i for i in range(0, 50)])
+
+    #@unittest.skip("disabled")
+    def test_call_sync_timeout(self):
+        """
+        call_sync returns None if nobody answers.
+        """
+        result = self.loop.run_until_complete(
+            self.m.call_sync("test.async.nobody", "ping", timeout=0.5))
+        self.assertIsNone(result)
+
+    #@unittest.skip("disabled")
+    def test_notification(self):
+        """
+        Notifications are delivered to the callback on the loop.
+        """
+        received = []
+
+        async def scenario():
+            await self.m.register_notification_endpoint(
+                lambda ch, method, props, body: received.append(body), "test.async.notification")
+            await asyncio.sleep(0.5)
+            await self.m.notify("test.async.notification", "my-notification")
+            for i in range(0, 100):
+                if received:
+                    break
+                await asyncio.sleep(0.05)
+
+        self.loop.run_until_complete(scenario())
+        self.assertEqual(received, ["my-notification"])
+
+
+class TestCallbackDispatcher(unittest.TestCase):
+    """
+    Test concurrent callback execution with per-key ordering (no broker needed).
+    """
+
+    def setUp(self):
+        self.d = CallbackDispatcher(4, max_pending=10)
+
+    def tearDown(self):
+        self.d.shutdown()
+
+    def test_per_key_ordering(self):
+        """
+        Callbacks with the same key run in arrival order, without overlap.
+        """
+        result = {"a": [], "b": []}
+        done = threading.Event()
+
+        def job(key, i):
+            def _run():
+                time.sleep(0.001)
+                result[key].append(i)
+                if len(result["a"]) + len(result["b"]) == 40:
+                    done.set()
+            return _run
+
+        for i in range(0, 20):
+            self.d.submit("a", "test.topic", job("a", i))
+            self.d.submit("b", "test.topic", job("b", i))
+        self.assertTrue(done.wait(5))
+        self.assertEqual(result["a"], list(range(0, 20)))
+        self.assertEqual(result["b"], list(range(0, 20)))
+        time.sleep(0.1)
+        stats = self.d.stats()["test.topic"]
+        self.assertEqual(stats["completed"], 40)
+        self.assertEqual(stats["queued"], 0)
+        self.assertLessEqual(stats["max_depth"], 10)
+
+    def test_slow_key_does_not_block_others(self):
+        """
+        A blocked callback only delays callbacks with the same key.
+        """
+        release = threading.Event()
+        fast = threading.Event()
+        self.d.submit("slow", "test.slow", lambda: release.wait(5))
+        self.d.submit("fast", "test.fast", fast.set)
+        self.assertTrue(fast.wait(1))
+        release.set()
+
+    def test_payload_key(self):
+        key = payload_key("serv_id")
+        self.assertEqual(key(None, None, "{serv_id: 1234, foo: bar}"), 1234)
+        self.assertEqual(key(None, None, '{"serv_id": "abc"}'), "abc")
+        self.assertIsNone(key(None, None, "no-dict"))
+
+
+class TestPendingCallRegistry(unittest.TestCase):
+    """
+    Test bookkeeping of pending call_async requests (no broker needed).
+    """
+
+    def setUp(self):
+        self.released = []
+        self.timeouts = []
+        self.r = PendingCallRegistry(
+            on_queue_released=lambda topic, queue: self.released.append(queue))
+
+    def tearDown(self):
+        self.r.stop()
+
+    def test_queue_reference_counting(self):
+        self.r.add("c1", None, "t", "q1")
+        self.r.add("c2", None, "t", "q1")
+        self.assertEqual(self.r.queue_for_topic("t"), "q1")
+        self.assertIsNotNone(self.r.pop("c1"))
+        self.assertEqual(self.released, [])
+        self.assertIsNotNone(self.r.pop("c2"))
+        self.assertEqual(self.released, ["q1"])
+        self.assertIsNone(self.r.queue_for_topic("t"))
+
+    def test_acquire_and_pop_interleaved(self):
+        """
+        A reply to the last call on a topic never releases the queue that
+        a new call just got for the topic.
+        """
+        names = iter(range(0, 1000000))
+        names_lock = threading.Lock()
+        start = threading.Barrier(2)
+        errors = []
+
+        def caller(n):
+            start.wait()
+            for i in range(0, 5000):
+                with names_lock:
+                    new_queue = "q%d" % next(names)
+                queue, created = self.r.acquire_queue("t", new_queue)
+                if created:
+                    self.r.queue_subscribed(queue)
+                self.r.add("c%d-%d" % (n, i), None, "t", queue, acquired=True)
+                if queue in released:
+                    errors.append(queue)
+                self.r.pop("c%d-%d" % (n, i))
+
+        released = set()
+        self.r.on_queue_released = lambda topic, queue: released.add(queue)
+        interval = sys.getswitchinterval()
+        # switch threads often to interleave the calls
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=caller, args=(n,)) for n in range(0, 2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+        self.assertEqual(self.r.stats()["response_queues"], 0)
+        self.assertIsNone(self.r.queue_for_topic("t"))
+
+    def test_failed_subscription(self):
+        queue, created = self.r.acquire_queue("t", "q1")
+        self.assertEqual((queue, created), ("q1", True))
+        result = []
+        joiner = threading.Thread(target=lambda: result.append(self.r.acquire_queue("t", "q2")))
+        joiner.start()
+        time.sleep(0.1)
+        # the joiner waits for the subscription
+        self.assertEqual(result, [])
+        self.r.release_queue("t", "q1")
+        joiner.join(5)
+        # ... and reserves a new queue once it failed
+        self.assertEqual(result, [("q2", True)])
+        self.assertEqual(self.released, ["q1"])
+        self.r.release_queue("t", "q2")
+        self.assertEqual(self.r.stats()["response_queues"], 0)
+
+    def test_unmatched_reply(self):
+        self.assertIsNone(self.r.pop("unknown"))
+        self.assertEqual(self.r.stats()["unmatched"], 1)
+
+    def test_expiry(self):
+        now = time.time()
+        self.r.add("c1", None, "t", "q1", timeout=1,
+                   on_timeout=lambda topic, corr_id: self.timeouts.append(corr_id))
+        self.r.add("c2", None, "t", "q1", timeout=100)
+        self.assertEqual(self.r.sweep(now), 0)
+        self.assertEqual(self.r.sweep(now + 5), 1)
+        self.assertEqual(self.timeouts, ["c1"])
+        self.assertIsNone(self.r.pop("c1"))
+        stats = self.r.stats()
+        self.assertEqual(stats["outstanding"], 1)
+        self.assertEqual(stats["timed_out"], 1)
+        self.assertEqual(self.released, [])
+        self.assertEqual(self.r.sweep(now + 200), 1)
+        self.assertEqual(self.released, ["q1"])
+        self.assertEqual(self.r.stats()["outstanding"], 0)
+
+
 if __name__ == "__main__":
     #unittest.main()
     t = TestManoBrokerRequestResponseConnection()
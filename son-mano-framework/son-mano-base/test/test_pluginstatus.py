@@ -0,0 +1,83 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+
+from sonmanobase import pluginstatus
+from sonmanobase.pluginstatus import PluginStatusView
+
+
+class TestPluginStatusView(unittest.TestCase):
+    """
+    Test the subscriber side of the versioned plugin status updates.
+    """
+
+    def setUp(self):
+        self.view = PluginStatusView()
+        self.a = {"name": "slm", "state": "READY"}
+        self.b = {"name": "flm", "state": "READY"}
+
+    def test_diff(self):
+        old = {"a": self.a, "b": self.b}
+        new = {"a": dict(self.a, state="PAUSED"), "c": self.b}
+        added, changed, removed = pluginstatus.diff(old, new)
+        self.assertEqual(list(added), ["c"])
+        self.assertEqual(list(changed), ["a"])
+        self.assertEqual(removed, ["b"])
+
+    def test_heartbeat_is_no_change(self):
+        old = {"a": dict(self.a, last_heartbeat_at="2017-01-01 10:00:00")}
+        new = {"a": dict(self.a, last_heartbeat_at="2017-01-01 10:00:05")}
+        self.assertEqual(pluginstatus.diff(old, new), ({}, {}, []))
+
+    def test_snapshot_then_deltas(self):
+        self.assertEqual(self.view.apply(pluginstatus.snapshot_message(3, {"a": self.a})),
+                         ({"a": self.a}, {}, []))
+        added, changed, removed = self.view.apply(pluginstatus.delta_message(4, {"b": self.b}, {}, ["a"]))
+        self.assertEqual(list(added), ["b"])
+        self.assertEqual(removed, ["a"])
+        self.assertEqual(self.view.plugins, {"b": self.b})
+        self.assertEqual(self.view.seq, 4)
+        # duplicates are ignored
+        self.assertEqual(self.view.apply(pluginstatus.delta_message(4, {"b": self.b}, {}, [])), ({}, {}, []))
+
+    def test_gap_needs_snapshot(self):
+        # nothing known yet
+        self.assertIsNone(self.view.apply(pluginstatus.delta_message(7, {"a": self.a}, {}, [])))
+        self.view.apply(pluginstatus.snapshot_message(7, {"a": self.a}))
+        # seq 8 is missing
+        self.assertIsNone(self.view.apply(pluginstatus.delta_message(9, {"b": self.b}, {}, [])))
+        self.assertEqual(self.view.seq, 7)
+
+    def test_legacy_full_message(self):
+        msg = {"timestamp": "now", "plugin_dict": {"a": self.a}}
+        self.assertEqual(self.view.apply(msg), ({"a": self.a}, {}, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import json
+import threading
+import time
+import unittest
+
+from sonmanobase.repository import RecordWrite, RepositoryClient, first_error
+
+
+class Response(object):
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class Repository(object):
+    """
+    In-process stand-in for the catalogue, used as HTTP session.
+    """
+
+    def __init__(self, bulk=True, delay=0.0):
+        self.bulk = bulk
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, data=None, headers=None, timeout=None):
+        with self._lock:
+            self.requests.append((method, url))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if url.endswith('/bulk'):
+                if not self.bulk:
+                    return Response(404, {'message': 'not found'})
+                return Response(200, json.loads(data))
+            if url.endswith('/down'):
+                raise IOError("connection refused")
+            if url.endswith('/bad'):
+                return Response(400, {'message': 'invalid record'})
+            return Response(200, json.loads(data))
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class TestRepositoryClient(unittest.TestCase):
+
+    def writes(self, n, bulk_url=None):
+        return [RecordWrite(i, 'PUT', 'http://repo/vnf-instances/%d' % i,
+                            {'id': i}, bulk_url) for i in range(n)]
+
+    def test_write(self):
+        client = RepositoryClient(session=Repository())
+        self.assertIsNone(client.write('POST', 'http://repo/ns-instances', {'id': 1}))
+        error = client.write('PUT', 'http://repo/ns-instances/bad', {'id': 1})
+        self.assertEqual(error['http_code'], 400)
+        self.assertEqual(error['message'], {'message': 'invalid record'})
+        error = client.write('PUT', 'http://repo/ns-instances/down', {'id': 1})
+        self.assertEqual(error['http_code'], '0')
+        self.assertEqual(client.stats()['failures'], 2)
+        client.stop()
+
+    def test_concurrency_limit(self):
+        repo = Repository(delay=0.05)
+        client = RepositoryClient(concurrency=3, session=repo)
+        results = client.write_all(self.writes(9))
+        self.assertEqual(results, dict((i, None) for i in range(9)))
+        self.assertEqual(repo.max_active, 3)
+        client.stop()
+
+    def test_per_record_errors(self):
+        client = RepositoryClient(session=Repository())
+        writes = self.writes(3)
+        writes.append(RecordWrite('x', 'PUT', 'http://repo/vnf-instances/bad', {}))
+        writes.append(RecordWrite('y', 'PUT', 'http://repo/vnf-instances/down', {}))
+        results = client.write_all(writes)
+        self.assertIsNone(results[0])
+        self.assertEqual(results['x']['http_code'], 400)
+        self.assertEqual(results['y']['http_code'], '0')
+        self.assertEqual(first_error(results, writes), results['x'])
+        client.stop()
+
+    def test_bulk(self):
+        repo = Repository()
+        client = RepositoryClient(bulk=True, session=repo)
+        results = client.write_all(self.writes(5, 'http://repo/bulk'))
+        self.assertEqual(results, dict((i, None) for i in range(5)))
+        self.assertEqual(repo.requests, [('PUT', 'http://repo/bulk')])
+        client.stop()
+
+    def test_bulk_fallback(self):
+        repo = Repository(bulk=False)
+        client = RepositoryClient(bulk=True, session=repo)
+        results = client.write_all(self.writes(4, 'http://repo/bulk'))
+        self.assertEqual(results, dict((i, None) for i in range(4)))
+        self.assertEqual(len(repo.requests), 5)
+        # the missing bulk endpoint is remembered
+        client.write_all(self.writes(4, 'http://repo/bulk'))
+        self.assertEqual(len(repo.requests), 9)
+        client.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
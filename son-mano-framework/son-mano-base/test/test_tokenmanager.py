@@ -0,0 +1,93 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import base64
+import json
+import time
+import unittest
+
+from sonmanobase.tokenmanager import TokenManager, token_expiry
+
+
+def jwt(exp):
+    claims = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return "header." + claims + ".signature"
+
+
+class TestTokenManager(unittest.TestCase):
+    """
+    Test caching and refreshing of gatekeeper tokens (no gatekeeper needed).
+    """
+
+    def setUp(self):
+        self.tokens = []
+
+    def login(self):
+        token = jwt(time.time() + 60) + str(len(self.tokens))
+        self.tokens.append(token)
+        return token
+
+    def test_token_expiry(self):
+        self.assertEqual(token_expiry(jwt(1234)), 1234)
+        self.assertGreater(token_expiry("opaque", default_ttl=10), time.time())
+
+    def test_cached(self):
+        tm = TokenManager(self.login)
+        token = tm.get_token()
+        self.assertEqual(tm.get_token(), token)
+        self.assertEqual(tm.logins, 1)
+        tm.stop()
+
+    def test_proactive_refresh(self):
+        tm = TokenManager(self.login, refresh_margin=59.8, retry_interval=0.05)
+        first = tm.get_token()
+        time.sleep(0.5)
+        # refreshed in the background, without a caller waiting for it
+        self.assertGreater(tm.logins, 1)
+        self.assertNotEqual(tm.get_token(block=False), first)
+        tm.stop()
+
+    def test_retry_on_401(self):
+        tm = TokenManager(self.login)
+        first = tm.get_token()
+        calls = []
+
+        def request(token):
+            calls.append(token)
+            if token == first:
+                return {"error": 401, "content": "expired"}
+            return {"error": None, "content": "ok"}
+
+        self.assertEqual(tm.call(request)["content"], "ok")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(tm.logins, 2)
+        tm.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -34,8 +34,6 @@ import threading
 import json
 from flask import Flask, request
 import flask_restful as fr
-from mongoengine import DoesNotExist
-from son_mano_pluginmanager import model
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("son-mano-pluginmanger:interface")
@@ -47,56 +45,53 @@ class PluginsEndpoint(fr.Resource):
 
     def get(self):
         LOG.debug("GET plugin list")
-        return [p.uuid for p in model.Plugin.objects], 200
+        return PM.registry.uuids(), 200
 
 
 class PluginEndpoint(fr.Resource):
 
     def get(self, plugin_uuid=None):
         LOG.debug("GET plugin info for: %r" % plugin_uuid)
-        try:
-            p = model.Plugin.objects.get(uuid=plugin_uuid)
-            return p.to_dict(), 200
-        except DoesNotExist as e:
+        p = PM.registry.get(plugin_uuid)
+        if p is None:
             LOG.error("Lookup error: %r" % plugin_uuid)
             return {}, 404
+        return p.to_dict(), 200
 
     def delete(self, plugin_uuid=None):
         LOG.debug("DELETE plugin: %r" % plugin_uuid)
-        try:
-            p = model.Plugin.objects.get(uuid=plugin_uuid)
-            # send lifecycle stop event to plugin
-            PM.send_stop_notification(p)
-            # TODO ensure that record is deleted even if plugin does not deregister itself (use a timeout?)
-            return {}, 200
-        except DoesNotExist as e:
+        p = PM.registry.get(plugin_uuid)
+        if p is None:
             LOG.error("Lookup error: %r" % plugin_uuid)
             return {}, 404
+        # send lifecycle stop event to plugin
+        PM.send_stop_notification(p)
+        # TODO ensure that record is deleted even if plugin does not deregister itself (use a timeout?)
+        return {}, 200
 
 
 class PluginLifecycleEndpoint(fr.Resource):
 
     def put(self, plugin_uuid=None):
         LOG.debug("PUT plugin lifecycle: %r" % plugin_uuid)
-        try:
-            p = model.Plugin.objects.get(uuid=plugin_uuid)
-            # get target state from request body
-            ts = json.loads(request.json).get("target_state")
-            if ts is None:
-                LOG.error("Malformed request: %r" % request.json)
-                return {"message": "malformed request"}, 500
-            if ts == "start":
-                 PM.send_start_notification(p)
-            elif ts == "pause":
-                PM.send_pause_notification(p)
-            elif ts == "stop":
-                PM.send_stop_notification(p)
-            else:
-                return {"message": "Malformed request"}, 500
-            return {}, 200
-        except DoesNotExist as e:
+        p = PM.registry.get(plugin_uuid)
+        if p is None:
             LOG.error("Lookup error: %r" % plugin_uuid)
             return {}, 404
+        # get target state from request body
+        ts = json.loads(request.json).get("target_state")
+        if ts is None:
+            LOG.error("Malformed request: %r" % request.json)
+            return {"message": "malformed request"}, 500
+        if ts == "start":
+            PM.send_start_notification(p)
+        elif ts == "pause":
+            PM.send_pause_notification(p)
+        elif ts == "stop":
+            PM.send_stop_notification(p)
+        else:
+            return {"message": "Malformed request"}, 500
+        return {}, 200
 
 # reference to plugin manager
 PM = None
@@ -36,17 +36,26 @@ import yaml
 import uuid
 import os
 import time
-from mongoengine import DoesNotExist
+import threading
 
 from sonmanobase.plugin import ManoBasePlugin
+from sonmanobase import pluginstatus
 from son_mano_pluginmanager import model
 from son_mano_pluginmanager import interface
+from son_mano_pluginmanager.registry import PluginRegistry
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("son-mano-pluginmanger")
 LOG.setLevel(logging.INFO)
 logging.getLogger("son-mano-base:messaging").setLevel(logging.INFO)
 
+# seconds to wait for further changes before a status update is broadcasted
+STATUS_UPDATE_DELAY = float(os.environ.get("pm_status_update_delay", 0.2))
+# seconds without heartbeat after which a plugin is considered dead and removed
+HEARTBEAT_TIMEOUT = float(os.environ.get("pm_heartbeat_timeout", 30))
+# seconds an expired plugin is re-added if it sends heartbeats again
+EXPIRED_PLUGIN_RETENTION = float(os.environ.get("pm_expired_plugin_retention", 3600))
+
 
 class SonPluginManager(ManoBasePlugin):
     """
@@ -55,9 +64,25 @@ class SonPluginManager(ManoBasePlugin):
     themselves to it by doing a registration call.
     """
 
-    def __init__(self):
+    def __init__(self, status_update_delay=STATUS_UPDATE_DELAY, heartbeat_timeout=HEARTBEAT_TIMEOUT):
         # initialize plugin DB model
         model.initialize()
+        # in-memory view on all plugins, written behind to the DB
+        self.registry = PluginRegistry()
+        # coalesce status updates of bursts of changes into one broadcast
+        self.status_update_delay = status_update_delay
+        self._status_update_timer = None
+        self._status_update_lock = threading.Lock()
+        # sequence number and content of the last status broadcast
+        self._status_seq = 0
+        self._status_plugins = {}
+        self._status_lock = threading.Lock()
+        # remove plugins that stopped sending heartbeats, e.g. because they crashed
+        self.heartbeat_timeout = heartbeat_timeout
+        if heartbeat_timeout:
+            expiry = threading.Thread(target=self._expiry_loop, name="plugin-heartbeat-expiry")
+            expiry.daemon = True
+            expiry.start()
 
         # start up management interface
         interface.start(self)
@@ -73,6 +98,7 @@ class SonPluginManager(ManoBasePlugin):
         self.manoconn.subscribe(self._on_register, "platform.management.plugin.register")
         self.manoconn.subscribe(self._on_deregister, "platform.management.plugin.deregister")
         self.manoconn.register_notification_endpoint(self._on_heartbeat, "platform.management.plugin.*.heartbeat")
+        self.manoconn.register_async_endpoint(self._on_status_snapshot_request, pluginstatus.STATUS_SNAPSHOT_TOPIC)
 
     def _send_lifecycle_notification(self, plugin, operation):
         """
@@ -93,24 +119,80 @@ class SonPluginManager(ManoBasePlugin):
     def send_pause_notification(self, plugin):
         self._send_lifecycle_notification(plugin, "pause")
 
+    def schedule_plugin_status_update(self):
+        """
+        Broadcast a plugin status update after status_update_delay seconds.
+        All changes that happen until then are covered by the same broadcast.
+        """
+        if not self.status_update_delay:
+            self.send_plugin_status_update()
+            return
+        with self._status_update_lock:
+            if self._status_update_timer is not None:
+                # an update is already scheduled
+                return
+            self._status_update_timer = threading.Timer(
+                self.status_update_delay, self._on_status_update_timer)
+            self._status_update_timer.daemon = True
+            self._status_update_timer.start()
+
+    def _on_status_update_timer(self):
+        with self._status_update_lock:
+            self._status_update_timer = None
+        self.send_plugin_status_update()
+
     def send_plugin_status_update(self):
         """
         Broadcast a plugin status update message to all interested plugins.
-        The message always contains the entire list of registered plugins as well
-        as status information for each of these plugins.
+        The message only contains the plugins that were added, changed or
+        removed since the last broadcast and a sequence number. Plugins that
+        missed a message can request a full snapshot.
         This method should always be called when the status of a plugin changes.
         """
-        # generate status update message
-        plugin_dict = {}
-        for p in model.Plugin.objects:
-            plugin_dict[p.uuid] = p.to_dict()
-        # create correct message format
-        message = {"timestamp": str(datetime.datetime.now()),
-                    "plugin_dict": plugin_dict}
-        LOG.info("Broadcasting plugin status update to 'platform.management.plugin.status': %r" % message)
-        # broadcast plugin status update message
-        self.manoconn.notify(
-            "platform.management.plugin.status", json.dumps(message))
+        with self._status_lock:
+            plugin_dict = self.registry.to_dict()
+            added, changed, removed = pluginstatus.diff(self._status_plugins, plugin_dict)
+            self._status_seq += 1
+            self._status_plugins = plugin_dict
+            # create correct message format
+            message = pluginstatus.delta_message(self._status_seq, added, changed, removed)
+            LOG.info("Broadcasting plugin status update to 'platform.management.plugin.status': %r" % message)
+            # broadcast plugin status update message (inside the lock to keep the order)
+            self.manoconn.notify(
+                pluginstatus.STATUS_TOPIC, json.dumps(message))
+
+    def _expiry_loop(self):
+        while True:
+            time.sleep(self.heartbeat_timeout / 2.0)
+            try:
+                self.expire_plugins()
+            except BaseException:
+                LOG.exception("Heartbeat expiry failed:")
+
+    def expire_plugins(self):
+        """
+        Remove the plugins that didn't send a heartbeat for heartbeat_timeout
+        seconds. They are reported as removed in the next status update, so
+        that other plugins can take over their work.
+        :return: list of removed uuids
+        """
+        now = datetime.datetime.now()
+        deadline = now - datetime.timedelta(seconds=self.heartbeat_timeout)
+        forget_before = now - datetime.timedelta(seconds=EXPIRED_PLUGIN_RETENTION)
+        expired = self.registry.expire(deadline, forget_before)
+        for pid in expired:
+            LOG.warning("EXPIRED: %r, no heartbeat since %s" % (pid, deadline))
+        if expired:
+            self.schedule_plugin_status_update()
+        return expired
+
+    def _on_status_snapshot_request(self, ch, method, properties, message):
+        """
+        Return the state of the last status broadcast, together with its sequence number.
+        """
+        with self._status_lock:
+            response = pluginstatus.snapshot_message(self._status_seq, self._status_plugins)
+        return json.dumps(response)
 
     def _on_register(self, ch, method, properties, message):
         """
@@ -137,7 +219,7 @@ class SonPluginManager(ManoBasePlugin):
             state="REGISTERED"
         )
 
-        p.save()
+        self.registry.add(p)
         LOG.info("REGISTERED: %r" % p)
         # return result
         response = {
@@ -151,7 +233,7 @@ class SonPluginManager(ManoBasePlugin):
         self.manoconn.notify(
             'platform.management.plugin.register', json.dumps(response), correlation_id=properties.correlation_id)
         # broadcast a plugin status update to the other plugin
-        self.send_plugin_status_update()
+        self.schedule_plugin_status_update()
 
     def _on_deregister(self, ch, method, properties, message):
         """
@@ -163,15 +245,13 @@ class SonPluginManager(ManoBasePlugin):
         """
         message = json.loads(str(message))
 
-        try:
-            p = model.Plugin.objects.get(uuid=message.get("uuid"))
-            p.delete()
-        except DoesNotExist:
-            LOG.debug("Couldn't find plugin with UUID %r in DB" % pid)
+        pid = message.get("uuid")
+        if self.registry.remove(pid) is None:
+            LOG.debug("Couldn't find plugin with UUID %r in registry" % pid)
 
-        LOG.info("DE-REGISTERED: %r" % message.get("uuid"))
+        LOG.info("DE-REGISTERED: %r" % pid)
         # broadcast a plugin status update to the other plugin
-        self.send_plugin_status_update()
+        self.schedule_plugin_status_update()
         # return result
         response = {
             "status": "OK"
@@ -182,30 +262,34 @@ class SonPluginManager(ManoBasePlugin):
         message = json.loads(str(message))
         pid = message.get("uuid")
 
-        try:
-            p = model.Plugin.objects.get(uuid=pid)
-
-            # update heartbeat timestamp
-            p.last_heartbeat_at = datetime.datetime.now()
-
-            change = False
-
-            # TODO ugly: state management of plugins should be hidden with plugin class
-            if message.get("state") == "READY" and p.state != "READY":
-                # a plugin just announced that it is ready, lets start it
-                self.send_start_notification(p)
-                change = True
-            elif message.get("state") != p.state:
-                # lets keep track of the reported state update
-                p.state = message.get("state")
-                change = True
-
-            p.save()
-            if change:
-                # there was a state change lets schedule an plugin status update notification
-                self.send_plugin_status_update()
-        except DoesNotExist:
-            LOG.debug("Couldn't find plugin with UUID %r in DB" % pid)
+        # update heartbeat timestamp (only in memory, DB is written behind)
+        now = datetime.datetime.now()
+        p = self.registry.touch(pid, now)
+        change = False
+        if p is None:
+            # an expired plugin is still alive, it is added again so that
+            # the other plugins learn about it
+            p = self.registry.revive(pid, now)
+            if p is None:
+                LOG.debug("Couldn't find plugin with UUID %r in registry" % pid)
+                return
+            LOG.warning("REVIVED: %r, heartbeat received after it expired" % pid)
+            change = True
+
+        # TODO ugly: state management of plugins should be hidden with plugin class
+        if message.get("state") == "READY" and p.state != "READY":
+            # a plugin just announced that it is ready, lets start it
+            self.send_start_notification(p)
+            change = True
+        elif message.get("state") != p.state:
+            # lets keep track of the reported state update
+            p.state = message.get("state")
+            self.registry.mark_changed(pid)
+            change = True
+
+        if change:
+            # there was a state change lets schedule an plugin status update notification
+            self.schedule_plugin_status_update()
 
 
 def main():
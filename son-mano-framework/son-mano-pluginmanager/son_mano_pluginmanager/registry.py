@@ -0,0 +1,198 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+"""
+In-memory plugin registry of the plugin manager.
+
+The registry is the authoritative view on all registered plugins. MongoDB
+is only written behind: a background thread periodically saves new and
+modified plugins, deletes removed ones and writes all heartbeat timestamps
+that were received since the last flush in a single bulk request.
+"""
+import logging
+import threading
+from pymongo import UpdateOne
+
+from son_mano_pluginmanager import model
+
+logging.basicConfig(level=logging.INFO)
+LOG = logging.getLogger("son-mano-pluginmanger:registry")
+LOG.setLevel(logging.INFO)
+
+# seconds between two write-behind flushes
+FLUSH_INTERVAL = 5.0
+
+
+class PluginRegistry(object):
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, persist=True):
+        """
+        :param flush_interval: seconds between two flushes to the DB (None = only on flush())
+        :param persist: write changes to the DB at all
+        """
+        self.persist = persist
+        self.flush_interval = flush_interval
+        self._plugins = {}
+        self._lock = threading.RLock()
+        # pending writes
+        self._dirty = set()
+        self._heartbeats = {}
+        self._removed = set()
+        # expired plugins, re-added if their heartbeats come back
+        self._expired = {}
+        self._stop = threading.Event()
+        self._flusher = None
+        if persist and flush_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="plugin-registry-flush")
+            self._flusher.daemon = True
+            self._flusher.start()
+
+    def add(self, plugin):
+        with self._lock:
+            self._plugins[plugin.uuid] = plugin
+            self._removed.discard(plugin.uuid)
+            self._dirty.add(plugin.uuid)
+
+    def get(self, uuid):
+        """
+        :return: plugin or None
+        """
+        with self._lock:
+            return self._plugins.get(uuid)
+
+    def remove(self, uuid):
+        """
+        :return: removed plugin or None
+        """
+        with self._lock:
+            self._expired.pop(uuid, None)
+            plugin = self._plugins.pop(uuid, None)
+            if plugin is not None:
+                self._dirty.discard(uuid)
+                self._heartbeats.pop(uuid, None)
+                self._removed.add(uuid)
+            return plugin
+
+    def touch(self, uuid, timestamp):
+        """
+        Record a heartbeat. Only the newest timestamp per plugin is written.
+        :return: plugin or None
+        """
+        with self._lock:
+            plugin = self._plugins.get(uuid)
+            if plugin is not None:
+                plugin.last_heartbeat_at = timestamp
+                self._heartbeats[uuid] = timestamp
+            return plugin
+
+    def expire(self, deadline, forget_before=None):
+        """
+        Remove the plugins whose last heartbeat is older than deadline.
+        Plugins that never sent a heartbeat are kept, they don't use the
+        heartbeat mechanism. Removed plugins are remembered until their
+        last heartbeat is older than forget_before, see revive().
+        :return: list of removed uuids
+        """
+        with self._lock:
+            expired = [uuid for uuid, p in self._plugins.items()
+                       if p.last_heartbeat_at is not None and p.last_heartbeat_at < deadline]
+            for uuid in expired:
+                self._expired[uuid] = self.remove(uuid)
+            if forget_before is not None:
+                for uuid in [uuid for uuid, p in self._expired.items()
+                             if p.last_heartbeat_at < forget_before]:
+                    del self._expired[uuid]
+            return expired
+
+    def revive(self, uuid, timestamp):
+        """
+        Re-add an expired plugin that sends heartbeats again, e.g. after
+        a stall.
+        :return: plugin or None if no such plugin expired
+        """
+        with self._lock:
+            plugin = self._expired.pop(uuid, None)
+            if plugin is not None:
+                self.add(plugin)
+                self.touch(uuid, timestamp)
+            return plugin
+
+    def mark_changed(self, uuid):
+        with self._lock:
+            if uuid in self._plugins:
+                self._dirty.add(uuid)
+
+    def uuids(self):
+        with self._lock:
+            return list(self._plugins.keys())
+
+    def to_dict(self):
+        """
+        :return: dict uuid -> plugin.to_dict()
+        """
+        with self._lock:
+            return {uuid: p.to_dict() for uuid, p in self._plugins.items()}
+
+    def pending_writes(self):
+        with self._lock:
+            return len(self._dirty) + len(self._heartbeats) + len(self._removed)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except BaseException:
+                LOG.exception("Write-behind flush failed:")
+
+    def flush(self):
+        """
+        Write all pending changes to the DB.
+        """
+        with self._lock:
+            dirty = [self._plugins[uuid] for uuid in self._dirty]
+            heartbeats = dict((uuid, ts) for uuid, ts in self._heartbeats.items() if uuid not in self._dirty)
+            removed = list(self._removed)
+            self._dirty.clear()
+            self._heartbeats.clear()
+            self._removed.clear()
+        if not self.persist:
+            return
+        for plugin in dirty:
+            plugin.save()
+        if len(heartbeats) > 0:
+            model.Plugin._get_collection().bulk_write(
+                [UpdateOne({"_id": uuid}, {"$set": {"last_heartbeat_at": ts}}) for uuid, ts in heartbeats.items()],
+                ordered=False)
+        if len(removed) > 0:
+            model.Plugin.objects(uuid__in=removed).delete()
+        if dirty or heartbeats or removed:
+            LOG.debug("Flushed %d plugins, %d heartbeats, %d removals" % (len(dirty), len(heartbeats), len(removed)))
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
@@ -30,9 +30,13 @@ import unittest
 import time
 import json
 import threading
+import datetime
 import requests
+from unittest import mock
 from multiprocessing import Process
 from son_mano_pluginmanager.pluginmanager import SonPluginManager
+from son_mano_pluginmanager.registry import PluginRegistry
+from son_mano_pluginmanager import model
 from sonmanobase.messaging import ManoBrokerRequestResponseConnection
 
 
@@ -181,7 +185,9 @@ class TestPluginManagerMessageInterface(TestPluginManagerBase):
         def on_status_update(ch, method, properties, message):
             msg = json.loads(str(message))
             self.assertTrue(len(msg.get("timestamp")) > 0)
-            self.assertTrue(len(msg.get("plugin_dict")) > 0)
+            self.assertEqual(msg.get("type"), "delta")
+            self.assertGreater(msg.get("seq"), 0)
+            self.assertTrue(self.plugin_uuid in msg.get("added") or self.plugin_uuid in msg.get("changed"))
             # stop waiting
             self.messageReceived()
 
@@ -200,6 +206,25 @@ class TestPluginManagerMessageInterface(TestPluginManagerBase):
         # make our test synchronous: wait
         self.waitForMessage()
 
+    #@unittest.skip("skip")
+    def testStatusSnapshot(self):
+        """
+        Request a full status snapshot and check that it contains our plugin.
+        :return:
+        """
+        self.register()
+        time.sleep(0.5)  # wait for the debounced status update
+
+        def on_snapshot(ch, method, properties, message):
+            msg = json.loads(str(message))
+            self.assertEqual(msg.get("type"), "snapshot")
+            self.assertGreater(msg.get("seq"), 0)
+            self.assertIn(self.plugin_uuid, msg.get("plugin_dict"))
+            self.messageReceived()
+
+        self.m.call_async(on_snapshot, "platform.management.plugin.status.snapshot", "{}")
+        self.waitForMessage()
+
 
 class TestPluginManagerManagementInterface(TestPluginManagerBase):
     """
@@ -276,5 +301,109 @@ class TestPluginManagerManagementInterface(TestPluginManagerBase):
         self.assertEqual(r.status_code, 500)
 
 
+class TestPluginRegistry(unittest.TestCase):
+    """
+    Tests the in-memory plugin registry (without DB writes).
+    """
+
+    def setUp(self):
+        self.r = PluginRegistry(flush_interval=None, persist=False)
+
+    def _plugin(self, pid):
+        return model.Plugin(uuid=pid, name="p", version="v0.1", state="REGISTERED")
+
+    #@unittest.skip("disabled")
+    def test_add_get_remove(self):
+        self.r.add(self._plugin("a"))
+        self.r.add(self._plugin("b"))
+        self.assertEqual(sorted(self.r.uuids()), ["a", "b"])
+        self.assertEqual(self.r.get("a").uuid, "a")
+        self.assertIn("b", self.r.to_dict())
+        self.assertIsNotNone(self.r.remove("a"))
+        self.assertIsNone(self.r.get("a"))
+        self.assertIsNone(self.r.remove("a"))
+
+    #@unittest.skip("disabled")
+    def test_heartbeats_are_coalesced(self):
+        self.r.add(self._plugin("a"))
+        self.r.flush()
+        for i in range(10):
+            self.assertIsNotNone(self.r.touch("a", i))
+        # only the newest heartbeat per plugin is pending
+        self.assertEqual(self.r.pending_writes(), 1)
+        self.assertEqual(self.r.get("a").last_heartbeat_at, 9)
+        self.assertIsNone(self.r.touch("unknown", 1))
+        self.r.flush()
+        self.assertEqual(self.r.pending_writes(), 0)
+
+
+    #@unittest.skip("disabled")
+    def test_expire(self):
+        self.r.add(self._plugin("a"))
+        self.r.add(self._plugin("b"))
+        self.r.add(self._plugin("c"))
+        self.r.touch("a", 5)
+        self.r.touch("b", 15)
+        # c never sent a heartbeat
+        self.assertEqual(self.r.expire(10), ["a"])
+        self.assertEqual(sorted(self.r.uuids()), ["b", "c"])
+        self.assertNotIn("a", self.r.to_dict())
+
+    #@unittest.skip("disabled")
+    def test_revive(self):
+        self.r.add(self._plugin("a"))
+        self.r.add(self._plugin("b"))
+        self.r.touch("a", 5)
+        self.r.touch("b", 5)
+        self.assertEqual(sorted(self.r.expire(10)), ["a", "b"])
+        self.assertIsNone(self.r.touch("a", 12))
+        self.assertEqual(self.r.revive("a", 12).uuid, "a")
+        self.assertEqual(self.r.get("a").last_heartbeat_at, 12)
+        self.assertIsNone(self.r.revive("a", 13))
+        # b is forgotten after the retention
+        self.assertEqual(self.r.expire(10, forget_before=6), [])
+        self.assertIsNone(self.r.revive("b", 13))
+        self.assertIsNone(self.r.revive("unknown", 13))
+
+
+class TestPluginManagerExpiry(unittest.TestCase):
+    """
+    Tests the heartbeat expiry of the plugin manager (no broker or DB needed).
+    """
+
+    def setUp(self):
+        self.pm = SonPluginManager.__new__(SonPluginManager)
+        self.pm.name = "son-plugin.SonPluginManager"
+        self.pm.uuid = None
+        self.pm.registry = PluginRegistry(flush_interval=None, persist=False)
+        self.pm.status_update_delay = 0
+        self.pm.heartbeat_timeout = 30
+        self.pm._status_seq = 0
+        self.pm._status_plugins = {}
+        self.pm._status_lock = threading.Lock()
+        self.pm.manoconn = mock.Mock()
+        self.pm.registry.add(model.Plugin(uuid="a", name="p", version="v0.1", state="RUNNING"))
+        self.pm.send_plugin_status_update()
+
+    def heartbeat(self, pid):
+        self.pm._on_heartbeat(None, None, None, json.dumps({"uuid": pid, "state": "RUNNING"}))
+
+    def last_status_update(self):
+        topic, message = self.pm.manoconn.notify.call_args[0]
+        self.assertEqual(topic, "platform.management.plugin.status")
+        return json.loads(message)
+
+    #@unittest.skip("disabled")
+    def test_expire_then_heartbeat(self):
+        self.heartbeat("a")
+        self.pm.registry.get("a").last_heartbeat_at -= datetime.timedelta(seconds=60)
+        self.assertEqual(self.pm.expire_plugins(), ["a"])
+        self.assertEqual(self.last_status_update()["removed"], ["a"])
+        # the plugin was only stalled, its next heartbeat adds it again
+        self.heartbeat("a")
+        self.assertIsNotNone(self.pm.registry.get("a"))
+        self.assertIn("a", self.last_status_update()["added"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -33,7 +33,8 @@ import logging
 import os
 import docker
 import requests
-import yaml
+
+from son_mano_specific_manager_registry.smr_images import ImageCache
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("son-mano-specific-manager-registry-engine")
@@ -46,6 +47,9 @@ class SMREngine(object):
         # connect to docker
         self.dc = self.connect()
 
+        # the images of the f/ssms are kept between instantiations
+        self.images = ImageCache(self.dc)
+
         # create rabbitmq user that will be used for communication between FSMs/SSMs and MANO plugins
         if 'broker_man_host' in os.environ:
             self.host = os.environ['broker_man_host']
@@ -95,26 +99,25 @@ class SMREngine(object):
         LOG.info("Connected to Docker host: {0}".format(dc.base_url))
         return dc
 
-    def pull(self, image):#, ssm_name):
+    def pull(self, image, force=False):
 
         """
         Process of pulling / importing a SSM given as Docker image.
+        Images that are already on the Docker host are not pulled again,
+        unless force is set.
 
         SSM can be specified like:
         - ssm_uri = "registry.sonata-nfv.eu:5000/my-ssm" -> Docker PULL (opt B)
-        :return: ssm_image_name
+        :return: status of the pull, with an 'error' if it failed
+        """
+        return self.images.pull(image, force=force)
+
+    def pull_all(self, images):
+        """
+        Pull the images of several SSMs/FSMs in parallel.
+        :return: dict of image -> status of the pull
         """
-        #repository pull
-        res= self.dc.pull(image) # image name and uri are the same
-        error_count = 1
-        while error_count <= 3:
-            response = yaml.load(res.split("\n")[1])
-            if 'error' in response.keys():
-                error_count += 1
-                res = self.dc.pull(image)
-            else:
-                error_count = 4
-        return res
+        return self.images.pull_all(images)
 
     def start(self, id, image, sm_type, uuid, p_key):
 
@@ -142,6 +145,7 @@ class SMREngine(object):
                                              detach=True,
                                              name=cn_name,
                                              environment={'broker_host':broker_host, 'sf_uuid':uuid, 'PRIVATE_KEY':p_key})
+        self.images.acquire(image)
         networks = self.dc.networks()
         net_found = False
         for i in range(len(networks)):
@@ -167,7 +171,9 @@ class SMREngine(object):
         LOG.info("{0} Logs: {1}".format(id,self.dc.logs(container=cn_name)))
         self.dc.stop(container=cn_name)
         self.dc.remove_container(container=cn_name, force=True)
-        self.dc.remove_image(image= image, force=True)
+        # the image is kept for the next instantiation, unless the images
+        # exceed their disk budget
+        self.images.release(image)
 
     def retrieve_broker_name(self, broker):
         mid = broker.find(',')
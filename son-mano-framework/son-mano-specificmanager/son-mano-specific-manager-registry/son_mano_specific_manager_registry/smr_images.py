@@ -0,0 +1,223 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+'''
+The images of the specific managers on the Docker host. An image is
+pulled once and kept after its managers are terminated, so that the next
+instantiation of the service doesn't pull it again. Images that are not
+used by a container are removed, least recently used first, once the
+images take more disk space than the budget.
+'''
+
+import logging
+import os
+import threading
+import concurrent.futures as pool
+from collections import OrderedDict
+
+from sonmanobase import codec
+
+LOG = logging.getLogger("son-mano-specific-manager-registry-images")
+
+# Disk space in bytes that the images of the specific managers may take
+IMAGE_BUDGET = int(os.environ.get('sm_image_budget', 20 * 1024 ** 3))
+# Number of images that are pulled at the same time
+PULL_WORKERS = int(os.environ.get('sm_pull_workers', 4))
+PULL_ATTEMPTS = 3
+
+
+def decode_pull(response):
+    """
+    :param response: the status lines returned by a Docker pull
+    :return: the first error line, or the last status line
+    """
+    result = {}
+    for line in response.split("\n"):
+        if not line.strip():
+            continue
+        result = codec.decode(line)
+        if isinstance(result, dict) and 'error' in result:
+            return result
+    return result if isinstance(result, dict) else {'status': str(result)}
+
+
+class ImageCache(object):
+    """
+    The pulled images, by name, in the order in which they were used. For
+    each image the digest, the size and the number of containers that
+    use it are kept.
+    """
+
+    def __init__(self, dc, budget=IMAGE_BUDGET, workers=PULL_WORKERS):
+        self.dc = dc
+        self.budget = budget
+        self._images = OrderedDict()
+        self._pulling = {}
+        self._lock = threading.Lock()
+        self._pool = pool.ThreadPoolExecutor(max_workers=workers)
+        self.hits = 0
+        self.pulls = 0
+        self.evictions = 0
+
+    def pull(self, image, force=False):
+        """
+        Make sure an image is on the Docker host.
+
+        :param force: pull even if the image is present, e.g. to get the
+                      latest version of a tag
+        :return: the status of the pull, with an 'error' if it failed
+        """
+        return self._submit(image, force).result()
+
+    def pull_all(self, images, force=False):
+        """
+        Pull several images in parallel.
+
+        :return: dict of image -> status of the pull
+        """
+        futures = [(image, self._submit(image, force)) for image in images]
+        return dict((image, future.result()) for image, future in futures)
+
+    def _submit(self, image, force):
+        with self._lock:
+            if not force and image in self._images:
+                self._images.move_to_end(image)
+                self.hits += 1
+                done = pool.Future()
+                done.set_result({'status': 'Image is up to date for ' + image,
+                                 'digest': self._images[image]['digest']})
+                return done
+            # Concurrent requests for the same image share one pull
+            future = self._pulling.get(image)
+            if future is None:
+                future = self._pool.submit(self._pull, image, force)
+                self._pulling[image] = future
+            return future
+
+    def _pull(self, image, force):
+        try:
+            if not force:
+                info = self._inspect(image)
+                if info is not None:
+                    # Pulled before the SMR was started
+                    self._record(image, info)
+                    return {'status': 'Image is up to date for ' + image}
+
+            result = {}
+            for attempt in range(PULL_ATTEMPTS):
+                result = decode_pull(self.dc.pull(image))
+                if 'error' not in result:
+                    break
+                LOG.warning('Pull of {0} failed: {1}'.format(image, result['error']))
+
+            if 'error' not in result:
+                self.pulls += 1
+                info = self._inspect(image)
+                if info is not None:
+                    self._record(image, info)
+            return result
+        except BaseException as error:
+            return {'error': str(error)}
+        finally:
+            with self._lock:
+                self._pulling.pop(image, None)
+            self.evict()
+
+    def _inspect(self, image):
+        try:
+            return self.dc.inspect_image(image)
+        except Exception:
+            return None
+
+    def _record(self, image, info):
+        digests = info.get('RepoDigests') or [info.get('Id')]
+        with self._lock:
+            entry = self._images.pop(image, {'users': 0})
+            entry['digest'] = digests[0]
+            entry['size'] = info.get('Size', 0)
+            self._images[image] = entry
+
+    def acquire(self, image):
+        """
+        A container of the image was created, the image is not removed
+        until the container is.
+        """
+        with self._lock:
+            entry = self._images.get(image)
+            if entry is None:
+                # Not pulled through the cache, its size is unknown
+                entry = {'users': 0, 'digest': None, 'size': 0}
+                self._images[image] = entry
+            entry['users'] += 1
+            self._images.move_to_end(image)
+
+    def release(self, image):
+        """
+        A container of the image was removed.
+        """
+        with self._lock:
+            entry = self._images.get(image)
+            if entry is not None and entry['users'] > 0:
+                entry['users'] -= 1
+        self.evict()
+
+    def _size(self):
+        # Tags of the same digest share their layers
+        sizes = dict((entry['digest'], entry['size']) for entry in self._images.values())
+        return sum(sizes.values())
+
+    def evict(self):
+        """
+        Remove unused images, least recently used first, until the images
+        fit in the budget.
+        """
+        victims = []
+        with self._lock:
+            for image in list(self._images):
+                if self._size() <= self.budget:
+                    break
+                if self._images[image]['users'] > 0 or image in self._pulling:
+                    continue
+                del self._images[image]
+                victims.append(image)
+
+        for image in victims:
+            LOG.info('Removing image {0}, the images exceed the budget'.format(image))
+            self.evictions += 1
+            try:
+                self.dc.remove_image(image=image)
+            except Exception as error:
+                LOG.warning('Removing image {0} failed: {1}'.format(image, error))
+
+    def stats(self):
+        with self._lock:
+            return {'images': len(self._images),
+                    'size': self._size(),
+                    'budget': self.budget,
+                    'hits': self.hits,
+                    'pulls': self.pulls,
+                    'evictions': self.evictions}
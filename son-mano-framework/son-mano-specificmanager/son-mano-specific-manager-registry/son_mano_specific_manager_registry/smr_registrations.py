@@ -0,0 +1,95 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+'''
+Registration events of the specific managers. The SMR waits for a started
+SSM/FSM until it registers itself; the registration wakes the waiter
+instead of the waiter polling the repository.
+'''
+
+import logging
+import threading
+
+LOG = logging.getLogger("son-mano-specific-manager-registry-registrations")
+
+
+class RegistrationEvents(object):
+    """
+    One event per specific manager, keyed by its repository name (the
+    id of the manager followed by the uuid of the service or function).
+    """
+
+    def __init__(self):
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def _event(self, name):
+        with self._lock:
+            event = self._events.get(name)
+            if event is None:
+                event = threading.Event()
+                self._events[name] = event
+            return event
+
+    def expect(self, name, reset=False):
+        """
+        Announce that a manager is about to be started, before it is
+        started, so that an early registration is not missed.
+
+        :param reset: forget an earlier registration, e.g. of the version
+                      of the manager that is being updated
+        """
+        event = self._event(name)
+        if reset:
+            event.clear()
+
+    def registered(self, name):
+        """
+        Wake the waiters of a manager. Registrations that nobody expects,
+        e.g. ones arriving after a timeout, are ignored.
+        """
+        with self._lock:
+            event = self._events.get(name)
+        if event is not None:
+            event.set()
+
+    def wait(self, name, timeout):
+        """
+        :return: True if the manager registered within the timeout
+        """
+        if self._event(name).wait(timeout):
+            return True
+        LOG.error('Registration of {0} timed out after {1}s'.format(name, timeout))
+        return False
+
+    def forget(self, name):
+        """
+        Drop the event of a manager once its instantiation, update or
+        termination is over.
+        """
+        with self._lock:
+            self._events.pop(name, None)
@@ -29,18 +29,19 @@ partner consortium (www.sonata-nfv.eu).
 This is the main module of SONATA's Specific Manager Registry plugin.
 """
 import logging
-import time
 import uuid
-import yaml
 import string
 import random
 import threading
 import os
+import concurrent.futures as pool
 
 from sonmanobase.plugin import ManoBasePlugin
 from sonmanobase import messaging
+from sonmanobase import codec
 from son_mano_specific_manager_registry import smr_engine as engine
 from son_mano_specific_manager_registry import smr_topics as topic
+from son_mano_specific_manager_registry.smr_registrations import RegistrationEvents
 
 logging.basicConfig(level=logging.INFO)
 LOG = logging.getLogger("son-mano-specific-manager-registry")
@@ -58,6 +59,17 @@ class SpecificManagerRegistry(ManoBasePlugin):
         # a storage for f/ssms
         self.ssm_repo = {}
 
+        # started f/ssms wait for their registration
+        self.registrations = RegistrationEvents()
+        self.registration_timeout = int(os.environ.get('sm_registration_timeout', 60))
+
+        # the f/ssms of a request are started concurrently
+        self.sm_pool = pool.ThreadPoolExecutor(max_workers=int(os.environ.get('sm_start_workers', 10)))
+
+        # one broker connection per virtual host, shared by all requests
+        self.vh_connections = {}
+        self.vh_lock = threading.Lock()
+
         # connect to the docker daemon
         self.smrengine = engine.SMREngine()
 
@@ -78,7 +90,7 @@ class SpecificManagerRegistry(ManoBasePlugin):
         LOG.info('De-registering SMR with uuid ' + str(self.uuid))
         message = {"uuid": self.uuid}
         self.manoconn.notify("platform.management.plugin.deregister",
-                             yaml.dump(message))
+                             codec.encode(message))
         os._exit(0)
 
     def on_registration_ok(self):
@@ -107,89 +119,89 @@ class SpecificManagerRegistry(ManoBasePlugin):
     def on_ssm_onboard(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
-            message = yaml.load(message)
+            message = codec.decode(message, getattr(properties, 'content_type', None))
             if 'NSD' in message:
                 result = self.onboard(message)
-                return yaml.dump(result)
+                return codec.encode(result)
             else:
-                return yaml.dump({'status': 'Failed', 'error': 'NSD not found'})
+                return codec.encode({'status': 'Failed', 'error': 'NSD not found'})
 
     def on_fsm_onboard(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
-            message = yaml.load(message)
+            message = codec.decode(message, getattr(properties, 'content_type', None))
             if 'VNFD' in message:
                 result = self.onboard(message)
-                return yaml.dump(result)
+                return codec.encode(result)
             else:
-                return yaml.dump({'status': 'Failed', 'error': 'VNFD not found'})
+                return codec.encode({'status': 'Failed', 'error': 'VNFD not found'})
 
     def on_ssm_instantiate(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
-            message = yaml.load(message)
+            message = codec.decode(message, getattr(properties, 'content_type', None))
             if 'NSD' in message:
                 result = self.instantiate(message)
-                return yaml.dump(result)
+                return codec.encode(result)
             else:
-                return yaml.dump({'status': 'Failed', 'error': 'NSD not found'})
+                return codec.encode({'status': 'Failed', 'error': 'NSD not found'})
 
     def on_fsm_instantiate(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
-            message = yaml.load(message)
+            message = codec.decode(message, getattr(properties, 'content_type', None))
             if 'VNFD' in message:
                 result = self.instantiate(message)
-                return yaml.dump(result)
+                return codec.encode(result)
             else:
-                return yaml.dump({'status': 'Failed', 'error': 'VNFD not found'})
+                return codec.encode({'status': 'Failed', 'error': 'VNFD not found'})
 
 
     def on_ssm_update(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
-            message = yaml.load(message)
+            message = codec.decode(message, getattr(properties, 'content_type', None))
             if 'NSD' in message:
                 result = self.update(message)
-                return yaml.dump(result)
+                return codec.encode(result)
             else:
-                return yaml.dump({'status': 'Failed', 'error': 'NSD not found'})
+                return codec.encode({'status': 'Failed', 'error': 'NSD not found'})
 
     def on_fsm_update(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
-            message = yaml.load(message)
+            message = codec.decode(message, getattr(properties, 'content_type', None))
             if 'VNFD' in message:
                 result = self.update(message)
-                return yaml.dump(result)
+                return codec.encode(result)
             else:
-                return yaml.dump({'status': 'Failed', 'error': 'VNFD not found'})
+                return codec.encode({'status': 'Failed', 'error': 'VNFD not found'})
 
     def on_ssm_terminate(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
-            message = yaml.load(message)
+            message = codec.decode(message, getattr(properties, 'content_type', None))
             if 'NSD' in message:
                 result = self.terminate(message)
-                return yaml.dump(result)
+                return codec.encode(result)
             else:
-                return yaml.dump({'status': 'Failed', 'error': 'NSD not found'})
+                return codec.encode({'status': 'Failed', 'error': 'NSD not found'})
 
     def on_fsm_terminate(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
-            message = yaml.load(message)
+            message = codec.decode(message, getattr(properties, 'content_type', None))
             if 'VNFD' in message:
                 result = self.terminate(message)
-                return yaml.dump(result)
+                return codec.encode(result)
             else:
-                return yaml.dump({'status': 'Failed', 'error': 'VNFD not found'})
+                return codec.encode({'status': 'Failed', 'error': 'VNFD not found'})
 
     def on_ssm_register(self, ch, method, properties, message):
 
         if properties.app_id != self.name:
             try:
-                message = yaml.load(message)
+                message = codec.decode(message, getattr(properties, 'content_type', None))
 
                 # check if the message format is correct
                 if 'specific_manager_id' in message:
@@ -204,6 +216,7 @@ class SpecificManagerRegistry(ManoBasePlugin):
                             self.ssm_repo[sm_repo_id]['version'] = message['version']
                             self.ssm_repo[sm_repo_id]['description'] = message['description']
                             result = self.ssm_repo[sm_repo_id]
+                            self.registrations.registered(sm_repo_id)
                         else:
                             LOG.error("Cannot register '{0}', already exists".format(message['specific_manager_id']))
                             result = {'status': 'Failed', 'error': "Cannot register '{0}', "
@@ -224,6 +237,7 @@ class SpecificManagerRegistry(ManoBasePlugin):
                         }
                         self.ssm_repo.update({sm_repo_id: response})
                         result = response
+                        self.registrations.registered(sm_repo_id)
                 else:
                     result = {'status': 'Failed', 'error': 'Invalid registration request format'}
                     LOG.error("registration failed, invalid registration request format")
@@ -236,7 +250,7 @@ class SpecificManagerRegistry(ManoBasePlugin):
                     result = {'status': 'Failed', 'error': str(err)}
                     LOG.error("registration failed, Error: {0}".format(str(err)))
 
-            return yaml.dump(result)
+            return codec.encode(result)
 
     def onboard(self, message):
 
@@ -249,36 +263,28 @@ class SpecificManagerRegistry(ManoBasePlugin):
             descriptor = 'VNFD'
             manager = 'function_specific_managers'
 
-        for i in range(len(message[descriptor][manager])):
+        managers = message[descriptor][manager]
+        for sm in managers:
+            LOG.info('On-boarding request received for: {0}'.format(sm['id']))
 
-            m_id = message[descriptor][manager][i]['id']
-            m_image = message[descriptor][manager][i]['image']
+        # the images of all f/ssms are pulled at once
+        results = self.smrengine.pull_all([sm['image'] for sm in managers])
 
-            LOG.info('On-boarding request received for: {0}'.format(m_id))
-            try:
-                result = self.smrengine.pull(image=m_image)
-            except BaseException as error:
-                result_dict.update({m_id: {'status': 'Failed', 'error': str(error)}})
-                LOG.error('On-boarding failed for: {0}'.format(m_id))
+        for sm in managers:
+            m_id = sm['id']
+            result = results[sm['image']]
+            if 'error' not in result.keys():
+                LOG.info('On-boarding succeeded for: {0}'.format(m_id))
+                result_dict.update({m_id: {'status': 'On-boarded', 'error': 'None'}})
             else:
-                try:
-                    result = yaml.load(result.split("\n")[1])
-                except BaseException as error:
-                    LOG.error('On-boarding failed for: {0}'.format(m_id))
-                    result_dict.update({m_id: {'status': 'Failed', 'error': error}})
-                else:
-                    if 'error' not in result.keys():
-                        LOG.info('On-boarding succeeded for: {0}'.format(m_id))
-                        result_dict.update({m_id: {'status': 'On-boarded', 'error': 'None'}})
-                    else:
-                        LOG.error('On-boarding failed for: {0}'.format(m_id))
-                        result_dict.update({m_id: {'status': 'Failed', 'error': result['error']}})
+                LOG.error('On-boarding failed for: {0}'.format(m_id))
+                result_dict.update({m_id: {'status': 'Failed', 'error': result['error']}})
 
         return result_dict
 
     def instantiate(self, message):
 
-        descriptor = None; manager = None; result_dict = {}; sm_type='ssm'; v_host_error=False
+        descriptor = None; manager = None; result_dict = {}; sm_type='ssm'
 
         if 'NSD' in message:
             descriptor = 'NSD'
@@ -288,55 +294,95 @@ class SpecificManagerRegistry(ManoBasePlugin):
             manager = 'function_specific_managers'
             sm_type = 'fsm'
 
+        managers = message[descriptor][manager]
+
         # Create virtual host for the service/function to be used by SSM/FSM
-        response = self.smrengine.create_vh(sm_type=sm_type, uuid=message['UUID'])
+        if not self.connect_vh(sm_type, message['UUID']):
+            for sm in managers:
+                LOG.error('Instantiation failed for: {0}, Error: RabbitMQ virtual host creation failed'.format(sm['id']))
+                result_dict.update(
+                    {sm['id']: {'status': 'Failed', 'uuid': 'None', 'error': 'RabbitMQ virtual host creation failed'}})
+            return result_dict
 
-        if response == (201, 201) or (0,0):
-            url = "{0}/{1}-{2}".format(self.smrengine.sm_broker_host, sm_type, message['UUID'])
+        if 'private_key' in message:
+            p_key = message['private_key']
+        else:
+            p_key = None
+
+        # start all f/ssms at once, each one waits for its own registration
+        futures = []
+        for sm in managers:
+            futures.append((sm['id'], self.sm_pool.submit(self._instantiate_sm, sm['id'], sm['image'],
+                                                          sm_type, message['UUID'], p_key)))
+        for m_id, future in futures:
+            result_dict.update({m_id: future.result()})
+
+        return result_dict
+
+    def _instantiate_sm(self, m_id, m_image, sm_type, sf_uuid, p_key):
+
+        LOG.info('Instantiation request received for: {0}'.format(m_id))
+        sm_repo_name = "{0}{1}".format(m_id, sf_uuid)
+        self.registrations.expect(sm_repo_name)
+        try:
+            self.smrengine.start(id=m_id, image=m_image, sm_type=sm_type, uuid=sf_uuid, p_key=p_key)
+        except BaseException as error:
+            LOG.error('Instantiation failed for: {0}, Error: {1}'.format(m_id, error))
+            return {'status': 'Failed', 'uuid': 'None', 'error': str(error)}
+
+        registered = self.registrations.wait(sm_repo_name, self.registration_timeout)
+        self.registrations.forget(sm_repo_name)
+        if registered and sm_repo_name in self.ssm_repo:
+            LOG.debug('Registration & instantiation succeeded for: {0}'.format(m_id))
+            self.ssm_repo[sm_repo_name]['status'] = 'running'
+            return {'status': 'Instantiated', 'uuid': self.ssm_repo[sm_repo_name]['uuid'], 'error': 'None'}
+
+        LOG.error('Instantiation failed:SSM name {0} not found!'.format(m_id))
+        self.smrengine.rm(id=m_id, image=m_image, uuid=sf_uuid)
+        return {'status': 'Failed', 'uuid': 'None', 'error': 'Registration failed'}
+
+    def connect_vh(self, sm_type, uuid):
+        """
+        Create the virtual host of a service/function, if it doesn't exist
+        yet, and listen on it for registrations. The connection is reused
+        by all requests for the service/function.
+        :return: False if the virtual host could not be created
+        """
+        vh_name = '{0}-{1}'.format(sm_type, uuid)
+        with self.vh_lock:
+            if vh_name in self.vh_connections:
+                return True
+
+            response = self.smrengine.create_vh(sm_type=sm_type, uuid=uuid)
+            if response not in ((201, 201), (0, 0)):
+                return False
+
+            url = "{0}/{1}".format(self.smrengine.sm_broker_host, vh_name)
             connection = messaging.ManoBrokerRequestResponseConnection(app_id=self.name, url=url)
             connection.register_async_endpoint(self.on_ssm_register, topic.SSM_REGISTRATION)
-            time.sleep(1)
-            if response == (201, 201):
-                LOG.info('Virtual Host: {0}-{1} has been created!'.format(sm_type, message['UUID']))
-            else:
-                LOG.info('Virtual Host already exists')
+            self.vh_connections[vh_name] = connection
+
+        if response == (201, 201):
+            LOG.info('Virtual Host: {0} has been created!'.format(vh_name))
         else:
-            v_host_error = True
-        for i in range(len(message[descriptor][manager])):
-            if not v_host_error:
-                m_id = message[descriptor][manager][i]['id']
-                m_image = message[descriptor][manager][i]['image']
-                if 'private_key' in message:
-                    p_key = message['private_key']
-                else:
-                    p_key = None
-                LOG.info('Instantiation request received for: {0}'.format(m_id))
-                sm_repo_name= "{0}{1}".format(m_id, message['UUID'])
-                try:
-                    self.smrengine.start(id=m_id, image=m_image, sm_type=sm_type, uuid=message['UUID'], p_key= p_key)
-                except BaseException as error:
-                    LOG.error('Instantiation failed for: {0}, Error: {1}'.format(m_id, error))
-                    result_dict.update({m_id: {'status': 'Failed', 'uuid': 'None', 'error': str(error)}})
-                else:
-                    registration = threading.Thread(target= self._wait_for_sm_registration, args=[sm_repo_name,m_id])
-                    registration.daemon = True
-                    registration.start()
-                    registration.join()
-                    if sm_repo_name in self.ssm_repo.keys():
-                        LOG.debug('Registration & instantiation succeeded for: {0}'.format(m_id))
-                        self.ssm_repo[sm_repo_name]['status'] = 'running'
-                        result_dict.update({m_id: {'status': 'Instantiated',
-                                            'uuid': self.ssm_repo[sm_repo_name]['uuid'], 'error': 'None'}})
-                    else:
-                        LOG.error('Instantiation failed:SSM name {0} not found!'.format(m_id))
-                        result_dict.update({m_id: {'status': 'Failed', 'uuid': 'None', 'error': 'Registration failed'}})
-                        self.smrengine.rm(id=m_id, image=m_image, uuid= message['UUID'])
-            else:
-                LOG.error('Instantiation failed for: {0}, Error: RabbitMQ virtual host creation failed'.format(m_id))
-                result_dict.update(
-                    {m_id: {'status': 'Failed', 'uuid': 'None', 'error': 'RabbitMQ virtual host creation failed'}})
+            LOG.info('Virtual Host already exists')
+        return True
 
-        return result_dict
+    def release_vh(self, sm_type, uuid):
+        """
+        Close the connection to the virtual host of a service/function once
+        none of its f/ssms is left.
+        """
+        for sm in list(self.ssm_repo.values()):
+            if sm['sfuuid'] == uuid and sm['status'] != 'terminated':
+                return
+
+        vh_name = '{0}-{1}'.format(sm_type, uuid)
+        with self.vh_lock:
+            connection = self.vh_connections.pop(vh_name, None)
+        if connection is not None:
+            connection.stop_connection()
+            connection.stop_threads()
 
 
     def update(self, message):
@@ -352,20 +398,11 @@ class SpecificManagerRegistry(ManoBasePlugin):
             sm_type = 'fsm'
 
         # Create virtual host for the service/function to be used by SSM/FSM
-        response = self.smrengine.create_vh(sm_type=sm_type, uuid=message['UUID'])
-        if response == (201, 201) or (0,0):
-            url = "{0}/{1}-{2}".format(self.smrengine.sm_broker_host, sm_type, message['UUID'])
-            connection = messaging.ManoBrokerRequestResponseConnection(app_id=self.name, url=url)
-            connection.register_async_endpoint(self.on_ssm_register, topic.SSM_REGISTRATION)
-            time.sleep(1)
-            if (201,201):
-                LOG.info('Virtual Host: {0}-{1} has been created!'.format(sm_type, message['UUID']))
-            else:
-                LOG.info('Virtual Host already exists')
-        else:
+        if not self.connect_vh(sm_type, message['UUID']):
             v_host_error = True
 
         for i in range(len(message[descriptor][manager])):
+            m_id = message[descriptor][manager][i]['id']
 
             if not v_host_error:
                 # retrieve current id and image
@@ -391,12 +428,12 @@ class SpecificManagerRegistry(ManoBasePlugin):
                     # onboard the new SM
                     LOG.info('On-boarding started for : {0}'.format(m_id))
                     try:
-                        result = self.smrengine.pull(image=m_image)
+                        # the new version can have the tag of the current one
+                        result = self.smrengine.pull(image=m_image, force=True)
                     except BaseException as error:
                         result_dict.update({m_id: {'status': 'Failed', 'error': str(error)}})
                         LOG.error('On-boarding failed for: {0}'.format(m_id))
                     else:
-                        result = yaml.load(result.split("\n")[1])
                         if 'error' in result.keys():
                             LOG.error('On-boarding failed for: {0}'.format(m_id))
                             result_dict.update({m_id: {'status': 'Failed', 'error': result['error']}})
@@ -413,6 +450,8 @@ class SpecificManagerRegistry(ManoBasePlugin):
                                     p_key = None
                                 try:
                                     random_id = self.id_generator()
+                                    # the new version registers under the same name
+                                    self.registrations.expect(sm_repo_name, reset=True)
                                     self.smrengine.start(id=random_id, image=m_image, sm_type=sm_type,
                                                          uuid=message['UUID'], p_key= p_key)
                                 except BaseException as error:
@@ -422,10 +461,8 @@ class SpecificManagerRegistry(ManoBasePlugin):
                                 else:
 
                                     # Check if update is successfully done.
-                                    update = threading.Thread(target=self._wait_for_update, args=[sm_repo_name])
-                                    update.daemon = True
-                                    update.start()
-                                    update.join()
+                                    self.registrations.wait(sm_repo_name, self.registration_timeout)
+                                    self.registrations.forget(sm_repo_name)
 
                                     if self.ssm_repo[sm_repo_name]['status'] == 'registered':
                                         LOG.debug('Registration & instantiation succeeded for: {0}'.format(m_id))
@@ -469,6 +506,7 @@ class SpecificManagerRegistry(ManoBasePlugin):
                                 else:
                                     p_key = None
                                 try:
+                                    self.registrations.expect(sm_repo_name)
                                     self.smrengine.start(id=m_id, image=m_image, sm_type=sm_type, uuid=message['UUID'], p_key= p_key)
                                 except BaseException as error:
                                     LOG.error('Instantiation failed for: {0}, Error: {1}'.format(m_id, error))
@@ -477,11 +515,8 @@ class SpecificManagerRegistry(ManoBasePlugin):
                                 else:
 
                                     # Check if the registration is successfully done
-                                    registration = threading.Thread(target=self._wait_for_sm_registration,
-                                                                    args=[sm_repo_name, m_id])
-                                    registration.daemon = True
-                                    registration.start()
-                                    registration.join()
+                                    self.registrations.wait(sm_repo_name, self.registration_timeout)
+                                    self.registrations.forget(sm_repo_name)
 
                                     if sm_repo_name in self.ssm_repo.keys():
                                         LOG.debug('Registration & instantiation succeeded for: {0}'.format(m_id))
@@ -514,7 +549,7 @@ class SpecificManagerRegistry(ManoBasePlugin):
 
     def terminate(self, message):
 
-        descriptor = None; manager = None; result_dict = {}
+        descriptor = None; manager = None; result_dict = {}; sm_type = 'ssm'
 
         if 'NSD' in message:
             descriptor = 'NSD'
@@ -522,6 +557,7 @@ class SpecificManagerRegistry(ManoBasePlugin):
         elif 'VNFD' in message:
             descriptor = 'VNFD'
             manager = 'function_specific_managers'
+            sm_type = 'fsm'
 
         # terminating all SSMs within the NSD/VNFD
         for i in range(len(message[descriptor][manager])):
@@ -537,36 +573,16 @@ class SpecificManagerRegistry(ManoBasePlugin):
                         result_dict.update({m_id: {'status': 'Failed', 'error': str(error)}})
                     else:
                         LOG.debug("Termination succeeded for: {0}".format(m_id))
-                        self.ssm_repo["{0}{1}".format(m_id, message['UUID'])]['status']= 'terminated'
+                        sm_repo_name = "{0}{1}".format(m_id, message['UUID'])
+                        self.ssm_repo[sm_repo_name]['status'] = 'terminated'
+                        self.registrations.forget(sm_repo_name)
                         result_dict.update({m_id: {'status': 'Terminated', 'error': 'None'}})
 
+        self.release_vh(sm_type, message['UUID'])
         return result_dict
 
-    def _wait_for_sm_registration(self, rep_name, name):
-        c = 0
-        timeout = 60
-        sleep_interval = 2
-        while rep_name not in self.ssm_repo.keys() and c < timeout:
-            time.sleep(sleep_interval)
-            c += sleep_interval
-
-        if c >= 60:
-            LOG.error('Instantiation failed for: {0}, Registration failed- timeout error'.format(name))
-
-    def _wait_for_update(self, name):
-        c = 0
-        timeout = 60
-        sleep_interval = 2
-        while self.ssm_repo[name]['status'] != 'registered' and c < timeout:
-            time.sleep(sleep_interval)
-            c += sleep_interval
-
-        if c >= 60:
-            LOG.error('Updating failed for: {0}, timeout error'.format(name))
-
-
     def on_ssm_status(self, ch, method, properties, message):
-        message = yaml.load(message)
+        message = codec.decode(message, getattr(properties, 'content_type', None))
         LOG.info('{0} status: {1}'.format(message['name'], message['status']))
 
     def id_generator(self):
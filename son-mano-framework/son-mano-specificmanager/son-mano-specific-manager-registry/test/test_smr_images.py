@@ -0,0 +1,101 @@
+import unittest
+import threading
+import time
+
+from son_mano_specific_manager_registry.smr_images import ImageCache, decode_pull
+
+
+class FakeDocker(object):
+    """
+    Keeps the images in a dict, a pull takes a little while.
+    """
+
+    def __init__(self, sizes, fail=()):
+        self.sizes = sizes
+        self.fail = fail
+        self.present = {}
+        self.pulls = []
+        self.removed = []
+        self.lock = threading.Lock()
+
+    def pull(self, image):
+        with self.lock:
+            self.pulls.append(image)
+        time.sleep(0.1)
+        if image in self.fail:
+            return '{"status": "Pulling"}\n{"error": "not found"}\n'
+        self.present[image] = self.sizes[image]
+        return '{"status": "Pulling"}\n{"status": "Downloaded newer image for %s"}\n' % image
+
+    def inspect_image(self, image):
+        if image not in self.present:
+            raise Exception('No such image')
+        return {'Id': 'sha256:' + image, 'RepoDigests': [image + '@sha256:1'],
+                'Size': self.present[image]}
+
+    def remove_image(self, image):
+        self.removed.append(image)
+        del self.present[image]
+
+
+class test_SMR_images(unittest.TestCase):
+
+    def setUp(self):
+        self.dc = FakeDocker({'ssm1': 100, 'ssm2': 100, 'fsm1': 100})
+        self.images = ImageCache(self.dc, budget=250)
+
+    def test_decode_pull(self):
+        self.assertEqual(decode_pull('{"status": "a"}\n{"error": "b"}\n{"status": "c"}\n'), {'error': 'b'})
+        self.assertEqual(decode_pull('{"status": "a"}\n{"status": "c"}\n'), {'status': 'c'})
+
+    def test_second_pull_is_a_hit(self):
+        self.assertNotIn('error', self.images.pull('ssm1'))
+        result = self.images.pull('ssm1')
+        self.assertEqual(result['digest'], 'ssm1@sha256:1')
+        self.assertEqual(self.dc.pulls, ['ssm1'])
+        self.assertEqual(self.images.stats()['hits'], 1)
+
+    def test_present_image_is_not_pulled(self):
+        self.dc.present['ssm1'] = 100
+        self.assertNotIn('error', self.images.pull('ssm1'))
+        self.assertEqual(self.dc.pulls, [])
+        self.images.pull('ssm1', force=True)
+        self.assertEqual(self.dc.pulls, ['ssm1'])
+
+    def test_pull_all_in_parallel(self):
+        start = time.time()
+        results = self.images.pull_all(['ssm1', 'fsm1', 'ssm1'])
+        self.assertLess(time.time() - start, 0.3)
+        self.assertEqual(sorted(self.dc.pulls), ['fsm1', 'ssm1'])
+        self.assertEqual(sorted(results.keys()), ['fsm1', 'ssm1'])
+
+    def test_failed_pull_is_retried(self):
+        self.dc.fail = ('ssm1',)
+        self.assertEqual(self.images.pull('ssm1'), {'error': 'not found'})
+        self.assertEqual(len(self.dc.pulls), 3)
+        self.assertEqual(self.images.stats()['images'], 0)
+
+    def test_evict_least_recently_used(self):
+        self.images.pull('ssm1')
+        self.images.pull('ssm2')
+        self.images.pull('ssm1')
+        self.images.pull('fsm1')
+        self.assertEqual(self.dc.removed, ['ssm2'])
+        self.assertEqual(self.images.stats()['size'], 200)
+
+    def test_images_in_use_are_kept(self):
+        self.images.pull('ssm1')
+        self.images.acquire('ssm1')
+        self.images.pull('ssm2')
+        self.images.pull('fsm1')
+        self.assertEqual(self.dc.removed, ['ssm2'])
+        self.images.release('ssm1')
+        self.assertEqual(self.dc.removed, ['ssm2'])
+        self.images.budget = 100
+        self.images.release('ssm1')
+        self.images.evict()
+        self.assertEqual(self.dc.removed, ['ssm2', 'ssm1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
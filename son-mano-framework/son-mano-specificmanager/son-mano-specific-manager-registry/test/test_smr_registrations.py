@@ -0,0 +1,67 @@
+import unittest
+import threading
+import time
+
+from son_mano_specific_manager_registry.smr_registrations import RegistrationEvents
+
+
+class test_SMR_registrations(unittest.TestCase):
+
+    def setUp(self):
+        self.events = RegistrationEvents()
+
+    def test_registration_wakes_waiter(self):
+        self.events.expect('ssm1')
+        threading.Timer(0.05, self.events.registered, args=['ssm1']).start()
+        start = time.time()
+        self.assertTrue(self.events.wait('ssm1', 5))
+        self.assertLess(time.time() - start, 1)
+
+    def test_early_registration(self):
+        # the manager registered before the SMR started waiting
+        self.events.expect('ssm1')
+        self.events.registered('ssm1')
+        self.assertTrue(self.events.wait('ssm1', 0))
+
+    def test_timeout(self):
+        self.events.expect('ssm1')
+        self.events.registered('ssm2')
+        self.assertFalse(self.events.wait('ssm1', 0.05))
+
+    def test_reset_for_update(self):
+        self.events.registered('ssm1')
+        self.events.expect('ssm1', reset=True)
+        self.assertFalse(self.events.wait('ssm1', 0.05))
+        self.events.registered('ssm1')
+        self.assertTrue(self.events.wait('ssm1', 0))
+
+    def test_forget(self):
+        self.events.expect('ssm1')
+        self.events.registered('ssm1')
+        self.events.forget('ssm1')
+        # late or unexpected registrations do not leave an event behind
+        self.events.registered('ssm1')
+        self.events.registered('ssm2')
+        self.assertEqual(self.events._events, {})
+
+    def test_concurrent_waiters(self):
+        names = ['sm{0}'.format(i) for i in range(10)]
+        results = {}
+
+        def wait(name):
+            results[name] = self.events.wait(name, 5)
+
+        for name in names:
+            self.events.expect(name)
+        threads = [threading.Thread(target=wait, args=[name]) for name in names]
+        for thread in threads:
+            thread.start()
+        for name in reversed(names):
+            self.events.registered(name)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, dict((name, True) for name in names))
+
+
+if __name__ == '__main__':
+    unittest.main()